@@ -0,0 +1,13 @@
+"""
+Бенчмарки производительности Binom Assistant
+
+Содержит:
+- генератор синтетической SQLite базы (synthetic_data)
+- прогон всех модулей аналитики с замером времени, запросов и памяти (module_benchmark)
+"""
+from .synthetic_data import generate_synthetic_database, SyntheticDataConfig
+
+__all__ = [
+    'generate_synthetic_database',
+    'SyntheticDataConfig',
+]
@@ -0,0 +1,175 @@
+"""
+Бенчмарк накладных расходов логирования
+
+Сравнивает два способа записи логов:
+- sync:  handlers файла и консоли на корневом логгере, запись в потоке вызова
+- queue: utils.logging_setup - QueueHandler в потоке вызова, запись в отдельном потоке
+
+Замеры:
+- время вызова logger.info в потоке вызова (мкс на запись)
+- время запроса (вызов ASGI) к минимальному FastAPI приложению без LoggingMiddleware
+  и с ней (все запросы в логе и выборочно), накладные расходы на запрос
+
+Консоль пишется в файл во временной папке (как stdout в docker/systemd).
+
+Использование (из папки binom_assistant):
+    python -m benchmarks.logging_benchmark
+    python -m benchmarks.logging_benchmark --records 50000 --requests 5000
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from utils.log_index import ErrorIndexFileHandler
+from utils.logging_setup import (
+    DATE_FORMAT, LOG_BACKUP_COUNT, LOG_FORMAT, LOG_MAX_BYTES, setup_logging, stop_logging
+)
+
+logger = logging.getLogger("benchmarks.logging")
+
+
+def configure(pipeline: str, log_dir: Path) -> None:
+    """
+    Настраивает корневой логгер.
+
+    Args:
+        pipeline: sync - handlers на корневом логгере, queue - utils.logging_setup
+        log_dir: Папка для app.log и console.log
+    """
+    stop_logging()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers:
+        handler.close()
+    root_logger.handlers.clear()
+
+    # Консоль - в файл, одинаково для обоих вариантов
+    console = open(log_dir / "console.log", 'a', encoding='utf-8')
+
+    if pipeline == "queue":
+        # StreamHandler консоли запоминает sys.stdout при создании
+        with contextlib.redirect_stdout(console):
+            setup_logging(log_file=log_dir / "app.log", console=True)
+        return
+
+    formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+    root_logger.setLevel(logging.INFO)
+    handlers = [
+        ErrorIndexFileHandler(log_dir / "app.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'),
+        logging.StreamHandler(console),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root_logger.addHandler(handler)
+
+
+def bench_records(records: int) -> float:
+    """Среднее время logger.info в потоке вызова, мкс"""
+    started = time.perf_counter()
+    for i in range(records):
+        logger.info("Getting stats for campaign %s: date=%s, group1=%s", i, 3, 31)
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def build_app(sample_rate: Optional[float]):
+    """Минимальное приложение; sample_rate None - без LoggingMiddleware"""
+    from fastapi import FastAPI
+    from interfaces.web.middleware import LoggingMiddleware
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if sample_rate is not None:
+        app.add_middleware(LoggingMiddleware, sample_rate=sample_rate, slow_ms=1000)
+    return app
+
+
+async def _run_requests(app, requests: int) -> List[float]:
+    """Запросы GET /ping напрямую через ASGI (без сети и HTTP клиента)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    latencies = []
+    for i in range(requests + 100):
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        # Первые 100 запросов - прогрев
+        if i >= 100:
+            latencies.append((time.perf_counter() - started) * 1e6)
+    assert set(statuses) == {200}
+    return latencies
+
+
+def bench_requests(sample_rate: Optional[float], requests: int) -> Dict[str, float]:
+    """Медиана и среднее времени запроса, мкс"""
+    latencies = asyncio.run(_run_requests(build_app(sample_rate), requests))
+    return {"median_us": statistics.median(latencies), "mean_us": statistics.fmean(latencies)}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Measure logging overhead (sync vs queue pipeline)')
+    parser.add_argument('--records', type=int, default=20000, help='logger.info calls per pipeline')
+    parser.add_argument('--requests', type=int, default=20000, help='HTTP requests per variant')
+    parser.add_argument('--sample-rate', type=float, default=0.1, help='LoggingMiddleware sample rate')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'pipeline':<8} {'variant':<18} {'median us':>10} {'mean us':>10} {'overhead us':>12}")
+        for pipeline in ("sync", "queue"):
+            log_dir = Path(tmp) / pipeline
+            log_dir.mkdir()
+
+            # Перед каждым замером логирование настраивается заново: stop_logging()
+            # дописывает очередь, записи прошлого замера не пишутся во время следующего
+            configure(pipeline, log_dir)
+            record_us = bench_records(args.records)
+            print(f"{pipeline:<8} {'logger.info':<18} {record_us:>10.1f}")
+
+            baseline = None
+            for label, sample_rate in (("no middleware", None), ("log all", 1.0),
+                                       (f"sample {args.sample_rate:g}", args.sample_rate)):
+                configure(pipeline, log_dir)
+                result = bench_requests(sample_rate, args.requests)
+                if baseline is None:
+                    baseline = result["median_us"]
+                print(
+                    f"{pipeline:<8} {label:<18} {result['median_us']:>10.1f} {result['mean_us']:>10.1f} "
+                    f"{result['median_us'] - baseline:>12.1f}"
+                )
+        stop_logging()
+        logging.getLogger().handlers.clear()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Бенчмарк модулей аналитики на синтетических данных
+
+Генерирует (или переиспользует) синтетическую базу, прогоняет каждый
+зарегистрированный модуль через ModuleRunner и замеряет:
+- wall time прогона
+- количество SQL запросов (через событие before_cursor_execute)
+- пиковое потребление памяти Python (tracemalloc)
+
+Результаты сохраняются в JSON baseline. При передаче --compare текущий прогон
+сравнивается с предыдущим baseline и выводятся регрессии.
+
+Использование (из папки binom_assistant):
+    python -m benchmarks.module_benchmark --campaigns 500 --days 90
+    python -m benchmarks.module_benchmark --campaigns 5000 --compare benchmarks/results/modules_500x90.json
+    python -m benchmarks.module_benchmark --campaigns 50000 --modules bleeding_detector,roi_forecast --timeout 600
+    python -m benchmarks.module_benchmark --campaigns 10000 --days 30 --modules waste_campaign_finder --no-memory
+
+ВАЖНО: количество запросов включает служебные запросы ModuleRunner
+(загрузка конфига и сохранение run), одинаковые для всех модулей.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = ROOT_DIR / "data" / "benchmarks"
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class QueryCounter:
+    """
+    Считает SQL запросы, выполненные через engine.
+
+    Подписывается на событие before_cursor_execute, поэтому учитывает
+    запросы из любых потоков (модули выполняются в ThreadPoolExecutor).
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self._lock = threading.Lock()
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+    def reset(self) -> int:
+        """Сбрасывает счетчик и возвращает предыдущее значение"""
+        with self._lock:
+            value, self.count = self.count, 0
+        return value
+
+
+def _prepare_environment(db_path: Path) -> None:
+    """
+    Направляет приложение на синтетическую базу.
+
+    Вызывается ДО первого get_config(): конфиг читает DATABASE_URL при инициализации.
+    """
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path.resolve()}"
+    os.environ.setdefault('BINOM_URL', 'http://benchmark.local/index.php')
+    os.environ.setdefault('BINOM_API_KEY', 'benchmark')
+
+
+def run_benchmark(
+    module_ids: Optional[List[str]] = None,
+    timeout_seconds: Optional[int] = None,
+    track_memory: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Прогоняет модули через ModuleRunner и собирает метрики.
+
+    Args:
+        module_ids: Список ID модулей (None - все зарегистрированные)
+        timeout_seconds: Переопределение таймаута модулей
+        track_memory: Замерять пиковую память через tracemalloc (замедляет прогон)
+
+    Returns:
+        Dict module_id -> метрики
+    """
+    from storage.database.base import get_engine
+    from modules.registry import get_registry
+    from modules.module_runner import ModuleRunner
+    from modules.startup import register_all_modules
+
+    registry = get_registry()
+    if registry.get_count() == 0:
+        register_all_modules()
+
+    runner = ModuleRunner()
+    counter = QueryCounter(get_engine())
+
+    if module_ids is None:
+        module_ids = sorted(m.id for m in registry.list_modules())
+
+    results = {}
+    if track_memory:
+        tracemalloc.start()
+
+    try:
+        for module_id in module_ids:
+            module = registry.get_module_instance(module_id)
+            if module is None:
+                logger.warning(f"Module '{module_id}' not found, skipping")
+                continue
+
+            config = module.config
+            if timeout_seconds is not None:
+                config = config.model_copy(update={'timeout_seconds': timeout_seconds})
+
+            counter.reset()
+            if track_memory:
+                tracemalloc.reset_peak()
+                memory_before, _ = tracemalloc.get_traced_memory()
+
+            started = time.perf_counter()
+            result = runner.run_module(module_id, config=config, use_cache=False)
+            wall_ms = (time.perf_counter() - started) * 1000
+
+            queries = counter.reset()
+            peak_kb = None
+            if track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak_kb = round(max(peak - memory_before, 0) / 1024, 1)
+
+            results[module_id] = {
+                'category': module.metadata.category,
+                'status': result.status,
+                'wall_ms': round(wall_ms, 1),
+                'execution_time_ms': result.execution_time_ms,
+                'queries': queries,
+                'peak_memory_kb': peak_kb,
+                'error': result.error,
+            }
+            logger.info(
+                f"[{module_id}] {result.status} "
+                f"{wall_ms:.0f}ms, {queries} queries, peak {peak_kb} KB"
+            )
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+
+    return results
+
+
+def compare_results(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold_pct: float = 20.0
+) -> List[Dict[str, Any]]:
+    """
+    Сравнивает метрики текущего прогона с baseline.
+
+    Args:
+        current: Метрики текущего прогона (module_id -> метрики)
+        baseline: Метрики baseline
+        threshold_pct: Порог регрессии по времени в процентах
+
+    Returns:
+        Список строк сравнения по модулям, присутствующим в обоих прогонах
+    """
+    rows = []
+    for module_id, metrics in current.items():
+        base = baseline.get(module_id)
+        if not base:
+            continue
+
+        base_ms = base.get('wall_ms') or 0
+        time_delta_pct = ((metrics['wall_ms'] - base_ms) / base_ms * 100) if base_ms > 0 else 0.0
+
+        rows.append({
+            'module_id': module_id,
+            'baseline_ms': base_ms,
+            'current_ms': metrics['wall_ms'],
+            'time_delta_pct': round(time_delta_pct, 1),
+            'baseline_queries': base.get('queries'),
+            'current_queries': metrics['queries'],
+            'status_changed': base.get('status') != metrics['status'],
+            'regression': (
+                time_delta_pct > threshold_pct
+                or (metrics['queries'] or 0) > (base.get('queries') or 0)
+                or (base.get('status') == 'success' and metrics['status'] != 'success')
+            )
+        })
+
+    rows.sort(key=lambda r: r['time_delta_pct'], reverse=True)
+    return rows
+
+
+def _print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    """Печатает таблицу результатов, отсортированную по времени"""
+    print()
+    print(f"{'module':<32} {'status':<8} {'wall ms':>10} {'queries':>8} {'peak KB':>10}")
+    print("-" * 72)
+    for module_id, m in sorted(results.items(), key=lambda kv: kv[1]['wall_ms'], reverse=True):
+        peak = f"{m['peak_memory_kb']:.0f}" if m['peak_memory_kb'] is not None else "-"
+        print(f"{module_id:<32} {m['status']:<8} {m['wall_ms']:>10.0f} {m['queries']:>8} {peak:>10}")
+    total_ms = sum(m['wall_ms'] for m in results.values())
+    total_queries = sum(m['queries'] for m in results.values())
+    print("-" * 72)
+    print(f"{'TOTAL':<32} {'':<8} {total_ms:>10.0f} {total_queries:>8}")
+
+
+def _print_comparison(rows: List[Dict[str, Any]], threshold_pct: float) -> None:
+    """Печатает сравнение с baseline"""
+    print()
+    print(f"Comparison with baseline (regression threshold: +{threshold_pct:.0f}% time or more queries)")
+    print(f"{'module':<32} {'base ms':>10} {'now ms':>10} {'delta':>8} {'queries':>12}")
+    print("-" * 78)
+    for r in rows:
+        marker = " <-- REGRESSION" if r['regression'] else ""
+        queries = f"{r['baseline_queries']}->{r['current_queries']}"
+        print(
+            f"{r['module_id']:<32} {r['baseline_ms']:>10.0f} {r['current_ms']:>10.0f} "
+            f"{r['time_delta_pct']:>+7.1f}% {queries:>12}{marker}"
+        )
+
+
+def parse_args(argv=None):
+    """Парсинг аргументов командной строки"""
+    parser = argparse.ArgumentParser(description='Benchmark analytics modules on synthetic data')
+    parser.add_argument('--campaigns', type=int, default=500, help='Number of synthetic campaigns (500 / 5000 / 50000)')
+    parser.add_argument('--days', type=int, default=90, help='Days of history')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--db', type=Path, default=None, help='Synthetic DB path (default: data/benchmarks/synthetic_<N>x<D>.db)')
+    parser.add_argument('--reuse-db', action='store_true', help='Reuse existing synthetic DB instead of regenerating')
+    parser.add_argument('--modules', default=None, help='Comma-separated module ids (default: all)')
+    parser.add_argument('--timeout', type=int, default=None, help='Override module timeout in seconds')
+    parser.add_argument('--no-memory', action='store_true', help='Disable tracemalloc (faster, no peak memory)')
+    parser.add_argument('--output', type=Path, default=None, help='Output JSON path (default: benchmarks/results/modules_<N>x<D>.json)')
+    parser.add_argument('--compare', type=Path, default=None, help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=20.0, help='Regression threshold for time, percent')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with code 1 if regressions found')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI"""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+
+    scale_tag = f"{args.campaigns}x{args.days}"
+    db_path = args.db or DEFAULT_DATA_DIR / f"synthetic_{scale_tag}.db"
+    output_path = args.output or DEFAULT_RESULTS_DIR / f"modules_{scale_tag}.json"
+
+    _prepare_environment(db_path)
+
+    from benchmarks.synthetic_data import generate_synthetic_database, SyntheticDataConfig
+
+    generation = None
+    if not (args.reuse_db and db_path.exists()):
+        print(f"Generating synthetic database {db_path} ({scale_tag})...")
+        generation = generate_synthetic_database(
+            db_path,
+            SyntheticDataConfig(campaigns=args.campaigns, days=args.days, seed=args.seed)
+        )
+        print(f"Generated in {generation['generation_seconds']}s: {generation['rows']}")
+
+    module_ids = [m.strip() for m in args.modules.split(',')] if args.modules else None
+    results = run_benchmark(
+        module_ids=module_ids,
+        timeout_seconds=args.timeout,
+        track_memory=not args.no_memory
+    )
+    _print_report(results)
+
+    payload = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'campaigns': args.campaigns,
+            'days': args.days,
+            'seed': args.seed,
+            'timeout_override': args.timeout,
+            'track_memory': not args.no_memory,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'generation': generation,
+        },
+        'modules': results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\nResults saved to {output_path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        rows = compare_results(results, baseline.get('modules', {}), args.threshold)
+        _print_comparison(rows, args.threshold)
+        regressions = [r for r in rows if r['regression']]
+        print(f"\nRegressions: {len(regressions)}")
+        if regressions and args.fail_on_regression:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
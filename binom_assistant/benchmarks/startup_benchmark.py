@@ -0,0 +1,189 @@
+"""
+Бенчмарк старта системы модулей (import-time profile)
+
+Запускает регистрацию модулей в отдельном процессе с `python -X importtime`
+и сравнивает два режима:
+- lazy:  register_all_modules() + list_modules() (как при старте приложения)
+- eager: то же + load_all() (импорт всех 42 модулей, прежнее поведение)
+
+Для каждого режима выводит:
+- wall time регистрации (внутри процесса)
+- суммарное время импортов и количество импортированных модулей
+- самые дорогие импорты (по накопленному и собственному времени, все уровни вложенности)
+- загружены ли numpy / pandas
+
+Использование (из папки binom_assistant):
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --top 25 --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Код, выполняемый в дочернем процессе. Последняя строка stdout - JSON с замерами.
+_CHILD_CODE = """
+import json, sys, time
+started = time.perf_counter()
+from modules.startup import register_all_modules
+from modules.registry import get_registry
+register_all_modules()
+registry = get_registry()
+registry.list_modules()
+if {eager!r}:
+    registry.load_all()
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    'register_ms': round(elapsed_ms, 1),
+    'modules_registered': registry.get_count(),
+    'modules_loaded': sum(1 for m in registry.list_modules() if registry.is_loaded(m.id)),
+    'numpy_loaded': 'numpy' in sys.modules,
+    'pandas_loaded': 'pandas' in sys.modules,
+}}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Разбирает вывод -X importtime.
+
+    Returns:
+        Список импортов: name, self_us, cumulative_us, depth
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        imports.append({
+            'name': name,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(indent) - 1) // 2,
+        })
+    return imports
+
+
+def profile_startup(eager: bool) -> Dict[str, Any]:
+    """
+    Профилирует регистрацию модулей в чистом процессе.
+
+    Args:
+        eager: Импортировать все модули (load_all) после регистрации
+
+    Returns:
+        Dict с замерами процесса и списком импортов
+    """
+    env = dict(os.environ)
+    env.setdefault('BINOM_URL', 'http://benchmark.local/index.php')
+    env.setdefault('BINOM_API_KEY', 'benchmark')
+
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE.format(eager=eager)],
+        cwd=str(ROOT_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    measures = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(completed.stderr)
+    measures['imports'] = imports
+    measures['import_count'] = len(imports)
+    measures['import_total_ms'] = round(sum(i['self_us'] for i in imports) / 1000, 1)
+    return measures
+
+
+def summarize(runs: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """
+    Сводка по нескольким прогонам одного режима (медианы + топ импортов последнего прогона).
+    """
+    last = runs[-1]
+
+    return {
+        'register_ms': statistics.median(r['register_ms'] for r in runs),
+        'import_total_ms': statistics.median(r['import_total_ms'] for r in runs),
+        'import_count': last['import_count'],
+        'modules_registered': last['modules_registered'],
+        'modules_loaded': last['modules_loaded'],
+        'numpy_loaded': last['numpy_loaded'],
+        'pandas_loaded': last['pandas_loaded'],
+        'top_self': sorted(last['imports'], key=lambda i: i['self_us'], reverse=True)[:top],
+        'top_cumulative': sorted(last['imports'], key=lambda i: i['cumulative_us'], reverse=True)[:top],
+    }
+
+
+def _print_summary(mode: str, summary: Dict[str, Any]) -> None:
+    """Печатает отчет по режиму"""
+    print()
+    print(f"=== {mode} ===")
+    print(
+        f"register: {summary['register_ms']:.0f} ms | imports: {summary['import_count']} "
+        f"({summary['import_total_ms']:.0f} ms) | modules loaded: "
+        f"{summary['modules_loaded']}/{summary['modules_registered']} | "
+        f"numpy: {summary['numpy_loaded']} | pandas: {summary['pandas_loaded']}"
+    )
+    print(f"{'import (cumulative)':<48} {'ms':>8}    {'import (self)':<48} {'ms':>8}")
+    for cumulative, own in zip(summary['top_cumulative'], summary['top_self']):
+        print(
+            f"{cumulative['name']:<48} {cumulative['cumulative_us'] / 1000:>8.1f}    "
+            f"{own['name']:<48} {own['self_us'] / 1000:>8.1f}"
+        )
+
+
+def parse_args(argv=None):
+    """Парсинг аргументов командной строки"""
+    parser = argparse.ArgumentParser(description='Profile module system import time (lazy vs eager)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode (median is reported)')
+    parser.add_argument('--top', type=int, default=15, help='Number of heaviest imports to show')
+    parser.add_argument('--output', type=Path, default=DEFAULT_RESULTS_DIR / "startup.json", help='Output JSON path')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI"""
+    args = parse_args(argv)
+
+    results = {}
+    for mode, eager in (('lazy', False), ('eager', True)):
+        runs = [profile_startup(eager) for _ in range(max(args.repeat, 1))]
+        results[mode] = summarize(runs, args.top)
+        _print_summary(mode, results[mode])
+
+    lazy, eager = results['lazy'], results['eager']
+    saved_ms = eager['register_ms'] - lazy['register_ms']
+    print()
+    print(f"Lazy registry saves {saved_ms:.0f} ms "
+          f"({eager['import_count'] - lazy['import_count']} fewer imports) at startup")
+
+    payload = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'modes': results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\nResults saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""
+Генератор синтетической базы данных для бенчмарков модулей
+
+Создает SQLite базу со схемой приложения и заполняет ее правдоподобными данными:
+- кампании с разным базовым ROI, трендом, волатильностью и approve rate
+- кампании, которые стартуют позже окна и "умирают" до его конца
+- дневная статистика кампаний, источников, офферов и партнерок
+
+Все распределения детерминированы через seed, поэтому прогоны на одной
+конфигурации сравнимы между собой.
+
+Использование:
+    from benchmarks import generate_synthetic_database, SyntheticDataConfig
+
+    generate_synthetic_database("data/bench.db", SyntheticDataConfig(campaigns=5000, days=90))
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+from sqlalchemy import create_engine
+
+from storage.database.base import Base
+from storage.database import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+from storage.database.models import (
+    Campaign, CampaignStatsDaily,
+    TrafficSource, TrafficSourceStatsDaily,
+    Offer, OfferStatsDaily,
+    AffiliateNetwork, NetworkStatsDaily
+)
+
+logger = logging.getLogger(__name__)
+
+# Размер пачки для executemany вставок
+INSERT_CHUNK_SIZE = 20000
+
+GROUP_VERTICALS = ["Nutra", "Gambling", "Dating", "Crypto", "Sweeps", "Finance", "Apps", "Ecom"]
+GEOS = ["RU", "KZ", "BR", "MX", "IN", "ID", "TH", "VN", "PL", "DE", "US", "ES"]
+
+
+class SyntheticDataConfig(BaseModel):
+    """Параметры генерации синтетической базы"""
+    campaigns: int = Field(default=500, ge=1, description="Количество кампаний")
+    days: int = Field(default=90, ge=7, description="Глубина истории в днях (включая сегодня)")
+    seed: int = Field(default=42, description="Seed генератора случайных чисел")
+    cpl_share: float = Field(default=0.2, ge=0, le=1, description="Доля CPL кампаний")
+    dead_share: float = Field(default=0.15, ge=0, le=1, description="Доля кампаний, остановленных до конца окна")
+    late_start_share: float = Field(default=0.25, ge=0, le=1, description="Доля кампаний, стартовавших внутри окна")
+
+
+def _round2(values: np.ndarray) -> List[float]:
+    """Округляет массив до 2 знаков и возвращает список Python float"""
+    return np.round(values, 2).tolist()
+
+
+def _generate_campaign_profiles(cfg: SyntheticDataConfig, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Генерирует постоянные характеристики кампаний.
+
+    Returns:
+        Dict с массивами длины cfg.campaigns
+    """
+    n = cfg.campaigns
+
+    # Базовый ROI: большинство около нуля/в минусе, длинный правый хвост прибыльных
+    base_roi = np.clip(rng.normal(-8, 35, n) + rng.exponential(15, n) * (rng.random(n) < 0.3), -95, 400)
+    # Тренд ROI в п.п. в день
+    roi_slope = rng.normal(0, 0.6, n)
+    # Волатильность дневного ROI (п.п.)
+    volatility = rng.lognormal(np.log(20), 0.6, n)
+    # Дневной расход (логнормальный, от единиц до сотен долларов)
+    base_spend = rng.lognormal(np.log(15), 1.1, n)
+    # CPC
+    cpc = rng.lognormal(np.log(0.04), 0.7, n)
+    # CR (доля, не проценты)
+    cr = rng.beta(2, 60, n)
+    # Approve rate (доля)
+    approve = rng.beta(6, 4, n)
+    # Кампании с "обвалом" апрува в конце окна (для squeezed/zero approval)
+    approve_crash = rng.random(n) < 0.05
+
+    start_day = np.zeros(n, dtype=int)
+    late = rng.random(n) < cfg.late_start_share
+    start_day[late] = rng.integers(1, max(2, cfg.days - 5), late.sum())
+
+    end_day = np.full(n, cfg.days, dtype=int)
+    dead = rng.random(n) < cfg.dead_share
+    end_day[dead] = np.maximum(start_day[dead] + 3, rng.integers(5, cfg.days, dead.sum()))
+    end_day = np.minimum(end_day, cfg.days)
+
+    return {
+        'base_roi': base_roi,
+        'roi_slope': roi_slope,
+        'volatility': volatility,
+        'base_spend': base_spend,
+        'cpc': cpc,
+        'cr': cr,
+        'approve': approve,
+        'approve_crash': approve_crash,
+        'start_day': start_day,
+        'end_day': end_day,
+        'is_cpl': rng.random(n) < cfg.cpl_share,
+    }
+
+
+def _simulate_daily_matrix(
+    profiles: Dict[str, np.ndarray],
+    days: int,
+    rng: np.random.Generator
+) -> Dict[str, np.ndarray]:
+    """
+    Симулирует дневные метрики кампаний.
+
+    Returns:
+        Dict с матрицами формы (campaigns, days)
+    """
+    n = len(profiles['base_roi'])
+    t = np.arange(days)[None, :]
+
+    active = (t >= profiles['start_day'][:, None]) & (t < profiles['end_day'][:, None])
+    # Часть дней без трафика у живых кампаний
+    active &= rng.random((n, days)) > 0.07
+
+    spend_noise = rng.lognormal(0, 0.35, (n, days))
+    cost = profiles['base_spend'][:, None] * spend_noise * active
+    # Редкие скачки расхода
+    spikes = (rng.random((n, days)) < 0.01) & active
+    cost = np.where(spikes, cost * rng.uniform(2.5, 6, (n, days)), cost)
+    cost = np.round(cost, 2)
+
+    clicks = np.floor(cost / profiles['cpc'][:, None]).astype(np.int64)
+    leads = rng.binomial(clicks, profiles['cr'][:, None])
+
+    roi_day = (
+        profiles['base_roi'][:, None]
+        + profiles['roi_slope'][:, None] * (t - days / 2)
+        + rng.normal(0, 1, (n, days)) * profiles['volatility'][:, None]
+    )
+    roi_day = np.clip(roi_day, -100, 1500)
+    revenue = np.round(np.maximum(cost * (1 + roi_day / 100), 0), 2)
+
+    approve_rate = np.clip(
+        profiles['approve'][:, None] + rng.normal(0, 0.08, (n, days)), 0, 1
+    )
+    crash_tail = profiles['approve_crash'][:, None] & (t >= days - 4)
+    approve_rate = np.where(crash_tail, 0.0, approve_rate)
+    a_leads = np.floor(leads * approve_rate).astype(np.int64)
+    rest = leads - a_leads
+    h_leads = np.floor(rest * 0.6).astype(np.int64)
+    r_leads = rest - h_leads
+    # При нулевом апруве revenue идет только от холда (CPL) - обнуляем выплаты
+    revenue = np.where(crash_tail & ~profiles['is_cpl'][:, None], 0.0, revenue)
+
+    return {
+        'active': active,
+        'cost': cost,
+        'revenue': revenue,
+        'clicks': clicks,
+        'leads': leads,
+        'a_leads': a_leads,
+        'h_leads': h_leads,
+        'r_leads': r_leads,
+    }
+
+
+def _derived_metrics(cost, revenue, clicks, leads, a_leads, h_leads, r_leads) -> Dict[str, np.ndarray]:
+    """Вычисляет производные метрики так же, как их отдает Binom API"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit = revenue - cost
+        roi = np.where(cost > 0, np.clip(profit / cost * 100, -100, None), 0.0)
+        cr = np.where(clicks > 0, leads / clicks * 100, 0.0)
+        cpc = np.where(clicks > 0, cost / clicks, 0.0)
+        total_status = a_leads + h_leads + r_leads
+        approve = np.where(total_status > 0, a_leads / total_status * 100, 0.0)
+        epc = np.where(clicks > 0, revenue / clicks, 0.0)
+        lead_price = np.where(leads > 0, revenue / leads, 0.0)
+    return {
+        'profit': profit,
+        'roi': roi,
+        'cr': cr,
+        'cpc': cpc,
+        'approve': approve,
+        'epc': epc,
+        'lead_price': lead_price,
+    }
+
+
+def _insert_chunked(connection, table, rows: List[Dict[str, Any]]) -> None:
+    """Вставляет строки пачками через executemany"""
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        connection.execute(table.insert(), rows[i:i + INSERT_CHUNK_SIZE])
+
+
+def generate_synthetic_database(
+    db_path: Union[str, Path],
+    cfg: SyntheticDataConfig = None,
+    overwrite: bool = True
+) -> Dict[str, Any]:
+    """
+    Создает синтетическую SQLite базу со схемой приложения.
+
+    Args:
+        db_path: Путь к файлу базы
+        cfg: Параметры генерации
+        overwrite: Удалить существующий файл перед генерацией
+
+    Returns:
+        Dict со статистикой: количество строк по таблицам и время генерации
+    """
+    cfg = cfg or SyntheticDataConfig()
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if db_path.exists():
+        if not overwrite:
+            raise FileExistsError(f"Database already exists: {db_path}")
+        db_path.unlink()
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(cfg.seed)
+    n, days = cfg.campaigns, cfg.days
+    today = date.today()
+    dates = [today - timedelta(days=days - 1 - i) for i in range(days)]
+    now = datetime.now()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+
+    # === Справочники ===
+    n_ts = max(5, n // 50)
+    n_groups = max(5, n // 25)
+    n_networks = max(3, min(30, n // 100))
+    n_offers = max(20, n // 5)
+
+    ts_rows = [{
+        'id': ts_id,
+        'name': f"TS-{ts_id:04d}",
+        'status': True,
+        'first_seen': now - timedelta(days=days),
+        'last_seen': now,
+    } for ts_id in range(1, n_ts + 1)]
+
+    network_rows = [{
+        'id': net_id,
+        'name': f"Network-{net_id:03d}",
+        'status': bool(rng.random() > 0.1),
+        'first_seen': now - timedelta(days=days),
+        'last_seen': now,
+    } for net_id in range(1, n_networks + 1)]
+
+    offer_network = rng.integers(1, n_networks + 1, n_offers)
+    offer_geo = rng.choice(GEOS, n_offers)
+    offer_payout = np.round(rng.lognormal(np.log(8), 0.8, n_offers), 2)
+    offer_rows = [{
+        'id': offer_id,
+        'name': f"Offer-{offer_id:05d} {offer_geo[offer_id - 1]}",
+        'network_id': int(offer_network[offer_id - 1]),
+        'geo': str(offer_geo[offer_id - 1]),
+        'payout': float(offer_payout[offer_id - 1]),
+        'status': True,
+        'is_banned': False,
+        'first_seen': now - timedelta(days=days),
+        'last_seen': now,
+    } for offer_id in range(1, n_offers + 1)]
+
+    # === Кампании ===
+    profiles = _generate_campaign_profiles(cfg, rng)
+    campaign_ts = rng.integers(1, n_ts + 1, n)
+    campaign_group = rng.integers(0, n_groups, n)
+    group_names = [
+        f"{GROUP_VERTICALS[g % len(GROUP_VERTICALS)]}-{GEOS[g % len(GEOS)]}-{g:03d}"
+        for g in range(n_groups)
+    ]
+
+    campaign_rows = []
+    for i in range(n):
+        internal_id = i + 1
+        group_name = group_names[campaign_group[i]]
+        dead = profiles['end_day'][i] < days
+        campaign_rows.append({
+            'internal_id': internal_id,
+            'binom_id': 100000 + internal_id,
+            'current_name': f"{group_name} / camp {internal_id}",
+            'group_name': group_name,
+            'ts_id': int(campaign_ts[i]),
+            'ts_name': f"TS-{campaign_ts[i]:04d}",
+            'domain_name': f"lp{internal_id % 97}.example.com",
+            'is_cpl_mode': bool(profiles['is_cpl'][i]),
+            'is_active': not dead,
+            'status': 'paused' if dead else 'active',
+            'first_seen': datetime.combine(dates[profiles['start_day'][i]], datetime.min.time()),
+            'last_seen': now,
+        })
+
+    # === Дневная статистика кампаний ===
+    sim = _simulate_daily_matrix(profiles, days, rng)
+    derived = _derived_metrics(
+        sim['cost'], sim['revenue'], sim['clicks'], sim['leads'],
+        sim['a_leads'], sim['h_leads'], sim['r_leads']
+    )
+
+    # Как и collector, храним строку за каждый день жизни кампании (нули для дней без трафика)
+    lifetime = (
+        (np.arange(days)[None, :] >= profiles['start_day'][:, None])
+        & (np.arange(days)[None, :] < profiles['end_day'][:, None])
+    )
+    rows_idx = np.argwhere(lifetime)
+
+    columns = {
+        'cost': _round2(sim['cost'][lifetime]),
+        'revenue': _round2(sim['revenue'][lifetime]),
+        'profit': _round2(derived['profit'][lifetime]),
+        'roi': _round2(derived['roi'][lifetime]),
+        'cr': np.round(derived['cr'][lifetime], 4).tolist(),
+        'cpc': np.round(derived['cpc'][lifetime], 4).tolist(),
+        'epc': np.round(derived['epc'][lifetime], 4).tolist(),
+        'approve': _round2(derived['approve'][lifetime]),
+        'lead_price': _round2(derived['lead_price'][lifetime]),
+        'clicks': sim['clicks'][lifetime].tolist(),
+        'leads': sim['leads'][lifetime].tolist(),
+        'a_leads': sim['a_leads'][lifetime].tolist(),
+        'h_leads': sim['h_leads'][lifetime].tolist(),
+        'r_leads': sim['r_leads'][lifetime].tolist(),
+    }
+    stats_rows = [
+        {
+            'campaign_id': int(c) + 1,
+            'date': dates[d],
+            'snapshot_time': now,
+            **{key: values[k] for key, values in columns.items()}
+        }
+        for k, (c, d) in enumerate(rows_idx)
+    ]
+
+    # === Источники: агрегируем кампании по ts_id ===
+    ts_index = campaign_ts - 1
+    ts_agg = {}
+    for key in ('cost', 'revenue', 'clicks', 'leads', 'a_leads', 'h_leads', 'r_leads'):
+        matrix = np.zeros((n_ts, days), dtype=float)
+        np.add.at(matrix, ts_index, sim[key])
+        ts_agg[key] = matrix
+    ts_active = np.zeros((n_ts, days), dtype=int)
+    np.add.at(ts_active, ts_index, sim['active'].astype(int))
+    ts_derived = _derived_metrics(
+        ts_agg['cost'], ts_agg['revenue'], ts_agg['clicks'], ts_agg['leads'],
+        ts_agg['a_leads'], ts_agg['h_leads'], ts_agg['r_leads']
+    )
+    ts_stats_rows = [
+        {
+            'ts_id': ts + 1,
+            'date': dates[d],
+            'clicks': int(ts_agg['clicks'][ts, d]),
+            'cost': round(float(ts_agg['cost'][ts, d]), 2),
+            'leads': int(ts_agg['leads'][ts, d]),
+            'revenue': round(float(ts_agg['revenue'][ts, d]), 2),
+            'roi': round(float(ts_derived['roi'][ts, d]), 2),
+            'cr': round(float(ts_derived['cr'][ts, d]), 4),
+            'cpc': round(float(ts_derived['cpc'][ts, d]), 4),
+            'a_leads': int(ts_agg['a_leads'][ts, d]),
+            'h_leads': int(ts_agg['h_leads'][ts, d]),
+            'r_leads': int(ts_agg['r_leads'][ts, d]),
+            'approve': round(float(ts_derived['approve'][ts, d]), 2),
+            'active_campaigns': int(ts_active[ts, d]),
+            'snapshot_time': now,
+        }
+        for ts in range(n_ts) for d in range(days)
+        if ts_agg['clicks'][ts, d] > 0
+    ]
+
+    # === Офферы: собственные профили (оффер может жить в нескольких кампаниях) ===
+    offer_cfg = SyntheticDataConfig(
+        campaigns=n_offers, days=days, seed=cfg.seed + 1,
+        cpl_share=0, dead_share=cfg.dead_share, late_start_share=cfg.late_start_share
+    )
+    offer_profiles = _generate_campaign_profiles(offer_cfg, rng)
+    offer_profiles['base_spend'] = offer_profiles['base_spend'] * 3
+    offer_sim = _simulate_daily_matrix(offer_profiles, days, rng)
+    offer_derived = _derived_metrics(
+        offer_sim['cost'], offer_sim['revenue'], offer_sim['clicks'], offer_sim['leads'],
+        offer_sim['a_leads'], offer_sim['h_leads'], offer_sim['r_leads']
+    )
+    offer_stats_rows = [
+        {
+            'offer_id': o + 1,
+            'date': dates[d],
+            'clicks': int(offer_sim['clicks'][o, d]),
+            'leads': int(offer_sim['leads'][o, d]),
+            'revenue': float(offer_sim['revenue'][o, d]),
+            'cost': float(offer_sim['cost'][o, d]),
+            'a_leads': int(offer_sim['a_leads'][o, d]),
+            'h_leads': int(offer_sim['h_leads'][o, d]),
+            'r_leads': int(offer_sim['r_leads'][o, d]),
+            'cr': round(float(offer_derived['cr'][o, d]), 4),
+            'approve': round(float(offer_derived['approve'][o, d]), 2),
+            'epc': round(float(offer_derived['epc'][o, d]), 4),
+            'roi': round(float(offer_derived['roi'][o, d]), 2),
+            'snapshot_time': now,
+        }
+        for o, d in np.argwhere(offer_sim['clicks'] > 0)
+    ]
+
+    # === Партнерки: агрегируем офферы по network_id ===
+    net_index = offer_network - 1
+    net_agg = {}
+    for key in ('cost', 'revenue', 'clicks', 'leads', 'a_leads', 'h_leads', 'r_leads'):
+        matrix = np.zeros((n_networks, days), dtype=float)
+        np.add.at(matrix, net_index, offer_sim[key])
+        net_agg[key] = matrix
+    net_active = np.zeros((n_networks, days), dtype=int)
+    np.add.at(net_active, net_index, offer_sim['active'].astype(int))
+    net_derived = _derived_metrics(
+        net_agg['cost'], net_agg['revenue'], net_agg['clicks'], net_agg['leads'],
+        net_agg['a_leads'], net_agg['h_leads'], net_agg['r_leads']
+    )
+    network_stats_rows = [
+        {
+            'network_id': net + 1,
+            'date': dates[d],
+            'clicks': int(net_agg['clicks'][net, d]),
+            'leads': int(net_agg['leads'][net, d]),
+            'revenue': round(float(net_agg['revenue'][net, d]), 2),
+            'cost': round(float(net_agg['cost'][net, d]), 2),
+            'a_leads': int(net_agg['a_leads'][net, d]),
+            'h_leads': int(net_agg['h_leads'][net, d]),
+            'r_leads': int(net_agg['r_leads'][net, d]),
+            'approve': round(float(net_derived['approve'][net, d]), 2),
+            'roi': round(float(net_derived['roi'][net, d]), 2),
+            'profit': round(float(net_derived['profit'][net, d]), 2),
+            'active_offers': int(net_active[net, d]),
+            'snapshot_time': now,
+        }
+        for net in range(n_networks) for d in range(days)
+        if net_agg['clicks'][net, d] > 0
+    ]
+
+    with engine.begin() as connection:
+        _insert_chunked(connection, TrafficSource.__table__, ts_rows)
+        _insert_chunked(connection, AffiliateNetwork.__table__, network_rows)
+        _insert_chunked(connection, Offer.__table__, offer_rows)
+        _insert_chunked(connection, Campaign.__table__, campaign_rows)
+        _insert_chunked(connection, CampaignStatsDaily.__table__, stats_rows)
+        _insert_chunked(connection, TrafficSourceStatsDaily.__table__, ts_stats_rows)
+        _insert_chunked(connection, OfferStatsDaily.__table__, offer_stats_rows)
+        _insert_chunked(connection, NetworkStatsDaily.__table__, network_stats_rows)
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+    result = {
+        'db_path': str(db_path),
+        'config': cfg.model_dump(),
+        'rows': {
+            'campaigns': len(campaign_rows),
+            'campaign_stats_daily': len(stats_rows),
+            'traffic_sources': len(ts_rows),
+            'traffic_source_stats_daily': len(ts_stats_rows),
+            'offers': len(offer_rows),
+            'offer_stats_daily': len(offer_stats_rows),
+            'affiliate_networks': len(network_rows),
+            'network_stats_daily': len(network_stats_rows),
+        },
+        'generation_seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info(
+        f"Synthetic database generated: {db_path} "
+        f"({result['rows']['campaigns']} campaigns, "
+        f"{result['rows']['campaign_stats_daily']} daily rows, "
+        f"{result['generation_seconds']}s)"
+    )
+    return result
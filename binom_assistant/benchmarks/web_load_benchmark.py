@@ -0,0 +1,273 @@
+"""
+Нагрузочный тест веб-API на синтетических данных
+
+Поднимает приложение FastAPI через uvicorn в фоновом потоке и замеряет
+латентность под конкурентной нагрузкой дашборда:
+- N клиентов по кругу запрашивают тяжелые эндпоинты дашборда
+- отдельный клиент раз в --probe-interval секунд опрашивает /api/v1/health
+
+Для каждого эндпоинта выводит число запросов, ошибки и p50 / p95 / p99 / max.
+Если обработчики блокируют event loop, p99 /health растет до времени
+самого медленного запроса дашборда; при выполнении обработчиков
+в пуле потоков /health отвечает за миллисекунды.
+
+Результаты сохраняются в JSON; --compare сравнивает p99 с предыдущим прогоном.
+
+Использование (из папки binom_assistant):
+    python -m benchmarks.web_load_benchmark --campaigns 5000 --days 30 --reuse-db
+    python -m benchmarks.web_load_benchmark --db /tmp/big.db --reuse-db --clients 16 --duration 20
+    python -m benchmarks.web_load_benchmark --reuse-db --compare benchmarks/results/web_load_500x90.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from benchmarks.module_benchmark import DEFAULT_DATA_DIR, DEFAULT_RESULTS_DIR, _prepare_environment
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = "/api/v1/health"
+
+# Эндпоинты дашборда, которые клиенты запрашивают по кругу
+DASHBOARD_PATHS = [
+    "/api/v1/dashboard/summary?period=7d",
+    "/api/v1/dashboard/period-comparison?period=7d",
+    "/api/v1/stats/overview?period=7d",
+    "/api/v1/stats/charts?period=30d",
+    "/api/v1/campaigns?page=1&page_size=50",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль по ближайшему рангу (values не пустой)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    """
+    Сводка латентностей по эндпоинтам.
+
+    Returns:
+        Dict путь -> requests, errors, p50_ms, p95_ms, p99_ms, max_ms
+    """
+    result = {}
+    for path in sorted(set(latencies) | set(errors)):
+        values = latencies.get(path) or []
+        row = {"requests": len(values), "errors": errors.get(path, 0)}
+        if values:
+            row.update({
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(max(values), 1),
+            })
+        result[path] = row
+    return result
+
+
+def _free_port() -> int:
+    """Свободный TCP порт на localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int):
+    """
+    Запускает uvicorn с приложением в фоновом потоке.
+
+    Lifespan приложения не выполняется (он запускает сбор данных и планировщики),
+    пул потоков настраивается так же, как при старте приложения.
+
+    Returns:
+        uvicorn.Server (остановка - server.should_exit = True)
+    """
+    import uvicorn
+    from interfaces.web.main import app, configure_threadpool
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+
+    async def serve():
+        configure_threadpool()
+        await server.serve()
+
+    thread = threading.Thread(target=asyncio.run, args=(serve(),), name="web-load-server", daemon=True)
+    thread.start()
+
+    deadline = time.time() + 60
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn server did not start")
+        time.sleep(0.05)
+    return server
+
+
+async def _run_load(
+    base_url: str,
+    token: str,
+    clients: int,
+    duration: float,
+    probe_interval: float
+) -> Dict[str, Dict[str, Any]]:
+    """Клиенты дашборда + опрос /health в течение duration секунд"""
+    import httpx
+
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + duration
+
+    async def request(client, path: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        key = path.split("?")[0]
+        if ok:
+            latencies.setdefault(key, []).append(elapsed_ms)
+        else:
+            errors[key] = errors.get(key, 0) + 1
+
+    async def dashboard_client(client, offset: int) -> None:
+        i = offset
+        while time.perf_counter() < deadline:
+            await request(client, DASHBOARD_PATHS[i % len(DASHBOARD_PATHS)])
+            i += 1
+
+    async def health_probe(client) -> None:
+        while time.perf_counter() < deadline:
+            await request(client, HEALTH_PATH)
+            await asyncio.sleep(probe_interval)
+
+    limits = httpx.Limits(max_connections=clients + 2)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120.0) as client:
+        await asyncio.gather(
+            health_probe(client),
+            *(dashboard_client(client, i) for i in range(clients))
+        )
+
+    return summarize(latencies, errors)
+
+
+def _print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    """Печатает таблицу латентностей"""
+    print()
+    print(f"{'endpoint':<40} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print("-" * 94)
+    for path, m in results.items():
+        cells = [f"{m.get(k, 0):>9.1f}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{path:<40} {m['requests']:>6} {m['errors']:>6} {' '.join(cells)}")
+
+
+def _print_comparison(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    """Печатает сравнение p99 с baseline"""
+    print()
+    print(f"{'endpoint':<40} {'base p99':>10} {'now p99':>10} {'delta':>8}")
+    print("-" * 72)
+    for path, m in results.items():
+        base = baseline.get(path)
+        if not base or not base.get("p99_ms") or "p99_ms" not in m:
+            continue
+        delta = (m["p99_ms"] - base["p99_ms"]) / base["p99_ms"] * 100
+        print(f"{path:<40} {base['p99_ms']:>10.1f} {m['p99_ms']:>10.1f} {delta:>+7.1f}%")
+
+
+def parse_args(argv=None):
+    """Парсинг аргументов командной строки"""
+    parser = argparse.ArgumentParser(description='Load test the web API on synthetic data')
+    parser.add_argument('--campaigns', type=int, default=500, help='Number of synthetic campaigns')
+    parser.add_argument('--days', type=int, default=90, help='Days of history')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--db', type=Path, default=None, help='Synthetic DB path (default: data/benchmarks/synthetic_<N>x<D>.db)')
+    parser.add_argument('--reuse-db', action='store_true', help='Reuse existing synthetic DB instead of regenerating')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent dashboard clients')
+    parser.add_argument('--duration', type=float, default=15.0, help='Test duration, seconds')
+    parser.add_argument('--probe-interval', type=float, default=0.05, help='Pause between /health probes, seconds')
+    parser.add_argument('--output', type=Path, default=None, help='Output JSON path (default: benchmarks/results/web_load_<N>x<D>.json)')
+    parser.add_argument('--compare', type=Path, default=None, help='Baseline JSON to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Точка входа CLI"""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    scale_tag = f"{args.campaigns}x{args.days}"
+    db_path = args.db or DEFAULT_DATA_DIR / f"synthetic_{scale_tag}.db"
+    output_path = args.output or DEFAULT_RESULTS_DIR / f"web_load_{scale_tag}.json"
+
+    _prepare_environment(db_path)
+    os.environ.setdefault('AUTH_JWT_SECRET', 'benchmark')
+
+    from benchmarks.synthetic_data import generate_synthetic_database, SyntheticDataConfig
+
+    if not (args.reuse_db and db_path.exists()):
+        print(f"Generating synthetic database {db_path} ({scale_tag})...")
+        generate_synthetic_database(
+            db_path,
+            SyntheticDataConfig(campaigns=args.campaigns, days=args.days, seed=args.seed)
+        )
+
+    from interfaces.web.auth import create_access_token
+
+    port = _free_port()
+    server = _start_server(port)
+    try:
+        print(f"Load: {args.clients} dashboard clients + /health probe for {args.duration:.0f}s")
+        results = asyncio.run(_run_load(
+            f"http://127.0.0.1:{port}",
+            create_access_token({"sub": "benchmark"}),
+            args.clients,
+            args.duration,
+            args.probe_interval
+        ))
+    finally:
+        server.should_exit = True
+
+    _print_report(results)
+
+    payload = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'campaigns': args.campaigns,
+            'days': args.days,
+            'clients': args.clients,
+            'duration_seconds': args.duration,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'endpoints': results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\nResults saved to {output_path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        _print_comparison(results, baseline.get('endpoints', {}))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,12 +72,23 @@ class Config:
             "app.debug": ("DEBUG", "true"),
             "app.log_level": ("LOG_LEVEL", "INFO"),
 
+            # Logging
+            "logging.request_sample_rate": ("LOG_REQUEST_SAMPLE_RATE", "0.1"),
+            "logging.slow_request_ms": ("LOG_SLOW_REQUEST_MS", "1000"),
+
             # Collector
             "collector.enabled": ("COLLECTOR_ENABLED", "true"),
             "collector.interval_hours": ("COLLECTOR_INTERVAL_HOURS", "24"),
             "collector.update_days": ("COLLECTOR_UPDATE_DAYS", "7"),
             "collector.api_pause": ("COLLECTOR_API_PAUSE", "3.0"),
 
+            # Modules
+            "modules.incremental": ("MODULES_INCREMENTAL", "true"),
+            "modules.incremental_verify": ("MODULES_INCREMENTAL_VERIFY", "false"),
+            "modules.lazy_phases": ("MODULES_LAZY_PHASES", "true"),
+            "modules.orchestration": ("MODULES_ORCHESTRATION", "event"),
+            "modules.wave_concurrency": ("MODULES_WAVE_CONCURRENCY", "3"),
+
             # Timezone
             "app.timezone": ("TIMEZONE", "Europe/Moscow"),
 
@@ -90,6 +101,17 @@ class Config:
 
             # CORS
             "cors.origins": ("CORS_ORIGINS", "*"),
+
+            # Web
+            "web.threadpool_size": ("WEB_THREADPOOL_SIZE", "4"),
+            "web.response_cache_size": ("WEB_RESPONSE_CACHE_SIZE", "256"),
+            "web.response_cache_ttl": ("WEB_RESPONSE_CACHE_TTL", "300"),
+            "web.etag_max_age": ("WEB_ETAG_MAX_AGE", "300"),
+            "web.live_settle_seconds": ("WEB_LIVE_SETTLE_SECONDS", "5"),
+
+            # Прогресс фоновых задач
+            "progress.flush_interval": ("PROGRESS_FLUSH_INTERVAL", "30"),
+            "progress.stream_max_seconds": ("PROGRESS_STREAM_MAX_SECONDS", "60"),
         }
 
         mapping = env_map.get(path)
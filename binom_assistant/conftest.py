@@ -0,0 +1,12 @@
+"""
+Настройка pytest для тестов проекта
+
+interfaces.web при импорте создает приложение, а get_config() требует
+BINOM_URL и BINOM_API_KEY. pytest импортирует тесты веб-интерфейса как модули
+пакета interfaces.web - до того, как тест успеет задать окружение сам,
+поэтому тестовые значения задаются здесь (заданные в окружении не меняются).
+"""
+import os
+
+os.environ.setdefault("BINOM_URL", "http://binom.test/index.php")
+os.environ.setdefault("BINOM_API_KEY", "test")
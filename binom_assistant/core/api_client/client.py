@@ -116,7 +116,7 @@ class BinomClient:
 
         for attempt in range(self.retry_attempts):
             try:
-                logger.debug(f"Request attempt {attempt + 1}/{self.retry_attempts}: {params.get('page')}")
+                logger.debug("Request attempt %s/%s: %s", attempt + 1, self.retry_attempts, params.get('page'))
 
                 response = httpx.get(url, timeout=self.timeout)
                 response.raise_for_status()
@@ -145,7 +145,7 @@ class BinomClient:
                 if data is None or (isinstance(data, list) and len(data) == 0):
                     logger.debug("Empty response from API (no data for this period/filter)")
 
-                logger.debug(f"Request successful: {len(data) if isinstance(data, list) else 'dict'} items")
+                logger.debug("Request successful: %s items", len(data) if isinstance(data, list) else 'dict')
                 return data
 
             except httpx.TimeoutException as e:
@@ -233,14 +233,14 @@ class BinomClient:
         if date == "12" and date_start and date_end:
             params['date_s'] = date_start
             params['date_e'] = date_end
-            logger.info(f"Getting campaigns: date=custom ({date_start} to {date_end}), status={status}, val_page={val_page}")
+            logger.info("Getting campaigns: date=custom (%s to %s), status=%s, val_page=%s", date_start, date_end, status, val_page)
         else:
-            logger.info(f"Getting campaigns: date={date}, status={status}, val_page={val_page}")
+            logger.info("Getting campaigns: date=%s, status=%s, val_page=%s", date, status, val_page)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} campaigns")
+            logger.info("Retrieved %s campaigns", len(data))
             return data
 
         logger.warning("Failed to retrieve campaigns")
@@ -288,14 +288,14 @@ class BinomClient:
         if date == "12" and date_start and date_end:
             params['date_s'] = date_start
             params['date_e'] = date_end
-            logger.info(f"Getting stats for campaign {camp_id}: date=custom ({date_start} to {date_end}), group1={group1}")
+            logger.info("Getting stats for campaign %s: date=custom (%s to %s), group1=%s", camp_id, date_start, date_end, group1)
         else:
-            logger.info(f"Getting stats for campaign {camp_id}: date={date}, group1={group1}")
+            logger.info("Getting stats for campaign %s: date=%s, group1=%s", camp_id, date, group1)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} stats records for campaign {camp_id}")
+            logger.info("Retrieved %s stats records for campaign %s", len(data), camp_id)
             return data
 
         logger.warning(f"Failed to retrieve stats for campaign {camp_id}")
@@ -333,12 +333,12 @@ class BinomClient:
             'val_page': val_page
         }
 
-        logger.info(f"Getting campaigns: {date_start} to {date_end}")
+        logger.info("Getting campaigns: %s to %s", date_start, date_end)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} campaigns for custom period")
+            logger.info("Retrieved %s campaigns for custom period", len(data))
             return data
 
         logger.warning("Failed to retrieve campaigns for custom period")
@@ -372,12 +372,12 @@ class BinomClient:
             'timezone': self.timezone_offset
         }
 
-        logger.info(f"Getting trends: date_trends={date_trends}, date_gradation={date_gradation}")
+        logger.info("Getting trends: date_trends=%s, date_gradation=%s", date_trends, date_gradation)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} trend records")
+            logger.info("Retrieved %s trend records", len(data))
             return data
 
         logger.warning("Failed to retrieve trends")
@@ -417,14 +417,14 @@ class BinomClient:
         if date == "12" and date_start and date_end:
             params['date_s'] = date_start
             params['date_e'] = date_end
-            logger.info(f"Getting traffic sources: date=custom ({date_start} to {date_end}), status={status}")
+            logger.info("Getting traffic sources: date=custom (%s to %s), status=%s", date_start, date_end, status)
         else:
-            logger.info(f"Getting traffic sources: date={date}, status={status}")
+            logger.info("Getting traffic sources: date=%s, status=%s", date, status)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} traffic sources")
+            logger.info("Retrieved %s traffic sources", len(data))
             return data
 
         logger.warning("Failed to retrieve traffic sources")
@@ -464,14 +464,14 @@ class BinomClient:
         if date == "12" and date_start and date_end:
             params['date_s'] = date_start
             params['date_e'] = date_end
-            logger.info(f"Getting affiliate networks: date=custom ({date_start} to {date_end}), status={status}")
+            logger.info("Getting affiliate networks: date=custom (%s to %s), status=%s", date_start, date_end, status)
         else:
-            logger.info(f"Getting affiliate networks: date={date}, status={status}")
+            logger.info("Getting affiliate networks: date=%s, status=%s", date, status)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} affiliate networks")
+            logger.info("Retrieved %s affiliate networks", len(data))
             return data
 
         logger.warning("Failed to retrieve affiliate networks")
@@ -515,14 +515,14 @@ class BinomClient:
         if date == "12" and date_start and date_end:
             params['date_s'] = date_start
             params['date_e'] = date_end
-            logger.info(f"Getting offers: date=custom ({date_start} to {date_end}), status={status}")
+            logger.info("Getting offers: date=custom (%s to %s), status=%s", date_start, date_end, status)
         else:
-            logger.info(f"Getting offers: date={date}, status={status}")
+            logger.info("Getting offers: date=%s, status=%s", date, status)
 
         data = self._request(params)
 
         if data and isinstance(data, list):
-            logger.info(f"Retrieved {len(data)} offers")
+            logger.info("Retrieved %s offers", len(data))
             return data
 
         logger.warning("Failed to retrieve offers")
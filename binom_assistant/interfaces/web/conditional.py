@@ -0,0 +1,112 @@
+"""
+Условные ответы (ETag / If-None-Match) для эндпоинтов чтения
+
+Дашборд опрашивает статистику, кампании, модули и алерты, и почти всегда
+получает тот же JSON. Эндпоинт с зависимостью conditional_etag отдает
+сильный ETag, вычисленный без обращения к БД:
+- путь и параметры запроса
+- поколения данных областей (storage.database.write_tracker) - меняются
+  при каждом commit новых данных
+- сегодняшняя дата (периоды 7d / this_month) и интервал WEB_ETAG_MAX_AGE
+  (скользящие окна алертов, записи из других процессов)
+- идентификатор процесса - после перезапуска поколения начинаются с нуля
+
+Если If-None-Match совпадает, зависимость отвечает 304 до выполнения
+обработчика: запросов к БД и сериализации нет. Проверка идет после
+авторизации роутера. Cache-Control: private, no-cache - браузер хранит
+ответ и сам перепроверяет его при каждом fetch.
+
+Использование:
+    @router.get("/alerts", dependencies=[Depends(modules_etag)])
+    def get_alerts(...):
+        ...
+"""
+import hashlib
+import logging
+import time
+import uuid
+from datetime import date
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from config import get_config
+from storage.database.write_tracker import MODULES_SCOPE, STATS_SCOPE, get_generation
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "private, no-cache"
+
+# Поколения в памяти процесса - ETag прошлого запуска не должен совпасть
+_INSTANCE_ID = uuid.uuid4().hex
+
+
+def compute_etag(request: Request, *scopes: str) -> str:
+    """
+    Сильный ETag ответа по пути, параметрам и поколениям данных.
+
+    Args:
+        request: Запрос
+        scopes: Области данных, от которых зависит ответ
+
+    Returns:
+        ETag в кавычках
+    """
+    max_age = int(get_config().get("web.etag_max_age", 300))
+    source = repr((
+        _INSTANCE_ID,
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        [get_generation(scope) for scope in scopes],
+        date.today().isoformat(),
+        int(time.time() // max_age) if max_age > 0 else 0
+    ))
+    return f'"{hashlib.sha1(source.encode()).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Совпадает ли ETag с заголовком If-None-Match (слабое сравнение, RFC 9110).
+
+    Args:
+        if_none_match: Значение заголовка ("*" или список ETag через запятую)
+        etag: ETag текущего ответа
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def conditional_etag(*scopes: str) -> Callable:
+    """
+    Зависимость маршрута: 304 при совпадении If-None-Match, иначе ETag в ответе.
+
+    Args:
+        scopes: Области данных, от которых зависит ответ
+
+    Returns:
+        Async-зависимость (без пула потоков - ответ 304 не занимает поток)
+    """
+    async def dependency(request: Request, response: Response) -> None:
+        etag = compute_etag(request, *scopes)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
+
+
+# Статистика и кампании
+stats_etag = conditional_etag(STATS_SCOPE)
+
+# Модули и алерты (запуски модулей)
+modules_etag = conditional_etag(MODULES_SCOPE)
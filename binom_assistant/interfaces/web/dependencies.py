@@ -3,7 +3,7 @@
 """
 from typing import Generator
 from sqlalchemy.orm import Session
-from storage.database import get_session
+from storage.database import get_session_factory
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,16 +13,20 @@ def get_db() -> Generator[Session, None, None]:
     """
     Зависимость для получения сессии БД.
 
+    Отдельная сессия на запрос, а не scoped_session: FastAPI открывает
+    зависимость и выполняет синхронный обработчик в разных потоках пула,
+    thread-local сессия досталась бы параллельному запросу того же потока.
+
     Yields:
         Session: Сессия SQLAlchemy
     """
-    # Используем генератор get_session из storage.database
-    session_generator = get_session()
-    db = next(session_generator)
+    db = get_session_factory().session_factory()
     try:
         yield db
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Session error: {e}")
+        raise
     finally:
-        try:
-            next(session_generator)
-        except StopIteration:
-            pass
+        db.close()
@@ -0,0 +1,354 @@
+"""
+Живое обновление дашборда по WebSocket (/api/v1/dashboard/live)
+
+После сбора данных или запуска модулей дашборд получает не полный набор
+виджетов, а изменения относительно своего состояния. Хаб:
+- ждет, пока поколения данных (storage.database.write_tracker) перестанут
+  меняться LIVE_SETTLE_SECONDS секунд - сборщик фиксирует данные блоками
+- один раз на поколение считает виджеты для каждой подписки (период,
+  сортировка, лимиты) через compute_dashboard_widgets и кэш ответов
+- сравнивает их с прошлым снимком и рассылает всем клиентам подписки
+  одно и то же сообщение delta
+
+Формат изменения виджета (diff_widget):
+- {"replace": data} - виджет целиком
+- {"set": {...}, "unset": [...], "lists": {...}} - измененные поля верхнего
+  уровня; списки строк с ключом (id, date) передаются как порядок ключей
+  и измененные строки, списки без ключа (алерты) - как новые элементы
+  в начале и число сохраненных старых
+
+Протокол: клиент первым сообщением присылает token, period, sort_by,
+top_limit, alerts_limit и generation своих данных (из /dashboard/bundle),
+затем может прислать новую подписку без token. Если generation не совпадает
+со снимком хаба, клиент получает snapshot - все виджеты. Снимок прошлого
+поколения (данные уже изменились, рассылка еще ждет) при подписке
+пересчитывается: клиент, загрузивший /dashboard/bundle во время сбора, не
+получает данные старее своих, а клиенты подписки - delta до нового снимка.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
+
+from storage.database.write_tracker import MODULES_SCOPE, STATS_SCOPE, get_generation
+
+logger = logging.getLogger(__name__)
+
+# Ключи строк списков, по которым строки сопоставляются между снимками
+ROW_KEYS = ('id', 'date')
+
+# Параметры подписки и значения по умолчанию (как у /dashboard/bundle)
+SUBSCRIPTION_DEFAULTS = (
+    ('period', '7d'),
+    ('sort_by', 'roi'),
+    ('top_limit', 5),
+    ('alerts_limit', 30),
+)
+_LIMITS = {'top_limit': (1, 50), 'alerts_limit': (1, 100)}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _current_generation() -> Dict[str, int]:
+    return {STATS_SCOPE: get_generation(STATS_SCOPE), MODULES_SCOPE: get_generation(MODULES_SCOPE)}
+
+
+def _diff_list(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Изменение списка строк (dict) или None, если его нельзя выразить компактно.
+
+    Returns:
+        {"key", "order", "rows"} для строк с ключом ROW_KEYS
+        или {"prepend", "keep"} для списка, в начало которого добавлены элементы
+    """
+    if not isinstance(old, list) or not isinstance(new, list):
+        return None
+    if not all(isinstance(row, dict) for row in old + new):
+        return None
+
+    for key in ROW_KEYS:
+        if all(key in row for row in old + new) and len({_dumps(row[key]) for row in new}) == len(new):
+            previous = {_dumps(row[key]): row for row in old}
+            return {
+                'key': key,
+                'order': [row[key] for row in new],
+                'rows': [row for row in new if previous.get(_dumps(row[key])) != row]
+            }
+
+    # Новые элементы в начале, старые сдвигаются (и обрезаются лимитом)
+    for added in range(len(new)):
+        tail = new[added:]
+        if tail == old[:len(tail)]:
+            return {'prepend': new[:added], 'keep': len(tail)}
+    return None
+
+
+def diff_widget(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Изменение виджета относительно прошлого снимка.
+
+    Args:
+        old: Данные виджета в прошлом снимке (None - не было)
+        new: Новые данные виджета
+
+    Returns:
+        None, если виджет не изменился; иначе изменение (формат в описании модуля),
+        не длиннее самих данных
+    """
+    if old == new:
+        return None
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return {'replace': new}
+
+    changed: Dict[str, Any] = {}
+    lists: Dict[str, Any] = {}
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        list_delta = _diff_list(old.get(key), value)
+        if list_delta is not None:
+            lists[key] = list_delta
+        else:
+            changed[key] = value
+
+    delta: Dict[str, Any] = {}
+    if changed:
+        delta['set'] = changed
+    unset = [key for key in old if key not in new]
+    if unset:
+        delta['unset'] = unset
+    if lists:
+        delta['lists'] = lists
+
+    if len(_dumps(delta)) >= len(_dumps(new)):
+        return {'replace': new}
+    return delta
+
+
+def _subscription_key(message: Dict[str, Any]) -> Tuple:
+    """Параметры подписки из сообщения клиента (с умолчаниями и границами лимитов)"""
+    values = []
+    for name, default in SUBSCRIPTION_DEFAULTS:
+        value = message.get(name, default)
+        if name in _LIMITS:
+            low, high = _LIMITS[name]
+            try:
+                value = min(max(int(value), low), high)
+            except (TypeError, ValueError):
+                value = default
+        else:
+            value = str(value) if value else default
+        values.append(value)
+    return tuple(values)
+
+
+class DashboardHub:
+    """
+    Подписчики живого дашборда и снимки виджетов по подпискам.
+
+    Работает в event loop веб-сервера: виджеты считаются в пуле потоков,
+    рассылка и подписки - корутины.
+    """
+
+    def __init__(self, settle_seconds: float = 5.0, poll_interval: float = 1.0, send_timeout: float = 5.0):
+        """
+        Args:
+            settle_seconds: Сколько поколения данных должны не меняться перед рассылкой
+            poll_interval: Интервал проверки поколений, секунд (без обращения к БД)
+            send_timeout: Таймаут отправки сообщения клиенту (медленный клиент отключается)
+        """
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.send_timeout = send_timeout
+        self._clients: Dict[WebSocket, Tuple] = {}
+        self._snapshots: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._published: Optional[Dict[str, int]] = None
+        self._counters = {'versions': 0, 'computations': 0, 'messages': 0, 'bytes_sent': 0}
+
+    def start(self) -> None:
+        """Запускает отслеживание поколений (из lifespan приложения)"""
+        if self._task is None or self._task.done():
+            self._published = _current_generation()
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Останавливает отслеживание и закрывает соединения клиентов"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for websocket in list(self._clients):
+            await self._drop(websocket, code=1001)
+        self._snapshots.clear()
+
+    async def serve(self, websocket: WebSocket, message: Dict[str, Any]) -> None:
+        """
+        Обслуживает клиента: подписка из первого сообщения, затем новые подписки до отключения.
+
+        Args:
+            websocket: Принятое соединение (авторизация уже проверена)
+            message: Первое сообщение клиента
+        """
+        try:
+            while True:
+                await self._subscribe(websocket, message)
+                message = await websocket.receive_json()
+        except Exception as e:
+            # WebSocketDisconnect или некорректное сообщение - клиент отключается
+            logger.debug(f"Live dashboard client disconnected: {e!r}")
+        finally:
+            await self._drop(websocket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Метрики хаба.
+
+        Returns:
+            Dict: clients, subscriptions, published (последнее разосланное поколение),
+            versions, computations, messages, bytes_sent
+        """
+        return {
+            'clients': len(self._clients),
+            'subscriptions': len(set(self._clients.values())),
+            'published': self._published,
+            'settle_seconds': self.settle_seconds,
+            **self._counters
+        }
+
+    async def _subscribe(self, websocket: WebSocket, message: Dict[str, Any]) -> None:
+        """Регистрирует подписку и отправляет snapshot, если данные клиента другого поколения"""
+        key = _subscription_key(message)
+        async with self._lock:
+            previous = self._snapshots.get(key)
+            snapshot = previous
+            if snapshot is None or snapshot['generation'] != _current_generation():
+                snapshot = await self._compute(key, previous)
+                self._snapshots[key] = snapshot
+                # Клиенты подписки получают изменения до пересчитанного снимка
+                if previous is not None and snapshot['generation'] != previous['generation']:
+                    clients = [ws for ws, client_key in self._clients.items() if client_key == key]
+                    if clients:
+                        await self._send(clients, self._delta_text(previous, snapshot))
+            self._clients[websocket] = key
+
+        if message.get('generation') != snapshot['generation']:
+            await self._send([websocket], _dumps({
+                'type': 'snapshot',
+                'generation': snapshot['generation'],
+                'widgets': snapshot['widgets']
+            }))
+
+    async def _compute(self, key: Tuple, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Снимок виджетов подписки; упавшие виджеты берутся из прошлого снимка"""
+        from .routes.stats import compute_dashboard_widgets
+
+        computed = await compute_dashboard_widgets(*key)
+        self._counters['computations'] += 1
+        widgets = dict(previous['widgets']) if previous else {}
+        widgets.update(jsonable_encoder(computed['widgets']))
+        return {'generation': computed['generation'], 'widgets': widgets}
+
+    async def _watch(self) -> None:
+        """Ждет новое устоявшееся поколение данных и рассылает изменения"""
+        seen = self._published
+        changed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                generation = _current_generation()
+                if generation != seen:
+                    seen = generation
+                    changed_at = time.monotonic()
+                    continue
+                if generation == self._published or time.monotonic() - changed_at < self.settle_seconds:
+                    continue
+                self._published = generation
+                self._counters['versions'] += 1
+                if self._clients:
+                    await self._publish()
+                else:
+                    self._snapshots.clear()
+            except Exception as e:
+                logger.error(f"Live dashboard publish failed: {e}")
+
+    async def _publish(self) -> None:
+        """Пересчитывает снимки подписок и рассылает delta"""
+        async with self._lock:
+            for key in set(self._clients.values()):
+                previous = self._snapshots.get(key)
+                snapshot = await self._compute(key, previous)
+                self._snapshots[key] = snapshot
+                text = self._delta_text(previous, snapshot)
+                await self._send([ws for ws, client_key in self._clients.items() if client_key == key], text)
+
+            # Снимки подписок без клиентов больше не нужны
+            active = set(self._clients.values())
+            for key in [key for key in self._snapshots if key not in active]:
+                del self._snapshots[key]
+
+    @staticmethod
+    def _delta_text(previous: Optional[Dict[str, Any]], snapshot: Dict[str, Any]) -> str:
+        """Сообщение delta: изменения виджетов снимка относительно прошлого"""
+        old_widgets = previous['widgets'] if previous else {}
+        changes = {}
+        for name, data in snapshot['widgets'].items():
+            delta = diff_widget(old_widgets.get(name), data)
+            if delta is not None:
+                changes[name] = delta
+
+        return _dumps({
+            'type': 'delta',
+            'base': previous['generation'] if previous else None,
+            'generation': snapshot['generation'],
+            'widgets': changes
+        })
+
+    async def _send(self, websockets: List[WebSocket], text: str) -> None:
+        """Отправляет сообщение клиентам параллельно; не принявшие его отключаются"""
+        async def send(websocket: WebSocket) -> None:
+            try:
+                await asyncio.wait_for(websocket.send_text(text), timeout=self.send_timeout)
+                self._counters['messages'] += 1
+                self._counters['bytes_sent'] += len(text.encode())
+            except Exception as e:
+                logger.debug(f"Live dashboard send failed: {e!r}")
+                await self._drop(websocket)
+
+        await asyncio.gather(*(send(websocket) for websocket in websockets))
+
+    async def _drop(self, websocket: WebSocket, code: int = 1000) -> None:
+        """Удаляет клиента и закрывает соединение (если оно еще открыто)"""
+        self._clients.pop(websocket, None)
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+
+_dashboard_hub: Optional[DashboardHub] = None
+_dashboard_hub_lock = threading.Lock()
+
+
+def get_dashboard_hub() -> DashboardHub:
+    """Получает глобальный хаб живого дашборда (singleton)"""
+    global _dashboard_hub
+    if _dashboard_hub is None:
+        with _dashboard_hub_lock:
+            if _dashboard_hub is None:
+                from config import get_config
+                _dashboard_hub = DashboardHub(
+                    settle_seconds=float(get_config().get("web.live_settle_seconds", 5))
+                )
+    return _dashboard_hub
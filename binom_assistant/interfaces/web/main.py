@@ -8,6 +8,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from contextlib import asynccontextmanager
+from anyio import to_thread
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -18,6 +19,8 @@ from slowapi.errors import RateLimitExceeded
 
 # Импортируем роуты
 from .routes import health, campaigns, stats, alerts, system, modules, settings, chat, auth
+from .live import get_dashboard_hub
+from .middleware import LoggingMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,23 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 
+def configure_threadpool() -> int:
+    """
+    Ограничивает пул потоков для синхронных обработчиков.
+
+    Синхронные обработчики (запросы к БД) выполняются в пуле потоков,
+    event loop остается свободным для /health и легких запросов.
+    Лишние запросы ждут свободный поток, а не соединение с БД.
+    Вызывается внутри работающего event loop.
+
+    Returns:
+        Размер пула
+    """
+    threadpool_size = int(get_config().get("web.threadpool_size", 4))
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_size
+    return threadpool_size
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -51,6 +71,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {environment}")
     logger.info(f"Debug mode: {debug}")
 
+    threadpool_size = configure_threadpool()
+    logger.info(f"Request threadpool size: {threadpool_size}")
+
     # Проверяем first_run перед запуском scheduler'ов
     scheduler_instance = None
     first_run_flag = False
@@ -83,11 +106,16 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to initialize modules: {e}")
 
+    # Рассылка изменений дашборда по WebSocket
+    get_dashboard_hub().start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Binom Assistant API...")
 
+    await get_dashboard_hub().stop()
+
     # Останавливаем планировщик
     if scheduler_instance:
         try:
@@ -96,6 +124,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Failed to stop scheduler: {e}")
 
+    # Дописываем в БД прогресс задач, отложенный шиной
+    try:
+        from services.scheduler.progress_bus import get_progress_bus
+        get_progress_bus().flush()
+    except Exception as e:
+        logger.error(f"Failed to flush task progress: {e}")
+
     # Останавливаем систему модулей
     try:
         from modules.startup import shutdown_modules
@@ -142,6 +177,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Логирование запросов (выборочно, см. logging.request_sample_rate)
+app.add_middleware(LoggingMiddleware)
+
 # Подключаем статические файлы
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
@@ -150,6 +188,7 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(campaigns.router, prefix="/api/v1", tags=["campaigns"])
 app.include_router(stats.router, prefix="/api/v1", tags=["stats"])
+app.include_router(stats.live_router, prefix="/api/v1", tags=["stats"])  # WebSocket с авторизацией в первом сообщении
 app.include_router(alerts.router, prefix="/api/v1", tags=["alerts"])
 app.include_router(system.router, prefix="/api/v1/system", tags=["system"])
 app.include_router(modules.router, prefix="/api/v1", tags=["modules"])
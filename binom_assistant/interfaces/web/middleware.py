@@ -2,45 +2,87 @@
 Middleware 4;O FastAPI ?@8;>65=8O.
 """
 from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
-import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
 import logging
+import random
+import time
+
+from config import get_config
 
 logger = logging.getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware 4;O ;>38@>20=8O 70?@>A>2.
+class LoggingMiddleware:
     """
+    Middleware для логирования запросов (ASGI).
 
-    async def dispatch(self, request: Request, call_next):
-        """
-        1@010BK205B 70?@>A 8 ;>38@C5B 8=D>@<0F8N.
-        """
-        start_time = time.time()
+    Одна запись на запрос после ответа: метод, путь, статус, время.
+    Обычные запросы логируются выборочно (logging.request_sample_rate - доля
+    запросов), ответы 5xx и медленные запросы (logging.slow_request_ms) - всегда.
+    Потоки SSE (text/event-stream) открыты, пока клиент подписан, поэтому
+    не считаются медленными и логируются выборочно.
+    Время обработки передается в заголовке X-Process-Time.
 
-        # >38@C5< 2E>4OI89 70?@>A
-        logger.info(
-            f"Incoming request: {request.method} {request.url.path}"
-        )
-
-        # 1@010BK205< 70?@>A
-        response = await call_next(request)
-
-        # KG8A;O5< 2@5<O >1@01>B:8
-        process_time = time.time() - start_time
+    Чистый ASGI вместо BaseHTTPMiddleware: ответ не оборачивается
+    в дополнительный поток и задачу.
+    """
 
-        # >38@C5< @57C;LB0B
-        logger.info(
-            f"Request processed: {request.method} {request.url.path} "
-            f"- Status: {response.status_code} - Time: {process_time:.3f}s"
-        )
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None, slow_ms: Optional[float] = None):
+        self.app = app
+        config = get_config()
+        if sample_rate is None:
+            sample_rate = float(config.get("logging.request_sample_rate", 0.1))
+        if slow_ms is None:
+            slow_ms = float(config.get("logging.slow_request_ms", 1000))
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.slow_seconds = slow_ms / 1000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        streaming = False
+
+        async def send_with_time(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                streaming = headers.get("content-type", "").startswith("text/event-stream")
+                # Добавляем заголовок с временем обработки
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+            await send(message)
 
-        # >102;O5< 703>;>2>: A 2@5<5=5< >1@01>B:8
-        response.headers["X-Process-Time"] = str(process_time)
+        try:
+            await self.app(scope, receive, send_with_time)
+        finally:
+            process_time = time.perf_counter() - start_time
+            if self._should_log(status_code, process_time, streaming):
+                logger.info(
+                    "Request processed: %s %s - Status: %s - Time: %.3fs",
+                    scope["method"], scope["path"], status_code, process_time
+                )
+
+    def _should_log(self, status_code: int, process_time: float, streaming: bool = False) -> bool:
+        """
+        Логировать ли запрос (ошибки и медленные - всегда, остальные - выборочно).
 
-        return response
+        Args:
+            status_code: Статус ответа
+            process_time: Время обработки, секунд
+            streaming: Ответ - поток SSE (время не проверяется)
+        """
+        if not logger.isEnabledFor(logging.INFO):
+            return False
+        if status_code >= 500 or (process_time >= self.slow_seconds and not streaming):
+            return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
 
 
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
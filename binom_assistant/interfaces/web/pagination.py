@@ -0,0 +1,139 @@
+"""
+Keyset-пагинация списков API (курсоры)
+
+Страница со смещением (OFFSET) читает и отбрасывает все предыдущие строки:
+чем дальше страница, тем дороже запрос. Курсор хранит ключ сортировки
+последней строки страницы, следующая страница начинается условием
+(ключ) < (ключ курсора) и читается по индексу с нужного места - глубокие
+страницы стоят столько же, сколько первая.
+
+Ключ сортировки - индексированные колонки, последняя из них уникальна
+(обычно id), чтобы порядок строк был однозначным.
+
+Курсор непрозрачен для клиента: base64url от JSON-списка значений ключа.
+Клиент передает next_cursor из ответа в параметр cursor следующего запроса.
+
+Использование:
+    from ..pagination import keyset_page
+
+    runs, next_cursor = keyset_page(query, (ModuleRun.started_at, ModuleRun.id), cursor, limit)
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Курсор из значений ключа сортировки.
+
+    Args:
+        values: Значения ключа (datetime/date передаются в ISO формате)
+
+    Returns:
+        Строка base64url без выравнивания
+    """
+    payload = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values]
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _parse_value(value: Any, python_type: type) -> Any:
+    """Значение ключа из JSON в тип колонки"""
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"integer expected, got {value!r}")
+        return value
+    if not isinstance(value, python_type):
+        raise ValueError(f"{python_type.__name__} expected, got {value!r}")
+    return value
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    Значения ключа сортировки из курсора.
+
+    Args:
+        cursor: Курсор из encode_cursor
+        types: Типы значений ключа (datetime, date, int, str)
+
+    Returns:
+        Список значений
+
+    Raises:
+        HTTPException: 400, если курсор поврежден или от другого списка
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor length mismatch")
+        return [_parse_value(value, python_type) for value, python_type in zip(values, types)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def keyset_filter(query, columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    Строки запроса после ключа values в порядке сортировки.
+
+    Args:
+        query: Запрос
+        columns: Колонки ключа сортировки
+        values: Значения ключа последней прочитанной строки
+        descending: Сортировка по убыванию ключа
+
+    Returns:
+        Запрос с условием (columns) < (values) или (columns) > (values)
+    """
+    key = tuple_(*columns)
+    bound = tuple_(*(literal(value, column.type) for value, column in zip(values, columns)))
+    return query.filter(key < bound if descending else key > bound)
+
+
+def keyset_page(
+    query,
+    columns: Sequence[Any],
+    cursor: Optional[str],
+    limit: Optional[int],
+    descending: bool = True,
+    offset: int = 0
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Страница запроса по ключу сортировки.
+
+    Args:
+        query: Запрос (query(Model) с фильтрами, без сортировки и лимита)
+        columns: Колонки ключа сортировки, последняя - уникальная
+        cursor: Курсор предыдущей страницы (None - первая страница)
+        limit: Размер страницы (None - все оставшиеся строки)
+        descending: Сортировка по убыванию ключа
+        offset: Пропустить строк (только для совместимости с номерами страниц)
+
+    Returns:
+        (строки страницы, курсор следующей страницы или None, если строк больше нет)
+    """
+    if cursor:
+        values = decode_cursor(cursor, [column.type.python_type for column in columns])
+        query = keyset_filter(query, columns, values, descending)
+
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    if offset:
+        query = query.offset(offset)
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column in columns])
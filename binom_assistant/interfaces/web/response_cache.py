@@ -0,0 +1,218 @@
+"""
+Кэш ответов эндпоинтов статистики и дашборда
+
+Агрегаты /stats/* и /dashboard/* меняются только после сбора данных или
+пересчета периодов, а дашборд запрашивает их при каждой загрузке и опросе.
+Ответ кэшируется в памяти процесса по ключу
+(маршрут, параметры, поколение данных, сегодняшняя дата):
+- поколение (storage.database.write_tracker) растет при каждом commit
+  записей статистики - следующий запрос после сбора считается заново
+- дата в ключе - периоды 7d / this_month считаются от сегодняшнего дня
+- TTL страхует от записей из других процессов (скрипты пересчета)
+
+Одинаковые параллельные запросы считаются один раз (single-flight):
+первый вычисляет, остальные ждут его результат. Ошибки не кэшируются.
+
+Использование:
+    @router.get("/stats/summary")
+    @cached_response("stats/summary")
+    def get_summary_stats(period: str = Query("7d"), db: Session = Depends(get_db)):
+        ...
+"""
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from config import get_config
+from storage.database.write_tracker import get_generation
+
+logger = logging.getLogger(__name__)
+
+# Параметры обработчика, не влияющие на ответ
+IGNORED_PARAMS = frozenset({'db', 'request'})
+
+
+class _Flight:
+    """Вычисление ответа, которого ждут одинаковые запросы"""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """
+    LRU кэш ответов с single-flight и счетчиками попаданий.
+
+    Потокобезопасен: синхронные обработчики выполняются в пуле потоков.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_entries: Максимум ответов в кэше (0 - кэш выключен)
+            ttl_seconds: Время жизни ответа, секунд
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: Dict[tuple, _Flight] = {}
+        self._generation = get_generation()
+        self._invalidations = 0
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    def get_or_compute(self, route: str, params: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """
+        Возвращает ответ из кэша или вычисляет его (один раз для одинаковых запросов).
+
+        Args:
+            route: Имя маршрута
+            params: Параметры запроса, влияющие на ответ
+            compute: Вычисление ответа
+
+        Returns:
+            Ответ обработчика (общий объект для всех попаданий - не изменять)
+        """
+        if self.max_entries <= 0:
+            return compute()
+
+        generation = get_generation()
+        key = (route, tuple(sorted(params.items())), generation, date.today())
+
+        with self._lock:
+            counters = self._routes.setdefault(route, {'hits': 0, 'misses': 0, 'coalesced': 0})
+            if generation != self._generation:
+                # Новые данные зафиксированы - старые ответы больше не нужны
+                self._invalidations += 1
+                self._generation = generation
+                self._entries.clear()
+
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                counters['hits'] += 1
+                return entry[0]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                counters['misses'] += 1
+            else:
+                counters['coalesced'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # Данные поменялись во время вычисления - ответ может быть смешанным
+                if flight.error is None and generation == get_generation():
+                    self._entries[key] = (flight.value, time.monotonic())
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.event.set()
+
+    def clear(self) -> int:
+        """
+        Очищает кэш.
+
+        Returns:
+            Количество удаленных ответов
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Метрики кэша.
+
+        Returns:
+            Dict: entries, generation, invalidations, hits, misses, coalesced,
+            hit_ratio (доля запросов без вычисления) и те же счетчики по маршрутам
+        """
+        with self._lock:
+            routes = {
+                route: {**counters, 'hit_ratio': _hit_ratio(counters)}
+                for route, counters in sorted(self._routes.items())
+            }
+            totals = {
+                name: sum(counters[name] for counters in self._routes.values())
+                for name in ('hits', 'misses', 'coalesced')
+            }
+            return {
+                'enabled': self.max_entries > 0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'generation': self._generation,
+                'invalidations': self._invalidations,
+                **totals,
+                'hit_ratio': _hit_ratio(totals),
+                'routes': routes
+            }
+
+
+def _hit_ratio(counters: Dict[str, int]) -> float:
+    """Доля запросов, обслуженных без собственного вычисления"""
+    served = counters['hits'] + counters['coalesced']
+    total = served + counters['misses']
+    return round(served / total, 4) if total else 0.0
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Получает глобальный кэш ответов (singleton)"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                config = get_config()
+                _response_cache = ResponseCache(
+                    max_entries=int(config.get("web.response_cache_size", 256)),
+                    ttl_seconds=float(config.get("web.response_cache_ttl", 300))
+                )
+    return _response_cache
+
+
+def cached_response(route: str) -> Callable:
+    """
+    Декоратор синхронного обработчика: ответ через get_response_cache().
+
+    Ключ - именованные параметры обработчика, кроме db и request.
+    Сигнатура сохраняется (functools.wraps), FastAPI видит исходные параметры.
+
+    Args:
+        route: Имя маршрута для ключа и метрик
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            params = {name: value for name, value in kwargs.items() if name not in IGNORED_PARAMS}
+            return get_response_cache().get_or_compute(route, params, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
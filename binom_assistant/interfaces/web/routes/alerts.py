@@ -5,8 +5,11 @@ API endpoints для алертов из модулей
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from itertools import chain
 from typing import Optional, List, Dict, Any
 from ..dependencies import get_db
+from ..conditional import modules_etag
+from ..pagination import decode_cursor, encode_cursor, keyset_filter
 from ..auth import get_current_user
 from storage.database.models import ModuleRun
 import logging
@@ -16,25 +19,57 @@ logger = logging.getLogger(__name__)
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
-@router.get("/alerts")
-async def get_alerts(
+# Ключ сортировки запусков для алертов (индекс idx_module_runs_status_completed)
+ALERT_RUN_KEY = (ModuleRun.completed_at, ModuleRun.id)
+
+# Сколько запусков читать за раз при сборе страницы алертов
+ALERT_RUNS_BATCH = 50
+
+
+def _iter_runs(runs_query, after: Optional[tuple], batch_size: int = ALERT_RUNS_BATCH):
+    """
+    Запуски по убыванию (completed_at, id) после ключа after, пачками по индексу.
+
+    Args:
+        runs_query: Запрос запусков с фильтрами
+        after: (completed_at, id) последнего прочитанного запуска (None - с начала)
+        batch_size: Запусков в одном запросе
+    """
+    while True:
+        query = runs_query if after is None else keyset_filter(runs_query, ALERT_RUN_KEY, after)
+        runs = query.order_by(*(column.desc() for column in ALERT_RUN_KEY)).limit(batch_size).all()
+        yield from runs
+        if len(runs) < batch_size:
+            return
+        after = (runs[-1].completed_at, runs[-1].id)
+
+
+@router.get("/alerts", dependencies=[Depends(modules_etag)])
+def get_alerts(
     period: str = Query("7d", description="Период: 1d, 7d, 14d, 30d"),
     severity: Optional[str] = Query(None, description="Фильтр по важности"),
     module_id: Optional[str] = Query(None, description="Фильтр по модулю"),
-    limit: int = Query(100, description="Максимум алертов"),
+    limit: int = Query(100, ge=1, le=500, description="Максимум алертов"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из ответа)"),
     db: Session = Depends(get_db)
 ):
     """
     Получить список алертов из истории запусков модулей.
 
+    Алерты идут от новых запусков к старым; запуски читаются пачками
+    по индексу, пока страница не наберет limit алертов (с учетом фильтра
+    severity). Курсор хранит запуск, на котором остановилась страница,
+    и позицию алерта в нем - следующая страница продолжает с этого места.
+
     Query Params:
         period: Период (1d, 7d, 14d, 30d)
         severity: Фильтр по важности (critical, high, medium, low)
         module_id: Фильтр по модулю
-        limit: Максимальное количество алертов
+        limit: Максимальное количество алертов на странице
+        cursor: Курсор следующей страницы
 
     Returns:
-        Список алертов с метаданными
+        Список алертов с метаданными и next_cursor (None - алертов больше нет)
     """
     try:
         # Парсим период (включая текущий день)
@@ -42,7 +77,7 @@ async def get_alerts(
         # Устанавливаем начало дня для корректной фильтрации
         date_from = (datetime.now() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
 
-        # Получаем последние успешные запуски модулей
+        # Успешные запуски модулей за период
         runs_query = db.query(ModuleRun).filter(
             ModuleRun.status == "success",
             ModuleRun.completed_at >= date_from,
@@ -53,32 +88,48 @@ async def get_alerts(
         if module_id:
             runs_query = runs_query.filter(ModuleRun.module_id == module_id)
 
-        runs = runs_query.order_by(
-            ModuleRun.completed_at.desc()
-        ).limit(limit * 2).all()  # Берем больше чтобы после фильтрации осталось достаточно
-
-        # Собираем все алерты
+        # Запуски и позиция первого алерта в каждом
+        sources = iter(())
+        after = None
+        if cursor:
+            completed_at, run_id, position = decode_cursor(cursor, (datetime, int, int))
+            if position < 0:
+                raise HTTPException(status_code=400, detail="Invalid cursor: negative position")
+            after = (completed_at, run_id)
+            resumed = runs_query.filter(ModuleRun.id == run_id).first()
+            if resumed is not None:
+                sources = iter([(resumed, position)])
+        sources = chain(sources, ((run, 0) for run in _iter_runs(runs_query, after)))
+
+        # Собираем алерты страницы
         all_alerts = []
-        for run in runs:
-            results = run.results or {}
-            alerts = results.get("alerts", [])
+        next_cursor = None
+        runs_read = 0
+        for run, position in sources:
+            runs_read += 1
+            alerts = (run.results or {}).get("alerts", [])
+
+            for index in range(position, len(alerts)):
+                alert = alerts[index]
+                # Фильтрация по severity
+                if severity and alert.get("severity") != severity:
+                    continue
+
+                # Страница заполнена, а подходящий алерт еще есть - с него начнется следующая
+                if len(all_alerts) == limit:
+                    next_cursor = encode_cursor([run.completed_at, run.id, index])
+                    break
 
-            for alert in alerts:
                 # Добавляем метаданные
-                alert_item = {
+                all_alerts.append({
                     **alert,  # все поля алерта (type, severity, message и т.д.)
                     "module_id": run.module_id,
                     "run_id": run.id,
                     "created_at": run.completed_at.isoformat() if run.completed_at else datetime.now().isoformat()
-                }
-                all_alerts.append(alert_item)
-
-        # Фильтрация по severity
-        if severity:
-            all_alerts = [a for a in all_alerts if a.get("severity") == severity]
+                })
 
-        # Ограничиваем количество
-        all_alerts = all_alerts[:limit]
+            if next_cursor:
+                break
 
         # Сортировка по severity
         severity_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
@@ -91,23 +142,26 @@ async def get_alerts(
         high_count = sum(1 for a in all_alerts if a.get("severity") == "high")
         medium_count = sum(1 for a in all_alerts if a.get("severity") == "medium")
 
-        logger.info(f"Loaded {len(all_alerts)} alerts from {len(runs)} module runs")
+        logger.info(f"Loaded {len(all_alerts)} alerts from {runs_read} module runs")
 
         return {
             "alerts": all_alerts,
             "total": len(all_alerts),
             "critical_count": critical_count,
             "high_count": high_count,
-            "medium_count": medium_count
+            "medium_count": medium_count,
+            "next_cursor": next_cursor
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting alerts: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/alerts/recent")
-async def get_recent_alerts(
+@router.get("/alerts/recent", dependencies=[Depends(modules_etag)])
+def get_recent_alerts(
     limit: int = Query(10, description="Количество алертов"),
     severity_filter: str = Query(None, description="Фильтр по severity: all, important (critical+high), или конкретный уровень"),
     db: Session = Depends(get_db)
@@ -162,17 +216,10 @@ async def get_recent_alerts(
 
         # Добавляем ошибки из логов (последние 24 часа)
         try:
-            from pathlib import Path
-            import re
+            from utils.log_reader import find_log_lines, get_log_files, parse_log_line
 
             logger.info("Starting to parse log files for errors...")
 
-            log_files = [
-                Path("logs/app.log"),
-                Path("logs/collector.log"),
-                Path("logs/stat_periods.log")
-            ]
-
             # Blacklist компонентов - не показывать в уведомлениях
             component_blacklist = {
                 'asyncio',  # Системные сообщения asyncio
@@ -181,47 +228,20 @@ async def get_recent_alerts(
             cutoff_time = datetime.now() - timedelta(hours=24)
             log_errors = []
 
-            for log_file in log_files:
-                if not log_file.exists():
-                    continue
-
+            for log_file in get_log_files():
                 try:
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-
-                    # Берем последние строки
-                    recent_lines = lines[-500:] if len(lines) > 500 else lines
-
-                    for line in recent_lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-
-                        # Проверяем уровень (только ERROR и CRITICAL)
-                        is_error = " - ERROR - " in line or " - CRITICAL - " in line
-                        if not is_error:
-                            continue
-
-                        # Извлекаем timestamp
-                        timestamp_match = re.match(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                        if not timestamp_match:
-                            continue
-
-                        timestamp_str = timestamp_match.group(1)
+                    # Только ERROR и CRITICAL, по индексу ошибок
+                    for line in find_log_lines(log_file, 500, since=cutoff_time, levels=("ERROR", "CRITICAL")):
+                        entry = parse_log_line(line.strip())
+                        timestamp_str = entry["timestamp"]
                         try:
                             log_time = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
                         except ValueError:
                             continue
 
-                        # Фильтруем по времени
-                        if log_time < cutoff_time:
-                            continue
-
-                        # Извлекаем компонент и сообщение
-                        parts = line.split(" - ", 3)
-                        component = parts[1] if len(parts) > 1 else "unknown"
-                        level = parts[2] if len(parts) > 2 else "ERROR"
-                        message = parts[3] if len(parts) > 3 else line
+                        component = entry["component"]
+                        level = entry["level"]
+                        message = entry["message"]
 
                         # Фильтруем системные компоненты из blacklist
                         if component in component_blacklist:
@@ -274,8 +294,8 @@ async def get_recent_alerts(
         return {"alerts": [], "total": 0}
 
 
-@router.get("/alerts/unread/count")
-async def get_unread_count(db: Session = Depends(get_db)):
+@router.get("/alerts/unread/count", dependencies=[Depends(modules_etag)])
+def get_unread_count(db: Session = Depends(get_db)):
     """
     Получить количество непрочитанных алертов для badge.
 
@@ -323,7 +343,7 @@ async def get_unread_count(db: Session = Depends(get_db)):
 
 
 @router.delete("/alerts/{run_id}")
-async def delete_alert(
+def delete_alert(
     run_id: int,
     db: Session = Depends(get_db)
 ):
@@ -361,7 +381,7 @@ async def delete_alert(
 
 
 @router.delete("/alerts/bulk")
-async def delete_all_alerts(
+def delete_all_alerts(
     period: str = Query("7d", description="Период: 1d, 7d, 14d, 30d"),
     severity: Optional[str] = Query(None, description="Фильтр по важности"),
     module_id: Optional[str] = Query(None, description="Фильтр по модулю"),
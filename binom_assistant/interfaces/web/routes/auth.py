@@ -35,7 +35,7 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(login_data: LoginRequest) -> TokenResponse:
+def login(login_data: LoginRequest) -> TokenResponse:
     """
     Аутентификация пользователя и получение JWT токена.
 
@@ -65,7 +65,7 @@ async def login(login_data: LoginRequest) -> TokenResponse:
 
 
 @router.get("/login", response_class=HTMLResponse)
-async def login_page(request: Request):
+def login_page(request: Request):
     """
     Страница логина.
     """
@@ -73,7 +73,7 @@ async def login_page(request: Request):
 
 
 @router.post("/logout")
-async def logout() -> Dict[str, str]:
+def logout() -> Dict[str, str]:
     """
     Выход из системы.
     JWT токены не сбрасываются на сервере (stateless),
@@ -7,13 +7,18 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 from typing import Optional, List
 from ..dependencies import get_db
+from ..conditional import stats_etag
+from ..pagination import keyset_page
 from ..auth import get_current_user
 from ..schemas import (
     CampaignResponse,
     CampaignListResponse,
-    CampaignDetailResponse
+    CampaignDetailResponse,
+    CampaignSearchResult,
+    CampaignSearchResponse
 )
 from storage.database.models import Campaign
+from storage.database.campaign_search import campaign_search_filter, search_campaigns as search_campaigns_fts
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,8 +26,8 @@ logger = logging.getLogger(__name__)
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
-@router.get("/campaigns", response_model=CampaignListResponse)
-async def get_campaigns(
+@router.get("/campaigns", response_model=CampaignListResponse, dependencies=[Depends(stats_etag)])
+def get_campaigns(
     page: int = Query(1, ge=1, description="Номер страницы"),
     page_size: int = Query(50, ge=1, le=200, description="Размер страницы"),
     group_name: Optional[str] = Query(None, description="Фильтр по группе"),
@@ -31,11 +36,17 @@ async def get_campaigns(
     min_cost: Optional[float] = Query(None, description="Минимальный расход"),
     min_leads: Optional[int] = Query(None, description="Минимум лидов"),
     search: Optional[str] = Query(None, description="Поиск по имени"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из ответа)"),
     db: Session = Depends(get_db)
 ):
     """
     Получить список кампаний с фильтрацией и пагинацией.
 
+    Кампании отсортированы по internal_id. Следующая страница запрашивается
+    по cursor (keyset, стоимость не зависит от глубины); page оставлен для
+    совместимости и читает страницу через OFFSET. Общее количество
+    считается только для запроса без cursor.
+
     Args:
         page: Номер страницы
         page_size: Количество элементов на странице
@@ -45,11 +56,44 @@ async def get_campaigns(
         min_cost: Минимальный расход
         min_leads: Минимум лидов
         search: Поиск по имени
+        cursor: Курсор следующей страницы
         db: Сессия БД
 
     Returns:
         Список кампаний с пагинацией
     """
+    return list_campaigns(
+        db,
+        page=page,
+        page_size=page_size,
+        group_name=group_name,
+        ts_name=ts_name,
+        is_cpl_mode=is_cpl_mode,
+        min_cost=min_cost,
+        min_leads=min_leads,
+        search=search,
+        cursor=cursor
+    )
+
+
+def list_campaigns(
+    db: Session,
+    page: int = 1,
+    page_size: int = 50,
+    group_name: Optional[str] = None,
+    ts_name: Optional[str] = None,
+    is_cpl_mode: Optional[bool] = None,
+    min_cost: Optional[float] = None,
+    min_leads: Optional[int] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> CampaignListResponse:
+    """
+    Список кампаний с фильтрами (общий для /campaigns, /campaigns/by-group и /campaigns/search/{query}).
+
+    Обычная функция без Query-параметров: маршруты передают только свои
+    фильтры, остальные остаются None.
+    """
     try:
         # 07>2K9 70?@>A
         query = db.query(Campaign)
@@ -73,36 +117,49 @@ async def get_campaigns(
             filters.append(Campaign.leads >= min_leads)
 
         if search:
-            filters.append(Campaign.current_name.ilike(f"%{search}%"))
+            # Полнотекстовый индекс; для запросов короче 3 символов - LIKE
+            search_filter = campaign_search_filter(db, search)
+            if search_filter is None:
+                search_filter = Campaign.current_name.ilike(f"%{search}%")
+            filters.append(search_filter)
 
         if filters:
             query = query.filter(and_(*filters))
 
-        # Подсчет общего количества
-        total = query.count()
-
-        # 038=0F8O
-        offset = (page - 1) * page_size
-        campaigns = query.offset(offset).limit(page_size).all()
-
-        # Вычисляем количество страниц
-        pages = (total + page_size - 1) // page_size
+        # Общее количество - только для первого запроса (без курсора)
+        total = None
+        pages = None
+        if not cursor:
+            total = query.count()
+            pages = (total + page_size - 1) // page_size
+
+        campaigns, next_cursor = keyset_page(
+            query,
+            (Campaign.internal_id,),
+            cursor,
+            page_size,
+            descending=False,
+            offset=0 if cursor else (page - 1) * page_size
+        )
 
         return CampaignListResponse(
             campaigns=[CampaignResponse.from_orm(c) for c in campaigns],
             total=total,
-            page=page,
+            page=None if cursor else page,
             page_size=page_size,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching campaigns: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/campaigns/top")
-async def get_top_campaigns(
+@router.get("/campaigns/top", dependencies=[Depends(stats_etag)])
+def get_top_campaigns(
     period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
     limit: int = Query(5, ge=1, le=50, description="Количество кампаний"),
     sort_by: str = Query("roi", description="Поле для сортировки: roi, revenue, cost, profit, clicks, leads"),
@@ -264,8 +321,51 @@ async def get_top_campaigns(
         }
 
 
-@router.get("/campaigns/{campaign_id}", response_model=CampaignDetailResponse)
-async def get_campaign(
+@router.get("/campaigns/search", response_model=CampaignSearchResponse, dependencies=[Depends(stats_etag)])
+def search_campaigns_ranked(
+    q: str = Query(..., min_length=1, max_length=255, description="Подстрока названия, группы или источника"),
+    limit: int = Query(20, ge=1, le=100, description="Максимум результатов"),
+    db: Session = Depends(get_db)
+):
+    """
+    Поиск кампаний по названию, группе и источнику с ранжированием.
+
+    Использует полнотекстовый индекс (FTS5 trigram): совпадение в названии
+    весит больше, чем в группе или источнике. Запросы короче 3 символов
+    (и БД без индекса) ищутся через LIKE по названию, без ранжирования.
+
+    Args:
+        q: Строка поиска
+        limit: Максимум результатов
+        db: Сессия БД
+
+    Returns:
+        Кампании по убыванию релевантности и использованный движок (fts5 / like)
+    """
+    try:
+        ranked = search_campaigns_fts(db, q, limit=limit)
+        if ranked is not None:
+            results = [
+                CampaignSearchResult.model_validate(campaign).model_copy(update={'score': score})
+                for campaign, score in ranked
+            ]
+            engine = 'fts5'
+        else:
+            campaigns = db.query(Campaign).filter(
+                Campaign.current_name.ilike(f"%{q}%")
+            ).order_by(Campaign.current_name).limit(limit).all()
+            results = [CampaignSearchResult.model_validate(c) for c in campaigns]
+            engine = 'like'
+
+        return CampaignSearchResponse(query=q, results=results, total=len(results), engine=engine)
+
+    except Exception as e:
+        logger.error(f"Error searching campaigns: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/campaigns/{campaign_id}", response_model=CampaignDetailResponse, dependencies=[Depends(stats_etag)])
+def get_campaign(
     campaign_id: int,
     db: Session = Depends(get_db)
 ):
@@ -294,8 +394,8 @@ async def get_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/campaigns/by-group/{group_name}", response_model=CampaignListResponse)
-async def get_campaigns_by_group(
+@router.get("/campaigns/by-group/{group_name}", response_model=CampaignListResponse, dependencies=[Depends(stats_etag)])
+def get_campaigns_by_group(
     group_name: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
@@ -313,16 +413,16 @@ async def get_campaigns_by_group(
     Returns:
         Список кампаний группы
     """
-    return await get_campaigns(
+    return list_campaigns(
+        db,
         page=page,
         page_size=page_size,
-        group_name=group_name,
-        db=db
+        group_name=group_name
     )
 
 
-@router.get("/campaigns/search/{query}", response_model=CampaignListResponse)
-async def search_campaigns(
+@router.get("/campaigns/search/{query}", response_model=CampaignListResponse, dependencies=[Depends(stats_etag)])
+def search_campaigns(
     query: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
@@ -340,9 +440,9 @@ async def search_campaigns(
     Returns:
         Список найденных кампаний
     """
-    return await get_campaigns(
+    return list_campaigns(
+        db,
         page=page,
         page_size=page_size,
-        search=query,
-        db=db
+        search=query
     )
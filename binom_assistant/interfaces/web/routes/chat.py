@@ -1,13 +1,15 @@
 """
 API роуты для чата с AI.
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 import logging
 from typing import List, Optional
 from datetime import datetime
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ..auth import get_current_user
+from ..pagination import keyset_page
 from ..schemas.chat import (
     ChatRequest,
     ChatResponse,
@@ -31,10 +33,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-# Dependency для получения сессии БД
+# Dependency для получения сессии БД (отдельная сессия на запрос, не thread-local)
 def get_db():
-    session_factory = get_session_factory()
-    session = session_factory()
+    session = get_session_factory().session_factory()
     try:
         yield session
     finally:
@@ -172,7 +173,7 @@ async def get_models():
 
 
 @router.get("/chat/agent-categories")
-async def get_agent_categories():
+def get_agent_categories():
     """
     Получение списка доступных категорий агентов.
 
@@ -189,7 +190,7 @@ async def get_agent_categories():
 
 
 @router.get("/chat/agent-category/{category_id}/details")
-async def get_category_details(category_id: str):
+def get_category_details(category_id: str):
     """
     Получение детальной информации о модулях категории.
 
@@ -225,7 +226,7 @@ async def get_category_details(category_id: str):
 # === История чатов ===
 
 @router.post("/chat/new")
-async def create_chat(db: Session = Depends(get_db)):
+def create_chat(db: Session = Depends(get_db)):
     """
     Создание нового чата.
     
@@ -246,23 +247,50 @@ async def create_chat(db: Session = Depends(get_db)):
 
 
 @router.get("/chat/list")
-async def list_chats(db: Session = Depends(get_db)):
+def list_chats(
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Чатов на странице (без limit - все)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из ответа)"),
+    db: Session = Depends(get_db)
+):
     """
-    Получение списка всех чатов.
-    
+    Получение списка чатов (последние обновленные первыми).
+
+    Страницы читаются по индексу (updated_at, id) с курсора,
+    количество сообщений считается одним запросом для всей страницы.
+
+    Args:
+        limit: Чатов на странице
+        cursor: Курсор следующей страницы
+
     Returns:
-        Список чатов с базовой информацией
+        Список чатов с базовой информацией и next_cursor
     """
     try:
-        chats = db.query(ChatSession).order_by(ChatSession.updated_at.desc()).all()
-        return {"chats": [chat.to_dict() for chat in chats]}
+        chats, next_cursor = keyset_page(
+            db.query(ChatSession),
+            (ChatSession.updated_at, ChatSession.id),
+            cursor,
+            limit
+        )
+        counts = dict(
+            db.query(DBChatMessage.chat_id, func.count(DBChatMessage.id))
+            .filter(DBChatMessage.chat_id.in_([chat.id for chat in chats]))
+            .group_by(DBChatMessage.chat_id)
+            .all()
+        ) if chats else {}
+        return {
+            "chats": [chat.to_dict(message_count=counts.get(chat.id, 0)) for chat in chats],
+            "next_cursor": next_cursor
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing chats: {e}")
         raise HTTPException(status_code=500, detail="Failed to list chats")
 
 
 @router.get("/chat/{chat_id}")
-async def get_chat(chat_id: int, db: Session = Depends(get_db)):
+def get_chat(chat_id: int, db: Session = Depends(get_db)):
     """
     Получение чата с историей сообщений.
     
@@ -292,7 +320,7 @@ async def get_chat(chat_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/chat/{chat_id}")
-async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
+def delete_chat(chat_id: int, db: Session = Depends(get_db)):
     """
     Удаление чата и всех его сообщений.
 
@@ -320,7 +348,7 @@ async def delete_chat(chat_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/chat/all")
-async def delete_all_chats(db: Session = Depends(get_db)):
+def delete_all_chats(db: Session = Depends(get_db)):
     """
     Удаление всех чатов и их сообщений.
 
@@ -346,7 +374,7 @@ async def delete_all_chats(db: Session = Depends(get_db)):
 
 
 @router.put("/chat/{chat_id}/title")
-async def update_chat_title(
+def update_chat_title(
     chat_id: int, 
     title: str,
     db: Session = Depends(get_db)
@@ -381,7 +409,7 @@ async def update_chat_title(
 
 
 @router.post("/chat/{chat_id}/messages")
-async def add_messages(
+def add_messages(
     chat_id: int,
     messages: List[ChatMessage],
     db: Session = Depends(get_db)
@@ -437,7 +465,7 @@ async def add_messages(
 # === Шаблоны промптов ===
 
 @router.get("/templates", response_model=TemplateListResponse)
-async def list_templates(db: Session = Depends(get_db)):
+def list_templates(db: Session = Depends(get_db)):
     """
     Получение списка всех шаблонов.
 
@@ -453,7 +481,7 @@ async def list_templates(db: Session = Depends(get_db)):
 
 
 @router.post("/templates", response_model=TemplateResponse)
-async def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
+def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
     """
     Создание нового шаблона.
 
@@ -481,7 +509,7 @@ async def create_template(template: TemplateCreate, db: Session = Depends(get_db
 
 
 @router.get("/templates/{template_id}", response_model=TemplateResponse)
-async def get_template(template_id: int, db: Session = Depends(get_db)):
+def get_template(template_id: int, db: Session = Depends(get_db)):
     """
     Получение шаблона по ID.
 
@@ -505,7 +533,7 @@ async def get_template(template_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/templates/{template_id}", response_model=TemplateResponse)
-async def update_template(
+def update_template(
     template_id: int,
     template: TemplateUpdate,
     db: Session = Depends(get_db)
@@ -547,7 +575,7 @@ async def update_template(
 
 
 @router.delete("/templates/{template_id}")
-async def delete_template(template_id: int, db: Session = Depends(get_db)):
+def delete_template(template_id: int, db: Session = Depends(get_db)):
     """
     Удаление шаблона.
 
@@ -577,7 +605,7 @@ async def delete_template(template_id: int, db: Session = Depends(get_db)):
 # === Управление системными промптами агентов ===
 
 @router.get("/chat/agent-prompts/{category_id}")
-async def get_agent_prompt(category_id: str):
+def get_agent_prompt(category_id: str):
     """
     Получение системного промпта для категории агента.
 
@@ -615,7 +643,7 @@ async def get_agent_prompt(category_id: str):
 
 
 @router.put("/chat/agent-prompts/{category_id}")
-async def update_agent_prompt(category_id: str, request: dict):
+def update_agent_prompt(category_id: str, request: dict):
     """
     Обновление системного промпта для категории агента.
 
@@ -654,7 +682,7 @@ async def update_agent_prompt(category_id: str, request: dict):
 
 
 @router.post("/chat/agent-prompts/{category_id}/reset")
-async def reset_agent_prompt(category_id: str):
+def reset_agent_prompt(category_id: str):
     """
     Сброс системного промпта к дефолтному значению.
 
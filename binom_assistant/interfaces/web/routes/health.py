@@ -29,7 +29,7 @@ async def health_check() -> Dict[str, Any]:
 
 
 @router.get("/health/detailed")
-async def detailed_health_check(
+def detailed_health_check(
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
@@ -160,7 +160,7 @@ async def detailed_health_check(
 
 
 @router.get("/health/ready")
-async def readiness_check(
+def readiness_check(
     db: Session = Depends(get_db)
 ) -> Dict[str, str]:
     """
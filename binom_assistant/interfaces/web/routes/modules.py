@@ -8,6 +8,8 @@ from datetime import datetime
 from typing import Optional, List
 
 from ..dependencies import get_db
+from ..conditional import modules_etag
+from ..pagination import keyset_page
 from ..auth import get_current_user, get_current_user_or_internal
 from ..schemas.module import (
     ModuleListResponse,
@@ -17,6 +19,8 @@ from ..schemas.module import (
     ModuleRunHistoryItem,
     ModuleConfigUpdate,
     ModuleRunRequest,
+    ModuleSweepRequest,
+    ModuleSweepResponse,
     ModuleMetadataResponse,
     ModuleConfigResponse
 )
@@ -47,8 +51,8 @@ def get_module_runner() -> ModuleRunner:
     return ModuleRunner()
 
 
-@router.get("/modules", response_model=ModuleListResponse)
-async def list_modules(
+@router.get("/modules", response_model=ModuleListResponse, dependencies=[Depends(modules_etag)])
+def list_modules(
     category: Optional[str] = Query(None, description="Фильтр по категории"),
     db: Session = Depends(get_db),
     registry: ModuleRegistry = Depends(get_module_registry)
@@ -86,11 +90,10 @@ async def list_modules(
                 # Модуль считается включенным если у него есть schedule
                 module_data['enabled'] = bool(config.schedule and config.schedule.strip())
             else:
-                # Для новых модулей проверяем дефолтный конфиг
-                module = registry.get_module_instance(module_meta.id)
-                if module:
-                    default_config = module.get_default_config()
-                    module_data['enabled'] = bool(default_config.schedule and default_config.schedule.strip())
+                # Для новых модулей проверяем дефолтное расписание (из манифеста, без импорта модуля)
+                default_schedule = registry.get_default_schedule(module_meta.id)
+                if default_schedule is not None:
+                    module_data['enabled'] = bool(default_schedule.strip())
 
             # Получаем последний запуск
             last_run = db.query(ModuleRunDB).filter(
@@ -119,8 +122,8 @@ async def list_modules(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/modules/{module_id}", response_model=ModuleInfoResponse)
-async def get_module_info(
+@router.get("/modules/{module_id}", response_model=ModuleInfoResponse, dependencies=[Depends(modules_etag)])
+def get_module_info(
     module_id: str,
     db: Session = Depends(get_db),
     registry: ModuleRegistry = Depends(get_module_registry)
@@ -210,7 +213,7 @@ async def get_module_info(
 
 
 @router.get("/modules/{module_id}/config/default", response_model=ModuleConfigResponse)
-async def get_module_default_config(
+def get_module_default_config(
     module_id: str,
     registry: ModuleRegistry = Depends(get_module_registry)
 ):
@@ -249,7 +252,7 @@ async def get_module_default_config(
 
 
 @run_router.post("/modules/{module_id}/run", response_model=ModuleResultResponse)
-async def run_module(
+def run_module(
     module_id: str,
     request: ModuleRunRequest,
     runner: ModuleRunner = Depends(get_module_runner),
@@ -309,10 +312,58 @@ async def run_module(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/modules/{module_id}/results", response_model=ModuleResultResponse)
-async def get_module_results(
+@router.post("/modules/{module_id}/sweep", response_model=ModuleSweepResponse)
+def sweep_module(
     module_id: str,
-    db: Session = Depends(get_db)
+    request: ModuleSweepRequest,
+    runner: ModuleRunner = Depends(get_module_runner)
+):
+    """
+    Считает модуль для нескольких наборов параметров (подбор порогов).
+
+    Данные читаются из БД один раз, наборы считаются параллельно.
+    Результаты не сохраняются в историю запусков.
+
+    Args:
+        module_id: ID модуля
+        request: Наборы параметров
+        runner: Раннер модулей
+
+    Returns:
+        Таблица сравнения наборов (summary каждого набора)
+    """
+    try:
+        return runner.run_module_sweep(
+            module_id=module_id,
+            params_sets=request.params_sets,
+            include_data=request.include_data
+        )
+    except ValueError as e:
+        status_code = 404 if "not found" in str(e) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running sweep for module '{module_id}': {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _materialize_run(run: ModuleRunDB, db: Session, runner: ModuleRunner) -> None:
+    """
+    Достраивает отложенные графики и рекомендации запуска и сохраняет их в запуск.
+
+    Фоновые запуски сохраняют только данные анализа; фазы строятся
+    при первом просмотре результатов и дальше отдаются из БД.
+    """
+    results = runner.materialize_run_results(run.module_id, run.results)
+    if results is not None:
+        run.results = results
+        db.commit()
+
+
+@router.get("/modules/{module_id}/results", response_model=ModuleResultResponse, dependencies=[Depends(modules_etag)])
+def get_module_results(
+    module_id: str,
+    db: Session = Depends(get_db),
+    runner: ModuleRunner = Depends(get_module_runner)
 ):
     """
     Получает результаты последнего запуска модуля.
@@ -320,6 +371,7 @@ async def get_module_results(
     Args:
         module_id: ID модуля
         db: Сессия БД
+        runner: Раннер модулей (для построения отложенных фаз)
 
     Returns:
         Результат последнего успешного запуска
@@ -337,6 +389,8 @@ async def get_module_results(
                 detail=f"No successful runs found for module '{module_id}'"
             )
 
+        _materialize_run(last_run, db, runner)
+
         # Add params from run to results
         result_data = last_run.results.copy()
         result_data['params'] = last_run.params
@@ -349,27 +403,35 @@ async def get_module_results(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/modules/{module_id}/history", response_model=ModuleRunHistoryResponse)
-async def get_module_history(
+@router.get("/modules/{module_id}/history", response_model=ModuleRunHistoryResponse, dependencies=[Depends(modules_etag)])
+def get_module_history(
     module_id: str,
-    limit: int = Query(10, description="Количество записей"),
+    limit: int = Query(10, ge=1, le=100, description="Количество записей"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor из ответа)"),
     db: Session = Depends(get_db)
 ):
     """
-    Получает историю запусков модуля.
+    Получает историю запусков модуля (новые первыми).
+
+    Страницы читаются по индексу (module_id, started_at, id) с курсора,
+    общее количество считается только для первой страницы.
 
     Args:
         module_id: ID модуля
         limit: Количество записей
+        cursor: Курсор следующей страницы
         db: Сессия БД
 
     Returns:
         История запусков
     """
     try:
-        runs = db.query(ModuleRunDB).filter(
-            ModuleRunDB.module_id == module_id
-        ).order_by(ModuleRunDB.started_at.desc()).limit(limit).all()
+        runs, next_cursor = keyset_page(
+            db.query(ModuleRunDB).filter(ModuleRunDB.module_id == module_id),
+            (ModuleRunDB.started_at, ModuleRunDB.id),
+            cursor,
+            limit
+        )
 
         history_items = []
         for run in runs:
@@ -589,25 +651,31 @@ async def get_module_history(
                 params=run.params
             ))
 
-        total = db.query(ModuleRunDB).filter(
-            ModuleRunDB.module_id == module_id
-        ).count()
+        total = None
+        if not cursor:
+            total = db.query(ModuleRunDB).filter(
+                ModuleRunDB.module_id == module_id
+            ).count()
 
         return ModuleRunHistoryResponse(
             runs=history_items,
-            total=total
+            total=total,
+            next_cursor=next_cursor
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting history for module '{module_id}': {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/modules/{module_id}/history/{run_id}")
-async def get_module_run(
+@router.get("/modules/{module_id}/history/{run_id}", dependencies=[Depends(modules_etag)])
+def get_module_run(
     module_id: str,
     run_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    runner: ModuleRunner = Depends(get_module_runner)
 ):
     """
     Получает конкретный запуск модуля с результатами.
@@ -616,6 +684,7 @@ async def get_module_run(
         module_id: ID модуля
         run_id: ID запуска
         db: Сессия БД
+        runner: Раннер модулей (для построения отложенных фаз)
 
     Returns:
         Информация о запуске с результатами
@@ -629,6 +698,9 @@ async def get_module_run(
         if not run:
             raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
 
+        if run.status == "success":
+            _materialize_run(run, db, runner)
+
         return {
             "id": run.id,
             "module_id": run.module_id,
@@ -649,7 +721,7 @@ async def get_module_run(
 
 
 @router.delete("/modules/{module_id}/history/{run_id}")
-async def delete_module_run(
+def delete_module_run(
     module_id: str,
     run_id: int,
     db: Session = Depends(get_db)
@@ -688,7 +760,7 @@ async def delete_module_run(
 
 
 @router.delete("/modules/{module_id}/history")
-async def delete_module_history(
+def delete_module_history(
     module_id: str,
     db: Session = Depends(get_db)
 ):
@@ -718,7 +790,7 @@ async def delete_module_history(
 
 
 @router.put("/modules/{module_id}/config")
-async def update_module_config(
+def update_module_config(
     module_id: str,
     config_update: ModuleConfigUpdate,
     db: Session = Depends(get_db),
@@ -807,7 +879,7 @@ async def update_module_config(
 
 
 @router.delete("/modules/{module_id}/cache")
-async def clear_module_cache(
+def clear_module_cache(
     module_id: str,
     runner: ModuleRunner = Depends(get_module_runner)
 ):
@@ -21,7 +21,7 @@ class SettingUpdate(BaseModel):
 
 
 @router.get("/settings")
-async def get_all_settings() -> Dict[str, Any]:
+def get_all_settings() -> Dict[str, Any]:
     """
     Получает все настройки из БД
 
@@ -45,7 +45,7 @@ async def get_all_settings() -> Dict[str, Any]:
 
 
 @router.get("/settings/{key}")
-async def get_setting(key: str) -> Dict[str, Any]:
+def get_setting(key: str) -> Dict[str, Any]:
     """
     Получает конкретную настройку
 
@@ -87,7 +87,7 @@ async def get_setting(key: str) -> Dict[str, Any]:
 
 
 @router.get("/settings/category/{category}")
-async def get_settings_by_category(category: str) -> Dict[str, Any]:
+def get_settings_by_category(category: str) -> Dict[str, Any]:
     """
     Получает все настройки определенной категории с детальной информацией
 
@@ -182,7 +182,7 @@ def validate_setting_value(key: str, value: Any) -> Any:
 
 
 @router.put("/settings/{key}")
-async def update_setting(key: str, update: SettingUpdate) -> Dict[str, Any]:
+def update_setting(key: str, update: SettingUpdate) -> Dict[str, Any]:
     """
     Обновляет настройку в БД
 
@@ -228,7 +228,7 @@ async def update_setting(key: str, update: SettingUpdate) -> Dict[str, Any]:
 
 
 @router.delete("/settings/{key}")
-async def reset_setting(key: str) -> Dict[str, Any]:
+def reset_setting(key: str) -> Dict[str, Any]:
     """
     Удаляет настройку из БД (fallback на .env или default)
 
@@ -265,7 +265,7 @@ async def reset_setting(key: str) -> Dict[str, Any]:
 
 
 @router.post("/settings/migrate-from-env")
-async def migrate_from_env(keys: List[str] = None) -> Dict[str, Any]:
+def migrate_from_env(keys: List[str] = None) -> Dict[str, Any]:
     """
     Мигрирует настройки из .env в БД
 
@@ -307,7 +307,7 @@ class TelegramAlertsSettings(BaseModel):
 
 
 @router.get("/settings/telegram/alerts")
-async def get_telegram_alerts_settings() -> Dict[str, Any]:
+def get_telegram_alerts_settings() -> Dict[str, Any]:
     """
     Получить настройки уведомлений Telegram для алертов
 
@@ -346,7 +346,7 @@ async def get_telegram_alerts_settings() -> Dict[str, Any]:
 
 
 @router.post("/settings/telegram/alerts")
-async def save_telegram_alerts_settings(
+def save_telegram_alerts_settings(
     data: TelegramAlertsSettings
 ) -> Dict[str, Any]:
     """
@@ -2,13 +2,17 @@
 """
 API endpoints для статистики.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 from datetime import datetime, timedelta
+import asyncio
 from ..dependencies import get_db
-from ..auth import get_current_user
+from ..conditional import conditional_etag, stats_etag
+from ..auth import decode_access_token, get_current_user
+from ..response_cache import cached_response
 from ..schemas import (
     AggregatedStats,
     GroupStatsResponse,
@@ -22,12 +26,21 @@ from storage.database.models import (
     Offer, OfferStatsDaily,
     AffiliateNetwork, NetworkStatsDaily
 )
+from storage.database import get_session_factory
+from storage.database.period_comparison import compare_periods
+from storage.database.write_tracker import MODULES_SCOPE, STATS_SCOPE, get_generation
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
+# WebSocket живого дашборда: Bearer-заголовок браузер не передает, токен приходит первым сообщением
+live_router = APIRouter()
+
+# Сколько ждать первое сообщение (с токеном) живого дашборда, секунд
+LIVE_AUTH_TIMEOUT = 10
+
 # Импортируем вспомогательные функции для работы с периодами
 from .utils import get_date_range_for_period
 
@@ -68,8 +81,9 @@ def validate_period_days(period: str) -> int:
     return days
 
 
-@router.get("/stats/overview", response_model=AggregatedStats)
-async def get_overview_stats(
+@router.get("/stats/overview", response_model=AggregatedStats, dependencies=[Depends(stats_etag)])
+@cached_response("stats/overview")
+def get_overview_stats(
     period: str = Query("7d", description="Период: 1d, 7d, 14d, 30d"),
     db: Session = Depends(get_db)
 ):
@@ -164,8 +178,8 @@ async def get_overview_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats/by-groups", response_model=GroupStatsResponse)
-async def get_stats_by_groups(
+@router.get("/stats/by-groups", response_model=GroupStatsResponse, dependencies=[Depends(stats_etag)])
+def get_stats_by_groups(
     period: str = Query("7d", description="Период: 1d, 7d, 14d, 30d"),
     grouping: str = Query("group_name", description=">;5 3@C??8@>2:8"),
     db: Session = Depends(get_db)
@@ -255,8 +269,8 @@ async def get_stats_by_groups(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats/campaign/{campaign_id}/daily", response_model=DailyStatsResponse)
-async def get_campaign_daily_stats(
+@router.get("/stats/campaign/{campaign_id}/daily", response_model=DailyStatsResponse, dependencies=[Depends(stats_etag)])
+def get_campaign_daily_stats(
     campaign_id: int,
     days: int = Query(7, ge=1, le=90, description=">;8G5AB2> 4=59"),
     db: Session = Depends(get_db)
@@ -315,8 +329,9 @@ async def get_campaign_daily_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats/charts")
-async def get_charts_data(
+@router.get("/stats/charts", dependencies=[Depends(stats_etag)])
+@cached_response("stats/charts")
+def get_charts_data(
     period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
     db: Session = Depends(get_db)
 ):
@@ -423,8 +438,9 @@ async def get_charts_data(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/stats/summary")
-async def get_summary_stats(
+@router.get("/stats/summary", dependencies=[Depends(stats_etag)])
+@cached_response("stats/summary")
+def get_summary_stats(
     period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
     db: Session = Depends(get_db)
 ):
@@ -492,8 +508,9 @@ async def get_summary_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dashboard/summary")
-async def get_dashboard_summary(
+@router.get("/dashboard/summary", dependencies=[Depends(stats_etag)])
+@cached_response("dashboard/summary")
+def get_dashboard_summary(
     period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
     db: Session = Depends(get_db)
 ):
@@ -645,8 +662,9 @@ async def get_dashboard_summary(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dashboard/period-comparison")
-async def get_period_comparison(
+@router.get("/dashboard/period-comparison", dependencies=[Depends(stats_etag)])
+@cached_response("dashboard/period-comparison")
+def get_period_comparison(
     period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
     db: Session = Depends(get_db)
 ):
@@ -671,24 +689,26 @@ async def get_period_comparison(
         previous_to = current_from - timedelta(days=1)
         previous_from = previous_to - timedelta(days=period_length - 1)
 
-        # Функция для получения агрегированных данных за период
-        def get_period_stats(date_from, date_to):
-            stats = db.query(
-                func.sum(CampaignStatsDaily.cost).label('cost'),
-                func.sum(CampaignStatsDaily.revenue).label('revenue'),
-                func.sum(CampaignStatsDaily.clicks).label('clicks'),
-                func.sum(CampaignStatsDaily.leads).label('leads'),
-                func.avg(CampaignStatsDaily.approve).label('approve_rate')
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.date <= date_to
-            ).first()
-
-            cost = float(stats.cost or 0)
-            revenue = float(stats.revenue or 0)
-            clicks = int(stats.clicks or 0)
-            leads = int(stats.leads or 0)
-            approve_rate = float(stats.approve_rate or 0)
+        # Оба периода одним запросом
+        comparison = compare_periods(
+            db,
+            [(current_from, current_to), (previous_from, previous_to)],
+            sums={
+                'cost': CampaignStatsDaily.cost,
+                'revenue': CampaignStatsDaily.revenue,
+                'clicks': CampaignStatsDaily.clicks,
+                'leads': CampaignStatsDaily.leads
+            },
+            averages={'approve_rate': CampaignStatsDaily.approve}
+        )[0]
+
+        # Функция для расчета показателей периода по агрегатам
+        def get_period_stats(stats):
+            cost = float(stats['cost'] or 0)
+            revenue = float(stats['revenue'] or 0)
+            clicks = int(stats['clicks'] or 0)
+            leads = int(stats['leads'] or 0)
+            approve_rate = float(stats['approve_rate'] or 0)
             profit = revenue - cost
             roi = (profit / cost * 100) if cost > 0 else 0
             cr = (leads / clicks * 100) if clicks > 0 else 0
@@ -704,9 +724,8 @@ async def get_period_comparison(
                 'approve_rate': round(approve_rate, 2)
             }
 
-        # Получаем данные за оба периода
-        current_stats = get_period_stats(current_from, current_to)
-        previous_stats = get_period_stats(previous_from, previous_to)
+        current_stats = get_period_stats(comparison['current'])
+        previous_stats = get_period_stats(comparison['previous'])
 
         # Вычисляем изменения (дельты)
         def calculate_delta(current, previous, is_percentage=False):
@@ -793,3 +812,134 @@ async def get_period_comparison(
     except Exception as e:
         logger.error(f"Error fetching period comparison: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _run_widget(handler: Callable, **params) -> Any:
+    """
+    Выполняет обработчик виджета дашборда в собственной сессии (в пуле потоков).
+
+    Args:
+        handler: Синхронный обработчик маршрута
+        params: Параметры запроса обработчика (кроме db)
+    """
+    db = get_session_factory().session_factory()
+    try:
+        result = handler(db=db, **params)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def compute_dashboard_widgets(
+    period: str,
+    sort_by: str = "roi",
+    top_limit: int = 5,
+    alerts_limit: int = 30
+) -> Dict[str, Any]:
+    """
+    Считает виджеты дашборда для одного поколения данных.
+
+    Виджеты считаются параллельно в пуле потоков теми же обработчиками,
+    что и отдельные эндпоинты (и через тот же кэш ответов). Если данные
+    были зафиксированы во время расчета, виджеты пересчитываются один раз,
+    чтобы все они соответствовали одному поколению данных.
+
+    Returns:
+        Dict: generation (область -> поколение), widgets (имя -> данные)
+        и errors (виджет -> ошибка; такого виджета нет в widgets)
+    """
+    from .alerts import get_recent_alerts
+    from .campaigns import get_top_campaigns
+
+    widgets = {
+        'stats': (get_summary_stats, {'period': period}),
+        'summary': (get_dashboard_summary, {'period': period}),
+        'charts': (get_charts_data, {'period': period}),
+        'period_comparison': (get_period_comparison, {'period': period}),
+        'top_campaigns': (get_top_campaigns, {'period': period, 'limit': top_limit, 'sort_by': sort_by}),
+        'recent_alerts': (get_recent_alerts, {'limit': alerts_limit, 'severity_filter': 'all'}),
+    }
+
+    for attempt in range(2):
+        generation = (get_generation(STATS_SCOPE), get_generation(MODULES_SCOPE))
+        results = await asyncio.gather(
+            *(run_in_threadpool(_run_widget, handler, **params) for handler, params in widgets.values()),
+            return_exceptions=True
+        )
+        if generation == (get_generation(STATS_SCOPE), get_generation(MODULES_SCOPE)):
+            break
+        logger.info(f"Dashboard widgets: data changed during computation (attempt {attempt + 1})")
+
+    computed = {
+        'generation': {STATS_SCOPE: generation[0], MODULES_SCOPE: generation[1]},
+        'widgets': {},
+        'errors': {}
+    }
+    for name, result in zip(widgets, results):
+        if isinstance(result, HTTPException):
+            computed['errors'][name] = result.detail
+        elif isinstance(result, Exception):
+            logger.error(f"Dashboard widget '{name}' failed: {result}")
+            computed['errors'][name] = str(result)
+        else:
+            computed['widgets'][name] = result
+
+    return computed
+
+
+@router.get("/dashboard/bundle", dependencies=[Depends(conditional_etag(STATS_SCOPE, MODULES_SCOPE))])
+async def get_dashboard_bundle(
+    period: str = Query("7d", description="Период: 1d, yesterday, 7d, 14d, 30d, this_month, last_month"),
+    sort_by: str = Query("roi", description="Сортировка топ кампаний: roi, revenue, cost, profit, clicks, leads"),
+    top_limit: int = Query(5, ge=1, le=50, description="Количество топ кампаний"),
+    alerts_limit: int = Query(30, ge=1, le=100, description="Количество последних алертов")
+):
+    """
+    Все виджеты дашборда одним запросом (compute_dashboard_widgets).
+
+    Returns:
+        stats, summary, charts, period_comparison, top_campaigns,
+        recent_alerts, module_names (module_id -> название), generation
+        и errors (виджет -> ошибка; остальные виджеты при этом отдаются)
+    """
+    from modules.registry import get_registry
+
+    computed = await compute_dashboard_widgets(period, sort_by, top_limit, alerts_limit)
+    return {
+        'period': period,
+        'generation': computed['generation'],
+        'module_names': {meta.id: meta.name for meta in get_registry().list_modules()},
+        'errors': computed['errors'],
+        **computed['widgets']
+    }
+
+
+@live_router.websocket("/dashboard/live")
+async def dashboard_live(websocket: WebSocket):
+    """
+    Живое обновление дашборда (interfaces.web.live).
+
+    Первое сообщение: {"token", "period", "sort_by", "top_limit", "alerts_limit", "generation"}.
+    Сервер присылает snapshot (все виджеты), если generation клиента устарело,
+    и delta (изменения виджетов) после каждого нового поколения данных.
+    Без валидного токена соединение закрывается с кодом 1008.
+    """
+    from ..live import get_dashboard_hub
+
+    await websocket.accept()
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), timeout=LIVE_AUTH_TIMEOUT)
+    except (asyncio.TimeoutError, ValueError, WebSocketDisconnect):
+        await websocket.close(code=1008)
+        return
+
+    payload = decode_access_token(message.get('token') or '') if isinstance(message, dict) else None
+    if not payload or not payload.get('sub'):
+        await websocket.close(code=1008)
+        return
+
+    await get_dashboard_hub().serve(websocket, message)
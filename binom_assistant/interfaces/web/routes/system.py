@@ -3,9 +3,12 @@
 Системные endpoint'ы для управления приложением
 """
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
-from typing import Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, List, Optional
 from pathlib import Path
+import asyncio
+import json
 import logging
 import os
 import sys
@@ -21,6 +24,9 @@ security_logger = logging.getLogger("security_audit")
 router = APIRouter(dependencies=[Depends(get_current_user)])
 limiter = Limiter(key_func=get_remote_address)
 
+# Интервал keepalive-комментариев в /tasks/stream, секунд
+TASK_STREAM_KEEPALIVE = 15
+
 
 def get_uptime() -> Dict[str, Any]:
     """
@@ -74,7 +80,7 @@ def get_uptime() -> Dict[str, Any]:
 
 
 @router.post("/refresh")
-async def refresh_data(background_tasks: BackgroundTasks) -> Dict[str, Any]:
+def refresh_data(background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     Запускает обновление данных из Binom в фоновом режиме
 
@@ -115,7 +121,7 @@ async def refresh_data(background_tasks: BackgroundTasks) -> Dict[str, Any]:
 
 
 @router.get("/refresh/status")
-async def get_refresh_status() -> Dict[str, Any]:
+def get_refresh_status() -> Dict[str, Any]:
     """
     Получает статус последнего обновления данных
 
@@ -124,6 +130,7 @@ async def get_refresh_status() -> Dict[str, Any]:
     """
     try:
         from storage.database import session_scope, Campaign, CampaignStatsDaily, BackgroundTask
+        from services.scheduler.progress_bus import get_progress_bus
         from sqlalchemy import func
 
         with session_scope() as session:
@@ -150,14 +157,19 @@ async def get_refresh_status() -> Dict[str, Any]:
                 func.count(CampaignStatsDaily.id)
             ).scalar()
 
+            # Прогресс из шины свежее БД (в БД пишется периодически)
+            active_task = None
+            if active_collection_task is not None:
+                active_task = get_progress_bus().get(active_collection_task.id) or active_collection_task.to_dict()
+
             return {
                 "last_campaign_update": last_campaign_update.isoformat() if last_campaign_update else None,
                 "last_stat_update": last_stat_update.isoformat() if last_stat_update else None,
                 "total_campaigns": total_campaigns or 0,
                 "total_stats_records": total_stats or 0,
                 "is_updating": active_collection_task is not None,
-                "update_progress": active_collection_task.progress if active_collection_task else None,
-                "update_message": active_collection_task.progress_message if active_collection_task else None
+                "update_progress": active_task["progress"] if active_task else None,
+                "update_message": active_task["progress_message"] if active_task else None
             }
 
     except Exception as e:
@@ -165,8 +177,38 @@ async def get_refresh_status() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/pipeline")
+def get_pipeline_reports(limit: int = 5) -> Dict[str, Any]:
+    """
+    Отчеты о последних прогонах конвейера после сбора данных
+
+    Таймлайн этапов (stat_periods, weekly_rollup), волн модулей и статусы модулей
+    (success, error, unchanged - входные данные не изменились, not_due - cron еще не сработал).
+
+    Args:
+        limit: Количество последних отчетов
+
+    Returns:
+        Режим оркестрации, признак выполнения и отчеты (новые первыми)
+    """
+    try:
+        from services.scheduler.orchestrator import get_orchestrator, is_event_mode
+
+        orchestrator = get_orchestrator()
+        return {
+            "mode": "event" if is_event_mode() else "cron",
+            "concurrency": orchestrator.concurrency,
+            "is_running": orchestrator.is_running,
+            "reports": orchestrator.get_reports(limit=max(1, min(limit, 20)))
+        }
+
+    except Exception as e:
+        logger.error(f"Error getting pipeline reports: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/health")
-async def get_system_health() -> Dict[str, Any]:
+def get_system_health() -> Dict[str, Any]:
     """
     Комплексная проверка состояния системы для индикатора в UI
 
@@ -353,7 +395,7 @@ async def get_system_health() -> Dict[str, Any]:
 
 
 @router.get("/tasks/active", response_model=None)
-async def get_active_tasks():
+def get_active_tasks():
     """
     Получает список активных фоновых задач (pending или running)
 
@@ -361,9 +403,11 @@ async def get_active_tasks():
         JSONResponse со списком активных задач
     """
     from storage.database import session_scope, BackgroundTask
+    from services.scheduler.progress_bus import get_progress_bus
     import json
 
     logger.info("=== GET /tasks/active called ===")
+    bus = get_progress_bus()
 
     try:
         with session_scope() as session:
@@ -391,6 +435,8 @@ async def get_active_tasks():
                         'started_at': task.started_at.isoformat() if task.started_at else None,
                         'completed_at': task.completed_at.isoformat() if task.completed_at else None,
                     }
+                    # Прогресс из шины свежее БД
+                    task_dict.update(bus.get(task.id) or {})
                     tasks_list.append(task_dict)
                     logger.info(f"Task {task.id} ({task.task_type}) converted successfully")
                 except Exception as e:
@@ -418,8 +464,84 @@ async def get_active_tasks():
         )
 
 
+@router.get("/tasks/stream")
+async def stream_tasks(request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events с прогрессом фоновых задач (вместо опроса /tasks/*)
+
+    Первыми идут события со снимком активных и недавно завершенных задач,
+    затем событие на каждое обновление прогресса из шины. Раз в
+    TASK_STREAM_KEEPALIVE секунд - комментарий keepalive. Поток закрывается
+    через PROGRESS_STREAM_MAX_SECONDS (клиент переподключается), чтобы
+    открытые потоки не задерживали остановку и перезагрузку сервера.
+
+    Событие:
+        id: <sequence>
+        event: task
+        data: <задача в формате /tasks/{task_id}>
+
+    Returns:
+        text/event-stream
+    """
+    from services.scheduler.progress_bus import get_progress_bus
+    from config import get_config
+
+    bus = get_progress_bus()
+    max_seconds = float(get_config().get("progress.stream_max_seconds", 60))
+
+    async def events():
+        queue = bus.subscribe()
+        try:
+            tasks = await run_in_threadpool(_load_stream_snapshot, bus)
+            for task in tasks:
+                yield _format_sse(task)
+
+            deadline = asyncio.get_running_loop().time() + max_seconds
+            while not await request.is_disconnected():
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(TASK_STREAM_KEEPALIVE, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format_sse(event['task'], event['sequence'])
+        finally:
+            bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _load_stream_snapshot(bus) -> List[Dict[str, Any]]:
+    """
+    Снимок для нового подписчика: активные задачи из БД (с прогрессом из шины)
+    и задачи шины, завершенные за последние 10 минут.
+    """
+    from storage.database import session_scope, BackgroundTask
+
+    tasks = {task['id']: task for task in bus.get_tasks(since_seconds=600)}
+    with session_scope() as session:
+        for task in session.query(BackgroundTask).filter(
+            BackgroundTask.status.in_(['pending', 'running'])
+        ).all():
+            tasks.setdefault(task.id, task.to_dict())
+    return sorted(tasks.values(), key=lambda task: task['id'])
+
+
+def _format_sse(task: Dict[str, Any], sequence: Optional[int] = None) -> str:
+    """Событие task в формате text/event-stream"""
+    lines = [f"id: {sequence}"] if sequence is not None else []
+    lines += ["event: task", f"data: {json.dumps(task, ensure_ascii=False, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
 @router.get("/tasks/{task_id}")
-async def get_task_status(task_id: int) -> Dict[str, Any]:
+def get_task_status(task_id: int) -> Dict[str, Any]:
     """
     Получает статус фоновой задачи
 
@@ -431,6 +553,12 @@ async def get_task_status(task_id: int) -> Dict[str, Any]:
     """
     try:
         from storage.database import session_scope, BackgroundTask
+        from services.scheduler.progress_bus import get_progress_bus
+
+        # Задача в шине - без запроса к БД
+        task = get_progress_bus().get(task_id)
+        if task is not None:
+            return task
 
         with session_scope() as session:
             task = session.query(BackgroundTask).filter_by(id=task_id).first()
@@ -448,7 +576,7 @@ async def get_task_status(task_id: int) -> Dict[str, Any]:
 
 
 @router.get("/config")
-async def get_app_config() -> Dict[str, Any]:
+def get_app_config() -> Dict[str, Any]:
     """
     Получает конфигурацию приложения для frontend.
 
@@ -486,7 +614,7 @@ async def get_app_config() -> Dict[str, Any]:
 
 @router.delete("/cache")
 @limiter.limit("10/minute")  # Максимум 10 очисток кэша в минуту
-async def clear_cache(request: Request) -> Dict[str, Any]:
+def clear_cache(request: Request) -> Dict[str, Any]:
     """
     Очищает кэш системы (не удаляя настройки)
 
@@ -496,10 +624,13 @@ async def clear_cache(request: Request) -> Dict[str, Any]:
     try:
         from services.settings_manager import get_settings_manager
 
+        from interfaces.web.response_cache import get_response_cache
+
         settings = get_settings_manager()
         settings.clear_cache()
+        responses = get_response_cache().clear()
 
-        logger.info("System cache cleared successfully")
+        logger.info(f"System cache cleared successfully ({responses} cached responses)")
 
         return {
             "status": "ok",
@@ -511,8 +642,36 @@ async def clear_cache(request: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/response-cache")
+def get_response_cache_stats() -> Dict[str, Any]:
+    """
+    Метрики кэша ответов статистики и дашборда
+
+    Returns:
+        Количество ответов, поколение данных, hits / misses / coalesced
+        и hit_ratio - всего и по маршрутам
+    """
+    from interfaces.web.response_cache import get_response_cache
+
+    return get_response_cache().get_stats()
+
+
+@router.get("/dashboard-live")
+def get_dashboard_live_stats() -> Dict[str, Any]:
+    """
+    Метрики живого дашборда (WebSocket /dashboard/live)
+
+    Returns:
+        Клиенты и подписки, последнее разосланное поколение данных,
+        число поколений, расчетов снимков, сообщений и отправленных байт
+    """
+    from interfaces.web.live import get_dashboard_hub
+
+    return get_dashboard_hub().get_stats()
+
+
 @router.post("/data/reset-and-rebuild")
-async def reset_and_rebuild_data(background_tasks: BackgroundTasks) -> Dict[str, Any]:
+def reset_and_rebuild_data(background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     ПОЛНАЯ ОЧИСТКА всех данных из Binom и повторный сбор за 60 дней.
 
@@ -556,7 +715,7 @@ async def reset_and_rebuild_data(background_tasks: BackgroundTasks) -> Dict[str,
 
 
 @router.post("/settings/reset")
-async def reset_all_settings() -> Dict[str, Any]:
+def reset_all_settings() -> Dict[str, Any]:
     """
     Сбрасывает все настройки к значениям по умолчанию
     ВНИМАНИЕ: Удаляет все настройки из БД!
@@ -595,7 +754,7 @@ async def reset_all_settings() -> Dict[str, Any]:
 
 @router.post("/restart")
 @limiter.limit("5/hour")  # Максимум 5 перезапусков в час
-async def restart_application(request: Request, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+def restart_application(request: Request, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     Перезапускает приложение для применения изменений из .env
     ВНИМАНИЕ: Приложение будет недоступно несколько секунд!
@@ -624,10 +783,13 @@ async def restart_application(request: Request, background_tasks: BackgroundTask
 
 
 @router.get("/logs")
-async def get_logs(level: str = None, limit: int = 100) -> Dict[str, Any]:
+def get_logs(level: str = None, limit: int = 100) -> Dict[str, Any]:
     """
     Получает последние записи из всех лог-файлов
 
+    Файлы читаются с конца блоками до limit подходящих строк;
+    WARNING/ERROR/CRITICAL ищутся по индексу ошибок (utils.log_index).
+
     Args:
         level: Фильтр по уровню (INFO, WARNING, ERROR, DEBUG)
         limit: Максимальное количество записей (по умолчанию 100)
@@ -636,68 +798,25 @@ async def get_logs(level: str = None, limit: int = 100) -> Dict[str, Any]:
         Список последних лог-записей из всех файлов
     """
     try:
-        from pathlib import Path
-        import re
-        import os
-
-        # Пути к лог-файлам
-        # На VPS: /app/binom_assistant/ (рабочая директория) -> /app/logs/ (логи на уровень выше)
-        # На локалке: c:/Work/code/binom/binom_assistant/ -> c:/Work/code/binom/logs/
-        log_dir = Path(__file__).parent.parent.parent.parent / "logs"
-        log_files = [
-            log_dir / "app.log",
-            log_dir / "collector.log",
-            log_dir / "stat_periods.log"
-        ]
+        from utils.log_reader import INDEXED_LEVELS, detect_level, find_log_lines, get_log_files, parse_log_line, tail_lines
 
         all_logs = []
 
         # Читаем каждый лог-файл
-        for log_file in log_files:
-            if not log_file.exists():
-                continue
-
+        for log_file in get_log_files():
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-
-                # Берем последние строки (умножаем на количество файлов)
-                recent_lines = lines[-limit*2:] if len(lines) > limit*2 else lines
+                if level in INDEXED_LEVELS:
+                    lines = find_log_lines(log_file, limit, levels=(level,))
+                else:
+                    lines = tail_lines(log_file, limit, lambda line: not level or detect_level(line) == level)
 
-                # Парсим лог-записи
-                for line in recent_lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Пытаемся извлечь timestamp для сортировки
-                    # Формат: 2025-11-05 15:04:06 - ...
-                    timestamp_match = re.match(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                    timestamp = timestamp_match.group(1) if timestamp_match else None
-
-                    # Определяем уровень
-                    log_level = "INFO"  # дефолт
-                    if " - ERROR - " in line or ":ERROR:" in line:
-                        log_level = "ERROR"
-                    elif " - WARNING - " in line or ":WARNING:" in line:
-                        log_level = "WARNING"
-                    elif " - DEBUG - " in line or ":DEBUG:" in line:
-                        log_level = "DEBUG"
-                    elif " - CRITICAL - " in line or ":CRITICAL:" in line:
-                        log_level = "CRITICAL"
-
-                    # Фильтруем по уровню если указан
-                    if level and log_level != level:
-                        continue
-
-                    log_entry = {
-                        "message": line,
-                        "level": log_level,
+                for line in lines:
+                    all_logs.append({
+                        "message": line.strip(),
+                        "level": detect_level(line),
                         "source": log_file.name,
-                        "timestamp": timestamp
-                    }
-
-                    all_logs.append(log_entry)
+                        "timestamp": parse_log_line(line)["timestamp"]
+                    })
 
             except Exception as e:
                 logger.error(f"Error reading {log_file}: {e}")
@@ -727,11 +846,53 @@ async def get_logs(level: str = None, limit: int = 100) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/logs/download")
+def download_logs(file: str = "app.log", include_rotated: bool = False) -> StreamingResponse:
+    """
+    Скачивает лог-файл целиком (потоком, без загрузки в память)
+
+    Args:
+        file: Имя лог-файла (app.log, collector.log, stat_periods.log)
+        include_rotated: Добавить ротированные файлы (file.5 ... file.1) перед текущим
+
+    Returns:
+        Содержимое лог-файла
+    """
+    from utils.log_reader import LOG_DIR, LOG_FILES, iter_log_bytes
+
+    if file not in LOG_FILES:
+        raise HTTPException(status_code=400, detail="Недопустимое имя файла")
+
+    log_file = LOG_DIR / file
+    if not log_file.exists():
+        raise HTTPException(status_code=404, detail="Лог-файл не найден")
+
+    paths = [log_file]
+    if include_rotated:
+        rotated = sorted(
+            (path for path in LOG_DIR.glob(f"{file}.*") if path.suffix[1:].isdigit()),
+            key=lambda path: int(path.suffix[1:]),
+            reverse=True
+        )
+        paths = rotated + paths
+
+    logger.info(f"Downloading log: {file} ({len(paths)} file(s))")
+
+    return StreamingResponse(
+        iter_log_bytes(paths),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{file}"'}
+    )
+
+
 @router.get("/log-errors")
-async def get_log_errors(hours: int = 24, limit: int = 50) -> Dict[str, Any]:
+def get_log_errors(hours: int = 24, limit: int = 50) -> Dict[str, Any]:
     """
     Получает ERROR и WARNING из всех лог-файлов за указанный период
 
+    Строки читаются по индексу ошибок (utils.log_index) - без чтения
+    всего файла.
+
     Args:
         hours: Период в часах (по умолчанию 24)
         limit: Максимальное количество ошибок (по умолчанию 50)
@@ -740,85 +901,31 @@ async def get_log_errors(hours: int = 24, limit: int = 50) -> Dict[str, Any]:
         Список ошибок с метаданными для системы уведомлений
     """
     try:
-        from pathlib import Path
-        import re
-        from datetime import datetime, timedelta
-
-        # Пути к лог-файлам
-        # На VPS: /app/binom_assistant/ (рабочая директория) -> /app/logs/ (логи на уровень выше)
-        # На локалке: c:/Work/code/binom/binom_assistant/ -> c:/Work/code/binom/logs/
-        log_dir = Path(__file__).parent.parent.parent.parent / "logs"
-        log_files = [
-            log_dir / "app.log",
-            log_dir / "collector.log",
-            log_dir / "stat_periods.log"
-        ]
+        from utils.log_reader import find_log_lines, get_log_files, parse_log_line
 
         cutoff_time = datetime.now() - timedelta(hours=hours)
         all_errors = []
 
         # Читаем каждый лог-файл
-        for log_file in log_files:
-            if not log_file.exists():
-                continue
-
+        for log_file in get_log_files():
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-
-                # Берем последние строки (для производительности)
-                recent_lines = lines[-limit*10:] if len(lines) > limit*10 else lines
-
-                # Парсим ERROR и WARNING
-                for line in recent_lines:
+                for line in find_log_lines(log_file, limit, since=cutoff_time):
                     line = line.strip()
-                    if not line:
-                        continue
-
-                    # Проверяем уровень
-                    is_error = " - ERROR - " in line or " - CRITICAL - " in line
-                    is_warning = " - WARNING - " in line
-
-                    if not (is_error or is_warning):
-                        continue
-
-                    # Извлекаем timestamp
-                    # Формат: 2025-11-05 15:04:06 - ...
-                    timestamp_match = re.match(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', line)
-                    if not timestamp_match:
-                        continue
-
-                    timestamp_str = timestamp_match.group(1)
-                    try:
-                        log_time = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                    except ValueError:
-                        continue
-
-                    # Фильтруем по времени
-                    if log_time < cutoff_time:
-                        continue
-
-                    # Извлекаем компонент и сообщение
-                    # Формат: 2025-11-05 15:04:06 - component.name - LEVEL - message
-                    parts = line.split(" - ", 3)
-                    component = parts[1] if len(parts) > 1 else "unknown"
-                    level = parts[2] if len(parts) > 2 else "ERROR"
-                    message = parts[3] if len(parts) > 3 else line
+                    entry = parse_log_line(line)
+                    level = entry["level"]
 
                     # Определяем severity для системы уведомлений
                     severity = "critical" if "CRITICAL" in level else ("high" if "ERROR" in level else "medium")
 
-                    error_entry = {
-                        "timestamp": timestamp_str,
-                        "level": level.strip(),
+                    all_errors.append({
+                        "timestamp": entry["timestamp"],
+                        "level": level,
                         "severity": severity,
                         "source": log_file.name,
-                        "component": component,
-                        "message": message[:200],  # Ограничиваем длину сообщения
+                        "component": entry["component"],
+                        "message": entry["message"][:200],  # Ограничиваем длину сообщения
                         "full_line": line[:500]  # Полная строка (ограниченная)
-                    }
-
-                    all_errors.append(error_entry)
+                    })
 
             except Exception as e:
                 logger.error(f"Error reading {log_file} for errors: {e}")
@@ -860,7 +967,7 @@ async def get_log_errors(hours: int = 24, limit: int = 50) -> Dict[str, Any]:
 
 @router.delete("/logs")
 @limiter.limit("5/hour")  # Максимум 5 очисток логов в час
-async def clear_logs(request: Request) -> Dict[str, Any]:
+def clear_logs(request: Request) -> Dict[str, Any]:
     """
     Очищает лог-файл (архивирует текущий и создает новый)
 
@@ -870,6 +977,7 @@ async def clear_logs(request: Request) -> Dict[str, Any]:
     try:
         from pathlib import Path
         import shutil
+        from utils.log_index import index_path, reset_error_index
 
         client_ip = request.client.host if request.client else "unknown"
         security_logger.warning(f"LOGS_CLEAR_REQUESTED | IP: {client_ip} | timestamp: {datetime.now().isoformat()}")
@@ -912,6 +1020,9 @@ async def clear_logs(request: Request) -> Dict[str, Any]:
                 # Очищаем текущий лог-файл
                 with open(log_file, 'w', encoding='utf-8') as f:
                     f.write(f"# Log file cleared at {datetime.now().isoformat()}\n")
+                # Индекс ошибок (если файл пишет ErrorIndexFileHandler) начинается заново
+                if index_path(log_file).exists():
+                    reset_error_index(log_file)
 
                 cleared_count += 1
                 logger.info(f"Cleared {log_file.name} and archived to {archive_name}")
@@ -979,6 +1090,22 @@ def perform_restart():
         logger.error(f"Error during restart: {e}", exc_info=True)
 
 
+def _notify_collection_completed(source: str):
+    """
+    Запускает обработку после сбора (периоды, недели, волны модулей) в event режиме
+
+    Args:
+        source: Источник сбора для отчета оркестратора
+    """
+    try:
+        from services.scheduler.orchestrator import get_orchestrator, is_event_mode
+
+        if is_event_mode():
+            get_orchestrator().notify_collection_completed(source=source)
+    except Exception as e:
+        logger.error(f"Failed to start post-collection pipeline: {e}", exc_info=True)
+
+
 def run_collector(task_id: int):
     """
     Фоновая задача для запуска collector
@@ -995,6 +1122,8 @@ def run_collector(task_id: int):
 
         logger.info(f"Background collection completed (task_id={task_id}): {stats.get('campaigns_processed', 0)} campaigns")
 
+        _notify_collection_completed('manual')
+
     except Exception as e:
         logger.error(f"Background collection failed (task_id={task_id}): {e}", exc_info=True)
 
@@ -1006,19 +1135,16 @@ def run_stats_rebuild(task_id: int):
     Args:
         task_id: ID задачи для отслеживания прогресса
     """
+    from services.scheduler.progress_bus import get_progress_bus
+
+    bus = get_progress_bus()
     try:
         from services.scheduler.collector import DataCollector
-        from storage.database import session_scope, BackgroundTask
 
         logger.info(f"Starting stats rebuild (task_id={task_id})...")
 
         # Обновляем статус задачи
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.status = 'running'
-                task.progress_message = 'Пересборка статистики за последние 30 дней'
-                session.commit()
+        bus.update(task_id, status='running', message='Пересборка статистики за последние 30 дней')
 
         # Запускаем сборщик с периодом 30 дней
         collector = DataCollector()
@@ -1037,29 +1163,22 @@ def run_stats_rebuild(task_id: int):
 
         logger.info(f"Stats rebuild completed (task_id={task_id}): {stats.get('campaigns_processed', 0)} campaigns")
 
+        _notify_collection_completed('rebuild')
+
         # Обновляем статус задачи на завершенную
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.status = 'completed'
-                task.progress = 100
-                task.progress_message = f"Пересборка завершена: {stats.get('campaigns_processed', 0)} кампаний"
-                task.result = stats
-                session.commit()
+        bus.update(
+            task_id,
+            status='completed',
+            progress=100,
+            message=f"Пересборка завершена: {stats.get('campaigns_processed', 0)} кампаний",
+            result=stats
+        )
 
     except Exception as e:
         logger.error(f"Stats rebuild failed (task_id={task_id}): {e}", exc_info=True)
 
         # Обновляем статус задачи на ошибку
-        try:
-            with session_scope() as session:
-                task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                if task:
-                    task.status = 'failed'
-                    task.error_message = str(e)
-                    session.commit()
-        except:
-            pass
+        bus.update(task_id, status='failed', error=str(e))
 
 
 def run_full_reset_and_rebuild(task_id: int):
@@ -1074,10 +1193,13 @@ def run_full_reset_and_rebuild(task_id: int):
     Args:
         task_id: ID задачи для отслеживания прогресса
     """
+    from services.scheduler.progress_bus import get_progress_bus
+
+    bus = get_progress_bus()
     try:
         from services.scheduler.collector import DataCollector
         from storage.database import (
-            session_scope, BackgroundTask,
+            session_scope,
             Campaign, CampaignStatsDaily, StatPeriod, NameChange,
             TrafficSource, TrafficSourceStatsDaily,
             Offer, OfferStatsDaily,
@@ -1088,14 +1210,7 @@ def run_full_reset_and_rebuild(task_id: int):
         logger.warning(f"Starting FULL DATA RESET (task_id={task_id})...")
 
         # Обновляем статус задачи
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.status = 'running'
-                task.started_at = datetime.utcnow()
-                task.progress = 5
-                task.progress_message = 'Очистка всех данных из БД...'
-                session.commit()
+        bus.update(task_id, status='running', progress=5, message='Очистка всех данных из БД...')
 
         # ШАГ 1: Очищаем все таблицы с данными Binom
         logger.info("Step 1: Clearing all Binom data tables...")
@@ -1119,12 +1234,7 @@ def run_full_reset_and_rebuild(task_id: int):
             logger.info("All Binom data tables cleared successfully")
 
         # Обновляем прогресс
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.progress = 10
-                task.progress_message = 'Данные очищены, подготовка к сбору...'
-                session.commit()
+        bus.update(task_id, progress=10, message='Данные очищены, подготовка к сбору...')
 
         # ШАГ 2: Сбрасываем флаг first_run (чтобы не запускалась автоматическая initial_collection)
         logger.info("Step 2: Resetting first_run flag...")
@@ -1134,12 +1244,7 @@ def run_full_reset_and_rebuild(task_id: int):
 
         # ШАГ 3: Запускаем сбор данных за 60 дней
         logger.info("Step 3: Starting data collection for 60 days...")
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.progress = 15
-                task.progress_message = 'Запуск сбора данных за 60 дней (fast mode)...'
-                session.commit()
+        bus.update(task_id, progress=15, message='Запуск сбора данных за 60 дней (fast mode)...')
 
         # Создаем collector с отключением пауз для быстрого сбора
         collector = DataCollector(skip_pauses=True)
@@ -1151,31 +1256,19 @@ def run_full_reset_and_rebuild(task_id: int):
         logger.info("=" * 60)
 
         # Обновляем статус задачи на успешную
-        with session_scope() as session:
-            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-            if task:
-                task.status = 'completed'
-                task.progress = 100
-                task.progress_message = 'Полная очистка и сбор данных завершены'
-                task.completed_at = datetime.utcnow()
-                task.result = result
-                session.commit()
+        bus.update(
+            task_id,
+            status='completed',
+            progress=100,
+            message='Полная очистка и сбор данных завершены',
+            result=result
+        )
 
     except Exception as e:
         logger.error(f"Full reset and rebuild failed (task_id={task_id}): {e}", exc_info=True)
 
         # Обновляем статус задачи на ошибку
-        try:
-            with session_scope() as session:
-                task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                if task:
-                    task.status = 'failed'
-                    task.progress_message = 'Ошибка при очистке и сборе данных'
-                    task.error = str(e)
-                    task.completed_at = datetime.utcnow()
-                    session.commit()
-        except Exception as db_error:
-            logger.error(f"Failed to update task status: {db_error}")
+        bus.update(task_id, status='failed', message='Ошибка при очистке и сборе данных', error=str(e))
 
 
 # ============================================================================
@@ -1199,7 +1292,7 @@ def get_backup_dir() -> Path:
 
 @router.post("/backup/create")
 @limiter.limit("10/hour")  # Максимум 10 бэкапов в час
-async def create_backup(request: Request) -> Dict[str, Any]:
+def create_backup(request: Request) -> Dict[str, Any]:
     """
     Создает бэкап базы данных через вызов backup.sh скрипта (на Linux/Docker)
     или напрямую копированием файла (на Windows для dev режима)
@@ -1318,7 +1411,7 @@ async def create_backup(request: Request) -> Dict[str, Any]:
 
 
 @router.get("/backup/list")
-async def list_backups() -> Dict[str, Any]:
+def list_backups() -> Dict[str, Any]:
     """
     Получает список всех доступных бэкапов
 
@@ -1380,7 +1473,7 @@ async def list_backups() -> Dict[str, Any]:
 
 
 @router.get("/backup/download/{filename}")
-async def download_backup(filename: str) -> Any:
+def download_backup(filename: str) -> Any:
     """
     Скачивает конкретный файл бэкапа
 
@@ -1426,7 +1519,7 @@ async def download_backup(filename: str) -> Any:
 
 @router.delete("/backup/old")
 @limiter.limit("10/hour")  # Максимум 10 очисток в час
-async def delete_old_backups(request: Request, keep: int = 7) -> Dict[str, Any]:
+def delete_old_backups(request: Request, keep: int = 7) -> Dict[str, Any]:
     """
     Удаляет старые бэкапы, оставляя последние N штук
 
@@ -1494,7 +1587,7 @@ async def delete_old_backups(request: Request, keep: int = 7) -> Dict[str, Any]:
 
 @router.delete("/backup/{filename}")
 @limiter.limit("20/hour")  # Максимум 20 удалений в час
-async def delete_backup(request: Request, filename: str) -> Dict[str, Any]:
+def delete_backup(request: Request, filename: str) -> Dict[str, Any]:
     """
     Удаляет конкретный файл бэкапа
 
@@ -1584,7 +1677,7 @@ def get_current_version() -> str:
 
 
 @router.get("/update/status")
-async def get_update_status() -> Dict[str, Any]:
+def get_update_status() -> Dict[str, Any]:
     """
     Получает информацию о текущей версии и статусе git репозитория
 
@@ -1826,7 +1919,7 @@ async def check_updates(request: Request) -> Dict[str, Any]:
 
 @router.post("/update/pull")
 @limiter.limit("10/hour")  # Максимум 10 обновлений в час
-async def pull_updates(request: Request, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+def pull_updates(request: Request, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     Выполняет git pull и анализирует изменения
 
@@ -0,0 +1,112 @@
+"""
+Тест списков кампаний API (/campaigns/search/{query}, /campaigns/by-group/{group_name})
+
+Проверяет:
+- поиск по пути находит кампании через FTS индекс (подстрока, кириллица)
+- короткий запрос ищется через LIKE
+- список группы содержит только кампании группы
+
+Приложение собирается только из роутера кампаний: БД - in-memory SQLite,
+авторизация и ETag отключены через dependency_overrides.
+
+Использование:
+    python binom_assistant/interfaces/web/routes/test_campaigns.py
+    pytest binom_assistant/interfaces/web/routes/test_campaigns.py
+"""
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+# interfaces.web импортирует приложение, которому нужна обязательная конфигурация
+os.environ.setdefault("BINOM_URL", "http://binom.test/index.php")
+os.environ.setdefault("BINOM_API_KEY", "test")
+
+from storage.database.base import Base
+from storage.database.models import Campaign
+from storage.database.campaign_search import ensure_search_index
+from interfaces.web.auth import get_current_user
+from interfaces.web.conditional import stats_etag
+from interfaces.web.dependencies import get_db
+from interfaces.web.routes import campaigns
+
+NOW = datetime(2024, 5, 20)
+
+
+def _client(rows) -> TestClient:
+    """Клиент приложения с роутером кампаний и кампаниями (binom_id, name, group)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add_all([
+            Campaign(binom_id=binom_id, current_name=name, group_name=group, first_seen=NOW, last_seen=NOW)
+            for binom_id, name, group in rows
+        ])
+        session.commit()
+    assert ensure_search_index(engine)
+
+    def _db():
+        with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(campaigns.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_current_user] = lambda: "test"
+    app.dependency_overrides[stats_etag] = lambda: None
+    return TestClient(app)
+
+
+ROWS = [
+    (1, "Nutra Keto RU", "Nutra"),
+    (2, "Крипта Бот", "Finance"),
+    (3, "Keto Max", "Nutra"),
+    (4, "Gambling X", "Casino"),
+]
+
+
+def _names(response):
+    assert response.status_code == 200, response.text
+    return [c["current_name"] for c in response.json()["campaigns"]]
+
+
+def test_search_by_path():
+    """Поиск по пути: FTS для длинного запроса, LIKE для короткого"""
+    client = _client(ROWS)
+
+    response = client.get("/api/v1/campaigns/search/keto")
+    assert _names(response) == ["Nutra Keto RU", "Keto Max"]
+    assert response.json()["total"] == 2
+
+    assert _names(client.get("/api/v1/campaigns/search/КРИПТ")) == ["Крипта Бот"]
+    assert _names(client.get("/api/v1/campaigns/search/x")) == ["Keto Max", "Gambling X"]
+    assert _names(client.get("/api/v1/campaigns/search/nothing")) == []
+
+
+def test_campaigns_by_group():
+    """Список группы с пагинацией"""
+    client = _client(ROWS)
+
+    assert _names(client.get("/api/v1/campaigns/by-group/Nutra")) == ["Nutra Keto RU", "Keto Max"]
+
+    response = client.get("/api/v1/campaigns/by-group/Nutra?page=2&page_size=1")
+    assert _names(response) == ["Keto Max"]
+    assert response.json()["pages"] == 2
+
+
+if __name__ == "__main__":
+    test_search_by_path()
+    test_campaigns_by_group()
+    print("OK")
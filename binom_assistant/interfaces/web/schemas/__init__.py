@@ -7,6 +7,8 @@ from .campaign import (
     CampaignResponse,
     CampaignListResponse,
     CampaignDetailResponse,
+    CampaignSearchResult,
+    CampaignSearchResponse,
     CampaignFilter
 )
 from .stats import (
@@ -39,7 +41,8 @@ from .module import (
 __all__ = [
     # Campaigns
     "CampaignBase", "CampaignStats", "CampaignResponse",
-    "CampaignListResponse", "CampaignDetailResponse", "CampaignFilter",
+    "CampaignListResponse", "CampaignDetailResponse", "CampaignSearchResult",
+    "CampaignSearchResponse", "CampaignFilter",
     # Stats
     "AggregatedStats", "GroupStats", "GroupStatsResponse",
     "DailyStats", "DailyStatsResponse", "PeriodStats", "ComparisonResponse",
@@ -45,10 +45,28 @@ class CampaignResponse(CampaignBase, CampaignStats):
 class CampaignListResponse(BaseModel):
     """!?8A>: :0<?0=89 A ?038=0F859"""
     campaigns: List[CampaignResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # только для запроса без cursor
+    page: Optional[int] = None
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # None - страниц больше нет
+
+
+class CampaignSearchResult(CampaignBase):
+    """Кампания в результатах поиска"""
+    score: float = 0.0
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
+class CampaignSearchResponse(BaseModel):
+    """Результаты поиска кампаний по релевантности"""
+    query: str
+    results: List[CampaignSearchResult]
+    total: int
+    engine: str  # fts5 - полнотекстовый индекс, like - перебор таблицы
 
 
 class CampaignDetailResponse(CampaignResponse):
@@ -63,6 +63,7 @@ class ModuleResultResponse(BaseModel):
     alerts: List[Dict[str, Any]]
     error: Optional[str] = None
     params: Optional[Dict[str, Any]] = None
+    materialized: bool = True
 
 
 class ModuleRunHistoryItem(BaseModel):
@@ -81,7 +82,8 @@ class ModuleRunHistoryItem(BaseModel):
 class ModuleRunHistoryResponse(BaseModel):
     """История запусков модуля"""
     runs: List[ModuleRunHistoryItem]
-    total: int
+    total: Optional[int] = None  # только для первой страницы
+    next_cursor: Optional[str] = None  # None - записей больше нет
 
 
 class ModuleConfigUpdate(BaseModel):
@@ -98,3 +100,30 @@ class ModuleRunRequest(BaseModel):
     """Запрос на запуск модуля"""
     use_cache: bool = Field(default=True, description="Использовать кэш")
     params: Optional[Dict[str, Any]] = Field(default=None, description="Параметры запуска")
+
+
+class ModuleSweepRequest(BaseModel):
+    """Запрос на перебор параметров модуля"""
+    params_sets: List[Dict[str, Any]] = Field(..., description="Наборы параметров для сравнения")
+    include_data: bool = Field(default=False, description="Включить полные данные каждого набора")
+
+
+class ModuleSweepRow(BaseModel):
+    """Строка таблицы сравнения перебора"""
+    index: int
+    params: Dict[str, Any]
+    status: str
+    execution_time_ms: Optional[float] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+
+class ModuleSweepResponse(BaseModel):
+    """Результат перебора параметров модуля"""
+    module_id: str
+    shared_fetch: bool
+    fetch_ms: float
+    total_ms: float
+    varying_params: List[str]
+    rows: List[ModuleSweepRow]
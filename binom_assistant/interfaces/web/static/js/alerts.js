@@ -6,6 +6,11 @@
 let moduleNamesCache = {};
 let allModules = [];
 
+// Pagination: loaded alerts, cursor of the next page and filters it belongs to
+let loadedAlerts = [];
+let alertsCursor = null;
+let alertsQueryParams = '';
+
 document.addEventListener('DOMContentLoaded', async () => {
     // Load module names first and wait for completion
     await loadModuleNames();
@@ -100,21 +105,10 @@ async function loadAlerts() {
         // Update statistics
         updateAlertStats(response);
 
-        // Display alerts (filter out hidden)
-        const alerts = response.alerts || [];
-        const hiddenAlerts = getHiddenAlerts();
-        const visibleAlerts = alerts.filter(alert => !hiddenAlerts.includes(alert.run_id));
-
-        if (visibleAlerts.length === 0) {
-            alertsList.innerHTML = `
-                <div style="text-align: center; padding: 40px; color: var(--text-secondary);">
-                    <p>Нет алертов для отображения</p>
-                    <p style="font-size: 14px;">Все модули работают нормально</p>
-                </div>
-            `;
-        } else {
-            alertsList.innerHTML = visibleAlerts.map(alert => renderAlert(alert)).join('');
-        }
+        loadedAlerts = response.alerts || [];
+        alertsCursor = response.next_cursor || null;
+        alertsQueryParams = queryParams;
+        renderAlertsList();
 
     } catch (error) {
         console.error('Failed to load alerts:', error);
@@ -127,6 +121,57 @@ async function loadAlerts() {
     }
 }
 
+/**
+ * Load the next page of alerts (same filters, continues from the cursor)
+ */
+async function loadMoreAlerts() {
+    if (!alertsCursor) return;
+
+    try {
+        const response = await api.get(`/alerts?${alertsQueryParams}&cursor=${encodeURIComponent(alertsCursor)}`);
+        loadedAlerts = loadedAlerts.concat(response.alerts || []);
+        alertsCursor = response.next_cursor || null;
+
+        // Statistics cover all loaded pages
+        updateAlertStats({
+            critical_count: loadedAlerts.filter(a => a.severity === 'critical').length,
+            high_count: loadedAlerts.filter(a => a.severity === 'high').length,
+            medium_count: loadedAlerts.filter(a => a.severity === 'medium').length
+        });
+        renderAlertsList();
+    } catch (error) {
+        console.error('Failed to load more alerts:', error);
+    }
+}
+
+/**
+ * Display loaded alerts (hidden ones filtered out) and the "show more" button
+ */
+function renderAlertsList() {
+    const alertsList = document.getElementById('alertsList');
+    const hiddenAlerts = getHiddenAlerts();
+    const visibleAlerts = loadedAlerts.filter(alert => !hiddenAlerts.includes(alert.run_id));
+
+    if (visibleAlerts.length === 0 && !alertsCursor) {
+        alertsList.innerHTML = `
+            <div style="text-align: center; padding: 40px; color: var(--text-secondary);">
+                <p>Нет алертов для отображения</p>
+                <p style="font-size: 14px;">Все модули работают нормально</p>
+            </div>
+        `;
+        return;
+    }
+
+    alertsList.innerHTML = visibleAlerts.map(alert => renderAlert(alert)).join('');
+    if (alertsCursor) {
+        alertsList.innerHTML += `
+            <div style="text-align: center; padding: 16px;">
+                <button class="btn-secondary" onclick="loadMoreAlerts()">Показать еще</button>
+            </div>
+        `;
+    }
+}
+
 /**
  * Format module ID to readable name
  * @param {string} moduleId
@@ -369,12 +414,7 @@ function hideAlert(runId) {
                 // Check if no alerts left
                 const alertsList = document.getElementById('alertsList');
                 if (!alertsList.querySelector('.alert-item')) {
-                    alertsList.innerHTML = `
-                        <div style="text-align: center; padding: 40px; color: var(--text-secondary);">
-                            <p>Нет алертов для отображения</p>
-                            <p style="font-size: 14px;">Все модули работают нормально</p>
-                        </div>
-                    `;
+                    renderAlertsList();
                 }
             }, 300);
         }
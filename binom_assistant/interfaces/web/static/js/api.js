@@ -229,6 +229,72 @@ const api = {
             console.error('API DELETE Error:', error);
             throw error;
         }
+    },
+
+    /**
+     * Поток Server-Sent Events.
+     * fetch вместо EventSource: EventSource не передает заголовок Authorization.
+     * При закрытии потока сервером переподключается сразу, при ошибке - через retryMs.
+     * @param {string} endpoint - путь к endpoint
+     * @param {function} onEvent - обработчик (eventName, data)
+     * @param {number} retryMs - пауза перед переподключением после ошибки
+     */
+    stream(endpoint, onEvent, retryMs = 5000) {
+        const connect = async () => {
+            let delay = 100;
+            try {
+                const response = await fetch(`${API_BASE}${endpoint}`, {
+                    headers: this.getAuthHeaders()
+                });
+
+                if (response.status === 401 || response.status === 403) {
+                    return; // Без токена не переподключаемся, редирект делают обычные запросы
+                }
+                if (!response.ok || !response.body) {
+                    throw new Error(`Stream error: ${response.status}`);
+                }
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+
+                    buffer += decoder.decode(value, { stream: true });
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                        const block = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+
+                        let eventName = 'message';
+                        const dataLines = [];
+                        block.split('\n').forEach(line => {
+                            if (line.startsWith('event:')) {
+                                eventName = line.slice(6).trim();
+                            } else if (line.startsWith('data:')) {
+                                dataLines.push(line.slice(5).trim());
+                            }
+                        });
+
+                        if (dataLines.length > 0) {
+                            try {
+                                onEvent(eventName, JSON.parse(dataLines.join('\n')));
+                            } catch (e) {
+                                console.error('Stream event error:', e);
+                            }
+                        }
+                    }
+                }
+            } catch (error) {
+                console.warn('Stream disconnected:', error.message);
+                delay = retryMs;
+            }
+            setTimeout(connect, delay);
+        };
+
+        connect();
     }
 };
 
@@ -6,8 +6,9 @@
 const chatState = {
     currentChatId: null,  // ID текущего чата из БД
     messages: [],
-    chats: [],  // Список всех чатов
-    filteredChats: [],  // Чаты после фильтрации/поиска
+    chats: [],  // Загруженные чаты (страницы списка)
+    chatsCursor: null,  // Курсор следующей страницы списка (null - загружены все)
+    chatSearch: '',  // Строка поиска по названию
     displayedCount: 10,  // Количество отображаемых чатов
     chatsPerPage: 10,    // Чатов на одну "страницу"
     isTyping: false,
@@ -46,16 +47,35 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // ========== Функции для работы с БД чатами ==========
 
-// Загрузка списка чатов
+// Страница списка чатов (limit null - все оставшиеся)
+async function fetchChats(limit, cursor = null) {
+    const params = new URLSearchParams();
+    if (limit) params.set('limit', Math.min(limit, 200));
+    if (cursor) params.set('cursor', cursor);
+
+    const response = await fetch(`/api/v1/chat/list?${params}`, {
+        headers: getAuthHeaders()
+    });
+    if (!response.ok) throw new Error('Failed to load chats');
+    return response.json();
+}
+
+// Догрузка следующей страницы списка чатов
+async function loadMoreChats(limit) {
+    if (!chatState.chatsCursor) return;
+
+    const data = await fetchChats(limit, chatState.chatsCursor);
+    const known = new Set(chatState.chats.map(c => c.id));
+    chatState.chats.push(...(data.chats || []).filter(c => !known.has(c.id)));
+    chatState.chatsCursor = data.next_cursor || null;
+}
+
+// Загрузка списка чатов: столько, сколько показано; при поиске - весь список
 async function loadChats() {
     try {
-        const response = await fetch('/api/v1/chat/list', {
-            headers: getAuthHeaders()
-        });
-        if (!response.ok) throw new Error('Failed to load chats');
-
-        const data = await response.json();
+        const data = await fetchChats(chatState.chatSearch ? null : chatState.displayedCount);
         chatState.chats = data.chats || [];
+        chatState.chatsCursor = data.next_cursor || null;
 
         // Если нет текущего чата - создаем новый
         if (!chatState.currentChatId && chatState.chats.length === 0) {
@@ -80,8 +100,10 @@ function renderChatsList() {
 
     chatsList.innerHTML = '';
 
-    // Используем filteredChats если есть (поиск), иначе все чаты
-    const chatsToDisplay = chatState.filteredChats.length > 0 ? chatState.filteredChats : chatState.chats;
+    // При поиске - чаты с подходящим названием, иначе все загруженные
+    const chatsToDisplay = chatState.chatSearch
+        ? chatState.chats.filter(chat => chat.title.toLowerCase().includes(chatState.chatSearch))
+        : chatState.chats;
     const displayChats = chatsToDisplay.slice(0, chatState.displayedCount);
 
     if (displayChats.length === 0) {
@@ -112,7 +134,7 @@ function renderChatsList() {
 
     // Показываем/скрываем кнопку "Показать еще"
     if (showMoreBtn) {
-        if (chatsToDisplay.length > chatState.displayedCount) {
+        if (chatsToDisplay.length > chatState.displayedCount || (!chatState.chatSearch && chatState.chatsCursor)) {
             showMoreBtn.style.display = 'flex';
         } else {
             showMoreBtn.style.display = 'none';
@@ -130,8 +152,15 @@ function renderChatsList() {
     }
 }
 
-// Показать еще чатов
-function showMoreChats() {
+// Показать еще чатов (следующая страница загружается, когда показаны все загруженные)
+async function showMoreChats() {
+    try {
+        if (!chatState.chatSearch && chatState.chats.length < chatState.displayedCount + chatState.chatsPerPage) {
+            await loadMoreChats(chatState.chatsPerPage);
+        }
+    } catch (error) {
+        console.error('Error loading chats:', error);
+    }
     chatState.displayedCount += chatState.chatsPerPage;
     renderChatsList();
 }
@@ -143,22 +172,18 @@ function showMoreTemplates() {
 }
 
 // Поиск по чатам
-function searchChats(query) {
-    const lowerQuery = query.toLowerCase().trim();
+async function searchChats(query) {
+    chatState.chatSearch = query.toLowerCase().trim();
 
-    if (!lowerQuery) {
-        // Если поиск пустой - показываем все чаты
-        chatState.filteredChats = [];
-        chatState.displayedCount = chatState.chatsPerPage;
-        renderChatsList();
-        return;
+    // Поиск идет по всем чатам: догружаем оставшиеся страницы одним запросом
+    if (chatState.chatSearch && chatState.chatsCursor) {
+        try {
+            await loadMoreChats(null);
+        } catch (error) {
+            console.error('Error loading chats:', error);
+        }
     }
 
-    // Фильтруем чаты по title
-    chatState.filteredChats = chatState.chats.filter(chat =>
-        chat.title.toLowerCase().includes(lowerQuery)
-    );
-
     // Сбрасываем счетчик отображаемых
     chatState.displayedCount = chatState.chatsPerPage;
     renderChatsList();
@@ -315,7 +340,7 @@ async function deleteAllChats() {
 
         // Очищаем список чатов
         chatState.chats = [];
-        chatState.filteredChats = [];
+        chatState.chatsCursor = null;
         chatState.displayedCount = chatState.chatsPerPage;
 
         // Создаем новый чат
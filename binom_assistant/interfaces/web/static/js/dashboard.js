@@ -16,6 +16,189 @@ let comparisonChart = null;
 let deltaChart = null;
 let sparklineChart = null;
 let dashboardModuleNames = {}; // Маппинг module_id -> русское название
+let dashboardWidgets = {}; // Данные виджетов (к ним применяются изменения из liveDashboard)
+let dashboardGeneration = null; // Поколение данных виджетов ({stats, modules})
+
+/**
+ * Загрузка всех виджетов дашборда одним запросом (/dashboard/bundle)
+ *
+ * Данные виджетов кладутся в кеш под ключами отдельных загрузчиков,
+ * загрузчики рисуют их без запросов. Виджет, упавший в bundle,
+ * загрузчик запросит отдельно.
+ */
+async function loadDashboard() {
+    try {
+        const data = await api.get(
+            `/dashboard/bundle?period=${currentPeriod}&sort_by=${currentSortBy}&top_limit=5&alerts_limit=30`
+        );
+
+        Object.assign(dashboardModuleNames, data.module_names || {});
+
+        const widgetCacheKeys = getDashboardWidgetCacheKeys();
+        dashboardWidgets = {};
+        Object.entries(widgetCacheKeys).forEach(([widget, cacheKey]) => {
+            if (data[widget] !== undefined) {
+                dashboardWidgets[widget] = data[widget];
+                cache.set(cacheKey, data[widget]);
+            }
+        });
+        dashboardGeneration = data.generation || null;
+    } catch (error) {
+        console.error('Failed to load dashboard bundle:', error);
+        dashboardGeneration = null;
+        await loadModuleNames();
+    }
+
+    loadStats();
+    loadSummaryInfo();
+    loadTopCampaigns();
+    loadRecentAlerts();
+    loadCharts();
+
+    liveDashboard.subscribe();
+}
+
+/**
+ * Ключи кеша виджетов (совпадают с ключами загрузчиков)
+ */
+function getDashboardWidgetCacheKeys() {
+    return {
+        stats: `stats_${currentPeriod}`,
+        summary: `summary_${currentPeriod}`,
+        top_campaigns: `top_campaigns_${currentPeriod}_${currentSortBy}`,
+        recent_alerts: 'recent_alerts',
+        charts: `charts_${currentPeriod}`,
+        period_comparison: `period_comparison_${currentPeriod}`
+    };
+}
+
+/**
+ * Применение изменения виджета (формат interfaces/web/live.py)
+ */
+function applyWidgetDelta(current, delta) {
+    if (delta.replace !== undefined) return delta.replace;
+
+    const next = Object.assign({}, current || {});
+    (delta.unset || []).forEach(key => delete next[key]);
+    Object.assign(next, delta.set || {});
+
+    Object.entries(delta.lists || {}).forEach(([field, change]) => {
+        const old = (current && current[field]) || [];
+        if (change.key) {
+            // Строки с ключом: новый порядок + измененные строки
+            const rows = new Map(old.map(row => [JSON.stringify(row[change.key]), row]));
+            change.rows.forEach(row => rows.set(JSON.stringify(row[change.key]), row));
+            next[field] = change.order.map(key => rows.get(JSON.stringify(key)));
+        } else {
+            // Новые элементы в начале списка
+            next[field] = change.prepend.concat(old.slice(0, change.keep));
+        }
+    });
+    return next;
+}
+
+/**
+ * Сохранение виджетов в состояние и кеш и перерисовка (без запросов к API)
+ */
+function applyDashboardWidgets(widgets, generation) {
+    const cacheKeys = getDashboardWidgetCacheKeys();
+    const loaders = {
+        stats: loadStats,
+        summary: loadSummaryInfo,
+        top_campaigns: loadTopCampaigns,
+        recent_alerts: loadRecentAlerts,
+        charts: loadCharts,
+        period_comparison: loadPeriodComparisonForMomentum
+    };
+
+    const changed = Object.keys(widgets).filter(name => cacheKeys[name]);
+    changed.forEach(name => {
+        dashboardWidgets[name] = widgets[name];
+        cache.set(cacheKeys[name], widgets[name]);
+    });
+    dashboardGeneration = generation;
+
+    changed.forEach(name => {
+        // loadCharts сам рисует графики сравнения периодов
+        if (name === 'period_comparison' && changed.includes('charts')) return;
+        loaders[name]();
+    });
+}
+
+/**
+ * Живое обновление дашборда (WebSocket /dashboard/live)
+ *
+ * После сбора данных сервер присылает только изменения виджетов,
+ * они применяются к dashboardWidgets на месте. Токен передается
+ * первым сообщением (браузер не отправляет заголовок Authorization).
+ */
+const liveDashboard = {
+    socket: null,
+    connected: false,
+    retryMs: 5000,
+
+    connect() {
+        if (this.socket || !api.isAuthenticated()) return;
+
+        const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${location.host}${API_BASE}/dashboard/live`);
+        this.socket = socket;
+
+        socket.onopen = () => {
+            this.connected = true;
+            this.subscribe(true);
+        };
+        socket.onmessage = (event) => {
+            this.handleMessage(JSON.parse(event.data));
+        };
+        socket.onclose = (event) => {
+            this.socket = null;
+            this.connected = false;
+            if (event.code === 1008) return; // Токен не принят
+            setTimeout(() => this.connect(), this.retryMs);
+        };
+    },
+
+    /**
+     * Подписка на текущий период и сортировку (generation - поколение наших данных)
+     */
+    subscribe(withToken = false) {
+        if (!this.connected) return;
+
+        const message = {
+            period: currentPeriod,
+            sort_by: currentSortBy,
+            top_limit: 5,
+            alerts_limit: 30,
+            generation: dashboardGeneration
+        };
+        if (withToken) {
+            message.token = localStorage.getItem('access_token');
+        }
+        this.socket.send(JSON.stringify(message));
+    },
+
+    handleMessage(message) {
+        if (message.type === 'snapshot') {
+            applyDashboardWidgets(message.widgets, message.generation);
+            return;
+        }
+        if (message.type !== 'delta') return;
+
+        if (JSON.stringify(message.base) !== JSON.stringify(dashboardGeneration)) {
+            // Изменения посчитаны не от наших данных - просим снимок
+            dashboardGeneration = null;
+            this.subscribe();
+            return;
+        }
+
+        const widgets = {};
+        Object.entries(message.widgets).forEach(([name, delta]) => {
+            widgets[name] = applyWidgetDelta(dashboardWidgets[name], delta);
+        });
+        applyDashboardWidgets(widgets, message.generation);
+    }
+};
 
 /**
  * Загрузка статистики
@@ -178,6 +361,7 @@ async function loadTopCampaigns() {
         if (!data) {
             data = await api.get(`/campaigns/top?period=${currentPeriod}&limit=5&sort_by=${currentSortBy}`);
             cache.set(cacheKey, data);
+            dashboardWidgets.top_campaigns = data;
         }
 
         updateTopCampaignsTable(data);
@@ -404,9 +588,6 @@ async function initDashboard() {
         await loadAppConfig();
     }
 
-    // Загружаем названия модулей для корректного отображения в алертах
-    await loadModuleNames();
-
     // Селектор периода
     const periodBtns = document.querySelectorAll('.period-btn');
     periodBtns.forEach(btn => {
@@ -417,10 +598,7 @@ async function initDashboard() {
 
             // Перезагружаем данные
             cache.clear(); // Очищаем кеш для нового периода
-            loadStats();
-            loadSummaryInfo();
-            loadTopCampaigns();
-            loadCharts();
+            loadDashboard();
         });
     });
 
@@ -435,6 +613,7 @@ async function initDashboard() {
             // Перезагружаем топ кампании
             cache.clear(); // Очищаем кеш для новой сортировки
             loadTopCampaigns();
+            liveDashboard.subscribe();
         });
     });
 
@@ -474,20 +653,17 @@ async function initDashboard() {
         });
     });
 
-    // Загружаем данные
-    loadStats();
-    loadSummaryInfo();
-    loadTopCampaigns();
-    loadRecentAlerts();
-    loadCharts();
+    // Загружаем данные (названия модулей для алертов приходят в том же ответе)
+    await loadDashboard();
+
+    // Дальше изменения приходят по WebSocket
+    liveDashboard.connect();
 
-    // Автообновление каждые 5 минут
+    // Автообновление каждые 5 минут, пока WebSocket недоступен
     setInterval(() => {
+        if (liveDashboard.connected) return;
         cache.clear();
-        loadStats();
-        loadTopCampaigns();
-        loadRecentAlerts();
-        loadCharts();
+        loadDashboard();
         toast.info('Данные обновлены');
     }, 300000);
 }
@@ -455,69 +455,8 @@ async function initHeaderButtons() {
 
                 toast.success('Обновление запущено, отслеживаем прогресс...');
 
-                // Функция проверки прогресса задачи
-                const checkTaskProgress = async () => {
-                    try {
-                        const task = await api.get(`/system/tasks/${taskId}`);
-
-                        // Обновляем индикатор прогресса
-                        if (task.progress !== undefined) {
-                            const progressText = `${task.progress}% - ${task.progress_message || 'Обработка...'}`;
-                            console.log('Progress:', progressText);
-
-                            // Показываем прогресс в toast (каждые 20%)
-                            if (task.progress % 20 === 0 && task.progress > 0 && task.progress < 100) {
-                                toast.info(progressText);
-                            }
-                        }
-
-                        // Проверяем статус
-                        if (task.status === 'completed') {
-                            clearInterval(checkInterval);
-                            refreshBtn.classList.remove('rotating');
-                            refreshBtn.disabled = false;
-
-                            const result = task.result || {};
-                            toast.success(`Обновление завершено! Кампаний: ${result.campaigns || 0}, источников: ${result.traffic_sources || 0}`);
-
-                            // Обновляем данные на странице
-                            cache.clear();
-                            if (typeof loadStats === 'function') loadStats();
-                            if (typeof loadTopCampaigns === 'function') loadTopCampaigns();
-                            if (typeof loadRecentAlerts === 'function') loadRecentAlerts();
-                            if (typeof loadCharts === 'function') loadCharts();
-                            updateLastUpdateTime();
-                            updateSystemStatus();
-
-                        } else if (task.status === 'failed') {
-                            clearInterval(checkInterval);
-                            refreshBtn.classList.remove('rotating');
-                            refreshBtn.disabled = false;
-
-                            toast.error(`Ошибка обновления: ${task.error || 'Неизвестная ошибка'}`);
-                        }
-
-                    } catch (error) {
-                        console.error('Error checking task progress:', error);
-                        // Не останавливаем проверку при ошибке, продолжаем попытки
-                    }
-                };
-
-                // Проверяем прогресс каждые 5 секунд
-                const checkInterval = setInterval(checkTaskProgress, 5000);
-
-                // Первая проверка сразу
-                checkTaskProgress();
-
-                // Останавливаем проверку через 2 часа (на случай если что-то пошло не так)
-                setTimeout(() => {
-                    clearInterval(checkInterval);
-                    if (refreshBtn.disabled) {
-                        refreshBtn.classList.remove('rotating');
-                        refreshBtn.disabled = false;
-                        toast.warning('Проверка прогресса остановлена (таймаут 2 часа)');
-                    }
-                }, 7200000); // 2 часа
+                // Прогресс и завершение приходят в поток задач (handleTaskEvent)
+                trackedTasks[taskId] = 0;
 
             } catch (error) {
                 console.error('Refresh error:', error);
@@ -555,169 +494,116 @@ async function updateRefreshButtonTooltip() {
     }
 }
 
+// ========== Прогресс фоновых задач ========== //
+
+// Задачи сбора данных (как в /system/refresh/status)
+const COLLECTION_TASK_TYPES = ['initial_collection', 'data_collection', 'stats_rebuild'];
+
+// Задачи, которые страница видела активными: id -> последний прогресс
+const trackedTasks = {};
+
 /**
- * Проверяет и восстанавливает отслеживание активных фоновых задач
- * С адаптивным интервалом проверки
+ * Подписка на поток прогресса задач (SSE /system/tasks/stream).
+ * Заменяет опрос /tasks/{id}, /tasks/active и /refresh/status:
+ * при подключении сервер присылает активные задачи, затем каждое обновление.
  */
-async function checkAndResumeActiveTasks() {
-    let checkAttempts = 0;
-    const maxCheckAttempts = 6; // Уменьшено с 12 до 6 попыток
-    let checkInterval = 3000; // Начальный интервал 3 секунды (вместо 5)
-
-    const performCheck = async () => {
-        try {
-            checkAttempts++;
-            const response = await api.get('/system/tasks/active', 10000); // 10 секунд таймаут
-            const activeTasks = response.tasks || [];
-
-            if (activeTasks.length === 0) {
-                // Логируем только каждую 3-ю попытку, чтобы не спамить
-                if (checkAttempts % 3 === 1 || checkAttempts === maxCheckAttempts) {
-                    console.log(`[Task Check] No active tasks (attempt ${checkAttempts}/${maxCheckAttempts})`);
-                }
+function initTaskStream() {
+    if (!api.isAuthenticated()) return;
 
-                // Если задач нет и это не первая попытка
-                if (checkAttempts < maxCheckAttempts) {
-                    // Увеличиваем интервал после 3-й попытки (3s -> 5s -> 10s)
-                    if (checkAttempts >= 3) {
-                        checkInterval = Math.min(checkInterval * 1.5, 10000);
-                    }
-                    return false; // Продолжаем периодическую проверку
-                }
-                console.log('[Task Check] Stopping periodic check - no active tasks found');
-                return true; // Останавливаем проверку
-            }
+    api.stream('/system/tasks/stream', (eventName, task) => {
+        if (eventName === 'task') {
+            handleTaskEvent(task);
+        }
+    });
+}
 
-            // Ищем initial_collection или data_collection задачи
-            const dataCollectionTask = activeTasks.find(t =>
-                t.task_type === 'initial_collection' || t.task_type === 'data_collection'
-            );
+/**
+ * Показ прогресса обновления данных вместо времени последнего обновления
+ */
+function showUpdateProgress(task) {
+    const timeEl = document.getElementById('lastUpdateTime');
+    if (!timeEl) return;
 
-            if (dataCollectionTask) {
-                const refreshBtn = document.getElementById('refreshBtn');
-                if (!refreshBtn) return true;
+    timeEl.textContent = `Обновление... (${task.progress || 0}%)`;
+    timeEl.title = task.progress_message || '';
+}
 
-                // Показываем модалку для initial_collection
-                if (dataCollectionTask.task_type === 'initial_collection') {
-                    openFirstRunModal();
-                }
+/**
+ * Обработка события задачи сбора данных из потока
+ */
+function handleTaskEvent(task) {
+    if (!COLLECTION_TASK_TYPES.includes(task.task_type)) return;
 
-                // Активируем анимацию кнопки
-                refreshBtn.classList.add('rotating');
-                refreshBtn.disabled = true;
+    const refreshBtn = document.getElementById('refreshBtn');
 
-                // Запускаем отслеживание прогресса
-                const checkInterval = setInterval(async () => {
-                    try {
-                        const task = await api.get(`/system/tasks/${dataCollectionTask.id}`);
+    if (task.status === 'pending' || task.status === 'running') {
+        const isNew = !(task.id in trackedTasks);
 
-                        // Показываем прогресс в консоли
-                        if (task.progress_message && task.progress > 0) {
-                            console.log(`Task progress: ${task.progress}% - ${task.progress_message}`);
-                        }
+        // Показываем модалку для initial_collection
+        if (isNew && task.task_type === 'initial_collection') {
+            openFirstRunModal();
+        }
 
-                        // Проверяем статус
-                        if (task.status === 'completed') {
-                            clearInterval(checkInterval);
-                            refreshBtn.classList.remove('rotating');
-                            refreshBtn.disabled = false;
-
-                            const result = task.result || {};
-                            const message = dataCollectionTask.task_type === 'initial_collection'
-                                ? `Первичный сбор данных завершен! Кампаний: ${result.campaigns || 0}`
-                                : `Обновление завершено! Кампаний: ${result.campaigns || 0}`;
-
-                            // Для initial_collection проверяем, открыта ли модалка
-                            if (dataCollectionTask.task_type === 'initial_collection') {
-                                const modal = document.getElementById('firstRunModal');
-                                const modalIsOpen = modal && modal.style.display === 'block';
-
-                                if (modalIsOpen) {
-                                    // Модалка открыта - закрываем и перезагружаем страницу
-                                    closeFirstRunModal();
-                                    toast.success(message + ' - Перезагружаем страницу...');
-
-                                    setTimeout(() => {
-                                        location.reload();
-                                    }, 1500); // 1.5 секунды задержка для показа toast
-
-                                    return; // Выходим, не обновляем данные вручную
-                                } else {
-                                    // Модалка закрыта (пользователь закрыл вручную) - просто обновляем данные
-                                    toast.success(message);
-                                }
-                            } else {
-                                // Для обычного обновления - просто toast
-                                toast.success(message);
-                            }
-
-                            // Обновляем данные на странице (только если не перезагружаем)
-                            if (typeof loadDashboardData === 'function') {
-                                loadDashboardData();
-                            }
-                            if (typeof loadTopCampaigns === 'function') {
-                                loadTopCampaigns();
-                            }
-                            updateLastUpdateTime();
-                            updateSystemStatus();
-
-                        } else if (task.status === 'failed') {
-                            clearInterval(checkInterval);
-                            refreshBtn.classList.remove('rotating');
-                            refreshBtn.disabled = false;
-
-                            // Закрываем модалку для initial_collection
-                            if (dataCollectionTask.task_type === 'initial_collection') {
-                                closeFirstRunModal();
-                            }
-
-                            toast.error(`Ошибка: ${task.error || 'Неизвестная ошибка'}`);
-                        }
+        // Показываем прогресс в toast (каждые 20%)
+        if (!isNew && task.progress !== trackedTasks[task.id] &&
+            task.progress % 20 === 0 && task.progress > 0 && task.progress < 100) {
+            toast.info(`${task.progress}% - ${task.progress_message || 'Обработка...'}`);
+        }
 
-                    } catch (error) {
-                        console.error('Error checking task:', error);
-                    }
-                }, 5000); // Проверяем каждые 5 секунд
-
-                // Останавливаем проверку через 2 часа (таймаут)
-                setTimeout(() => {
-                    clearInterval(checkInterval);
-                    if (refreshBtn.disabled) {
-                        refreshBtn.classList.remove('rotating');
-                        refreshBtn.disabled = false;
-
-                        // Закрываем модалку если открыта
-                        if (dataCollectionTask.task_type === 'initial_collection') {
-                            closeFirstRunModal();
-                        }
+        trackedTasks[task.id] = task.progress;
 
-                        toast.warning('Проверка прогресса остановлена (таймаут 2 часа)');
-                    }
-                }, 7200000); // 2 часа
+        if (refreshBtn) {
+            refreshBtn.classList.add('rotating');
+            refreshBtn.disabled = true;
+        }
+        showUpdateProgress(task);
+        return;
+    }
 
-                return true; // Останавливаем периодическую проверку
-            }
+    // Завершение обрабатываем только для задач, которые страница видела активными
+    if (!(task.id in trackedTasks)) return;
+    delete trackedTasks[task.id];
 
-            return true; // Останавливаем проверку
+    if (refreshBtn) {
+        refreshBtn.classList.remove('rotating');
+        refreshBtn.disabled = false;
+    }
 
-        } catch (error) {
-            console.error('Error checking active tasks:', error);
-            return checkAttempts >= maxCheckAttempts; // Продолжаем пока не достигнем лимита
+    if (task.status === 'failed') {
+        if (task.task_type === 'initial_collection') {
+            closeFirstRunModal();
         }
-    };
+        toast.error(`Ошибка: ${task.error || 'Неизвестная ошибка'}`);
+        updateLastUpdateTime();
+        return;
+    }
 
-    // Рекурсивная функция для периодической проверки с переменным интервалом
-    const scheduleNextCheck = async () => {
-        const shouldStop = await performCheck();
+    const result = task.result || {};
+    if (task.task_type === 'initial_collection') {
+        const message = `Первичный сбор данных завершен! Кампаний: ${result.campaigns || 0}`;
+        const modal = document.getElementById('firstRunModal');
 
-        if (!shouldStop) {
-            // Запускаем следующую проверку с актуальным интервалом
-            setTimeout(scheduleNextCheck, checkInterval);
+        if (modal && modal.style.display === 'block') {
+            // Модалка открыта - закрываем и перезагружаем страницу
+            closeFirstRunModal();
+            toast.success(message + ' - Перезагружаем страницу...');
+            setTimeout(() => {
+                location.reload();
+            }, 1500); // 1.5 секунды задержка для показа toast
+            return;
         }
-    };
+        toast.success(message);
+    } else {
+        toast.success(`Обновление завершено! Кампаний: ${result.campaigns || 0}, источников: ${result.traffic_sources || 0}`);
+    }
 
-    // Первая проверка с задержкой 2 секунды
-    setTimeout(scheduleNextCheck, 2000);
+    // Обновляем данные на странице (живой дашборд получает изменения по WebSocket)
+    if (typeof liveDashboard === 'undefined' || !liveDashboard.connected) {
+        cache.clear();
+        if (typeof loadDashboard === 'function') loadDashboard();
+    }
+    updateLastUpdateTime();
+    updateSystemStatus();
 }
 
 document.addEventListener('DOMContentLoaded', async () => {
@@ -738,16 +624,12 @@ document.addEventListener('DOMContentLoaded', async () => {
     // Обновляем tooltip кнопки refresh
     updateRefreshButtonTooltip();
 
-    // Проверяем активные задачи и восстанавливаем отслеживание
-    checkAndResumeActiveTasks();
+    // Поток прогресса фоновых задач (активные задачи приходят сразу после подключения)
+    initTaskStream();
 
     // Периодическая проверка статуса (каждые 30 секунд)
     setInterval(updateSystemStatus, 30000);
 
-    // Периодическое обновление времени последнего обновления (каждые 10 секунд)
-    // Чаще чем статус, чтобы отслеживать прогресс обновления
-    setInterval(updateLastUpdateTime, 10000);
-
     // Инициализация модалки доната
     initDonateModal();
 });
@@ -32,7 +32,10 @@ const state = {
     // Для сортировки таблицы
     campaigns: [],
     sortColumn: null,
-    sortDirection: 'asc'
+    sortDirection: 'asc',
+    // История запусков: загруженные записи и курсор следующей страницы
+    historyRuns: [],
+    historyCursor: null
 };
 
 // Извлекаем ID модуля из URL
@@ -489,6 +492,8 @@ function renderAlerts(results) {
 async function loadHistory() {
     try {
         const history = await api.get(`/modules/${state.moduleId}/history`);
+        state.historyRuns = history.runs || [];
+        state.historyCursor = history.next_cursor || null;
         renderHistory(history);
         return history; // Возвращаем историю для использования в других функциях
     } catch (error) {
@@ -497,6 +502,23 @@ async function loadHistory() {
     }
 }
 
+/**
+ * Загрузка следующей страницы истории запусков
+ */
+async function loadMoreHistory() {
+    if (!state.historyCursor) return;
+
+    try {
+        const cursor = encodeURIComponent(state.historyCursor);
+        const history = await api.get(`/modules/${state.moduleId}/history?cursor=${cursor}`);
+        state.historyRuns = state.historyRuns.concat(history.runs || []);
+        state.historyCursor = history.next_cursor || null;
+        renderHistory({ runs: state.historyRuns });
+    } catch (error) {
+        console.error('Ошибка загрузки истории:', error);
+    }
+}
+
 /**
  * Отрисовка истории
  */
@@ -548,8 +570,18 @@ function renderHistory(history) {
         </div>
     `;
 
+    if (state.historyCursor) {
+        html += `
+            <div style="text-align: center; margin-top: 1rem;">
+                <button class="btn-secondary" id="loadMoreHistoryBtn">Показать еще</button>
+            </div>
+        `;
+    }
+
     container.innerHTML = html;
 
+    document.getElementById('loadMoreHistoryBtn')?.addEventListener('click', loadMoreHistory);
+
     // Добавляем обработчики событий для кнопок
     container.querySelectorAll('.btn-view-history').forEach(btn => {
         btn.addEventListener('click', async (e) => {
@@ -14,6 +14,7 @@
             reason: 'Причина',
             current_roi: 'Текущий ROI',
             current_volatility: 'Волатильность',
+            marginal_roi: 'Маржинальный ROI',
             potential_improvement: 'Потенциальное улучшение',
             total_campaigns: 'Всего кампаний',
             top_campaigns: 'Кампании для увеличения',
@@ -24,32 +25,28 @@
 
         algorithm: `
             <ol>
-                <li>Загрузка данных по всем кампаниям за период</li>
+                <li>Загрузка дневной статистики всех кампаний за период одним запросом</li>
                 <li>Фильтрация шума (расход < $1 или клики < 50)</li>
                 <li>Расчет производительности каждой кампании:
                     <ol>
                         <li><strong>ROI</strong>: ((revenue - cost) / cost) * 100</li>
                         <li><strong>Волатильность</strong>: коэффициент вариации дневного ROI</li>
-                        <li><strong>Риск</strong>: высокая волатильность = высокий риск</li>
+                        <li><strong>Эластичность</strong>: наклон log(revenue) от log(cost) по дням - как выручка растет с бюджетом (убывающая отдача)</li>
                     </ol>
                 </li>
-                <li>Сегментирование кампаний:
+                <li>Модель выручки кампании: revenue(x) = a * x<sup>b</sup>, проходит через текущий дневной расход и выручку</li>
+                <li>Ограничения:
                     <ul>
-                        <li><strong>Топ 20%</strong> по ROI: рекомендация увеличения бюджета</li>
-                        <li><strong>Низ 20%</strong> по ROI: рекомендация снижения бюджета</li>
-                    </ul>
-                </li>
-                <li>Расчет рекомендуемого изменения:
-                    <ul>
-                        <li>Для топ-кампаний: change = (roi_score * max_change) - (volatility_penalty)</li>
-                        <li>Макс изменение ограничено параметром max_change_percent (по умолчанию 30%)</li>
-                        <li>Учитывается волатильность как фактор риска</li>
+                        <li>Снижение бюджета кампании - не больше max_change_percent</li>
+                        <li>Увеличение - не больше max_change_percent, уменьшенного при высокой волатильности</li>
+                        <li>Общий дневной бюджет - текущий расход + budget_change_percent</li>
                     </ul>
                 </li>
+                <li>Распределение бюджета по <strong>маржинальному ROI</strong> (прибыль с последнего доллара): бюджет получают кампании с наибольшей отдачей, пока она выше цены бюджета</li>
+                <li>Рекомендации - изменения не меньше min_change_percent</li>
                 <li>Оценка потенциала улучшения:
                     <ul>
-                        <li>Расчет текущего средневзвешенного ROI</li>
-                        <li>Расчет нового средневзвешенного ROI с учетом рекомендаций</li>
+                        <li>Текущий ROI портфеля и ожидаемый ROI по модели выручки</li>
                         <li>Потенциал = ((новый ROI - текущий ROI) / |текущий ROI|) * 100</li>
                     </ul>
                 </li>
@@ -63,6 +60,7 @@
             <li><strong>Change Percent</strong> - рекомендуемое изменение бюджета в процентах</li>
             <li><strong>Current ROI</strong> - текущий ROI кампании за период</li>
             <li><strong>Volatility</strong> - волатильность (нестабильность) производительности кампании</li>
+            <li><strong>Marginal ROI</strong> - прибыль с последнего доллара бюджета при текущем расходе (и после изменения)</li>
             <li><strong>Top Campaigns</strong> - количество кампаний с рекомендацией увеличения</li>
             <li><strong>Bottom Campaigns</strong> - количество кампаний с рекомендацией снижения</li>
             <li><strong>Total Current Spend</strong> - общий текущий расход портфеля за период</li>
@@ -73,7 +71,9 @@
             days: 'Период анализа (дней)',
             max_change_percent: 'Макс. изменение бюджета (%)',
             min_cost: 'Минимальный расход ($)',
-            min_clicks: 'Минимум кликов'
+            min_clicks: 'Минимум кликов',
+            budget_change_percent: 'Изменение общего бюджета (%)',
+            min_change_percent: 'Мин. изменение в рекомендации (%)'
         },
 
         renderTable: function(results, container) {
@@ -87,6 +87,7 @@
             const potential_improvement = data.potential_improvement || 0;
             const summary = data.summary || {};
             const period = data.period || {};
+            const allocation = data.allocation || {};
             const sortState = { column: null, direction: 'asc' };
 
             const render = () => {
@@ -105,6 +106,7 @@
                                         ${renderSortableHeader('change_percent', 'Изменение (%)', 'number', sortState.column, sortState.direction)}
                                         ${renderSortableHeader('current_roi', 'ROI (%)', 'number', sortState.column, sortState.direction)}
                                         ${renderSortableHeader('current_volatility', 'Волатильность (%)', 'number', sortState.column, sortState.direction)}
+                                        ${renderSortableHeader('marginal_roi', 'Маржинальный ROI (%)', 'number', sortState.column, sortState.direction)}
                                         <th>Причина</th>
                                         <th>Binom</th>
                                     </tr>
@@ -116,6 +118,9 @@
                         const binomId = rec.binom_id || rec.campaign_id;
                         const changeIcon = rec.change_percent > 0 ? '↑' : '↓';
                         const changeClass = rec.change_percent > 0 ? 'text-success' : 'text-danger';
+                        const marginalRoi = rec.marginal_roi !== undefined
+                            ? `${rec.marginal_roi.toFixed(1)}% → ${rec.marginal_roi_after.toFixed(1)}%`
+                            : '-';
 
                         html += `
                             <tr>
@@ -125,6 +130,7 @@
                                 <td class="${changeClass}"><strong>${changeIcon} ${Math.abs(rec.change_percent).toFixed(1)}%</strong></td>
                                 <td class="${rec.current_roi >= 0 ? 'text-success' : 'text-danger'}">${rec.current_roi.toFixed(1)}%</td>
                                 <td>${rec.current_volatility.toFixed(1)}%</td>
+                                <td>${marginalRoi}</td>
                                 <td><small>${rec.reason}</small></td>
                                 <td>${renderBinomLink(binomId)}</td>
                             </tr>
@@ -147,6 +153,16 @@
                     </div>
                 `;
 
+                if (allocation.daily_budget !== undefined) {
+                    html += `
+                        <div class="info-banner">
+                            <strong>Дневной бюджет:</strong> ${formatCurrency(allocation.daily_budget)}
+                            ${allocation.budget_bound ? ` | <strong>Маржинальный ROI последнего доллара:</strong> ${allocation.shadow_price.toFixed(1)}%` : ''}
+                            | <strong>Дневная прибыль:</strong> ${formatCurrency(allocation.current_daily_profit)} → ${formatCurrency(allocation.expected_daily_profit)}
+                        </div>
+                    `;
+                }
+
                 container.innerHTML = html;
 
                 // Подключаем сортировку
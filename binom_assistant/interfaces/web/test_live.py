@@ -0,0 +1,113 @@
+"""
+Тест живого дашборда (DashboardHub)
+
+Проверяет:
+- клиент, загрузивший данные во время сбора (поколение новее снимка хаба),
+  не получает снимок старых данных
+- клиенты подписки получают delta до пересчитанного при подписке снимка
+- клиент со старыми данными получает snapshot текущего поколения
+- рассылка нового поколения - delta от снимка, который есть у клиентов
+
+Виджеты считаются заглушкой по номеру поколения, без БД.
+
+Использование:
+    python binom_assistant/interfaces/web/test_live.py
+    pytest binom_assistant/interfaces/web/test_live.py
+"""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+# interfaces.web импортирует приложение, которому нужна обязательная конфигурация
+os.environ.setdefault("BINOM_URL", "http://binom.test/index.php")
+os.environ.setdefault("BINOM_API_KEY", "test")
+
+from storage.database.write_tracker import MODULES_SCOPE, STATS_SCOPE
+from interfaces.web import live
+
+
+# Номер текущего поколения данных (STATS_SCOPE)
+_current = {'number': 1}
+
+
+def _generation(number: int):
+    return {STATS_SCOPE: number, MODULES_SCOPE: 1}
+
+
+def _widgets(number: int):
+    return {'stats': {'total_cost': number * 100, 'period': '7d'}}
+
+
+class _Socket:
+    """WebSocket клиента: сохраняет полученные сообщения"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text):
+        self.messages.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+class _Hub(live.DashboardHub):
+    """Хаб с виджетами текущего поколения (без БД)"""
+
+    async def _compute(self, key, previous):
+        self._counters['computations'] += 1
+        number = _current['number']
+        return {'generation': _generation(number), 'widgets': _widgets(number)}
+
+
+async def _scenario():
+    hub = _Hub()
+    first, second, third = _Socket(), _Socket(), _Socket()
+
+    await hub._subscribe(first, {'generation': None})
+    assert first.messages == [{'type': 'snapshot', 'generation': _generation(1), 'widgets': _widgets(1)}]
+
+    # Идет сбор: поколение 2 еще не разослано, клиент уже загрузил bundle поколения 2
+    _current['number'] = 2
+    await hub._subscribe(second, {'generation': _generation(2)})
+    assert second.messages == []
+    assert first.messages[-1] == {
+        'type': 'delta', 'base': _generation(1), 'generation': _generation(2),
+        'widgets': {'stats': live.diff_widget(_widgets(1)['stats'], _widgets(2)['stats'])}
+    }
+
+    # Клиент со старыми данными получает снимок текущего поколения без пересчета
+    computations = hub._counters['computations']
+    await hub._subscribe(third, {'generation': _generation(1)})
+    assert third.messages == [{'type': 'snapshot', 'generation': _generation(2), 'widgets': _widgets(2)}]
+    assert hub._counters['computations'] == computations
+
+    # Рассылка поколения 3 - delta от поколения 2 всем клиентам
+    _current['number'] = 3
+    await hub._publish()
+    for socket in (first, second, third):
+        message = socket.messages[-1]
+        assert (message['type'], message['base'], message['generation']) == ('delta', _generation(2), _generation(3))
+
+
+def test_subscribe_during_collection():
+    """Подписка после изменения данных, но до рассылки"""
+    saved = live._current_generation
+    live._current_generation = lambda: _generation(_current['number'])
+    _current['number'] = 1
+    try:
+        asyncio.run(_scenario())
+    finally:
+        live._current_generation = saved
+
+
+if __name__ == "__main__":
+    test_subscribe_during_collection()
+    print("OK")
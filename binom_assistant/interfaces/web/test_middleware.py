@@ -0,0 +1,101 @@
+"""
+Тест логирования запросов (LoggingMiddleware)
+
+Проверяет:
+- медленные запросы и ответы 5xx логируются всегда
+- поток SSE (text/event-stream) не считается медленным и логируется выборочно
+- заголовок X-Process-Time есть у всех ответов
+
+Использование:
+    python binom_assistant/interfaces/web/test_middleware.py
+    pytest binom_assistant/interfaces/web/test_middleware.py
+"""
+import logging
+import os
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+# interfaces.web импортирует приложение, которому нужна обязательная конфигурация
+os.environ.setdefault("BINOM_URL", "http://binom.test/index.php")
+os.environ.setdefault("BINOM_API_KEY", "test")
+
+from interfaces.web import middleware
+from interfaces.web.middleware import LoggingMiddleware
+
+
+class _Records(logging.Handler):
+    """Пути запросов из записей LoggingMiddleware"""
+
+    def __init__(self):
+        super().__init__()
+        self.paths = []
+
+    def emit(self, record):
+        self.paths.append(record.args[1])
+
+
+def _client(sample_rate: float, slow_ms: float) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.get("/broken")
+    def broken():
+        return JSONResponse({"error": "unavailable"}, status_code=503)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["data: 1\n\n", "data: 2\n\n"]), media_type="text/event-stream")
+
+    app.add_middleware(LoggingMiddleware, sample_rate=sample_rate, slow_ms=slow_ms)
+    return TestClient(app)
+
+
+def _logged(client: TestClient, paths) -> list:
+    """Пути запросов, попавших в лог"""
+    records = _Records()
+    logger = middleware.logger
+    saved_level = logger.level
+    logger.addHandler(records)
+    logger.setLevel(logging.INFO)
+    try:
+        for path in paths:
+            response = client.get(path)
+            assert "X-Process-Time" in response.headers
+    finally:
+        logger.removeHandler(records)
+        logger.setLevel(saved_level)
+    return records.paths
+
+
+def test_slow_and_errors_always_logged():
+    """Без выборки: медленные (порог 0 мс) и 5xx - в логе, SSE - нет"""
+    client = _client(sample_rate=0, slow_ms=0)
+    assert _logged(client, ["/ping", "/broken", "/stream"]) == ["/ping", "/broken"]
+
+    # Обычный порог: быстрые запросы не логируются
+    client = _client(sample_rate=0, slow_ms=60000)
+    assert _logged(client, ["/ping", "/broken", "/stream"]) == ["/broken"]
+
+
+def test_stream_sampled():
+    """Поток SSE логируется по общей выборке"""
+    client = _client(sample_rate=1, slow_ms=0)
+    assert _logged(client, ["/ping", "/stream"]) == ["/ping", "/stream"]
+
+
+if __name__ == "__main__":
+    test_slow_and_errors_always_logged()
+    test_stream_sampled()
+    print("OK")
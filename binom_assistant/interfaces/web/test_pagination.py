@@ -0,0 +1,187 @@
+"""
+Тест keyset-пагинации API (interfaces/web/pagination.py, курсор /alerts)
+
+Проверяет:
+- курсор переживает encode/decode (datetime, date, int, str)
+- поврежденный курсор или курсор другого списка - HTTP 400
+- keyset_page проходит все строки ровно один раз при одинаковых
+  значениях первой колонки ключа (по возрастанию и убыванию)
+- курсор /alerts останавливается посреди алертов запуска,
+  следующая страница продолжает с того же места; после последнего
+  алерта курсора нет (и при числе алертов, кратном limit)
+
+Использование:
+    python binom_assistant/interfaces/web/test_pagination.py
+    pytest binom_assistant/interfaces/web/test_pagination.py
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+# interfaces.web импортирует приложение, которому нужна обязательная конфигурация
+os.environ.setdefault("BINOM_URL", "http://binom.test/index.php")
+os.environ.setdefault("BINOM_API_KEY", "test")
+
+from storage.database.base import Base
+from storage.database.models import ModuleRun
+from interfaces.web.auth import get_current_user
+from interfaces.web.conditional import modules_etag
+from interfaces.web.dependencies import get_db
+from interfaces.web.pagination import decode_cursor, encode_cursor, keyset_page
+from interfaces.web.routes import alerts
+
+NOW = datetime.now().replace(microsecond=0)
+
+KEY = (ModuleRun.started_at, ModuleRun.id)
+
+
+def _factory():
+    """Фабрика сессий in-memory SQLite"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _runs(session, count: int, same_time: int):
+    """Запуски: по same_time запусков с одинаковым started_at подряд"""
+    session.add_all([
+        ModuleRun(module_id="test", started_at=NOW - timedelta(minutes=i // same_time), status="success")
+        for i in range(count)
+    ])
+    session.commit()
+
+
+def _bad_request(cursor, types):
+    try:
+        decode_cursor(cursor, types)
+    except HTTPException as e:
+        assert e.status_code == 400 and e.detail.startswith("Invalid cursor"), e.detail
+        return
+    raise AssertionError(f"cursor {cursor!r} accepted")
+
+
+def test_cursor_round_trip():
+    """encode_cursor -> decode_cursor возвращает те же значения"""
+    values = [datetime(2024, 5, 20, 13, 45, 7, 120000), date(2024, 5, 20), 42, "Крипта"]
+    cursor = encode_cursor(values)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor, (datetime, date, int, str)) == values
+
+
+def test_bad_cursor():
+    """Поврежденный курсор и курсор другого списка отклоняются с 400"""
+    cursor = encode_cursor([NOW, 7])
+    _bad_request("not a cursor!", (datetime, int))
+    _bad_request(cursor[:-3], (datetime, int))
+    _bad_request(encode_cursor([7]), (datetime, int))
+    _bad_request(cursor, (datetime, int, int))
+    _bad_request(encode_cursor([NOW, "7"]), (datetime, int))
+    _bad_request(encode_cursor([NOW, True]), (datetime, int))
+    _bad_request(encode_cursor(["yesterday", 7]), (datetime, int))
+    _bad_request(encode_cursor({"id": 7}), (int,))
+
+
+def test_keyset_page_walks_ties():
+    """Все строки ровно один раз, одинаковый started_at у соседних строк"""
+    factory = _factory()
+    with factory() as session:
+        _runs(session, 23, same_time=4)
+        for descending in (True, False):
+            expected = session.query(ModuleRun).order_by(
+                *(column.desc() if descending else column.asc() for column in KEY)
+            ).all()
+            for limit in (1, 3, 4, 5, 23, 50):
+                seen, cursor, pages = [], None, 0
+                while True:
+                    rows, cursor = keyset_page(session.query(ModuleRun), KEY, cursor, limit, descending)
+                    pages += 1
+                    assert len(rows) <= limit
+                    seen.extend(rows)
+                    if cursor is None:
+                        break
+                assert [run.id for run in seen] == [run.id for run in expected], (descending, limit)
+                # Лишняя строка в запросе: после полной последней страницы пустой нет
+                assert pages == -(-23 // limit), (descending, limit, pages)
+
+
+def test_alerts_cursor_inside_run():
+    """Страницы /alerts с курсором посреди алертов запуска"""
+    factory = _factory()
+    with factory() as session:
+        # 5 запусков, у трех одинаковое completed_at; по 3 алерта в запуске
+        session.add_all([
+            ModuleRun(
+                module_id="test", started_at=NOW, status="success",
+                completed_at=NOW - timedelta(minutes=0 if i < 3 else i),
+                results={"alerts": [{"severity": "high", "message": f"run {i} alert {j}"} for j in range(3)]}
+            )
+            for i in range(5)
+        ])
+        session.commit()
+        expected = [
+            (run.id, alert["message"])
+            for run in session.query(ModuleRun).order_by(*(column.desc() for column in alerts.ALERT_RUN_KEY))
+            for alert in run.results["alerts"]
+        ]
+
+        # Пачки по 2 запуска: граница пачки внутри одинаковых completed_at
+        runs = list(alerts._iter_runs(session.query(ModuleRun), None, batch_size=2))
+        assert [run.id for run in runs] == list(dict.fromkeys(run_id for run_id, _ in expected))
+
+    def _db():
+        with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(alerts.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_current_user] = lambda: "test"
+    app.dependency_overrides[modules_etag] = lambda: None
+    client = TestClient(app)
+
+    stops = set()
+    for limit in (2, 3, 4, 5, 15, 16):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": limit}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/v1/alerts", params=params)
+            assert response.status_code == 200, response.text
+            page = response.json()
+            # Пустой страницы в конце нет: курсор только если алерты еще есть
+            assert page["alerts"], (limit, cursor)
+            seen.extend((alert["run_id"], alert["message"]) for alert in page["alerts"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            # Курсор указывает на запуск и позицию первого алерта следующей страницы
+            run_id, position = decode_cursor(cursor, (datetime, int, int))[1:]
+            stops.add(position)
+            assert expected[len(seen)][0] == run_id
+        assert seen == expected, limit
+    assert stops & {1, 2}, stops
+
+    response = client.get("/api/v1/alerts", params={"cursor": encode_cursor([NOW, 1, -1])})
+    assert response.status_code == 400
+    assert client.get("/api/v1/alerts", params={"cursor": "garbage"}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_bad_cursor()
+    test_keyset_page_walks_ties()
+    test_alerts_cursor_inside_run()
+    print("OK")
@@ -12,7 +12,6 @@ import argparse
 import uvicorn
 import logging
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
 
 # Добавляем корневую папку в путь
 ROOT_DIR = Path(__file__).parent
@@ -22,42 +21,12 @@ sys.path.insert(0, str(ROOT_DIR))
 def setup_logging():
     """
     Настраивает логирование приложения в файл и консоль
-    """
-    # Создаем директорию для логов если её нет
-    log_dir = ROOT_DIR / "logs"
-    log_dir.mkdir(exist_ok=True)
-
-    log_file = log_dir / "app.log"
-
-    # Настраиваем формат логов
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    date_format = '%Y-%m-%d %H:%M:%S'
-
-    # Создаем корневой logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
 
-    # Удаляем существующие handlers чтобы избежать дублирования
-    root_logger.handlers.clear()
-
-    # File handler с ротацией (макс 10MB, 5 бэкапов)
-    file_handler = RotatingFileHandler(
-        log_file,
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter(log_format, date_format))
-
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter(log_format, date_format))
+    Записи пишет отдельный поток через очередь (utils.logging_setup)
+    """
+    from utils.logging_setup import setup_logging as setup_app_logging
 
-    # Добавляем handlers
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    setup_app_logging(level=logging.INFO, console=True)
 
     # Логируем старт
     logger = logging.getLogger(__name__)
@@ -149,6 +118,8 @@ def main():
         config.update({
             "workers": args.workers,
             "log_level": "info",
+            # Запросы логирует LoggingMiddleware (выборочно)
+            "access_log": False,
         })
 
     try:
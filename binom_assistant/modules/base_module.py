@@ -3,7 +3,7 @@
 """
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from pydantic import BaseModel, Field
 import logging
 import hashlib
@@ -84,6 +84,10 @@ class ModuleResult(BaseModel):
     recommendations: List[str] = Field(default_factory=list, description="Рекомендации")
     alerts: List[Dict[str, Any]] = Field(default_factory=list, description="Критические алерты")
     error: Optional[str] = Field(default=None, description="Сообщение об ошибке")
+    materialized: bool = Field(
+        default=True,
+        description="Графики и рекомендации рассчитаны (False - будут построены по запросу из data)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -97,11 +101,32 @@ class ModuleResult(BaseModel):
                 "charts": [],
                 "recommendations": [],
                 "alerts": [],
-                "error": None
+                "error": None,
+                "materialized": True
             }
         }
 
 
+class IncrementalPlan(BaseModel):
+    """
+    План инкрементального пересчета модуля.
+
+    Формируется ModuleRunner на основе сохраненного состояния модуля и журнала
+    изменений сборщика. dirty_campaign_ids = None означает полный пересчет.
+    Поле states заполняется во время выполнения и сохраняется для следующего запуска.
+    """
+    window_start: date = Field(..., description="Начало окна данных модуля")
+    data_version: int = Field(default=0, description="Версия данных (ID журнала изменений)")
+    dirty_campaign_ids: Optional[List[int]] = Field(default=None, description="Кампании для пересчета (None - все)")
+    previous_states: Dict[int, Dict[str, Any]] = Field(default_factory=dict, description="Состояние с прошлого запуска")
+    states: Dict[int, Dict[str, Any]] = Field(default_factory=dict, description="Состояние после запуска")
+
+    @property
+    def is_full(self) -> bool:
+        """Полный пересчет всех кампаний"""
+        return self.dirty_campaign_ids is None
+
+
 class BaseModule(ABC):
     """
     Базовый класс для всех модулей аналитики.
@@ -225,6 +250,31 @@ class BaseModule(ABC):
         """
         return []
 
+    @property
+    def supports_deferred_phases(self) -> bool:
+        """
+        Графики и рекомендации можно построить позже из сохраненных данных.
+
+        Возможно, только если format_results() не переопределен: тогда data
+        результата совпадает с выводом analyze(), из которого строятся фазы.
+        """
+        return type(self).format_results is BaseModule.format_results
+
+    def materialize_phases(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Строит отложенные фазы результата (графики и рекомендации).
+
+        Args:
+            data: Данные результата (вывод analyze() или сохраненный data запуска)
+
+        Returns:
+            Dict с charts и recommendations
+        """
+        return {
+            'charts': self.prepare_chart_data(data),
+            'recommendations': self.generate_recommendations(data)
+        }
+
     def get_param_metadata(self) -> Dict[str, Dict[str, Any]]:
         """
         Возвращает метаданные параметров для UI.
@@ -245,6 +295,126 @@ class BaseModule(ABC):
         """
         return {}
 
+    def get_lookback_days(self, config: ModuleConfig) -> Optional[int]:
+        """
+        Окно данных модуля в днях назад от сегодня.
+
+        Модули с инкрементальным пересчетом переопределяют этот метод вместе
+        с analyze_campaigns() и merge_campaign_states(). Изменения данных
+        раньше окна не приводят к пересчету кампании.
+
+        Args:
+            config: Конфигурация модуля
+
+        Returns:
+            Optional[int]: Количество дней или None (модуль пересчитывается целиком)
+        """
+        return None
+
+    @property
+    def supports_incremental(self) -> bool:
+        """Модуль умеет пересчитывать только измененные кампании"""
+        return self.get_lookback_days(self.config) is not None
+
+    def analyze_campaigns(
+        self,
+        config: ModuleConfig,
+        campaign_ids: Optional[List[int]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Промежуточное состояние по кампаниям (для инкрементального пересчета).
+
+        Кампании, не попавшие в результат (не прошли фильтры), в словаре отсутствуют.
+        Состояние должно сериализоваться в JSON.
+
+        Args:
+            config: Конфигурация модуля
+            campaign_ids: internal_id кампаний для пересчета (None - все)
+
+        Returns:
+            Dict[int, Dict[str, Any]]: campaign_id -> состояние
+        """
+        raise NotImplementedError(f"Module '{self.metadata.id}' does not support incremental analysis")
+
+    def merge_campaign_states(
+        self,
+        config: ModuleConfig,
+        states: Dict[int, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Собирает результат analyze() из состояний всех кампаний.
+
+        Args:
+            config: Конфигурация модуля
+            states: campaign_id -> состояние
+
+        Returns:
+            Dict[str, Any]: Данные в формате analyze()
+        """
+        raise NotImplementedError(f"Module '{self.metadata.id}' does not support incremental analysis")
+
+    def fetch_shared_data(self, configs: List[ModuleConfig]) -> Any:
+        """
+        Загружает данные, достаточные для анализа всех конфигураций перебора параметров.
+
+        Модули с поддержкой перебора переопределяют этот метод вместе с
+        analyze_shared(): данные читаются из БД один раз (по самому широкому
+        окну среди конфигураций), а каждая конфигурация считается в памяти.
+
+        Args:
+            configs: Конфигурации перебора
+
+        Returns:
+            Any: Общие данные для analyze_shared()
+        """
+        raise NotImplementedError(f"Module '{self.metadata.id}' does not support parameter sweeps")
+
+    def analyze_shared(self, config: ModuleConfig, shared_data: Any) -> Dict[str, Any]:
+        """
+        Анализ по заранее загруженным данным (результат совпадает с analyze()).
+
+        Не должен изменять shared_data: конфигурации считаются параллельно.
+
+        Args:
+            config: Конфигурация модуля
+            shared_data: Результат fetch_shared_data()
+
+        Returns:
+            Dict[str, Any]: Данные в формате analyze()
+        """
+        raise NotImplementedError(f"Module '{self.metadata.id}' does not support parameter sweeps")
+
+    @property
+    def supports_sweep(self) -> bool:
+        """Модуль умеет считать несколько конфигураций по одной загрузке данных"""
+        return type(self).fetch_shared_data is not BaseModule.fetch_shared_data
+
+    def _analyze_with_plan(self, config: ModuleConfig, plan: Optional[IncrementalPlan]) -> Dict[str, Any]:
+        """
+        Выполняет анализ полностью или только по измененным кампаниям.
+
+        Args:
+            config: Конфигурация модуля
+            plan: План инкрементального пересчета (None - обычный analyze)
+
+        Returns:
+            Dict[str, Any]: Сырые данные
+        """
+        if plan is None:
+            return self.analyze(config)
+
+        if plan.is_full:
+            states = self.analyze_campaigns(config)
+        else:
+            states = dict(plan.previous_states)
+            for campaign_id in plan.dirty_campaign_ids:
+                states.pop(campaign_id, None)
+            if plan.dirty_campaign_ids:
+                states.update(self.analyze_campaigns(config, plan.dirty_campaign_ids))
+
+        plan.states = states
+        return self.merge_campaign_states(config, states)
+
     def get_cache_key(self, config: ModuleConfig) -> str:
         """
         Генерирует ключ кэша на основе конфигурации и версии модуля.
@@ -262,24 +432,36 @@ class BaseModule(ABC):
         hash_input = f"{self.metadata.id}_{self.metadata.version}_{params_str}"
         return hashlib.md5(hash_input.encode()).hexdigest()
 
-    def _run_with_timeout(self, config: ModuleConfig) -> Dict[str, Any]:
+    def _run_with_timeout(
+        self,
+        config: ModuleConfig,
+        plan: Optional[IncrementalPlan] = None,
+        materialize: bool = True
+    ) -> Dict[str, Any]:
         """
         Внутренний метод для выполнения анализа с таймаутом.
         Вызывается из run() через ThreadPoolExecutor.
 
         Args:
             config: Конфигурация модуля
+            plan: План инкрементального пересчета (опционально)
+            materialize: Строить графики и рекомендации сразу
+                (False - отложить до запроса, если модуль это поддерживает)
 
         Returns:
-            Dict с результатами: raw_data, formatted_data, charts, recommendations, alerts
+            Dict с результатами: raw_data, formatted_data, charts, recommendations, alerts, materialized
         """
         # Выполнить анализ
-        raw_data = self.analyze(config)
+        raw_data = self._analyze_with_plan(config, plan)
 
         # Обработать результаты
         formatted_data = self.format_results(raw_data)
-        charts = self.prepare_chart_data(raw_data)
-        recommendations = self.generate_recommendations(raw_data)
+
+        materialized = materialize or not self.supports_deferred_phases
+        if materialized:
+            phases = self.materialize_phases(raw_data)
+        else:
+            phases = {'charts': [], 'recommendations': []}
 
         # Генерировать алерты только если включено в конфиге
         if config.alerts_enabled:
@@ -290,17 +472,25 @@ class BaseModule(ABC):
         return {
             'raw_data': raw_data,
             'formatted_data': formatted_data,
-            'charts': charts,
-            'recommendations': recommendations,
-            'alerts': alerts
+            'charts': phases['charts'],
+            'recommendations': phases['recommendations'],
+            'alerts': alerts,
+            'materialized': materialized
         }
 
-    def run(self, config: Optional[ModuleConfig] = None) -> ModuleResult:
+    def run(
+        self,
+        config: Optional[ModuleConfig] = None,
+        plan: Optional[IncrementalPlan] = None,
+        materialize: bool = True
+    ) -> ModuleResult:
         """
         Главный метод запуска модуля с enforcement таймаута.
 
         Args:
             config: Конфигурация модуля (опционально)
+            plan: План инкрементального пересчета (опционально, см. ModuleRunner)
+            materialize: Строить графики и рекомендации сразу (False - по запросу, см. materialize_phases)
 
         Returns:
             ModuleResult: Результат выполнения
@@ -329,7 +519,7 @@ class BaseModule(ABC):
 
             # Выполняем с таймаутом через ThreadPoolExecutor
             with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(self._run_with_timeout, config)
+                future = executor.submit(self._run_with_timeout, config, plan, materialize)
 
                 try:
                     # Ждем результат с таймаутом
@@ -352,7 +542,8 @@ class BaseModule(ABC):
                         data=results['formatted_data'],
                         charts=results['charts'],
                         recommendations=results['recommendations'],
-                        alerts=results['alerts']
+                        alerts=results['alerts'],
+                        materialized=results['materialized']
                     )
 
                 except FuturesTimeoutError:
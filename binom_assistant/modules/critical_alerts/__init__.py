@@ -1,12 +1,21 @@
 """
 Модули критических алертов
+
+Классы импортируются лениво (при первом обращении), чтобы импорт одного
+модуля категории не загружал остальные.
 """
-from .bleeding_detector import BleedingCampaignDetector
-from .zero_approval_alert import ZeroApprovalAlert
-from .spend_spike_monitor import SpendSpikeMonitor
-from .waste_campaign_finder import WasteCampaignFinder
-from .traffic_quality_crash import TrafficQualityCrash
-from .squeezed_offer import SqueezedOfferDetector
+from ..manifest import lazy_exports
+
+_EXPORTS = {
+    'BleedingCampaignDetector': '.bleeding_detector',
+    'ZeroApprovalAlert': '.zero_approval_alert',
+    'SpendSpikeMonitor': '.spend_spike_monitor',
+    'WasteCampaignFinder': '.waste_campaign_finder',
+    'TrafficQualityCrash': '.traffic_quality_crash',
+    'SqueezedOfferDetector': '.squeezed_offer',
+}
+
+__getattr__ = lazy_exports(__name__, _EXPORTS)
 
 __all__ = [
     'BleedingCampaignDetector',
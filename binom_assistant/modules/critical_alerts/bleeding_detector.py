@@ -1,9 +1,10 @@
 """
 Модуль поиска критически убыточных кампаний
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import func, type_coerce, Float
 from contextlib import contextmanager
 
 from storage.database.base import get_session
@@ -28,6 +29,11 @@ def get_db_session():
             pass
 
 
+def _to_cents(value: float) -> float:
+    """Округление суммы до центов так же, как результат Numeric(10, 2) из БД"""
+    return float(f"{value:.2f}")
+
+
 class BleedingCampaignDetector(BaseModule):
     """
     Детектор убыточных кампаний.
@@ -134,6 +140,10 @@ class BleedingCampaignDetector(BaseModule):
             ]
         }
 
+    def get_lookback_days(self, config: ModuleConfig) -> int:
+        """Окно данных: последние days полных дней"""
+        return config.params.get("days", 3)
+
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
         Анализ убыточных кампаний через SQLAlchemy.
@@ -144,15 +154,27 @@ class BleedingCampaignDetector(BaseModule):
         Returns:
             Dict[str, Any]: Данные об убыточных кампаниях
         """
+        return self.merge_campaign_states(config, self.analyze_campaigns(config))
+
+    def analyze_campaigns(
+        self,
+        config: ModuleConfig,
+        campaign_ids: Optional[List[int]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Убыточные кампании за период (состояние по кампаниям).
+
+        Args:
+            config: Конфигурация модуля
+            campaign_ids: Пересчитать только эти кампании (None - все)
+
+        Returns:
+            Dict[int, Dict[str, Any]]: internal_id -> данные кампании
+        """
         # Получение параметров
-        roi_threshold = config.params.get("roi_threshold", -50)
         min_spend = config.params.get("min_spend", 5)
         days = config.params.get("days", 3)
 
-        # Получение настраиваемых порогов severity
-        severity_critical_threshold = config.params.get("severity_critical", -70)
-        severity_high_threshold = config.params.get("severity_high", -50)
-
         # Анализируем только полные дни (исключаем текущий неполный день)
         date_from = datetime.now().date() - timedelta(days=days)
 
@@ -175,7 +197,12 @@ class BleedingCampaignDetector(BaseModule):
             ).filter(
                 CampaignStatsDaily.date >= date_from,
                 CampaignStatsDaily.cost > 0  # только активные
-            ).group_by(
+            )
+
+            if campaign_ids is not None:
+                query = query.filter(CampaignStatsDaily.campaign_id.in_(campaign_ids))
+
+            query = query.group_by(
                 Campaign.internal_id
             ).having(
                 func.sum(CampaignStatsDaily.cost) >= min_spend
@@ -184,68 +211,245 @@ class BleedingCampaignDetector(BaseModule):
             results = query.all()
 
             # Обработка результатов
-            bleeding_campaigns = []
-            total_losses = 0
+            bleeding_campaigns = {}
 
             for row in results:
-                cost = float(row.total_cost)
-                revenue = float(row.total_revenue)
-                loss = cost - revenue
-
-                # Вычисляем правильный ROI от суммарных показателей
-                if cost > 0:
-                    roi = ((revenue - cost) / cost) * 100
-                else:
-                    roi = 0
-
-                # Фильтруем только убыточные кампании (ROI < roi_threshold)
-                if roi >= roi_threshold:
-                    continue
-
-                total_losses += loss
-
-                # Определение критичности на основе настраиваемых порогов
-                if roi < severity_critical_threshold:
-                    severity = "critical"
-                elif roi < severity_high_threshold:
-                    severity = "high"
-                else:
-                    severity = "medium"
-
-                bleeding_campaigns.append({
+                state = self._campaign_state(
+                    config,
+                    {
+                        "campaign_id": row.internal_id,
+                        "binom_id": row.binom_id,
+                        "name": row.current_name,
+                        "group": row.group_name or "Без группы"
+                    },
+                    cost=float(row.total_cost),
+                    revenue=float(row.total_revenue),
+                    clicks=row.total_clicks,
+                    leads=row.total_leads
+                )
+                if state is not None:
+                    bleeding_campaigns[row.internal_id] = state
+
+            return bleeding_campaigns
+
+    def _campaign_state(
+        self,
+        config: ModuleConfig,
+        campaign: Dict[str, Any],
+        cost: float,
+        revenue: float,
+        clicks: int,
+        leads: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Классифицирует кампанию по суммарным показателям за период.
+
+        Args:
+            config: Конфигурация модуля
+            campaign: campaign_id, binom_id, name, group
+            cost, revenue, clicks, leads: Суммы за период
+
+        Returns:
+            Optional[Dict]: Данные убыточной кампании или None (ROI выше порога)
+        """
+        roi_threshold = config.params.get("roi_threshold", -50)
+
+        # Получение настраиваемых порогов severity
+        severity_critical_threshold = config.params.get("severity_critical", -70)
+        severity_high_threshold = config.params.get("severity_high", -50)
+
+        loss = cost - revenue
+
+        # Вычисляем правильный ROI от суммарных показателей
+        if cost > 0:
+            roi = ((revenue - cost) / cost) * 100
+        else:
+            roi = 0
+
+        # Фильтруем только убыточные кампании (ROI < roi_threshold)
+        if roi >= roi_threshold:
+            return None
+
+        # Определение критичности на основе настраиваемых порогов
+        if roi < severity_critical_threshold:
+            severity = "critical"
+        elif roi < severity_high_threshold:
+            severity = "high"
+        else:
+            severity = "medium"
+
+        return {
+            **campaign,
+            "total_cost": cost,
+            "total_revenue": revenue,
+            "avg_roi": round(roi, 2),
+            "loss": loss,
+            "severity": severity,
+            "total_clicks": clicks,
+            "total_leads": leads
+        }
+
+    def fetch_shared_data(self, configs: List[ModuleConfig]) -> Dict[str, Any]:
+        """
+        Дневная статистика активных кампаний за самое широкое окно среди конфигураций.
+
+        Args:
+            configs: Конфигурации перебора
+
+        Returns:
+            Dict с массивами по дневным строкам (campaign_index, dates, cost,
+            revenue, clicks, leads) и списком кампаний
+        """
+        days = max(config.params.get("days", 3) for config in configs)
+        date_from = datetime.now().date() - timedelta(days=days)
+
+        with get_db_session() as session:
+            rows = session.query(
+                Campaign.internal_id,
+                Campaign.binom_id,
+                Campaign.current_name,
+                Campaign.group_name,
+                CampaignStatsDaily.date,
+                # Исходные значения без округления Numeric до 2 знаков (как их суммирует SUM())
+                type_coerce(CampaignStatsDaily.cost, Float).label('cost'),
+                type_coerce(CampaignStatsDaily.revenue, Float).label('revenue'),
+                CampaignStatsDaily.clicks,
+                CampaignStatsDaily.leads
+            ).join(
+                CampaignStatsDaily,
+                Campaign.internal_id == CampaignStatsDaily.campaign_id
+            ).filter(
+                CampaignStatsDaily.date >= date_from,
+                CampaignStatsDaily.cost > 0  # только активные
+            ).order_by(
+                Campaign.internal_id,
+                CampaignStatsDaily.date
+            ).all()
+
+        campaigns = []
+        positions = {}
+        campaign_index = np.empty(len(rows), dtype=np.int64)
+
+        for i, row in enumerate(rows):
+            position = positions.get(row.internal_id)
+            if position is None:
+                position = positions[row.internal_id] = len(campaigns)
+                campaigns.append({
                     "campaign_id": row.internal_id,
                     "binom_id": row.binom_id,
                     "name": row.current_name,
-                    "group": row.group_name or "Без группы",
-                    "total_cost": cost,
-                    "total_revenue": revenue,
-                    "avg_roi": round(roi, 2),
-                    "loss": loss,
-                    "severity": severity,
-                    "total_clicks": row.total_clicks,
-                    "total_leads": row.total_leads
+                    "group": row.group_name or "Без группы"
                 })
+            campaign_index[i] = position
 
-            # Сортировка по убыткам
-            bleeding_campaigns.sort(key=lambda x: x['loss'], reverse=True)
-
-            return {
-                "campaigns": bleeding_campaigns,
-                "summary": {
-                    "total_found": len(bleeding_campaigns),
-                    "total_losses": total_losses,
-                    "critical_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'critical'),
-                    "high_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'high'),
-                    "medium_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'medium')
-                },
-                "period_days": days,
-                "thresholds": {
-                    "roi": roi_threshold,
-                    "min_spend": min_spend,
-                    "severity_critical": severity_critical_threshold,
-                    "severity_high": severity_high_threshold
-                }
+        cost = np.array([row.cost for row in rows], dtype=np.float64)
+        revenue = np.array([row.revenue or 0 for row in rows], dtype=np.float64)
+
+        # Если все суммы в целых центах - суммируем центы: сумма целых чисел точная
+        # и совпадает с SUM() в SQLite (при суммировании долларов возможны расхождения в последнем знаке)
+        money_scale = 100.0
+        if not (np.array_equal(np.round(cost * 100) / 100, cost)
+                and np.array_equal(np.round(revenue * 100) / 100, revenue)):
+            money_scale = 1.0
+
+        return {
+            "campaigns": campaigns,
+            "campaign_index": campaign_index,
+            "money_scale": money_scale,
+            "dates": np.array([row.date.toordinal() for row in rows], dtype=np.int64),
+            "cost": np.round(cost * money_scale) if money_scale != 1.0 else cost,
+            "revenue": np.round(revenue * money_scale) if money_scale != 1.0 else revenue,
+            "clicks": np.array([row.clicks or 0 for row in rows], dtype=np.float64),
+            "leads": np.array([row.leads or 0 for row in rows], dtype=np.float64)
+        }
+
+    def analyze_shared(self, config: ModuleConfig, shared_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Убыточные кампании по заранее загруженной дневной статистике.
+
+        Суммы за период считаются через np.bincount по индексу кампании,
+        дальше - те же фильтры и классификация, что и в analyze_campaigns().
+        Денежные суммы округляются до центов так же, как SUM() по колонке
+        Numeric(10, 2) в SQL-варианте.
+
+        Args:
+            config: Конфигурация модуля
+            shared_data: Результат fetch_shared_data()
+
+        Returns:
+            Dict[str, Any]: Данные в формате analyze()
+        """
+        min_spend = config.params.get("min_spend", 5)
+        days = config.params.get("days", 3)
+        date_from = (datetime.now().date() - timedelta(days=days)).toordinal()
+
+        campaigns = shared_data["campaigns"]
+        mask = shared_data["dates"] >= date_from
+        index = shared_data["campaign_index"][mask]
+
+        totals = {
+            metric: np.bincount(index, weights=shared_data[metric][mask], minlength=len(campaigns))
+            for metric in ("cost", "revenue", "clicks", "leads")
+        }
+        active = np.bincount(index, minlength=len(campaigns)) > 0
+
+        bleeding_campaigns = {}
+        totals["cost"] /= shared_data["money_scale"]
+        totals["revenue"] /= shared_data["money_scale"]
+
+        for position in np.flatnonzero(active & (totals["cost"] >= min_spend)):
+            campaign = campaigns[position]
+            state = self._campaign_state(
+                config,
+                campaign,
+                cost=_to_cents(totals["cost"][position]),
+                revenue=_to_cents(totals["revenue"][position]),
+                clicks=int(totals["clicks"][position]),
+                leads=int(totals["leads"][position])
+            )
+            if state is not None:
+                bleeding_campaigns[campaign["campaign_id"]] = state
+
+        return self.merge_campaign_states(config, bleeding_campaigns)
+
+    def merge_campaign_states(
+        self,
+        config: ModuleConfig,
+        states: Dict[int, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Собирает итоговый результат из данных по кампаниям.
+
+        Args:
+            config: Конфигурация модуля
+            states: internal_id -> данные кампании
+
+        Returns:
+            Dict[str, Any]: Данные об убыточных кампаниях
+        """
+        bleeding_campaigns = [states[campaign_id] for campaign_id in sorted(states)]
+        total_losses = sum(c['loss'] for c in bleeding_campaigns)
+
+        # Сортировка по убыткам
+        bleeding_campaigns.sort(key=lambda x: x['loss'], reverse=True)
+
+        return {
+            "campaigns": bleeding_campaigns,
+            "summary": {
+                "total_found": len(bleeding_campaigns),
+                "total_losses": total_losses,
+                "critical_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'critical'),
+                "high_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'high'),
+                "medium_count": sum(1 for c in bleeding_campaigns if c['severity'] == 'medium')
+            },
+            "period_days": config.params.get("days", 3),
+            "thresholds": {
+                "roi": config.params.get("roi_threshold", -50),
+                "min_spend": config.params.get("min_spend", 5),
+                "severity_critical": config.params.get("severity_critical", -70),
+                "severity_high": config.params.get("severity_high", -50)
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
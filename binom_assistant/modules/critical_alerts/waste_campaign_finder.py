@@ -1,14 +1,20 @@
 """
 Модуль поиска кампаний стабильно сливающих бюджет
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
+from itertools import chain
+import numpy as np
 from sqlalchemy import func
 from contextlib import contextmanager
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .. import stats_kernel
+
+# Относительный запас сравнений ROI в векторном отборе (float против Decimal)
+ROI_SCREEN_MARGIN = 1e-9
 
 
 @contextmanager
@@ -247,6 +253,71 @@ class WasteCampaignFinder(BaseModule):
         # Если средний ROI последних дней выше порога, считаем что есть восстановление
         return avg_last_roi < recovery_threshold
 
+    def _group_by_campaign(self, rows: List[Any]) -> Tuple[List[Any], List[List[Any]]]:
+        """
+        Разбивает дневные строки (отсортированные по кампании и дате) по кампаниям.
+
+        Returns:
+            (кампании, дневные строки каждой кампании) в порядке internal_id
+        """
+        campaigns = []
+        campaign_stats = []
+        current_id = None
+
+        for row in rows:
+            if row.internal_id != current_id:
+                current_id = row.internal_id
+                campaigns.append(row)
+                campaign_stats.append([])
+            campaign_stats[-1].append(row)
+
+        return campaigns, campaign_stats
+
+    def _screen_candidates(
+        self,
+        campaign_stats: List[List[Any]],
+        roi_threshold: float,
+        min_consecutive: int,
+        recovery_threshold: float
+    ) -> List[int]:
+        """
+        Векторный отбор кандидатов по матрице ROI (кампании x дни с расходом).
+
+        Серии плохих дней и средний ROI последних 3 дней считаются по всей
+        матрице сразу. Сравнения выполняются с запасом ROI_SCREEN_MARGIN, поэтому
+        отбор не теряет кампаний, которые прошли бы точную (Decimal) проверку
+        в _check_consecutive_negative_days / _check_no_recovery.
+
+        Returns:
+            List[int]: Позиции кампаний-кандидатов
+        """
+        if not campaign_stats:
+            return []
+
+        lengths = np.array([len(stats) for stats in campaign_stats], dtype=np.int64)
+        rows = list(chain.from_iterable(campaign_stats))
+        cost = np.fromiter((row.cost for row in rows), dtype=np.float64, count=len(rows))
+        revenue = np.fromiter((row.revenue for row in rows), dtype=np.float64, count=len(rows))
+
+        # Матрица ROI: строка - кампания, столбец - порядковый день с расходом (как в pack_series)
+        campaign_index = np.repeat(np.arange(len(campaign_stats)), lengths)
+        day_index = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        roi = np.full((len(campaign_stats), int(lengths.max())), np.nan)
+        roi[campaign_index, day_index] = (revenue - cost) / cost * 100
+
+        roi_margin = ROI_SCREEN_MARGIN * max(1.0, abs(roi_threshold))
+        recovery_margin = ROI_SCREEN_MARGIN * max(1.0, abs(recovery_threshold))
+
+        with np.errstate(invalid='ignore'):
+            bad_days = roi < roi_threshold + roi_margin
+            has_streak = stats_kernel.longest_run(bad_days) >= min_consecutive
+
+            # Меньше 3 дней - восстановление не проверяется (как в _check_no_recovery)
+            last_roi = stats_kernel.tail_mean(roi, 3)
+            no_recovery = np.isnan(last_roi) | (last_roi < recovery_threshold + recovery_margin)
+
+        return np.flatnonzero(has_streak & no_recovery).tolist()
+
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
         Анализ кампаний со стабильным сливом бюджета через SQLAlchemy.
@@ -272,50 +343,51 @@ class WasteCampaignFinder(BaseModule):
 
         # Работа с БД
         with get_db_session() as session:
-            # Сначала получаем список всех кампаний с достаточным расходом
-            campaigns_query = session.query(
+            # Кампании с достаточным средним расходом в день
+            qualified_ids = session.query(
+                CampaignStatsDaily.campaign_id
+            ).filter(
+                CampaignStatsDaily.date >= date_from,
+                CampaignStatsDaily.cost > 0
+            ).group_by(
+                CampaignStatsDaily.campaign_id
+            ).having(
+                func.avg(CampaignStatsDaily.cost) >= min_daily_spend
+            )
+
+            # Дневная статистика всех таких кампаний одним запросом
+            rows = session.query(
+                CampaignStatsDaily.date,
+                CampaignStatsDaily.cost,
+                CampaignStatsDaily.revenue,
+                CampaignStatsDaily.clicks,
+                CampaignStatsDaily.leads,
                 Campaign.internal_id,
                 Campaign.binom_id,
                 Campaign.current_name,
                 Campaign.group_name
             ).join(
-                CampaignStatsDaily,
+                Campaign,
                 Campaign.internal_id == CampaignStatsDaily.campaign_id
             ).filter(
                 CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost > 0
-            ).group_by(
-                Campaign.internal_id
-            ).having(
-                func.avg(CampaignStatsDaily.cost) >= min_daily_spend
-            )
+                CampaignStatsDaily.cost > 0,
+                CampaignStatsDaily.campaign_id.in_(qualified_ids)
+            ).order_by(
+                Campaign.internal_id,
+                CampaignStatsDaily.date
+            ).all()
 
-            campaigns = campaigns_query.all()
+            campaigns, campaign_stats = self._group_by_campaign(rows)
+            candidates = self._screen_candidates(campaign_stats, roi_threshold, consecutive_days, recovery_threshold)
 
-            # Для каждой кампании получаем дневные данные
             waste_campaigns = []
             total_wasted = 0
 
-            for campaign in campaigns:
-                # Получаем дневную статистику
-                daily_query = session.query(
-                    CampaignStatsDaily.date,
-                    CampaignStatsDaily.cost,
-                    CampaignStatsDaily.revenue,
-                    CampaignStatsDaily.clicks,
-                    CampaignStatsDaily.leads
-                ).filter(
-                    CampaignStatsDaily.campaign_id == campaign.internal_id,
-                    CampaignStatsDaily.date >= date_from,
-                    CampaignStatsDaily.cost > 0
-                ).order_by(
-                    CampaignStatsDaily.date
-                )
-
-                daily_stats = daily_query.all()
-
-                if not daily_stats:
-                    continue
+            # Точная проверка только для кампаний, прошедших векторный отбор
+            for position in candidates:
+                campaign = campaigns[position]
+                daily_stats = campaign_stats[position]
 
                 # Проверяем наличие последовательных дней с плохим ROI
                 has_streak, max_streak, avg_bad_roi = self._check_consecutive_negative_days(
@@ -0,0 +1,220 @@
+"""
+Инкрементальный пересчет модулей
+
+Модуль, объявивший окно данных (get_lookback_days) и состояние по кампаниям
+(analyze_campaigns / merge_campaign_states), пересчитывает только кампании,
+строки которых изменились с прошлого запуска. Источник изменений - журнал
+сборщика (services.scheduler.change_log).
+
+Полный пересчет выполняется, если:
+- состояния еще нет или изменились параметры (другой cache_key)
+- окно сдвинулось (наступил новый день - меняется набор дней у всех кампаний)
+- журнал изменений уже очищен после сохраненной версии
+- изменилось слишком много кампаний (полный проход дешевле)
+
+Режим проверки (MODULES_INCREMENTAL_VERIFY=true) после каждого
+инкрементального запуска выполняет полный пересчет и сравнивает результаты.
+"""
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+
+from storage.database.base import get_session
+from storage.database.models import ModuleState as ModuleStateDB
+from .base_module import BaseModule, ModuleConfig, IncrementalPlan
+
+logger = logging.getLogger(__name__)
+
+# Порог, после которого инкрементальный пересчет не выгоден
+MAX_DIRTY_CAMPAIGNS = 500
+MAX_DIRTY_SHARE = 0.5
+
+# Допуск при сравнении чисел в режиме проверки
+VERIFY_TOLERANCE = 1e-6
+
+
+@contextmanager
+def get_db_session():
+    """
+    Локальная обертка над get_session() для использования в with.
+    Преобразует генератор в контекстный менеджер.
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        yield session
+    finally:
+        try:
+            next(session_gen)
+        except StopIteration:
+            pass
+
+
+def build_plan(module: BaseModule, config: ModuleConfig) -> IncrementalPlan:
+    """
+    Формирует план пересчета по сохраненному состоянию и журналу изменений.
+
+    Args:
+        module: Экземпляр модуля с поддержкой инкрементального пересчета
+        config: Конфигурация запуска
+
+    Returns:
+        IncrementalPlan: полный или инкрементальный план
+    """
+    from services.scheduler.change_log import get_changes_since, get_data_version
+
+    module_id = module.metadata.id
+    window_start = date.today() - timedelta(days=module.get_lookback_days(config))
+    cache_key = module.get_cache_key(config)
+
+    saved = _load_state(module_id, cache_key)
+    if saved is None or saved['window_start'] != window_start:
+        reason = "no saved state" if saved is None else "window moved"
+        logger.info(f"Module '{module_id}': full recompute ({reason})")
+        return IncrementalPlan(window_start=window_start, data_version=get_data_version())
+
+    dirty, version = get_changes_since(saved['data_version'], date_from=window_start)
+    if dirty is None:
+        return IncrementalPlan(window_start=window_start, data_version=version)
+
+    previous_states = saved['states']
+    if len(dirty) > MAX_DIRTY_CAMPAIGNS or len(dirty) > len(previous_states) * MAX_DIRTY_SHARE > 0:
+        logger.info(f"Module '{module_id}': full recompute ({len(dirty)} changed campaigns)")
+        return IncrementalPlan(window_start=window_start, data_version=version)
+
+    logger.info(
+        f"Module '{module_id}': incremental recompute of {len(dirty)} campaigns "
+        f"(data version {saved['data_version']} -> {version})"
+    )
+    return IncrementalPlan(
+        window_start=window_start,
+        data_version=version,
+        dirty_campaign_ids=sorted(dirty),
+        previous_states=previous_states
+    )
+
+
+def save_state(module: BaseModule, config: ModuleConfig, plan: IncrementalPlan) -> None:
+    """
+    Сохраняет состояние по кампаниям после успешного запуска.
+
+    Args:
+        module: Экземпляр модуля
+        config: Конфигурация запуска
+        plan: Выполненный план (с заполненным states)
+    """
+    module_id = module.metadata.id
+    cache_key = module.get_cache_key(config)
+    # JSON хранит ключи строками
+    states = {str(campaign_id): state for campaign_id, state in plan.states.items()}
+
+    try:
+        with get_db_session() as session:
+            entry = session.query(ModuleStateDB).filter(
+                ModuleStateDB.module_id == module_id,
+                ModuleStateDB.cache_key == cache_key
+            ).first()
+
+            if entry is None:
+                entry = ModuleStateDB(module_id=module_id, cache_key=cache_key)
+                session.add(entry)
+
+            entry.window_start = plan.window_start
+            entry.data_version = plan.data_version
+            entry.states = states
+            session.commit()
+            logger.debug(f"State saved for module '{module_id}': {len(states)} campaigns, v{plan.data_version}")
+    except Exception as e:
+        logger.error(f"Error saving state for module '{module_id}': {e}")
+
+
+def clear_state(module_id: Optional[str] = None) -> int:
+    """
+    Удаляет сохраненные состояния (следующий запуск будет полным).
+
+    Args:
+        module_id: ID модуля (None - все модули)
+
+    Returns:
+        int: Количество удаленных записей
+    """
+    try:
+        with get_db_session() as session:
+            query = session.query(ModuleStateDB)
+            if module_id:
+                query = query.filter(ModuleStateDB.module_id == module_id)
+            count = query.delete()
+            session.commit()
+            return count
+    except Exception as e:
+        logger.error(f"Error clearing module state: {e}")
+        return 0
+
+
+def _load_state(module_id: str, cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Загружает сохраненное состояние модуля.
+
+    Returns:
+        Dict с window_start, data_version, states (ключи - int) или None
+    """
+    try:
+        with get_db_session() as session:
+            entry = session.query(ModuleStateDB).filter(
+                ModuleStateDB.module_id == module_id,
+                ModuleStateDB.cache_key == cache_key
+            ).first()
+
+            if entry is None:
+                return None
+
+            return {
+                'window_start': entry.window_start,
+                'data_version': entry.data_version or 0,
+                'states': {int(campaign_id): state for campaign_id, state in (entry.states or {}).items()}
+            }
+    except Exception as e:
+        logger.error(f"Error loading state for module '{module_id}': {e}")
+        return None
+
+
+def compare_results(incremental: Any, full: Any, path: str = "data") -> List[str]:
+    """
+    Сравнивает результат инкрементального и полного пересчета.
+
+    Числа сравниваются с допуском VERIFY_TOLERANCE, остальное - на равенство.
+
+    Args:
+        incremental: Данные инкрементального запуска
+        full: Данные полного пересчета
+        path: Путь для сообщений о расхождениях
+
+    Returns:
+        List[str]: Пути, по которым результаты расходятся (пустой - совпадают)
+    """
+    if isinstance(incremental, dict) and isinstance(full, dict):
+        mismatches = []
+        for key in sorted(set(incremental) | set(full), key=str):
+            if key not in incremental or key not in full:
+                mismatches.append(f"{path}.{key}: missing")
+                continue
+            mismatches.extend(compare_results(incremental[key], full[key], f"{path}.{key}"))
+        return mismatches
+
+    if isinstance(incremental, list) and isinstance(full, list):
+        if len(incremental) != len(full):
+            return [f"{path}: length {len(incremental)} != {len(full)}"]
+        mismatches = []
+        for index, (left, right) in enumerate(zip(incremental, full)):
+            mismatches.extend(compare_results(left, right, f"{path}[{index}]"))
+        return mismatches
+
+    numeric = (int, float)
+    if isinstance(incremental, numeric) and isinstance(full, numeric) \
+            and not isinstance(incremental, bool) and not isinstance(full, bool):
+        if abs(incremental - full) <= VERIFY_TOLERANCE * max(1.0, abs(full)):
+            return []
+        return [f"{path}: {incremental} != {full}"]
+
+    return [] if incremental == full else [f"{path}: {incremental!r} != {full!r}"]
@@ -0,0 +1,198 @@
+"""
+Манифест модулей аналитики
+
+modules/manifest.json - декларативный список модулей: ID -> путь импорта класса,
+метаданные и расписание по умолчанию. Реестр регистрирует модули по манифесту
+без импорта их кода; класс импортируется при первом get_module_instance().
+
+Путь импорта задается относительно пакета modules: "critical_alerts.bleeding_detector:BleedingCampaignDetector".
+
+Добавление нового модуля:
+    1. Добавить запись с import_path в manifest.json (metadata можно оставить пустым)
+    2. Обновить метаданные: python -m modules.manifest --update
+
+Проверка актуальности (метаданные в манифесте совпадают с классами):
+    python -m modules.manifest --check
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field
+
+from .base_module import BaseModule, ModuleMetadata
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = Path(__file__).resolve().parent / "manifest.json"
+
+
+class ModuleManifestEntry(BaseModel):
+    """Запись манифеста модуля"""
+    import_path: str = Field(..., description="Путь к классу: '<подмодуль>:<класс>' относительно пакета modules")
+    metadata: ModuleMetadata = Field(..., description="Метаданные модуля")
+    default_schedule: str = Field(default="", description="Расписание по умолчанию (cron, пусто - не запускать)")
+
+
+def import_module_class(import_path: str) -> Type[BaseModule]:
+    """
+    Импортирует класс модуля по пути из манифеста.
+
+    Args:
+        import_path: '<подмодуль>:<класс>', например 'stability.consistency_scorer:ConsistencyScorer'
+
+    Returns:
+        Type[BaseModule]: Класс модуля
+
+    Raises:
+        ImportError: Если модуль или класс не найден
+    """
+    module_path, _, class_name = import_path.partition(":")
+    if not module_path or not class_name:
+        raise ImportError(f"Invalid module import path: '{import_path}'")
+
+    module = importlib.import_module(f".{module_path}", __package__)
+    module_class = getattr(module, class_name, None)
+    if module_class is None:
+        raise ImportError(f"Class '{class_name}' not found in '{module.__name__}'")
+    return module_class
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> List[ModuleManifestEntry]:
+    """
+    Читает манифест модулей.
+
+    Args:
+        path: Путь к manifest.json
+
+    Returns:
+        List[ModuleManifestEntry]: Записи в порядке манифеста
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [ModuleManifestEntry(**entry) for entry in data["modules"]]
+
+
+def build_entry(import_path: str) -> ModuleManifestEntry:
+    """
+    Строит запись манифеста по классу модуля (импортирует модуль).
+
+    Args:
+        import_path: Путь к классу
+
+    Returns:
+        ModuleManifestEntry: Актуальная запись
+    """
+    instance = import_module_class(import_path)()
+    return ModuleManifestEntry(
+        import_path=import_path,
+        metadata=instance.metadata,
+        default_schedule=instance.get_default_config().schedule or ""
+    )
+
+
+def check_manifest(path: Path = MANIFEST_PATH) -> List[str]:
+    """
+    Сверяет манифест с классами модулей.
+
+    Returns:
+        List[str]: Описание расхождений (пустой - манифест актуален)
+    """
+    problems = []
+    seen_ids = set()
+
+    for entry in load_manifest(path):
+        module_id = entry.metadata.id
+        if module_id in seen_ids:
+            problems.append(f"{module_id}: duplicate id")
+        seen_ids.add(module_id)
+
+        try:
+            actual = build_entry(entry.import_path)
+        except Exception as e:
+            problems.append(f"{entry.import_path}: import failed ({e})")
+            continue
+
+        if actual.metadata != entry.metadata:
+            problems.append(f"{module_id}: metadata outdated")
+        if actual.default_schedule != entry.default_schedule:
+            problems.append(f"{module_id}: default_schedule outdated")
+
+    return problems
+
+
+def update_manifest(path: Path = MANIFEST_PATH) -> int:
+    """
+    Перестраивает метаданные всех записей манифеста из классов модулей.
+
+    Порядок записей и import_path сохраняются.
+
+    Returns:
+        int: Количество модулей в манифесте
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        import_paths = [entry["import_path"] for entry in json.load(f)["modules"]]
+
+    entries = [build_entry(import_path).model_dump(mode="json") for import_path in import_paths]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"modules": entries}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    return len(entries)
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Создает __getattr__ для пакета категории (PEP 562).
+
+    Классы модулей импортируются при первом обращении, поэтому импорт одного
+    модуля категории не тянет за собой все остальные.
+
+    Args:
+        package: __name__ пакета категории
+        exports: имя класса -> подмодуль ('.bleeding_detector')
+
+    Returns:
+        Функция __getattr__ для пакета
+    """
+    def __getattr__(name: str) -> Any:
+        if name in exports:
+            return getattr(importlib.import_module(exports[name], package), name)
+        raise AttributeError(f"module '{package}' has no attribute '{name}'")
+
+    return __getattr__
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа CLI"""
+    parser = argparse.ArgumentParser(description='Check or update modules/manifest.json')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--check', action='store_true', help='Verify manifest matches module classes')
+    group.add_argument('--update', action='store_true', help='Regenerate metadata from module classes')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.update:
+        count = update_manifest()
+        print(f"Manifest updated: {count} modules")
+        return 0
+
+    problems = check_manifest()
+    for problem in problems:
+        print(f"[OUTDATED] {problem}")
+    if problems:
+        print("Run: python -m modules.manifest --update")
+        return 1
+
+    print("Manifest is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
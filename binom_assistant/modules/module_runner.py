@@ -2,10 +2,13 @@
 Запуск и управление модулями
 """
 import logging
-from typing import Optional
+import time
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
 
+from config import get_config
 from storage.database.base import get_session
 from storage.database.models import (
     ModuleConfig as ModuleConfigDB,
@@ -14,9 +17,14 @@ from storage.database.models import (
 )
 from .base_module import BaseModule, ModuleConfig, ModuleResult
 from .registry import get_registry
+from . import incremental
 
 logger = logging.getLogger(__name__)
 
+# Ограничения перебора параметров (run_module_sweep)
+MAX_SWEEP_CONFIGS = 20
+SWEEP_WORKERS = 4
+
 
 @contextmanager
 def get_db_session():
@@ -46,17 +54,42 @@ class ModuleRunner:
     - Кэширование результатов
     - Сохранение истории запусков
     - Загрузка конфигурации из БД
+    - Инкрементальный пересчет (только изменившиеся кампании)
+    - Отложенные фазы результата (графики и рекомендации строятся при первом просмотре)
+    - Перебор параметров по одной загрузке данных (run_module_sweep)
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        incremental: Optional[bool] = None,
+        verify_incremental: Optional[bool] = None,
+        lazy_phases: Optional[bool] = None
+    ):
+        """
+        Args:
+            incremental: Разрешить инкрементальный пересчет (по умолчанию из MODULES_INCREMENTAL)
+            verify_incremental: Сверять инкрементальный результат с полным пересчетом
+                (по умолчанию из MODULES_INCREMENTAL_VERIFY)
+            lazy_phases: Разрешить откладывать графики и рекомендации фоновых запусков
+                (по умолчанию из MODULES_LAZY_PHASES)
+        """
+        app_config = get_config()
+
         self.registry = get_registry()
+        self.incremental = app_config.get("modules.incremental", True) if incremental is None else incremental
+        self.verify_incremental = (
+            app_config.get("modules.incremental_verify", False)
+            if verify_incremental is None else verify_incremental
+        )
+        self.lazy_phases = app_config.get("modules.lazy_phases", True) if lazy_phases is None else lazy_phases
         logger.info("ModuleRunner initialized")
 
     def run_module(
         self,
         module_id: str,
         config: Optional[ModuleConfig] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        materialize: bool = True
     ) -> ModuleResult:
         """
         Запускает модуль по ID.
@@ -65,6 +98,9 @@ class ModuleRunner:
             module_id: ID модуля
             config: Конфигурация (опционально)
             use_cache: Использовать кэш
+            materialize: Строить графики и рекомендации сразу. Фоновые запуски
+                передают False: фазы строятся при первом запросе результатов
+                (materialize_run_results) и сохраняются в запуске
 
         Returns:
             ModuleResult: Результат выполнения
@@ -81,16 +117,23 @@ class ModuleRunner:
         if config is None:
             config = self._load_config(module_id) or module.config
 
+        materialize = materialize or not self.lazy_phases
+
         # Проверяем кэш
         if use_cache:
             cached_result = self._get_from_cache(module, config)
             if cached_result:
                 logger.info(f"Module '{module_id}' result loaded from cache")
+                if materialize:
+                    cached_result = self.materialize_result(module, cached_result)
                 return cached_result
 
         # Запускаем модуль
         logger.info(f"Running module '{module_id}'...")
-        result = module.run(config)
+        if self.incremental and module.supports_incremental:
+            result = self._run_incremental(module, config, materialize)
+        else:
+            result = module.run(config, materialize=materialize)
         logger.info(f"Module '{module_id}' completed with status: {result.status}")
 
         # Сохраняем результат в БД (с параметрами)
@@ -106,6 +149,190 @@ class ModuleRunner:
 
         return result
 
+    def run_module_sweep(
+        self,
+        module_id: str,
+        params_sets: List[Dict[str, Any]],
+        include_data: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Считает модуль для нескольких наборов параметров и сравнивает результаты.
+
+        Модули с поддержкой перебора (supports_sweep) читают данные из БД один раз
+        по самому широкому окну, остальные выполняют analyze() для каждого набора.
+        Наборы считаются параллельно. Запуски не сохраняются в историю и кэш.
+
+        Args:
+            module_id: ID модуля
+            params_sets: Наборы параметров (поверх сохраненной конфигурации модуля)
+            include_data: Включить полные данные analyze() в строки таблицы
+
+        Returns:
+            Dict: таблица сравнения (rows) с параметрами и summary каждого набора
+
+        Raises:
+            ValueError: Если модуль не найден или наборов нет / слишком много
+        """
+        module = self.registry.get_module_instance(module_id)
+        if not module:
+            raise ValueError(f"Module '{module_id}' not found in registry")
+        if not params_sets:
+            raise ValueError("At least one parameter set is required")
+        if len(params_sets) > MAX_SWEEP_CONFIGS:
+            raise ValueError(f"Too many parameter sets: {len(params_sets)} (max {MAX_SWEEP_CONFIGS})")
+
+        base_config = self._load_config(module_id) or module.get_default_config()
+        configs = [
+            base_config.model_copy(update={'params': {**base_config.params, **params}})
+            for params in params_sets
+        ]
+
+        started = time.perf_counter()
+        shared_data = None
+        if module.supports_sweep:
+            shared_data = module.fetch_shared_data(configs)
+        fetch_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        def evaluate(config: ModuleConfig) -> Dict[str, Any]:
+            config_started = time.perf_counter()
+            if shared_data is not None:
+                data = module.analyze_shared(config, shared_data)
+            else:
+                data = module.analyze(config)
+            return {'data': data, 'execution_time_ms': round((time.perf_counter() - config_started) * 1000, 1)}
+
+        executor = ThreadPoolExecutor(max_workers=min(SWEEP_WORKERS, len(configs)))
+        try:
+            futures = [executor.submit(evaluate, config) for config in configs]
+            wait(futures, timeout=base_config.timeout_seconds)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        rows = []
+        for index, (params, future) in enumerate(zip(params_sets, futures)):
+            row = {
+                'index': index,
+                'params': params,
+                'status': 'success',
+                'execution_time_ms': None,
+                'summary': None,
+                'error': None
+            }
+            if not future.done():
+                row.update(status='timeout', error=f"Exceeded timeout of {base_config.timeout_seconds}s")
+            elif future.exception() is not None:
+                row.update(status='error', error=str(future.exception()))
+            else:
+                outcome = future.result()
+                row['execution_time_ms'] = outcome['execution_time_ms']
+                row['summary'] = outcome['data'].get('summary')
+                if include_data:
+                    row['data'] = outcome['data']
+            rows.append(row)
+
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"Module '{module_id}' sweep: {len(configs)} parameter sets in {total_ms}ms "
+            f"(shared fetch: {shared_data is not None}, fetch {fetch_ms}ms)"
+        )
+
+        return {
+            'module_id': module_id,
+            'shared_fetch': shared_data is not None,
+            'fetch_ms': fetch_ms,
+            'total_ms': total_ms,
+            'varying_params': sorted({
+                key for params in params_sets for key in params
+                if len({repr(p.get(key)) for p in params_sets}) > 1
+            }),
+            'rows': rows
+        }
+
+    def _run_incremental(self, module: BaseModule, config: ModuleConfig, materialize: bool = True) -> ModuleResult:
+        """
+        Запускает модуль с пересчетом только изменившихся кампаний.
+
+        В режиме проверки инкрементальный результат сверяется с полным
+        пересчетом; при расхождении используется полный результат.
+        """
+        module_id = module.metadata.id
+        plan = incremental.build_plan(module, config)
+        result = module.run(config, plan, materialize=materialize)
+
+        if result.status != "success":
+            return result
+
+        if self.verify_incremental and not plan.is_full:
+            full_plan = incremental.IncrementalPlan(
+                window_start=plan.window_start,
+                data_version=plan.data_version
+            )
+            full_result = module.run(config, full_plan, materialize=materialize)
+
+            if full_result.status == "success":
+                mismatches = incremental.compare_results(result.data, full_result.data)
+                if mismatches:
+                    logger.error(
+                        f"Module '{module_id}': incremental result differs from full recompute "
+                        f"in {len(mismatches)} places, first: {mismatches[:5]}"
+                    )
+                    result, plan = full_result, full_plan
+                else:
+                    logger.info(f"Module '{module_id}': incremental result verified against full recompute")
+
+        incremental.save_state(module, config, plan)
+        return result
+
+    def materialize_result(self, module: BaseModule, result: ModuleResult) -> ModuleResult:
+        """
+        Достраивает отложенные фазы результата (графики и рекомендации).
+
+        Args:
+            module: Экземпляр модуля
+            result: Результат запуска
+
+        Returns:
+            ModuleResult: Результат с построенными фазами (тот же объект, если уже построены)
+        """
+        if result.materialized or result.status != "success":
+            return result
+
+        phases = module.materialize_phases(result.data)
+        return result.model_copy(update={
+            'charts': phases['charts'],
+            'recommendations': phases['recommendations'],
+            'materialized': True
+        })
+
+    def materialize_run_results(self, module_id: str, results: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Достраивает отложенные фазы сохраненного запуска (ModuleRun.results).
+
+        Вызывающий сохраняет возвращенный словарь в запуск, поэтому фазы
+        строятся один раз на запуск.
+
+        Args:
+            module_id: ID модуля
+            results: Сохраненный результат запуска
+
+        Returns:
+            Optional[Dict]: Обновленный результат или None, если достраивать нечего
+        """
+        # Запуски до появления отложенных фаз не содержат флага - они построены полностью
+        if not results or results.get('materialized', True):
+            return None
+
+        module = self.registry.get_module_instance(module_id)
+        if not module:
+            return None
+
+        result = self.materialize_result(module, ModuleResult(**results))
+        logger.info(
+            f"Module '{module_id}': materialized {len(result.charts)} charts, "
+            f"{len(result.recommendations)} recommendations on demand"
+        )
+        return result.model_dump(mode='json')
+
     def _load_config(self, module_id: str) -> Optional[ModuleConfig]:
         """
         Загружает конфигурацию модуля из БД.
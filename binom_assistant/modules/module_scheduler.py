@@ -15,6 +15,7 @@ from storage.database.models import ModuleConfig as ModuleConfigDB
 from .module_runner import ModuleRunner
 from .base_module import ModuleConfig
 from config import get_config
+from services.scheduler.orchestrator import is_event_mode
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +82,12 @@ class ModuleScheduler:
         logger.info("Setting up module scheduled jobs...")
         logger.info("=" * 60)
 
+        # В event режиме модули запускает оркестратор после сбора данных,
+        # расписание модуля определяет только, когда модуль "созрел"
+        if is_event_mode():
+            logger.info("Event orchestration mode: modules run in post-collection waves, cron jobs not added")
+            return
+
         job_count = 0
         skipped_count = 0
 
@@ -203,6 +210,10 @@ class ModuleScheduler:
         except Exception:
             pass  # Задачи могло не быть
 
+        if is_event_mode():
+            logger.info(f"Module '{module_id}' schedule updated (event mode, runs after data collection)")
+            return
+
         # Добавляем новую задачу если модуль enabled и есть расписание
         if enabled and schedule and schedule.strip():
             self._add_module_job(
@@ -313,7 +324,8 @@ class ModuleScheduler:
             result = self.runner.run_module(
                 module_id=module_id,
                 config=None,  # Загрузится из БД с полными настройками
-                use_cache=False  # Для автозапуска не используем кэш
+                use_cache=False,  # Для автозапуска не используем кэш
+                materialize=False  # Графики и рекомендации - при открытии результатов
             )
 
             if result.status == 'success':
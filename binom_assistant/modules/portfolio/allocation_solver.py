@@ -0,0 +1,176 @@
+"""
+Решатель распределения бюджета между кампаниями (budget_optimizer)
+
+Модель отклика: дневная выручка кампании r(x) = a * x^b, где x - дневной расход,
+0 < b < 1 - эластичность (убывающая отдача от увеличения бюджета).
+b оценивается по истории кампании регрессией log(revenue) на log(cost)
+по дням, a калибруется так, чтобы кривая проходила через текущую точку
+(средний дневной расход, средняя дневная выручка).
+
+Задача:
+    max  sum(r_i(x_i) - x_i)
+    при  lower_i <= x_i <= upper_i,  sum(x_i) <= budget
+
+Решение по условиям KKT: x_i(λ) = clip((a_i * b_i / (1 + λ)) ^ (1 / (1 - b_i)), lower_i, upper_i),
+где λ >= 0 - теневая цена бюджета (маржинальный ROI последнего доллара).
+λ подбирается бисекцией, каждая итерация - одна векторная операция по всем кампаниям.
+
+Маржинальный ROI кампании: r'(x) - 1 = a * b * x^(b - 1) - 1 (в процентах).
+"""
+from typing import Any, Dict
+
+import numpy as np
+
+# Границы эластичности: b = 1 - линейная отдача (решение вырождается в "все или ничего"),
+# слишком малые b означают, что кампания почти не реагирует на бюджет
+ELASTICITY_MIN = 0.2
+ELASTICITY_MAX = 0.95
+
+# Эластичность для кампаний без достаточной истории
+DEFAULT_ELASTICITY = 0.8
+
+# Минимум дней с расходом и выручкой для оценки эластичности
+MIN_FIT_DAYS = 4
+
+# Бисекция теневой цены
+MAX_ITERATIONS = 200
+RELATIVE_TOLERANCE = 1e-9
+
+
+def fit_elasticity(
+    campaign_index: np.ndarray,
+    cost: np.ndarray,
+    revenue: np.ndarray,
+    n_campaigns: int
+) -> np.ndarray:
+    """
+    Оценивает эластичность выручки по расходу для всех кампаний сразу.
+
+    Наклон регрессии log(revenue) на log(cost) по дням кампании
+    (дни без расхода или без выручки не участвуют).
+
+    Args:
+        campaign_index: Номер кампании для каждой дневной строки
+        cost: Дневной расход
+        revenue: Дневная выручка
+        n_campaigns: Количество кампаний
+
+    Returns:
+        np.ndarray длины n_campaigns в [ELASTICITY_MIN, ELASTICITY_MAX];
+        DEFAULT_ELASTICITY для кампаний без достаточной истории
+    """
+    mask = (cost > 0) & (revenue > 0)
+    index = campaign_index[mask]
+    log_cost = np.log(cost[mask])
+    log_revenue = np.log(revenue[mask])
+
+    counts = np.bincount(index, minlength=n_campaigns)
+    safe_counts = np.maximum(counts, 1)
+    mean_x = np.bincount(index, weights=log_cost, minlength=n_campaigns) / safe_counts
+    mean_y = np.bincount(index, weights=log_revenue, minlength=n_campaigns) / safe_counts
+
+    dx = log_cost - mean_x[index]
+    dy = log_revenue - mean_y[index]
+    sxx = np.bincount(index, weights=dx * dx, minlength=n_campaigns)
+    sxy = np.bincount(index, weights=dx * dy, minlength=n_campaigns)
+
+    fitted = (counts >= MIN_FIT_DAYS) & (sxx > 1e-12)
+    elasticity = np.full(n_campaigns, DEFAULT_ELASTICITY)
+    elasticity[fitted] = sxy[fitted] / sxx[fitted]
+
+    return np.clip(elasticity, ELASTICITY_MIN, ELASTICITY_MAX)
+
+
+def marginal_roi(scale: np.ndarray, elasticity: np.ndarray, spend: np.ndarray) -> np.ndarray:
+    """
+    Маржинальный ROI (%) при расходе spend: прибыль с последнего доллара.
+
+    Args:
+        scale: Коэффициент a модели отклика
+        elasticity: Эластичность b
+        spend: Дневной расход
+
+    Returns:
+        np.ndarray: (a * b * x^(b-1) - 1) * 100; -100 при нулевом расходе без выручки
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        derivative = scale * elasticity * np.power(spend, elasticity - 1)
+    derivative = np.where(scale > 0, derivative, 0.0)
+    return (derivative - 1) * 100
+
+
+def solve_allocation(
+    spend: np.ndarray,
+    revenue: np.ndarray,
+    elasticity: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    budget: float
+) -> Dict[str, Any]:
+    """
+    Распределяет бюджет, максимизируя ожидаемую прибыль портфеля.
+
+    Args:
+        spend: Текущий средний дневной расход кампаний (> 0)
+        revenue: Текущая средняя дневная выручка
+        elasticity: Эластичность кампаний (fit_elasticity)
+        lower: Минимальный дневной расход кампаний
+        upper: Максимальный дневной расход кампаний
+        budget: Ограничение суммарного дневного расхода
+
+    Returns:
+        Dict:
+            allocation - рекомендуемый дневной расход
+            expected_revenue - ожидаемая дневная выручка при allocation
+            marginal_roi_current / marginal_roi - маржинальный ROI (%) до и после
+            shadow_price - маржинальный ROI (%) последнего доллара бюджета
+            budget_bound - ограничение бюджета активно
+            feasible - сумма минимальных расходов укладывается в бюджет
+            iterations - итерации бисекции
+    """
+    scale = revenue / np.power(spend, elasticity)
+    exponent = 1.0 / (1.0 - elasticity)
+
+    def allocate(shadow: float) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            optimum = np.power(scale * elasticity / (1.0 + shadow), exponent)
+        return np.clip(optimum, lower, upper)
+
+    feasible = bool(lower.sum() <= budget)
+    iterations = 0
+    shadow = 0.0
+    allocation = allocate(0.0)
+
+    if not feasible:
+        allocation = lower.copy()
+    elif allocation.sum() > budget:
+        # Верхняя граница λ: удваиваем, пока распределение не уложится в бюджет
+        low, high = 0.0, 1.0
+        while allocate(high).sum() > budget and iterations < MAX_ITERATIONS:
+            low, high = high, high * 2
+            iterations += 1
+
+        while iterations < MAX_ITERATIONS and high - low > RELATIVE_TOLERANCE * max(1.0, high):
+            middle = (low + high) / 2
+            if allocate(middle).sum() > budget:
+                low = middle
+            else:
+                high = middle
+            iterations += 1
+
+        shadow = high
+        allocation = allocate(high)
+
+    with np.errstate(invalid='ignore'):
+        expected_revenue = scale * np.power(allocation, elasticity)
+
+    return {
+        "allocation": allocation,
+        "expected_revenue": np.nan_to_num(expected_revenue),
+        "marginal_roi_current": marginal_roi(scale, elasticity, spend),
+        "marginal_roi": marginal_roi(scale, elasticity, allocation),
+        "shadow_price": shadow * 100,
+        "budget_bound": bool(shadow > 0),
+        "feasible": feasible,
+        "iterations": iterations
+    }
@@ -1,16 +1,19 @@
 """
 Модуль оптимизации бюджета (Budget Optimizer)
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import Float, func, type_coerce
 from contextlib import contextmanager
-import statistics
 import logging
+import time
+
+import numpy as np
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .allocation_solver import fit_elasticity, solve_allocation
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +41,9 @@ class BudgetOptimizer(BaseModule):
 
     Анализирует производительность кампаний и предлагает оптимальное
     перераспределение бюджетов между ними:
-    - Топ кампании по ROI -> рекомендация увеличения бюджета
-    - Худшие кампании -> рекомендация снижения/остановки
+    - Модель выручки с убывающей отдачей, оцененная по истории кампании
+    - Распределение бюджета по маржинальному ROI с ограничениями
+      на общий бюджет и изменение бюджета каждой кампании
     - Расчет потенциального улучшения ROI портфеля
     """
 
@@ -50,8 +54,8 @@ class BudgetOptimizer(BaseModule):
             name="Оптимизация бюджета",
             category="portfolio",
             description="Предлагает оптимальное перераспределение бюджетов между кампаниями",
-            detailed_description="Модуль анализирует ROI, волатильность и риски для каждой кампании, выявляет лучшие и худшие исполнители, и рекомендует перераспределение бюджета для максимизации общего ROI портфеля.",
-            version="1.1.0",
+            detailed_description="Модуль оценивает для каждой кампании отдачу от дополнительного бюджета (эластичность выручки по расходу по дневной истории), учитывает волатильность как риск и распределяет общий бюджет по маржинальному ROI: бюджет переходит от кампаний с низкой отдачей последнего доллара к кампаниям с высокой в пределах допустимого изменения.",
+            version="1.2.0",
             author="Binom Assistant",
             priority="high",
             tags=["budget", "roi", "optimization", "reallocation"]
@@ -70,6 +74,8 @@ class BudgetOptimizer(BaseModule):
                 "max_change_percent": 30,
                 "min_cost": 1.0,  # минимальный расход для анализа
                 "min_clicks": 50,  # минимальное количество кликов
+                "budget_change_percent": 0,  # изменение общего дневного бюджета (%)
+                "min_change_percent": 1,  # минимальное изменение для рекомендации (%)
                 "severity_warning": 10,  # потенциальное улучшение для warning severity (%)
                 "severity_info": 5  # потенциальное улучшение для info severity (%)
             }
@@ -109,6 +115,22 @@ class BudgetOptimizer(BaseModule):
                 "min": 1,
                 "max": 10000,
                 "default": 50
+            },
+            "budget_change_percent": {
+                "label": "Изменение общего бюджета (%)",
+                "description": "Ограничение общего дневного бюджета относительно текущего расхода (0 - только перераспределение)",
+                "type": "number",
+                "min": -50,
+                "max": 100,
+                "default": 0
+            },
+            "min_change_percent": {
+                "label": "Мин. изменение в рекомендации (%)",
+                "description": "Изменения бюджета меньше этого значения не показываются",
+                "type": "number",
+                "min": 0,
+                "max": 50,
+                "default": 1
             }
         }
 
@@ -162,6 +184,8 @@ class BudgetOptimizer(BaseModule):
         max_change_percent = config.params.get("max_change_percent", 30)
         min_cost = config.params.get("min_cost", 1.0)
         min_clicks = config.params.get("min_clicks", 50)
+        budget_change_percent = config.params.get("budget_change_percent", 0)
+        min_change_percent = config.params.get("min_change_percent", 1)
 
         date_from = datetime.now().date() - timedelta(days=days - 1)
         date_to = datetime.now().date()
@@ -169,175 +193,171 @@ class BudgetOptimizer(BaseModule):
         # Работа с БД
         with get_db_session() as session:
             # Получаем все кампании с их статистикой
-            campaigns_data = self._get_campaigns_performance(
+            campaigns_data, elasticity = self._get_campaigns_performance(
                 session, date_from, date_to
             )
 
-            if not campaigns_data:
-                return {
-                    "recommendations": [],
-                    "potential_roi_improvement": 0,
-                    "summary": {
-                        "total_campaigns": 0,
-                        "top_campaigns": 0,
-                        "bottom_campaigns": 0,
-                        "total_current_spend": 0,
-                        "estimated_new_spend": 0
-                    },
-                    "period": {
-                        "days": days,
-                        "date_from": date_from.isoformat(),
-                        "date_to": date_to.isoformat()
-                    }
-                }
-
-            # Фильтруем по минимальному расходу
-            filtered_campaigns = self._filter_noise(campaigns_data, min_cost, min_clicks)
-
-            if not filtered_campaigns:
-                return {
-                    "recommendations": [],
-                    "potential_roi_improvement": 0,
-                    "summary": {
-                        "total_campaigns": 0,
-                        "top_campaigns": 0,
-                        "bottom_campaigns": 0,
-                        "total_current_spend": 0,
-                        "estimated_new_spend": 0
-                    },
-                    "period": {
-                        "days": days,
-                        "date_from": date_from.isoformat(),
-                        "date_to": date_to.isoformat()
-                    }
-                }
-
-            # Генерируем рекомендации
-            recommendations = self._generate_recommendations(
-                filtered_campaigns, max_change_percent, days
-            )
-
-            # Рассчитываем потенциальное улучшение
-            potential_improvement = self._calculate_potential_improvement(
-                filtered_campaigns, recommendations
-            )
-
-            # Подготавливаем summary
-            total_spend = sum(c["daily_spend"] * days for c in filtered_campaigns)
-            estimated_new_spend = self._calculate_estimated_spend(
-                filtered_campaigns, recommendations, days
-            )
-
-            # Получаем настраиваемые пороги severity
-            severity_warning_threshold = config.params.get("severity_warning", 10)
-            severity_info_threshold = config.params.get("severity_info", 5)
+        # Фильтруем по минимальному расходу
+        filtered_campaigns = self._filter_noise(campaigns_data, min_cost, min_clicks)
 
+        if not filtered_campaigns:
             return {
-                "recommendations": recommendations,
-                "potential_roi_improvement": potential_improvement,
+                "recommendations": [],
+                "potential_roi_improvement": 0,
                 "summary": {
-                    "total_campaigns": len(filtered_campaigns),
-                    "top_campaigns": len([r for r in recommendations if r["change_percent"] > 0]),
-                    "bottom_campaigns": len([r for r in recommendations if r["change_percent"] < 0]),
-                    "total_current_spend": round(total_spend, 2),
-                    "estimated_new_spend": round(estimated_new_spend, 2)
+                    "total_campaigns": 0,
+                    "top_campaigns": 0,
+                    "bottom_campaigns": 0,
+                    "total_current_spend": 0,
+                    "estimated_new_spend": 0
                 },
                 "period": {
                     "days": days,
                     "date_from": date_from.isoformat(),
                     "date_to": date_to.isoformat()
-                },
-                "severity_warning": severity_warning_threshold,
-                "severity_info": severity_info_threshold
+                }
             }
 
+        # Оптимальное распределение и рекомендации
+        recommendations, allocation = self._generate_recommendations(
+            filtered_campaigns,
+            elasticity[[c["index"] for c in filtered_campaigns]],
+            max_change_percent,
+            budget_change_percent,
+            min_change_percent
+        )
+
+        # Подготавливаем summary
+        total_spend = sum(c["daily_spend"] * days for c in filtered_campaigns)
+        estimated_new_spend = self._calculate_estimated_spend(
+            filtered_campaigns, recommendations, days
+        )
+
+        # Получаем настраиваемые пороги severity
+        severity_warning_threshold = config.params.get("severity_warning", 10)
+        severity_info_threshold = config.params.get("severity_info", 5)
+
+        return {
+            "recommendations": recommendations,
+            "potential_roi_improvement": allocation.pop("potential_improvement"),
+            "summary": {
+                "total_campaigns": len(filtered_campaigns),
+                "top_campaigns": len([r for r in recommendations if r["change_percent"] > 0]),
+                "bottom_campaigns": len([r for r in recommendations if r["change_percent"] < 0]),
+                "total_current_spend": round(total_spend, 2),
+                "estimated_new_spend": round(estimated_new_spend, 2)
+            },
+            "allocation": allocation,
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat()
+            },
+            "severity_warning": severity_warning_threshold,
+            "severity_info": severity_info_threshold
+        }
+
     def _get_campaigns_performance(
-        self, session, date_from: any, date_to: any
-    ) -> List[Dict[str, Any]]:
+        self, session, date_from: Any, date_to: Any
+    ) -> Tuple[List[Dict[str, Any]], np.ndarray]:
         """
         Получает производительность всех кампаний за период.
 
+        Дневная статистика всех кампаний загружается одним запросом
+        и агрегируется векторно; по тем же дневным точкам оценивается
+        эластичность выручки по расходу.
+
         Args:
             session: DB сессия
             date_from: Начало периода
             date_to: Конец периода
 
         Returns:
-            List[Dict]: Список с метриками кампаний
+            Tuple: список с метриками кампаний (index - позиция в массиве эластичности)
+                   и эластичность всех кампаний с расходом
         """
-        campaigns = session.query(Campaign).all()
-        result = []
+        campaigns = {
+            row.internal_id: row
+            for row in session.query(
+                Campaign.internal_id, Campaign.binom_id, Campaign.current_name
+            ).all()
+        }
 
-        for campaign in campaigns:
-            # Получаем дневную статистику
-            daily_stats = (
-                session.query(CampaignStatsDaily)
-                .filter(
-                    CampaignStatsDaily.campaign_id == campaign.internal_id,
-                    CampaignStatsDaily.date >= date_from,
-                    CampaignStatsDaily.date <= date_to
-                )
-                .all()
+        rows = (
+            session.query(
+                CampaignStatsDaily.campaign_id,
+                func.coalesce(type_coerce(CampaignStatsDaily.cost, Float), 0.0),
+                func.coalesce(type_coerce(CampaignStatsDaily.revenue, Float), 0.0),
+                func.coalesce(CampaignStatsDaily.clicks, 0),
+                func.coalesce(CampaignStatsDaily.leads, 0)
             )
+            .filter(
+                CampaignStatsDaily.date >= date_from,
+                CampaignStatsDaily.date <= date_to
+            )
+            .all()
+        )
 
-            if not daily_stats:
-                continue
-
-            # Агрегируем метрики
-            total_cost = sum(float(s.cost) if s.cost else 0 for s in daily_stats)
-            total_revenue = sum(float(s.revenue) if s.revenue else 0 for s in daily_stats)
-            total_leads = sum(float(s.leads) if s.leads else 0 for s in daily_stats)
-            total_clicks = sum(float(s.clicks) if s.clicks else 0 for s in daily_stats)
-            num_days = len(daily_stats)
+        if not rows:
+            return [], np.zeros(0)
+
+        stats = np.array([tuple(row) for row in rows], dtype=float)
+        campaign_ids, index = np.unique(stats[:, 0].astype(np.int64), return_inverse=True)
+        # Деньги округляются до центов, как Numeric(10, 2) при чтении через ORM
+        cost = np.round(stats[:, 1], 2)
+        revenue = np.round(stats[:, 2], 2)
+        n = len(campaign_ids)
+
+        num_days = np.bincount(index, minlength=n)
+        total_cost = np.bincount(index, weights=cost, minlength=n)
+        total_revenue = np.bincount(index, weights=revenue, minlength=n)
+        total_clicks = np.bincount(index, weights=stats[:, 3], minlength=n)
+        total_leads = np.bincount(index, weights=stats[:, 4], minlength=n)
+
+        # Волатильность ROI: выборочное стандартное отклонение дневного ROI к |среднему|
+        spent = cost > 0
+        spent_index = index[spent]
+        daily_roi = (revenue[spent] - cost[spent]) / cost[spent] * 100
+        roi_days = np.bincount(spent_index, minlength=n)
+        mean_roi = np.bincount(spent_index, weights=daily_roi, minlength=n) / np.maximum(roi_days, 1)
+        squares = np.bincount(spent_index, weights=(daily_roi - mean_roi[spent_index]) ** 2, minlength=n)
+        stdev_roi = np.sqrt(squares / np.maximum(roi_days - 1, 1))
+
+        elasticity = fit_elasticity(index, cost, revenue, n)
 
+        result = []
+        for i, campaign_id in enumerate(campaign_ids.tolist()):
+            campaign = campaigns.get(campaign_id)
             # Пропускаем кампании без расхода
-            if total_cost == 0:
+            if campaign is None or total_cost[i] == 0:
                 continue
 
-            # Рассчитываем ROI
-            roi = ((total_revenue - total_cost) / total_cost) * 100 if total_cost > 0 else 0
-
-            # Волатильность ROI
-            daily_roi_values = []
-            for stat in daily_stats:
-                cost = float(stat.cost) if stat.cost else 0
-                revenue = float(stat.revenue) if stat.revenue else 0
-                if cost > 0:
-                    daily_roi = ((revenue - cost) / cost) * 100
-                    daily_roi_values.append(daily_roi)
-
-            volatility = 0
-            if len(daily_roi_values) > 1:
-                try:
-                    mean_roi = statistics.mean(daily_roi_values)
-                    stdev_roi = statistics.stdev(daily_roi_values)
-                    volatility = (stdev_roi / abs(mean_roi)) * 100 if abs(mean_roi) > 0 else stdev_roi
-                except Exception:
-                    volatility = 0
-
-            # Средневзвешенный CPC/CPL
-            avg_cpc = total_cost / total_clicks if total_clicks > 0 else 0.0
-            avg_cpl = total_cost / total_leads if total_leads > 0 else 0.0
-
-            # Средний дневной расход
-            daily_spend = total_cost / num_days if num_days > 0 else 0
+            volatility = 0.0
+            if roi_days[i] > 1:
+                volatility = stdev_roi[i] / abs(mean_roi[i]) * 100 if mean_roi[i] != 0 else stdev_roi[i]
+
+            cost_i = float(total_cost[i])
+            clicks_i = float(total_clicks[i])
+            leads_i = float(total_leads[i])
 
             result.append({
-                "campaign_id": campaign.internal_id,
+                "index": i,
+                "campaign_id": campaign_id,
+                "binom_id": campaign.binom_id,
                 "name": campaign.current_name,
-                "total_cost": total_cost,
-                "total_revenue": total_revenue,
-                "roi": roi,
-                "volatility": volatility,
-                "daily_spend": daily_spend,
-                "num_days": num_days,
-                "total_clicks": total_clicks,
-                "total_leads": total_leads,
-                "avg_cpc": avg_cpc,
-                "avg_cpl": avg_cpl
+                "total_cost": cost_i,
+                "total_revenue": float(total_revenue[i]),
+                "roi": (float(total_revenue[i]) - cost_i) / cost_i * 100,
+                "volatility": float(volatility),
+                "daily_spend": cost_i / int(num_days[i]),
+                "num_days": int(num_days[i]),
+                "total_clicks": clicks_i,
+                "total_leads": leads_i,
+                "avg_cpc": cost_i / clicks_i if clicks_i > 0 else 0.0,
+                "avg_cpl": cost_i / leads_i if leads_i > 0 else 0.0
             })
 
-        return result
+        return result, elasticity
 
     def _filter_noise(self, campaigns: List[Dict[str, Any]], min_cost: float = 1.0, min_clicks: int = 50) -> List[Dict[str, Any]]:
         """
@@ -356,110 +376,118 @@ class BudgetOptimizer(BaseModule):
             if c["total_cost"] >= min_cost and c["total_clicks"] >= min_clicks
         ]
 
+    def _volatility_factor(self, volatility: float) -> float:
+        """
+        Доля допустимого увеличения бюджета с учетом волатильности.
+
+        Высокая волатильность значительно снижает допустимое увеличение,
+        штраф масштабируется нелинейно.
+        """
+        if volatility > 150:
+            # Критическая волатильность - минимальное увеличение
+            return 0.1
+        elif volatility > 100:
+            # Очень высокая волатильность - сильный штраф
+            return 0.3
+        elif volatility > 50:
+            # Высокая волатильность - средний штраф
+            return 0.6
+        # Низкая волатильность - минимальный штраф
+        return 1.0
+
     def _generate_recommendations(
-        self, campaigns: List[Dict[str, Any]], max_change_percent: float, days: int
-    ) -> List[Dict[str, Any]]:
+        self,
+        campaigns: List[Dict[str, Any]],
+        elasticity: np.ndarray,
+        max_change_percent: float,
+        budget_change_percent: float,
+        min_change_percent: float
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """
         Генерирует рекомендации по перераспределению бюджета.
 
         Логика:
-        1. Сортируем по ROI
-        2. Топ 20% -> рекомендуем увеличить
-        3. Низ 20% -> рекомендуем снизить
-        4. Учитываем волатильность как риск
+        1. Модель выручки с убывающей отдачей по каждой кампании (allocation_solver)
+        2. Границы дневного бюджета: снижение до max_change_percent,
+           увеличение до max_change_percent с учетом волатильности
+        3. Общий дневной бюджет: текущий расход + budget_change_percent
+        4. Бюджет распределяется по маржинальному ROI, рекомендации -
+           изменения не меньше min_change_percent
 
         Args:
             campaigns: Список кампаний с метриками
+            elasticity: Эластичность выручки кампаний
             max_change_percent: Максимальное изменение в %
-            days: Количество дней в периоде
+            budget_change_percent: Изменение общего бюджета в %
+            min_change_percent: Минимальное изменение для рекомендации в %
 
         Returns:
-            List[Dict]: Список рекомендаций
+            Tuple: список рекомендаций и сводка распределения
         """
-        if not campaigns or len(campaigns) < 2:
-            return []
+        spend = np.array([c["daily_spend"] for c in campaigns])
+        revenue = np.array([c["total_revenue"] / c["num_days"] for c in campaigns])
+        volatility_factor = np.array([self._volatility_factor(c["volatility"]) for c in campaigns])
 
-        # Сортируем по ROI
-        sorted_campaigns = sorted(campaigns, key=lambda x: x["roi"], reverse=True)
+        lower = spend * (1 - max_change_percent / 100)
+        upper = spend * (1 + max_change_percent * volatility_factor / 100)
+        budget = float(spend.sum()) * (1 + budget_change_percent / 100)
 
-        # Определяем границы топ и bottom групп
-        num_top = max(1, len(sorted_campaigns) // 5)
-        num_bottom = max(1, len(sorted_campaigns) // 5)
+        started = time.perf_counter()
+        solution = solve_allocation(spend, revenue, elasticity, lower, upper, budget)
+        solver_ms = (time.perf_counter() - started) * 1000
+        change = (solution["allocation"] / spend - 1) * 100
+        applied = np.abs(change) >= min_change_percent
 
-        top_campaigns = sorted_campaigns[:num_top]
-        bottom_campaigns = sorted_campaigns[-num_bottom:]
+        # Прибыль портфеля до и после: применяются только показанные рекомендации
+        new_spend = np.where(applied, solution["allocation"], spend)
+        new_revenue = np.where(applied, solution["expected_revenue"], revenue)
 
         recommendations = []
-
-        # Рекомендации для топ кампаний
-        for campaign in top_campaigns:
-            # ИСПРАВЛЕНО: Более эффективная логика штрафа за волатильность
-            # Высокая волатильность должна значительно снижать рекомендуемое увеличение
-            roi_score = min(campaign["roi"] / 100, 1.0)  # Нормализуем ROI
-
-            # Волатильность > 100% получает максимальный штраф
-            # Штраф масштабируется нелинейно для более сильного эффекта
-            volatility = campaign["volatility"]
-            if volatility > 150:
-                # Критическая волатильность - минимальное увеличение
-                volatility_factor = 0.1
-            elif volatility > 100:
-                # Очень высокая волатильность - сильный штраф
-                volatility_factor = 0.3
-            elif volatility > 50:
-                # Высокая волатильность - средний штраф
-                volatility_factor = 0.6
-            else:
-                # Низкая волатильность - минимальный штраф
-                volatility_factor = 1.0
-
-            change_percent = roi_score * max_change_percent * volatility_factor
-
-            change_percent = min(change_percent, max_change_percent)
-            change_percent = max(change_percent, 5)  # Минимум 5%
-
-            new_daily_spend = campaign["daily_spend"] * (1 + change_percent / 100)
-
-            recommendations.append({
-                "campaign_id": campaign["campaign_id"],
-                "name": campaign["name"],
-                "current_daily_spend": round(campaign["daily_spend"], 2),
-                "recommended_daily_spend": round(new_daily_spend, 2),
-                "change_percent": round(change_percent, 1),
-                "reason": self._get_reason_for_increase(campaign),
-                "current_roi": round(campaign["roi"], 1),
-                "current_volatility": round(campaign["volatility"], 1)
-            })
-
-        # Рекомендации для bottom кампаний
-        for campaign in bottom_campaigns:
-            if campaign in top_campaigns:  # Не добавляем дважды
-                continue
-
-            roi_score = max(campaign["roi"], -100) / 100
-            volatility_risk = campaign["volatility"] / 100
-
-            change_percent = roi_score * max_change_percent + volatility_risk * 5
-            change_percent = max(change_percent, -max_change_percent)
-            change_percent = min(change_percent, -5)  # Минимум -5%
-
-            new_daily_spend = campaign["daily_spend"] * (1 + change_percent / 100)
-
+        for i in np.flatnonzero(applied).tolist():
+            campaign = campaigns[i]
             recommendations.append({
                 "campaign_id": campaign["campaign_id"],
+                "binom_id": campaign["binom_id"],
                 "name": campaign["name"],
                 "current_daily_spend": round(campaign["daily_spend"], 2),
-                "recommended_daily_spend": round(new_daily_spend, 2),
-                "change_percent": round(change_percent, 1),
-                "reason": self._get_reason_for_decrease(campaign),
+                "recommended_daily_spend": round(float(new_spend[i]), 2),
+                "change_percent": round(float(change[i]), 1),
+                "reason": self._get_reason(campaign, float(change[i]), float(solution["marginal_roi_current"][i])),
                 "current_roi": round(campaign["roi"], 1),
-                "current_volatility": round(campaign["volatility"], 1)
+                "current_volatility": round(campaign["volatility"], 1),
+                "marginal_roi": round(float(solution["marginal_roi_current"][i]), 1),
+                "marginal_roi_after": round(float(solution["marginal_roi"][i]), 1),
+                "elasticity": round(float(elasticity[i]), 2)
             })
 
         # Сортируем по величине изменения (убывание)
         recommendations.sort(key=lambda x: abs(x["change_percent"]), reverse=True)
 
-        return recommendations
+        allocation = {
+            "daily_budget": round(budget, 2),
+            "budget_change_percent": budget_change_percent,
+            "budget_bound": bool(solution["budget_bound"]),
+            "feasible": bool(solution["feasible"]),
+            "shadow_price": round(float(solution["shadow_price"]), 1),
+            "current_daily_profit": round(float(revenue.sum() - spend.sum()), 2),
+            "expected_daily_profit": round(float(new_revenue.sum() - new_spend.sum()), 2),
+            "potential_improvement": self._calculate_potential_improvement(
+                spend, revenue, new_spend, new_revenue
+            ),
+            "iterations": solution["iterations"],
+            "solver_ms": round(solver_ms, 1)
+        }
+
+        return recommendations, allocation
+
+    def _get_reason(self, campaign: Dict[str, Any], change_percent: float, marginal_roi: float) -> str:
+        """Возвращает причину изменения бюджета"""
+        if change_percent > 0:
+            return self._get_reason_for_increase(campaign)
+        if marginal_roi > 0:
+            # Кампания прибыльна на последнем долларе, но уступает другим в рамках общего бюджета
+            return "Ограничение общего бюджета, отдача ниже других кампаний"
+        return self._get_reason_for_decrease(campaign)
 
     def _get_reason_for_increase(self, campaign: Dict[str, Any]) -> str:
         """Возвращает причину для увеличения бюджета"""
@@ -492,66 +520,42 @@ class BudgetOptimizer(BaseModule):
             return "Низкая производительность"
 
     def _calculate_potential_improvement(
-        self, campaigns: List[Dict[str, Any]], recommendations: List[Dict[str, Any]]
+        self,
+        spend: np.ndarray,
+        revenue: np.ndarray,
+        new_spend: np.ndarray,
+        new_revenue: np.ndarray
     ) -> float:
         """
         Рассчитывает потенциальное улучшение ROI портфеля.
 
+        Новая выручка кампаний берется из модели отклика,
+        а не из допущения о неизменном ROI кампании.
+
         Args:
-            campaigns: Список кампаний
-            recommendations: Список рекомендаций
+            spend: Текущий дневной расход кампаний
+            revenue: Текущая дневная выручка кампаний
+            new_spend: Рекомендуемый дневной расход
+            new_revenue: Ожидаемая дневная выручка при новом расходе
 
         Returns:
             float: Потенциальное улучшение в %
         """
-        if not campaigns or not recommendations:
+        total_cost = float(spend.sum())
+        new_total_cost = float(new_spend.sum())
+        if total_cost == 0 or new_total_cost == 0:
             return 0
 
-        # Текущий средневзвешенный ROI
-        total_cost = sum(c["total_cost"] for c in campaigns)
-        if total_cost == 0:
-            return 0
-
-        current_weighted_roi = sum(
-            c["roi"] * c["total_cost"] for c in campaigns
-        ) / total_cost
-
-        # ИСПРАВЛЕНО: Используем правильный расчет взвешенного ROI
-        # ROI кампании остается неизменным, меняется только ее вес в портфеле
-
-        # Создаем словарь рекомендаций для быстрого доступа
-        rec_dict = {r["campaign_id"]: r for r in recommendations}
-
-        # Для каждой кампании рассчитываем новую стоимость
-        new_campaigns_cost = {}
-        for campaign in campaigns:
-            if campaign["campaign_id"] in rec_dict:
-                rec = rec_dict[campaign["campaign_id"]]
-                # Новая стоимость = текущая стоимость * коэффициент изменения
-                change_factor = 1 + rec["change_percent"] / 100
-                new_cost = campaign["total_cost"] * change_factor
-                new_campaigns_cost[campaign["campaign_id"]] = new_cost
-            else:
-                new_campaigns_cost[campaign["campaign_id"]] = campaign["total_cost"]
-
-        # Рассчитываем новый взвешенный ROI правильно
-        # Новый взвешенный ROI = сумма(ROI_i * новая_стоимость_i) / сумма(новая_стоимость_i)
-        new_total_cost = sum(new_campaigns_cost.values())
-        if new_total_cost > 0:
-            new_weighted_roi = sum(
-                c["roi"] * new_campaigns_cost[c["campaign_id"]]
-                for c in campaigns
-            ) / new_total_cost
-        else:
-            new_weighted_roi = current_weighted_roi
+        current_roi = (float(revenue.sum()) - total_cost) / total_cost * 100
+        new_roi = (float(new_revenue.sum()) - new_total_cost) / new_total_cost * 100
 
         # Рассчитываем улучшение
-        if abs(current_weighted_roi) > 0:
-            improvement = ((new_weighted_roi - current_weighted_roi) / abs(current_weighted_roi)) * 100
+        if abs(current_roi) > 0:
+            improvement = ((new_roi - current_roi) / abs(current_roi)) * 100
         else:
-            improvement = new_weighted_roi * 100 if new_weighted_roi != 0 else 0
+            improvement = new_roi * 100 if new_roi != 0 else 0
 
-        return max(improvement, 0)  # Не показываем отрицательные значения
+        return round(max(improvement, 0), 2)  # Не показываем отрицательные значения
 
     def _calculate_estimated_spend(
         self, campaigns: List[Dict[str, Any]], recommendations: List[Dict[str, Any]], days: int
@@ -3,31 +3,9 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-from collections import defaultdict
-import statistics
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .rollup import get_portfolio_rollup, hhi
 
 
 class DiversificationScore(BaseModule):
@@ -155,178 +133,90 @@ class DiversificationScore(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=days - 1)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # ИСПРАВЛЕНО: Запрашиваем ts_name как источник трафика
-            # Получаем все кампании с данными за период
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                Campaign.ts_name,  # ИСПРАВЛЕНО: используем ts_name вместо дублирования group_name
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "source": None,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0,
-                "total_a_leads": 0,
-                "days_with_data": 0
-            })
+        rollup = get_portfolio_rollup(date_from, min_cost=min_cost, min_leads=min_leads)
+        campaigns = rollup["campaigns"]
+        portfolio = rollup["portfolio"]
+        sources = rollup["sources"]
+        groups = rollup["groups"]
+        total_portfolio_cost = portfolio["cost"]
+        total_portfolio_revenue = portfolio["revenue"]
+
+        # Определение типа кампании (CPL vs CPA)
+        eligible = campaigns["eligible"]
+        has_revenue = campaigns["revenue"][eligible] > 0
+        a_leads = campaigns["a_leads"][eligible]
+        campaign_types = {
+            "cpl": int((has_revenue & (campaigns["leads"][eligible] > 0) & (a_leads == 0)).sum()),
+            "cpa": int((has_revenue & (a_leads > 0)).sum())
+        }
 
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-                campaigns_data[campaign_id]["source"] = row.ts_name or "Неизвестен"  # ИСПРАВЛЕНО: используем ts_name
-
-                cost = float(row.cost) if row.cost else 0
-                revenue = float(row.revenue) if row.revenue else 0
-                leads = float(row.leads) if row.leads else 0
-                a_leads = float(row.a_leads) if row.a_leads else 0
-
-                campaigns_data[campaign_id]["total_cost"] += cost
-                campaigns_data[campaign_id]["total_revenue"] += revenue
-                campaigns_data[campaign_id]["total_leads"] += leads
-                campaigns_data[campaign_id]["total_a_leads"] += a_leads
-
-                if cost > 0:
-                    campaigns_data[campaign_id]["days_with_data"] += 1
-
-            # Фильтрация и анализ
-            portfolio_campaigns = []
-            source_distribution = defaultdict(float)  # расход по источникам
-            group_distribution = defaultdict(float)   # расход по группам
-            campaign_types = {"cpl": 0, "cpa": 0}
-            total_portfolio_cost = 0
-            total_portfolio_revenue = 0
-
-            for campaign_id, data in campaigns_data.items():
-                # Пропускаем кампании без данных
-                if data["days_with_data"] == 0:
-                    continue
-
-                cost = data["total_cost"]
-                revenue = data["total_revenue"]
-                leads = data["total_leads"]
-                a_leads = data["total_a_leads"]
-
-                # Пропускаем очень маленькие кампании (шум)
-                if cost < min_cost or leads < min_leads:
-                    continue
-
-                total_portfolio_cost += cost
-                total_portfolio_revenue += revenue
-
-                # Распределение по источникам
-                source = data["source"]
-                source_distribution[source] += cost
-
-                # Распределение по группам
-                group = data["group"]
-                group_distribution[group] += cost
-
-                # Определение типа кампании (CPL vs CPA)
-                if a_leads > 0 and revenue > 0:
-                    campaign_types["cpa"] += 1
-                elif leads > 0 and revenue > 0 and a_leads == 0:
-                    campaign_types["cpl"] += 1
-
-                portfolio_campaigns.append({
-                    "campaign_id": campaign_id,
-                    "name": data["name"],
-                    "source": source,
-                    "group": group,
-                    "cost": round(cost, 2),
-                    "revenue": round(revenue, 2),
-                    "type": "CPA" if (a_leads > 0 and revenue > 0) else "CPL" if (leads > 0 and revenue > 0) else "Unknown"
-                })
-
-            # Расчет диверсификации
-            if total_portfolio_cost == 0:
-                return self._get_empty_result(days)
-
-            # 1. Индекс Херфиндаля-Хиршмана (HHI) для источников
-            hhi_sources = self._calculate_hhi(source_distribution, total_portfolio_cost)
-
-            # 2. Top source share (доля самого большого источника)
-            top_source_share = max(source_distribution.values()) / total_portfolio_cost * 100 if source_distribution else 0
-
-            # 3. Top group share (доля самой большой группы)
-            top_group_share = max(group_distribution.values()) / total_portfolio_cost * 100 if group_distribution else 0
-
-            # 4. CPL vs CPA баланс
-            total_types = campaign_types["cpl"] + campaign_types["cpa"]
-            cpl_cpa_balance = (campaign_types["cpa"] / total_types * 100) if total_types > 0 else 50
-
-            # 5. Расчет общего score диверсификации
-            diversification_score = self._calculate_diversification_score(
-                hhi_sources,
-                top_source_share,
-                top_group_share,
-                cpl_cpa_balance,
-                max_single_source_share,
-                max_single_group_share
-            )
-
-            # 6. Определение уровня риска
-            risk_level = self._determine_risk_level(
-                hhi_sources,
-                top_source_share,
-                top_group_share,
-                cpl_cpa_balance,
-                hhi_threshold,
-                critical_source_share
-            )
-
-            return {
-                "diversification_score": round(diversification_score, 1),
-                "hhi_sources": round(hhi_sources, 4),
-                "top_source_share": round(top_source_share, 1),
-                "top_group_share": round(top_group_share, 1),
-                "cpl_cpa_balance": round(cpl_cpa_balance, 1),
-                "risk_level": risk_level,
-                "summary": {
-                    "total_campaigns": len(portfolio_campaigns),
-                    "unique_sources": len(source_distribution),
-                    "unique_groups": len(group_distribution),
-                    "cpa_campaigns": campaign_types["cpa"],
-                    "cpl_campaigns": campaign_types["cpl"],
-                    "total_cost": round(total_portfolio_cost, 2),
-                    "total_revenue": round(total_portfolio_revenue, 2)
-                },
-                "distributions": {
-                    "sources": {k: round(v / total_portfolio_cost * 100, 1) for k, v in sorted(source_distribution.items(), key=lambda x: x[1], reverse=True)[:5]},
-                    "groups": {k: round(v / total_portfolio_cost * 100, 1) for k, v in sorted(group_distribution.items(), key=lambda x: x[1], reverse=True)[:5]}
-                },
-                "period": {
-                    "days": days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat()
-                }
+        # Расчет диверсификации
+        if total_portfolio_cost == 0:
+            return self._get_empty_result(days)
+
+        # Расход по источникам и группам
+        source_distribution = dict(zip(sources["names"], sources["cost"].tolist()))
+        group_distribution = dict(zip(groups["names"], groups["cost"].tolist()))
+
+        # 1. Индекс Херфиндаля-Хиршмана (HHI) для источников (не больше 1)
+        hhi_sources = min(hhi(sources["cost_share"]), 1.0)
+
+        # 2. Top source share (доля самого большого источника)
+        top_source_share = max(source_distribution.values()) / total_portfolio_cost * 100 if source_distribution else 0
+
+        # 3. Top group share (доля самой большой группы)
+        top_group_share = max(group_distribution.values()) / total_portfolio_cost * 100 if group_distribution else 0
+
+        # 4. CPL vs CPA баланс
+        total_types = campaign_types["cpl"] + campaign_types["cpa"]
+        cpl_cpa_balance = (campaign_types["cpa"] / total_types * 100) if total_types > 0 else 50
+
+        # 5. Расчет общего score диверсификации
+        diversification_score = self._calculate_diversification_score(
+            hhi_sources,
+            top_source_share,
+            top_group_share,
+            cpl_cpa_balance,
+            max_single_source_share,
+            max_single_group_share
+        )
+
+        # 6. Определение уровня риска
+        risk_level = self._determine_risk_level(
+            hhi_sources,
+            top_source_share,
+            top_group_share,
+            cpl_cpa_balance,
+            hhi_threshold,
+            critical_source_share
+        )
+
+        return {
+            "diversification_score": round(diversification_score, 1),
+            "hhi_sources": round(hhi_sources, 4),
+            "top_source_share": round(top_source_share, 1),
+            "top_group_share": round(top_group_share, 1),
+            "cpl_cpa_balance": round(cpl_cpa_balance, 1),
+            "risk_level": risk_level,
+            "summary": {
+                "total_campaigns": portfolio["campaigns"],
+                "unique_sources": len(source_distribution),
+                "unique_groups": len(group_distribution),
+                "cpa_campaigns": campaign_types["cpa"],
+                "cpl_campaigns": campaign_types["cpl"],
+                "total_cost": round(total_portfolio_cost, 2),
+                "total_revenue": round(total_portfolio_revenue, 2)
+            },
+            "distributions": {
+                "sources": {k: round(v / total_portfolio_cost * 100, 1) for k, v in sorted(source_distribution.items(), key=lambda x: x[1], reverse=True)[:5]},
+                "groups": {k: round(v / total_portfolio_cost * 100, 1) for k, v in sorted(group_distribution.items(), key=lambda x: x[1], reverse=True)[:5]}
+            },
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
             }
+        }
 
     def _get_empty_result(self, days: int) -> Dict[str, Any]:
         """Возвращает пустой результат когда нет данных"""
@@ -357,26 +247,6 @@ class DiversificationScore(BaseModule):
             }
         }
 
-    def _calculate_hhi(self, distribution: Dict[str, float], total: float) -> float:
-        """
-        Расчет индекса Херфиндаля-Хиршмана (HHI).
-
-        HHI = сумма (доля_i ^ 2)
-        HHI от 0 (идеальная диверсификация) до 1 (полная концентрация)
-
-        Args:
-            distribution: Словарь распределения по категориям
-            total: Общая сумма
-
-        Returns:
-            float: HHI индекс от 0 до 1
-        """
-        if total == 0:
-            return 0.5
-
-        hhi = sum((value / total) ** 2 for value in distribution.values())
-        return min(hhi, 1.0)  # HHI не может быть больше 1
-
     def _calculate_diversification_score(
         self,
         hhi_sources: float,
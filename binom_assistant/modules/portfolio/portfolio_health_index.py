@@ -3,31 +3,13 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-from collections import defaultdict
 import statistics
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
-from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
+import numpy as np
 
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .. import stats_kernel
+from .rollup import get_portfolio_rollup, hhi
 
 
 class PortfolioHealthIndex(BaseModule):
@@ -206,214 +188,102 @@ class PortfolioHealthIndex(BaseModule):
         # Исключаем сегодняшний день (апрувы приходят с задержкой)
         date_from = datetime.now().date() - timedelta(days=days)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем все кампании с данными за период
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0,
-                "total_a_leads": 0,
-                "daily_stats": [],
-                "days_with_data": 0
-            })
-
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-
-                cost = float(row.cost) if row.cost else 0
-                revenue = float(row.revenue) if row.revenue else 0
-                leads = float(row.leads) if row.leads else 0
-                a_leads = float(row.a_leads) if row.a_leads else 0
-
-                campaigns_data[campaign_id]["total_cost"] += cost
-                campaigns_data[campaign_id]["total_revenue"] += revenue
-                campaigns_data[campaign_id]["total_leads"] += leads
-                campaigns_data[campaign_id]["total_a_leads"] += a_leads
-
-                if cost > 0:
-                    campaigns_data[campaign_id]["days_with_data"] += 1
-
-                campaigns_data[campaign_id]["daily_stats"].append({
-                    "date": row.date,
-                    "cost": cost,
-                    "revenue": revenue,
-                    "leads": leads,
-                    "a_leads": a_leads
-                })
-
-            # Анализ портфеля
-            portfolio_campaigns = []
-            total_portfolio_cost = 0
-            total_portfolio_revenue = 0
-            profitable_campaigns = 0
-            roi_values = []
-            daily_roi_values_by_day = defaultdict(list)
-            group_performance = defaultdict(lambda: {"cost": 0, "revenue": 0, "count": 0})
-
-            for campaign_id, data in campaigns_data.items():
-                # Пропускаем кампании без данных
-                if data["days_with_data"] == 0:
-                    continue
-
-                cost = data["total_cost"]
-                revenue = data["total_revenue"]
-
-                # Пропускаем очень маленькие кампании (шум)
-                if cost < min_cost or data["total_leads"] < min_leads:
-                    continue
-
-                # ROI расчет
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-                roi_values.append(roi)
-
-                # Определение прибыльности
-                is_profitable = revenue > cost
-                if is_profitable:
-                    profitable_campaigns += 1
-
-                # Сбор дневных ROI для анализа тренда
-                for day_stat in data["daily_stats"]:
-                    if day_stat["cost"] > 0:
-                        day_roi = ((day_stat["revenue"] - day_stat["cost"]) / day_stat["cost"]) * 100
-                        daily_roi_values_by_day[day_stat["date"]].append(day_roi)
-
-                total_portfolio_cost += cost
-                total_portfolio_revenue += revenue
-
-                # Накопление данных по группам
-                group = data["group"]
-                group_performance[group]["cost"] += cost
-                group_performance[group]["revenue"] += revenue
-                group_performance[group]["count"] += 1
-
-                portfolio_campaigns.append({
-                    "campaign_id": campaign_id,
-                    "binom_id": data["binom_id"],
-                    "name": data["name"],
-                    "group": group,
-                    "roi": round(roi, 1),
-                    "is_profitable": is_profitable,
-                    "cost": round(cost, 2),
-                    "revenue": round(revenue, 2)
-                })
-
-            # Расчет компонентов индекса
-            total_campaigns = len(portfolio_campaigns)
-
-            # 1. Средневзвешенный ROI (вес 30%)
-            weighted_roi_score = self._calculate_weighted_roi_score(
-                portfolio_campaigns,
-                roi_values
-            )
-
-            # 2. Доля прибыльных кампаний (вес 25%)
-            profitable_ratio_score = self._calculate_profitable_ratio_score(
-                total_campaigns,
-                profitable_campaigns
-            )
-
-            # 3. Стабильность метрик (вес 20%)
-            stability_score = self._calculate_stability_score(roi_values)
-
-            # 4. Диверсификация (вес 15%)
-            diversification_score = self._calculate_diversification_score(
-                group_performance,
-                total_campaigns
-            )
-
-            # 5. Тренд последних 7 дней (вес 10%)
-            trend_score = self._calculate_trend_score(daily_roi_values_by_day)
-
-            # Общий индекс здоровья (используем настраиваемые веса)
-            health_index = (
-                weighted_roi_score * roi_weight +
-                profitable_ratio_score * profitable_weight +
-                stability_score * stability_weight +
-                diversification_score * diversification_weight +
-                trend_score * trend_weight
-            )
-
-            # Получаем настраиваемые пороги severity
-            severity_critical_threshold = config.params.get("severity_critical", 40)
-            severity_warning_threshold = config.params.get("severity_warning", 60)
-
-            return {
-                "health_index": round(health_index, 1),
-                "components": {
-                    "weighted_roi": round(weighted_roi_score, 1),
-                    "profitable_ratio": round(profitable_ratio_score, 1),
-                    "stability": round(stability_score, 1),
-                    "diversification": round(diversification_score, 1),
-                    "trend": round(trend_score, 1)
-                },
-                "summary": {
-                    "total_campaigns": total_campaigns,
-                    "profitable_campaigns": profitable_campaigns,
-                    "avg_roi": round(statistics.mean(roi_values), 1) if roi_values else 0,
-                    "total_cost": round(total_portfolio_cost, 2),
-                    "total_revenue": round(total_portfolio_revenue, 2)
-                },
-                "period": {
-                    "days": days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat()
-                },
-                "severity_critical": severity_critical_threshold,
-                "severity_warning": severity_warning_threshold
-            }
+        rollup = get_portfolio_rollup(date_from, min_cost=min_cost, min_leads=min_leads)
+        campaigns = rollup["campaigns"]
+        eligible = campaigns["eligible"]
+        portfolio = rollup["portfolio"]
+        days_data = rollup["days"]
+
+        roi = campaigns["roi"][eligible]
+        cost = campaigns["cost"][eligible]
+        roi_values = roi.tolist()
+        total_campaigns = portfolio["campaigns"]
+        profitable_campaigns = int((campaigns["revenue"][eligible] > cost).sum())
+
+        # 1. Средневзвешенный ROI (вес 30%)
+        weighted_roi_score = self._calculate_weighted_roi_score(
+            stats_kernel.round_decimal(roi, 1),
+            stats_kernel.round_decimal(cost, 2)
+        )
+
+        # 2. Доля прибыльных кампаний (вес 25%)
+        profitable_ratio_score = self._calculate_profitable_ratio_score(
+            total_campaigns,
+            profitable_campaigns
+        )
 
-    def _calculate_weighted_roi_score(self, campaigns: List[Dict[str, Any]], roi_values: List[float]) -> float:
+        # 3. Стабильность метрик (вес 20%)
+        stability_score = self._calculate_stability_score(roi_values)
+
+        # 4. Диверсификация (вес 15%)
+        diversification_score = self._calculate_diversification_score(
+            rollup["groups"]["count_share"],
+            total_campaigns
+        )
+
+        # 5. Тренд последних 7 дней (вес 10%)
+        trend_score = self._calculate_trend_score(
+            days_data["roi_mean"][days_data["roi_count"] > 0].tolist()
+        )
+
+        # Общий индекс здоровья (используем настраиваемые веса)
+        health_index = (
+            weighted_roi_score * roi_weight +
+            profitable_ratio_score * profitable_weight +
+            stability_score * stability_weight +
+            diversification_score * diversification_weight +
+            trend_score * trend_weight
+        )
+
+        # Получаем настраиваемые пороги severity
+        severity_critical_threshold = config.params.get("severity_critical", 40)
+        severity_warning_threshold = config.params.get("severity_warning", 60)
+
+        return {
+            "health_index": round(health_index, 1),
+            "components": {
+                "weighted_roi": round(weighted_roi_score, 1),
+                "profitable_ratio": round(profitable_ratio_score, 1),
+                "stability": round(stability_score, 1),
+                "diversification": round(diversification_score, 1),
+                "trend": round(trend_score, 1)
+            },
+            "summary": {
+                "total_campaigns": total_campaigns,
+                "profitable_campaigns": profitable_campaigns,
+                "avg_roi": round(statistics.mean(roi_values), 1) if roi_values else 0,
+                "total_cost": round(portfolio["cost"], 2),
+                "total_revenue": round(portfolio["revenue"], 2)
+            },
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
+            },
+            "severity_critical": severity_critical_threshold,
+            "severity_warning": severity_warning_threshold
+        }
+
+    def _calculate_weighted_roi_score(self, roi: np.ndarray, cost: np.ndarray) -> float:
         """
         Рассчитывает взвешенный ROI и преобразует в score 0-100.
 
         Args:
-            campaigns: Список кампаний с данными
-            roi_values: Список значений ROI
+            roi: ROI кампаний (округленный до 0.1)
+            cost: Расход кампаний (округленный до центов)
 
         Returns:
             float: Score от 0 до 100
         """
-        if not campaigns or not roi_values:
+        if len(roi) == 0:
             return 50  # Нейтральное значение
 
         # Взвешенный ROI по стоимости кампании
-        total_cost = sum(c["cost"] for c in campaigns)
+        total_cost = float(stats_kernel.row_sums(cost[None, :])[0])
         if total_cost == 0:
             return 50
 
-        weighted_roi = sum(
-            (c["roi"] * c["cost"]) / total_cost for c in campaigns
-        )
+        weighted_roi = float(stats_kernel.row_sums((roi * cost / total_cost)[None, :])[0])
 
         # Преобразование ROI в score (0-100)
         # -100% ROI -> score 0
@@ -482,67 +352,48 @@ class PortfolioHealthIndex(BaseModule):
         except Exception:
             return 50
 
-    def _calculate_diversification_score(self, group_performance: Dict[str, Dict[str, Any]], total_campaigns: int) -> float:
+    def _calculate_diversification_score(self, group_shares: np.ndarray, total_campaigns: int) -> float:
         """
         Рассчитывает диверсификацию портфеля и преобразует в score 0-100.
 
         Хорошая диверсификация = равномерное распределение по группам/источникам.
 
         Args:
-            group_performance: Словарь производительности по группам
+            group_shares: Доли групп по количеству кампаний
             total_campaigns: Общее количество кампаний
 
         Returns:
             float: Score от 0 до 100
         """
-        if total_campaigns == 0 or len(group_performance) == 0:
+        if total_campaigns == 0 or len(group_shares) == 0:
             return 50
 
-        # Рассчитываем долю каждой группы
-        group_shares = [
-            data["count"] / total_campaigns for data in group_performance.values()
-        ]
-
         # Используем индекс Герфиндаля для измерения концентрации
-        # HHI = сумма (доля^2)
         # HHI от 0 (идеальная диверсификация) до 1 (полная концентрация)
-        hhi = sum(share ** 2 for share in group_shares)
+        concentration = hhi(group_shares)
 
         # Преобразование в score (0-100)
         # HHI = 0 (максимальная диверсификация) -> score 100
         # HHI = 1 (одна группа) -> score 0
-        score = (1 - hhi) * 100
+        score = (1 - concentration) * 100
 
         return score
 
-    def _calculate_trend_score(self, daily_roi_values: Dict[Any, List[float]]) -> float:
+    def _calculate_trend_score(self, sorted_roi: List[float]) -> float:
         """
         Рассчитывает тренд последних 7 дней и преобразует в score 0-100.
 
         Положительный тренд = высокий score.
 
         Args:
-            daily_roi_values: Словарь дневных ROI значений по датам
+            sorted_roi: Средний дневной ROI кампаний по дням (по возрастанию даты)
 
         Returns:
             float: Score от 0 до 100
         """
-        if not daily_roi_values:
+        if len(sorted_roi) < 2:
             return 50
 
-        # Получаем среднее ROI по дням
-        daily_avg_roi = {}
-        for date, roi_list in daily_roi_values.items():
-            if roi_list:
-                daily_avg_roi[date] = statistics.mean(roi_list)
-
-        if len(daily_avg_roi) < 2:
-            return 50
-
-        # Сортируем по дате
-        sorted_dates = sorted(daily_avg_roi.keys())
-        sorted_roi = [daily_avg_roi[date] for date in sorted_dates]
-
         try:
             # Вычисляем тренд (линейную регрессию)
             # Простой способ: сравниваем первую половину со второй
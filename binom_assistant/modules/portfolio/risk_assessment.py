@@ -3,32 +3,12 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-from collections import defaultdict
 import statistics
-import math
-
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
-from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
 
+import numpy as np
 
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .rollup import get_portfolio_rollup, hhi
 
 
 class RiskAssessment(BaseModule):
@@ -128,197 +108,82 @@ class RiskAssessment(BaseModule):
         # Исключаем сегодняшний день (апрувы приходят с задержкой)
         date_from = datetime.now().date() - timedelta(days=days)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем все кампании с данными за период
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads,
-                CampaignStatsDaily.h_leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0,
-                "total_a_leads": 0,
-                "total_h_leads": 0,
-                "daily_stats": [],
-                "days_with_data": 0
-            })
-
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-
-                cost = float(row.cost) if row.cost else 0
-                revenue = float(row.revenue) if row.revenue else 0
-                leads = float(row.leads) if row.leads else 0
-                a_leads = float(row.a_leads) if row.a_leads else 0
-                h_leads = float(row.h_leads) if row.h_leads else 0
-
-                campaigns_data[campaign_id]["total_cost"] += cost
-                campaigns_data[campaign_id]["total_revenue"] += revenue
-                campaigns_data[campaign_id]["total_leads"] += leads
-                campaigns_data[campaign_id]["total_a_leads"] += a_leads
-                campaigns_data[campaign_id]["total_h_leads"] += h_leads
-
-                if cost > 0:
-                    campaigns_data[campaign_id]["days_with_data"] += 1
-
-                campaigns_data[campaign_id]["daily_stats"].append({
-                    "date": row.date,
-                    "cost": cost,
-                    "revenue": revenue,
-                    "leads": leads,
-                    "a_leads": a_leads,
-                    "h_leads": h_leads
-                })
-
-            # Анализ портфеля
-            portfolio_campaigns = []
-            total_portfolio_cost = 0
-            total_portfolio_revenue = 0
-            roi_values = []
-            source_revenue_shares = {}
-            group_performance = defaultdict(lambda: {"cost": 0, "revenue": 0, "count": 0})
-            total_h_leads = 0
-
-            for campaign_id, data in campaigns_data.items():
-                # Пропускаем кампании без данных
-                if data["days_with_data"] == 0:
-                    continue
-
-                cost = data["total_cost"]
-                revenue = data["total_revenue"]
-                h_leads = data["total_h_leads"]
-
-                # Пропускаем очень маленькие кампании (шум)
-                if cost < min_cost or data["total_leads"] < min_leads:
-                    continue
-
-                # ROI расчет
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-                roi_values.append(roi)
-
-                total_portfolio_cost += cost
-                total_portfolio_revenue += revenue
-                total_h_leads += h_leads
-
-                # Накопление данных по группам
-                group = data["group"]
-                group_performance[group]["cost"] += cost
-                group_performance[group]["revenue"] += revenue
-                group_performance[group]["count"] += 1
-
-                # Накопление по источникам (по группам для доходов)
-                if group not in source_revenue_shares:
-                    source_revenue_shares[group] = 0
-                source_revenue_shares[group] += revenue
-
-                portfolio_campaigns.append({
-                    "campaign_id": campaign_id,
-                    "binom_id": data["binom_id"],
-                    "name": data["name"],
-                    "group": group,
-                    "roi": round(roi, 1),
-                    "cost": round(cost, 2),
-                    "revenue": round(revenue, 2),
-                    "h_leads": int(h_leads)
-                })
-
-            # Расчет компонентов риска
-            total_campaigns = len(portfolio_campaigns)
-
-            # 1. Риск концентрации (один источник > 50%)
-            concentration_risk = self._calculate_concentration_risk(source_revenue_shares, total_portfolio_revenue)
-
-            # 2. Риск волатильности (высокая дисперсия ROI)
-            volatility_risk = self._calculate_volatility_risk(roi_values)
-
-            # 3. Риск ликвидности (большие pending апрувы)
-            liquidity_risk = self._calculate_liquidity_risk(total_h_leads, total_portfolio_revenue)
-
-            # 4. Операционный риск (зависимость от одной группы)
-            operational_risk = self._calculate_operational_risk(group_performance, total_campaigns)
-
-            # Общая оценка риска (среднее значение, низкие значения = низкий риск)
-            risk_score = (concentration_risk + volatility_risk + liquidity_risk + operational_risk) / 4
-
-            # Определение уровня риска
-            if risk_score < 25:
-                risk_level = "low"
-            elif risk_score < 50:
-                risk_level = "medium"
-            elif risk_score < 75:
-                risk_level = "high"
-            else:
-                risk_level = "critical"
-
-            return {
-                "risk_score": round(risk_score, 1),
-                "risk_level": risk_level,
-                "risks": {
-                    "concentration_risk": round(concentration_risk, 1),
-                    "volatility_risk": round(volatility_risk, 1),
-                    "liquidity_risk": round(liquidity_risk, 1),
-                    "operational_risk": round(operational_risk, 1)
-                },
-                "summary": {
-                    "total_campaigns": total_campaigns,
-                    "total_cost": round(total_portfolio_cost, 2),
-                    "total_revenue": round(total_portfolio_revenue, 2),
-                    "total_h_leads": int(total_h_leads),
-                    "roi_std_dev": round(statistics.stdev(roi_values), 1) if len(roi_values) > 1 else 0,
-                    "max_source_revenue_share": round(max(source_revenue_shares.values()) / total_portfolio_revenue * 100, 1) if source_revenue_shares and total_portfolio_revenue > 0 else 0
-                },
-                "period": {
-                    "days": days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat()
-                }
+        rollup = get_portfolio_rollup(date_from, min_cost=min_cost, min_leads=min_leads)
+        campaigns = rollup["campaigns"]
+        portfolio = rollup["portfolio"]
+        groups = rollup["groups"]
+
+        roi_values = campaigns["roi"][campaigns["eligible"]].tolist()
+        total_campaigns = portfolio["campaigns"]
+        total_portfolio_revenue = portfolio["revenue"]
+
+        # Расчет компонентов риска
+        # 1. Риск концентрации (один источник > 50%)
+        concentration_risk = self._calculate_concentration_risk(groups["revenue"], total_portfolio_revenue)
+
+        # 2. Риск волатильности (высокая дисперсия ROI)
+        volatility_risk = self._calculate_volatility_risk(roi_values)
+
+        # 3. Риск ликвидности (большие pending апрувы)
+        liquidity_risk = self._calculate_liquidity_risk(portfolio["h_leads"], total_portfolio_revenue)
+
+        # 4. Операционный риск (зависимость от одной группы)
+        operational_risk = self._calculate_operational_risk(groups["count_share"], total_campaigns)
+
+        # Общая оценка риска (среднее значение, низкие значения = низкий риск)
+        risk_score = (concentration_risk + volatility_risk + liquidity_risk + operational_risk) / 4
+
+        # Определение уровня риска
+        if risk_score < 25:
+            risk_level = "low"
+        elif risk_score < 50:
+            risk_level = "medium"
+        elif risk_score < 75:
+            risk_level = "high"
+        else:
+            risk_level = "critical"
+
+        return {
+            "risk_score": round(risk_score, 1),
+            "risk_level": risk_level,
+            "risks": {
+                "concentration_risk": round(concentration_risk, 1),
+                "volatility_risk": round(volatility_risk, 1),
+                "liquidity_risk": round(liquidity_risk, 1),
+                "operational_risk": round(operational_risk, 1)
+            },
+            "summary": {
+                "total_campaigns": total_campaigns,
+                "total_cost": round(portfolio["cost"], 2),
+                "total_revenue": round(total_portfolio_revenue, 2),
+                "total_h_leads": int(portfolio["h_leads"]),
+                "roi_std_dev": round(statistics.stdev(roi_values), 1) if len(roi_values) > 1 else 0,
+                "max_source_revenue_share": round(float(groups["revenue"].max()) / total_portfolio_revenue * 100, 1) if groups["names"] and total_portfolio_revenue > 0 else 0
+            },
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
             }
+        }
 
-    def _calculate_concentration_risk(self, source_revenue_shares: Dict[str, float], total_revenue: float) -> float:
+    def _calculate_concentration_risk(self, source_revenue: np.ndarray, total_revenue: float) -> float:
         """
         Рассчитывает риск концентрации (один источник > 50%).
 
         Риск высок, если один источник доходов генерирует > 50% дохода.
 
         Args:
-            source_revenue_shares: Словарь доходов по источникам
+            source_revenue: Доходы по источникам (группам кампаний)
             total_revenue: Общий доход портфеля
 
         Returns:
             float: Score от 0 до 100 (чем выше, тем больше риск)
         """
-        if not source_revenue_shares or total_revenue == 0:
+        if len(source_revenue) == 0 or total_revenue == 0:
             return 50  # Нейтральное значение
 
-        max_revenue = max(source_revenue_shares.values())
+        max_revenue = float(source_revenue.max())
         max_share = (max_revenue / total_revenue) * 100
 
         # Преобразование доли в score риска
@@ -412,36 +277,31 @@ class RiskAssessment(BaseModule):
 
         return risk
 
-    def _calculate_operational_risk(self, group_performance: Dict[str, Dict[str, Any]], total_campaigns: int) -> float:
+    def _calculate_operational_risk(self, group_shares: np.ndarray, total_campaigns: int) -> float:
         """
         Рассчитывает операционный риск (зависимость от одной группы).
 
         Высокая зависимость от одной группы = высокий риск.
 
         Args:
-            group_performance: Словарь производительности по группам
+            group_shares: Доли групп по количеству кампаний
             total_campaigns: Общее количество кампаний
 
         Returns:
             float: Score от 0 до 100 (чем выше, тем больше риск)
         """
-        if total_campaigns == 0 or len(group_performance) == 0:
+        if total_campaigns == 0 or len(group_shares) == 0:
             return 50
 
-        # Рассчитываем долю каждой группы по количеству кампаний
-        group_campaign_counts = [data["count"] for data in group_performance.values()]
-        group_shares = [count / total_campaigns for count in group_campaign_counts]
-
         # Используем индекс Герфиндаля для измерения концентрации
-        # HHI = сумма (доля^2)
         # HHI от 0 (идеальная диверсификация) до 1 (полная концентрация)
-        hhi = sum(share ** 2 for share in group_shares)
+        concentration = hhi(group_shares)
 
         # Преобразование HHI в score риска
         # HHI = 0 (максимальная диверсификация) -> score 0 (низкий риск)
         # HHI = 0.5 -> score 50 (средний риск)
         # HHI = 1 (одна группа) -> score 100 (высокий риск)
-        risk = hhi * 100
+        risk = concentration * 100
 
         return risk
 
@@ -0,0 +1,344 @@
+"""
+Общий слой агрегатов портфеля
+
+portfolio_health_index, risk_assessment, diversification_score и
+total_performance_tracker читают одни и те же дневные строки и строят из них
+итоги по кампаниям, группам, источникам и дням. Слой загружает строки одним
+запросом, считает итоги и доли через np.bincount и кэширует результат до
+изменения версии данных (журнал изменений сборщика) или смены дня. Модули
+считают поверх свои баллы.
+
+Строки кэшируются для самого раннего запрошенного окна (но не короче
+PRELOAD_DAYS): окно, начинающееся позже, и другие пороги вырезаются из
+кэша без обращения к БД.
+
+Итоги складываются в порядке строк (кампании по internal_id, дни по дате),
+как раньше в циклах модулей, поэтому совпадают с ними до последнего бита.
+
+Результат общий для всех модулей - массивы нельзя изменять.
+
+Использование:
+    from .rollup import get_portfolio_rollup, hhi
+
+    rollup = get_portfolio_rollup(date_from, min_cost=1.0, min_leads=50)
+    groups = rollup['groups']
+    concentration = hhi(groups['count_share'])
+"""
+import logging
+import math
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, String, func, select, type_coerce
+
+from storage.database.base import get_session
+from storage.database.models import Campaign, CampaignStatsDaily
+from .. import stats_kernel
+
+logger = logging.getLogger(__name__)
+
+# Минимальная глубина загрузки: окна по умолчанию всех четырех модулей
+# (total_performance_tracker сравнивает два периода по 7 дней)
+PRELOAD_DAYS = 14
+
+# Сколько наборов агрегатов (окно, пороги) хранить для одной версии данных
+MAX_CACHED_ROLLUPS = 16
+
+_lock = threading.Lock()
+_rows_cache: Dict[str, Any] = {}
+_rollup_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+
+@contextmanager
+def get_db_session():
+    """
+    Локальная обертка над get_session() для использования в with.
+    Преобразует генератор в контекстный менеджер.
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        yield session
+    finally:
+        try:
+            next(session_gen)
+        except StopIteration:
+            pass
+
+
+def get_portfolio_rollup(
+    date_from: date,
+    date_to: Optional[date] = None,
+    min_cost: float = 0.0,
+    min_leads: float = 0
+) -> Dict[str, Any]:
+    """
+    Агрегаты портфеля за окно [date_from, date_to].
+
+    Кампания входит в портфель (eligible), если в окне есть день с расходом,
+    суммарный расход >= min_cost и лидов >= min_leads.
+
+    Args:
+        date_from: Начало окна
+        date_to: Конец окна включительно (None - без ограничения)
+        min_cost: Минимальный расход кампании за окно
+        min_leads: Минимум лидов кампании за окно
+
+    Returns:
+        Dict:
+            campaigns - по кампаниям с данными в окне (порядок по internal_id):
+                campaign_ids, info (internal_id -> binom_id, name, group, source),
+                cost, revenue, leads, a_leads, h_leads, days_with_data, roi, eligible
+            portfolio - итоги eligible-кампаний: campaigns, cost, revenue, h_leads
+            groups, sources - разбивка eligible-кампаний (порядок первого появления):
+                names, count, cost, revenue и доли count_share, cost_share, revenue_share
+            days - по дням окна (по возрастанию): dates, cost, revenue, clicks, leads,
+                a_leads по всем строкам, roi_mean - средний дневной ROI eligible-кампаний
+                (дни с расходом), roi_count - число таких кампаний
+            totals - итоги всех строк окна: cost, revenue, clicks, leads, a_leads
+    """
+    from services.scheduler.change_log import get_data_version
+
+    version = (get_data_version(), date.today())
+    key = (date_from, date_to, float(min_cost), float(min_leads))
+    load_from = min(date_from, date.today() - timedelta(days=PRELOAD_DAYS))
+
+    with _lock:
+        if _rows_cache.get('version') != version:
+            _rows_cache.clear()
+            _rollup_cache.clear()
+
+        rollup = _rollup_cache.get(key)
+        if rollup is not None:
+            _rollup_cache.move_to_end(key)
+            return rollup
+
+        if _rows_cache.get('date_from') is None or _rows_cache['date_from'] > load_from:
+            _rows_cache.update(_load_rows(load_from), version=version, date_from=load_from)
+
+        rollup = _compute_rollup(_rows_cache, date_from, date_to, min_cost, min_leads)
+        _rollup_cache[key] = rollup
+        while len(_rollup_cache) > MAX_CACHED_ROLLUPS:
+            _rollup_cache.popitem(last=False)
+
+    return rollup
+
+
+def hhi(shares: np.ndarray) -> float:
+    """
+    Индекс Херфиндаля-Хиршмана: сумма квадратов долей.
+
+    От 1/n (равные доли) до 1 (полная концентрация).
+    """
+    return sum(share ** 2 for share in shares.tolist())
+
+
+def clear_cache() -> None:
+    """Сбрасывает кэш строк и агрегатов"""
+    with _lock:
+        _rows_cache.clear()
+        _rollup_cache.clear()
+
+
+def _load_rows(date_from: date) -> Dict[str, Any]:
+    """
+    Загружает дневную статистику всех кампаний с date_from и атрибуты кампаний.
+
+    Деньги читаются как REAL без Decimal: итоги кампаний считаются по значениям,
+    округленным до центов (как Numeric(10, 2)), итоги окна - по исходным (как SUM в SQL).
+    """
+    with get_db_session() as session:
+        # Core-запрос без сборки ORM-строк и без join: атрибуты кампаний - отдельным запросом
+        rows = session.connection().execute(select(
+            CampaignStatsDaily.campaign_id,
+            type_coerce(CampaignStatsDaily.date, String),
+            func.coalesce(type_coerce(CampaignStatsDaily.cost, Float), 0.0),
+            func.coalesce(type_coerce(CampaignStatsDaily.revenue, Float), 0.0),
+            func.coalesce(CampaignStatsDaily.clicks, 0),
+            func.coalesce(CampaignStatsDaily.leads, 0),
+            func.coalesce(CampaignStatsDaily.a_leads, 0),
+            func.coalesce(CampaignStatsDaily.h_leads, 0)
+        ).filter(
+            CampaignStatsDaily.date >= date_from
+        ).order_by(
+            CampaignStatsDaily.campaign_id,
+            CampaignStatsDaily.date
+        )).all()
+
+        info = {
+            campaign.internal_id: {
+                'binom_id': campaign.binom_id,
+                'name': campaign.current_name,
+                'group': campaign.group_name or "Без группы",
+                'source': campaign.ts_name or "Неизвестен"
+            }
+            for campaign in session.query(
+                Campaign.internal_id,
+                Campaign.binom_id,
+                Campaign.current_name,
+                Campaign.group_name,
+                Campaign.ts_name
+            ).all()
+        }
+
+    columns = list(zip(*rows)) if rows else [()] * 8
+    raw_cost = np.array(columns[2], dtype=np.float64)
+    raw_revenue = np.array(columns[3], dtype=np.float64)
+
+    # Строки без карточки кампании не входят в портфель (как join в запросах модулей)
+    campaign_id = np.array(columns[0], dtype=np.int64)
+    known = np.isin(campaign_id, np.fromiter(info.keys(), dtype=np.int64, count=len(info)))
+
+    logger.debug(f"Portfolio rollup: loaded {len(rows)} daily rows since {date_from}")
+
+    return {
+        'campaign_id': campaign_id,
+        'known': known,
+        'day': np.array(columns[1], dtype='datetime64[D]').astype(np.int64),
+        'raw_cost': raw_cost,
+        'raw_revenue': raw_revenue,
+        'cost': stats_kernel.round_decimal(raw_cost, 2),
+        'revenue': stats_kernel.round_decimal(raw_revenue, 2),
+        'clicks': np.array(columns[4], dtype=np.int64),
+        'leads': np.array(columns[5], dtype=np.int64),
+        'a_leads': np.array(columns[6], dtype=np.int64),
+        'h_leads': np.array(columns[7], dtype=np.int64),
+        'info': info
+    }
+
+
+def _compute_rollup(
+    rows: Dict[str, Any],
+    date_from: date,
+    date_to: Optional[date],
+    min_cost: float,
+    min_leads: float
+) -> Dict[str, Any]:
+    """Считает агрегаты окна: bincount складывает значения в порядке строк"""
+    epoch = date(1970, 1, 1)
+    selected = rows['known'] & (rows['day'] >= (date_from - epoch).days)
+    if date_to is not None:
+        selected &= rows['day'] <= (date_to - epoch).days
+    selected = np.flatnonzero(selected)
+
+    ids, index = np.unique(rows['campaign_id'][selected], return_inverse=True)
+    index = index.ravel()
+    n_campaigns = len(ids)
+
+    def campaign_totals(column: str) -> np.ndarray:
+        return np.bincount(index, weights=rows[column][selected], minlength=n_campaigns)
+
+    cost_rows = rows['cost'][selected]
+    revenue_rows = rows['revenue'][selected]
+    cost = campaign_totals('cost')
+    revenue = campaign_totals('revenue')
+    leads = campaign_totals('leads')
+    days_with_data = np.bincount(index[cost_rows > 0], minlength=n_campaigns)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roi = np.where(cost > 0, (revenue - cost) / cost * 100, 0.0)
+
+    eligible = (days_with_data > 0) & (cost >= min_cost) & (leads >= min_leads)
+    h_leads = campaign_totals('h_leads')
+    info = rows['info']
+    eligible_ids = ids[eligible].tolist()
+
+    # Дневной ROI eligible-кампаний в дни с расходом
+    day_rows = rows['day'][selected]
+    dates, day_index = np.unique(day_rows, return_inverse=True)
+    day_index = day_index.ravel()
+    roi_days = eligible[index] & (cost_rows > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        day_roi = (revenue_rows[roi_days] - cost_rows[roi_days]) / cost_rows[roi_days] * 100
+    roi_count = np.bincount(day_index[roi_days], minlength=len(dates))
+    roi_sum = np.bincount(day_index[roi_days], weights=day_roi, minlength=len(dates))
+
+    def day_totals(column: str) -> np.ndarray:
+        return np.bincount(day_index, weights=rows[column][selected], minlength=len(dates))
+
+    portfolio_cost = stats_kernel.row_sums(cost[eligible][None, :])[0]
+    portfolio_revenue = stats_kernel.row_sums(revenue[eligible][None, :])[0]
+
+    return {
+        'campaigns': {
+            'campaign_ids': ids.tolist(),
+            'info': info,
+            'cost': cost,
+            'revenue': revenue,
+            'leads': leads,
+            'a_leads': campaign_totals('a_leads'),
+            'h_leads': h_leads,
+            'days_with_data': days_with_data,
+            'roi': roi,
+            'eligible': eligible
+        },
+        'portfolio': {
+            'campaigns': len(eligible_ids),
+            'cost': float(portfolio_cost),
+            'revenue': float(portfolio_revenue),
+            'h_leads': float(h_leads[eligible].sum())
+        },
+        'groups': _breakdown(
+            [info[campaign_id]['group'] for campaign_id in eligible_ids],
+            cost[eligible], revenue[eligible], portfolio_cost, portfolio_revenue
+        ),
+        'sources': _breakdown(
+            [info[campaign_id]['source'] for campaign_id in eligible_ids],
+            cost[eligible], revenue[eligible], portfolio_cost, portfolio_revenue
+        ),
+        'days': {
+            'dates': [epoch + timedelta(days=int(day)) for day in dates],
+            'cost': day_totals('cost'),
+            'revenue': day_totals('revenue'),
+            'clicks': day_totals('clicks'),
+            'leads': day_totals('leads'),
+            'a_leads': day_totals('a_leads'),
+            'roi_mean': np.where(roi_count > 0, roi_sum / np.maximum(roi_count, 1), np.nan),
+            'roi_count': roi_count
+        },
+        # Как SUM(Numeric(10, 2)) в SQL: сумма исходных значений, округленная до центов
+        'totals': {
+            'cost': _sql_money_sum(rows['raw_cost'][selected]),
+            'revenue': _sql_money_sum(rows['raw_revenue'][selected]),
+            'clicks': int(rows['clicks'][selected].sum()),
+            'leads': int(rows['leads'][selected].sum()),
+            'a_leads': int(rows['a_leads'][selected].sum())
+        }
+    }
+
+
+def _sql_money_sum(values: np.ndarray) -> float:
+    """Сумма денежной колонки как func.sum() по Numeric(10, 2): точная сумма, затем центы"""
+    return float(stats_kernel.round_decimal(np.array([math.fsum(values.tolist())]), 2)[0])
+
+
+def _breakdown(
+    keys: List[str],
+    cost: np.ndarray,
+    revenue: np.ndarray,
+    total_cost: float,
+    total_revenue: float
+) -> Dict[str, Any]:
+    """Итоги и доли по ключу (группа, источник) в порядке первого появления"""
+    names = list(dict.fromkeys(keys))
+    codes = {name: code for code, name in enumerate(names)}
+    index = np.array([codes[key] for key in keys], dtype=np.int64)
+
+    count = np.bincount(index, minlength=len(names))
+    group_cost = np.bincount(index, weights=cost, minlength=len(names))
+    group_revenue = np.bincount(index, weights=revenue, minlength=len(names))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'names': names,
+            'count': count,
+            'cost': group_cost,
+            'revenue': group_revenue,
+            'count_share': count / len(keys) if keys else count.astype(np.float64),
+            'cost_share': group_cost / total_cost if total_cost else np.zeros(len(names)),
+            'revenue_share': group_revenue / total_revenue if total_revenue else np.zeros(len(names))
+        }
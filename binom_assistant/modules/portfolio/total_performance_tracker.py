@@ -3,30 +3,9 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-from collections import defaultdict
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .rollup import get_portfolio_rollup
 
 
 class TotalPerformanceTracker(BaseModule):
@@ -130,80 +109,61 @@ class TotalPerformanceTracker(BaseModule):
         prev_date_from = date_from - timedelta(days=days)
         prev_date_to = date_from - timedelta(days=1)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем данные за текущий период
-            current_data = self._aggregate_period_data(
-                session, date_from, date_to
-            )
+        # Получаем данные за текущий период
+        current_data = self._aggregate_period_data(date_from, date_to)
 
-            # Получаем данные за предыдущий период
-            previous_data = self._aggregate_period_data(
-                session, prev_date_from, prev_date_to
-            )
+        # Получаем данные за предыдущий период
+        previous_data = self._aggregate_period_data(prev_date_from, prev_date_to)
 
-            # Расчет изменений
-            changes = self._calculate_changes(current_data, previous_data)
-
-            # Определение тренда
-            trend = self._determine_trend(changes, min_change_threshold)
-
-            # Формируем summary для отображения в карточке модуля
-            summary = {
-                "total_cost": current_data.get("total_cost", 0),
-                "total_revenue": current_data.get("total_revenue", 0),
-                "total_profit": current_data.get("total_profit", 0),
-                "roi": current_data.get("total_roi", 0),
-                "clicks": current_data.get("total_clicks", 0),
-                "leads": current_data.get("total_leads", 0),
-                "approved_leads": current_data.get("total_a_leads", 0),
-                "trend": trend
-            }
+        # Расчет изменений
+        changes = self._calculate_changes(current_data, previous_data)
 
-            return {
-                "summary": summary,
-                "current_period": current_data,
-                "previous_period": previous_data,
-                "changes": changes,
-                "trend": trend,
-                "period": {
-                    "days": days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": date_to.isoformat()
-                }
+        # Определение тренда
+        trend = self._determine_trend(changes, min_change_threshold)
+
+        # Формируем summary для отображения в карточке модуля
+        summary = {
+            "total_cost": current_data.get("total_cost", 0),
+            "total_revenue": current_data.get("total_revenue", 0),
+            "total_profit": current_data.get("total_profit", 0),
+            "roi": current_data.get("total_roi", 0),
+            "clicks": current_data.get("total_clicks", 0),
+            "leads": current_data.get("total_leads", 0),
+            "approved_leads": current_data.get("total_a_leads", 0),
+            "trend": trend
+        }
+
+        return {
+            "summary": summary,
+            "current_period": current_data,
+            "previous_period": previous_data,
+            "changes": changes,
+            "trend": trend,
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat()
             }
+        }
 
-    def _aggregate_period_data(self, session, date_from, date_to) -> Dict[str, Any]:
+    def _aggregate_period_data(self, date_from, date_to) -> Dict[str, Any]:
         """
         Агрегирует данные за период.
 
         Args:
-            session: Сессия БД
             date_from: Начальная дата
             date_to: Конечная дата
 
         Returns:
             Dict[str, Any]: Агрегированные данные за период
         """
-        query = session.query(
-            func.sum(CampaignStatsDaily.cost).label('total_cost'),
-            func.sum(CampaignStatsDaily.revenue).label('total_revenue'),
-            func.sum(CampaignStatsDaily.leads).label('total_leads'),
-            func.sum(CampaignStatsDaily.a_leads).label('total_a_leads'),
-            func.sum(CampaignStatsDaily.clicks).label('total_clicks')
-        ).filter(
-            CampaignStatsDaily.date >= date_from,
-            CampaignStatsDaily.date <= date_to
-        )
-
-        result = query.first()
+        totals = get_portfolio_rollup(date_from, date_to)["totals"]
 
-        # Обработка None значений
-        total_cost = float(result.total_cost or 0)
-        total_revenue = float(result.total_revenue or 0)
-        total_leads = float(result.total_leads or 0)
-        total_a_leads = float(result.total_a_leads or 0)
-        total_clicks = float(result.total_clicks or 0)
+        total_cost = totals["cost"]
+        total_revenue = totals["revenue"]
+        total_leads = totals["leads"]
+        total_a_leads = totals["a_leads"]
+        total_clicks = totals["clicks"]
 
         # Расчет ROI
         total_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
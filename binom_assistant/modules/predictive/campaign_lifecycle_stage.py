@@ -3,31 +3,11 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
 import numpy as np
-from collections import defaultdict
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from . import forecast_engine
 
 
 class CampaignLifecycleStage(BaseModule):
@@ -106,52 +86,30 @@ class CampaignLifecycleStage(BaseModule):
             }
         }
 
-    def _simple_linear_regression(self, x_values: List[float], y_values: List[float]) -> tuple:
-        """
-        Простая линейная регрессия.
-
-        Returns:
-            (slope, intercept, r_squared)
-        """
-        n = len(x_values)
-        if n < 2:
-            return 0, 0, 0
-
-        x_mean = np.mean(x_values)
-        y_mean = np.mean(y_values)
-
-        numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
-        denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return 0, y_mean, 0
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        # R-squared
-        ss_tot = sum((y_values[i] - y_mean) ** 2 for i in range(n))
-        ss_res = sum((y_values[i] - (slope * x_values[i] + intercept)) ** 2 for i in range(n))
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-
-        return slope, intercept, r_squared
-
-    def _determine_stage(self, daily_stats: List[Dict], params: Dict) -> Dict[str, Any]:
+    def _determine_stage(
+        self,
+        stats: Dict[str, float],
+        params: Dict,
+        roi_regression: tuple,
+        cost_regression: tuple
+    ) -> Dict[str, Any]:
         """
         Определяет стадию жизненного цикла кампании.
 
         Args:
-            daily_stats: Список дневной статистики
+            stats: Агрегаты дневной статистики (days, days_active, last_7_days_cost,
+                total_cost, total_revenue)
             params: Параметры анализа
+            roi_regression: Регрессия ROI по активным дням (slope, intercept, r_squared)
+            cost_regression: Регрессия расхода по активным дням
 
         Returns:
             Dict с информацией о стадии
         """
         stagnation_threshold = params.get("stagnation_threshold", 1)
 
-        # Подсчет дней активности (дни с cost > 0)
-        active_days = [d for d in daily_stats if d["cost"] > 0]
-        days_active = len(active_days)
+        # Дни активности (дни с cost > 0)
+        days_active = stats["days_active"]
 
         if days_active == 0:
             return {
@@ -163,14 +121,13 @@ class CampaignLifecycleStage(BaseModule):
                 "confidence": 1.0
             }
 
-        # Расчет последних 7 дней
-        last_7_days = daily_stats[-7:] if len(daily_stats) >= 7 else daily_stats
-        last_7_days_cost = sum(d["cost"] for d in last_7_days)
+        # Расход за последние 7 дней
+        last_7_days_cost = stats["last_7_days_cost"]
 
         # Расчет средних значений
-        total_cost = sum(d["cost"] for d in daily_stats)
-        total_revenue = sum(d["revenue"] for d in daily_stats)
-        avg_daily_spend = total_cost / len(daily_stats) if len(daily_stats) > 0 else 0
+        total_cost = stats["total_cost"]
+        total_revenue = stats["total_revenue"]
+        avg_daily_spend = total_cost / stats["days"] if stats["days"] > 0 else 0
         avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
 
         # СТАДИЯ: Launch (< 3 дней активности)
@@ -197,16 +154,9 @@ class CampaignLifecycleStage(BaseModule):
 
         # Расчет трендов используя линейную регрессию
         if days_active >= 2:
-            # Подготовка данных для регрессии (только активные дни)
-            x_values = list(range(len(active_days)))
-            roi_values = [d["roi"] for d in active_days]
-            cost_values = [d["cost"] for d in active_days]
-
-            # ROI тренд
-            roi_slope, _, roi_r_squared = self._simple_linear_regression(x_values, roi_values)
-
-            # Cost тренд
-            cost_slope, _, cost_r_squared = self._simple_linear_regression(x_values, cost_values)
+            # Регрессии посчитаны заранее по активным дням всех кампаний
+            roi_slope, _, roi_r_squared = roi_regression
+            cost_slope, _, cost_r_squared = cost_regression
 
             # Confidence основан на R² обоих трендов
             confidence = (roi_r_squared + cost_r_squared) / 2
@@ -275,146 +225,121 @@ class CampaignLifecycleStage(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=days_history - 1)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем все кампании с историей
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
+        # Дневные ряды всех кампаний (строка матрицы = кампания)
+        series = forecast_engine.load_daily_series(date_from)
+        lengths = series["lengths"]
+        cost_matrix = forecast_engine.pack(series, series["cost"])
+        total_costs = stats_kernel.row_sums(cost_matrix)
+        total_revenues = stats_kernel.row_sums(forecast_engine.pack(series, series["revenue"]))
+
+        # Расход за последние 7 записей ряда
+        columns = np.arange(cost_matrix.shape[1])[None, :]
+        last_7_days_costs = stats_kernel.row_sums(
+            np.where(columns >= lengths[:, None] - 7, cost_matrix, np.nan)
+        )
 
-            results = query.all()
+        # Тренды ROI и расхода по активным дням (cost > 0) сразу для всех кампаний
+        active = series["cost"] > 0
+        days_active = np.bincount(series["index"][active], minlength=len(lengths))
+        roi_regression = forecast_engine.fit(forecast_engine.pack(series, series["roi"], mask=active))
+        cost_regression = forecast_engine.fit(forecast_engine.pack(series, series["cost"], mask=active))
+
+        # Обработка и классификация
+        campaign_stages = []
+
+        # Счетчики по стадиям
+        stage_counts = {
+            "launch": 0,
+            "growth": 0,
+            "maturity": 0,
+            "decline": 0,
+            "stagnation": 0,
+            "dead": 0
+        }
 
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "daily_stats": []
-            })
+        for row, campaign_id in enumerate(series["campaign_ids"]):
+            # Фильтрация: минимальный расход
+            total_cost = float(total_costs[row])
+            if total_cost < min_spend:
+                continue
+
+            total_revenue = float(total_revenues[row])
+
+            # Определяем стадию
+            stage_info = self._determine_stage(
+                {
+                    "days": int(lengths[row]),
+                    "days_active": int(days_active[row]),
+                    "last_7_days_cost": float(last_7_days_costs[row]),
+                    "total_cost": total_cost,
+                    "total_revenue": total_revenue
+                },
+                {"stagnation_threshold": stagnation_threshold},
+                stats_kernel.regression_at(roi_regression, row),
+                stats_kernel.regression_at(cost_regression, row)
+            )
 
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-
-                campaigns_data[campaign_id]["daily_stats"].append({
-                    "date": row.date,
-                    "cost": cost,
-                    "revenue": revenue,
-                    "roi": roi,
-                    "clicks": row.clicks,
-                    "leads": row.leads
-                })
-
-            # Обработка и классификация
-            campaign_stages = []
-
-            # Счетчики по стадиям
-            stage_counts = {
-                "launch": 0,
-                "growth": 0,
-                "maturity": 0,
-                "decline": 0,
-                "stagnation": 0,
-                "dead": 0
-            }
+            # Агрегированная статистика
+            avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
+            avg_daily_spend = total_cost / days_history if days_history > 0 else 0
+
+            info = series["info"][campaign_id]
+            campaign_stages.append({
+                "campaign_id": campaign_id,
+                "binom_id": info["binom_id"],
+                "name": info["name"],
+                "group": info["group"],
+                "stage": stage_info["stage"],
+                "stage_label": stage_info["stage_label"],
+                "days_active": stage_info["days_active"],
+                "roi_trend": stage_info["roi_trend"],
+                "spend_trend": stage_info["spend_trend"],
+                "confidence": stage_info["confidence"],
+                "current_roi": round(avg_roi, 2),
+                "avg_daily_spend": round(avg_daily_spend, 2),
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2)
+            })
 
-            for campaign_id, data in campaigns_data.items():
-                daily_stats = data["daily_stats"]
-
-                # Фильтрация: минимальный расход
-                total_cost = sum(d["cost"] for d in daily_stats)
-                if total_cost < min_spend:
-                    continue
-
-                # Определяем стадию
-                stage_info = self._determine_stage(
-                    daily_stats,
-                    {"stagnation_threshold": stagnation_threshold}
-                )
-
-                # Агрегированная статистика
-                total_revenue = sum(d["revenue"] for d in daily_stats)
-                avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
-                avg_daily_spend = total_cost / days_history if days_history > 0 else 0
-
-                campaign_stages.append({
-                    "campaign_id": campaign_id,
-                    "binom_id": data["binom_id"],
-                    "name": data["name"],
-                    "group": data["group"],
-                    "stage": stage_info["stage"],
-                    "stage_label": stage_info["stage_label"],
-                    "days_active": stage_info["days_active"],
-                    "roi_trend": stage_info["roi_trend"],
-                    "spend_trend": stage_info["spend_trend"],
-                    "confidence": stage_info["confidence"],
-                    "current_roi": round(avg_roi, 2),
-                    "avg_daily_spend": round(avg_daily_spend, 2),
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2)
-                })
-
-                # Обновляем счетчики
-                stage_counts[stage_info["stage"]] += 1
-
-            # Сортировка по приоритету: decline > stagnation > dead > launch > growth > maturity
-            priority_map = {
-                "decline": 0,
-                "stagnation": 1,
-                "dead": 2,
-                "launch": 3,
-                "growth": 4,
-                "maturity": 5
-            }
+            # Обновляем счетчики
+            stage_counts[stage_info["stage"]] += 1
+
+        # Сортировка по приоритету: decline > stagnation > dead > launch > growth > maturity
+        priority_map = {
+            "decline": 0,
+            "stagnation": 1,
+            "dead": 2,
+            "launch": 3,
+            "growth": 4,
+            "maturity": 5
+        }
 
-            campaign_stages.sort(key=lambda x: (
-                priority_map.get(x["stage"], 99),
-                -x["total_cost"]  # внутри группы - по убыванию расхода
-            ))
+        campaign_stages.sort(key=lambda x: (
+            priority_map.get(x["stage"], 99),
+            -x["total_cost"]  # внутри группы - по убыванию расхода
+        ))
 
-            return {
-                "campaigns": campaign_stages,
-                "summary": {
-                    "total_analyzed": len(campaign_stages),
-                    "launch_count": stage_counts["launch"],
-                    "growth_count": stage_counts["growth"],
-                    "maturity_count": stage_counts["maturity"],
-                    "decline_count": stage_counts["decline"],
-                    "stagnation_count": stage_counts["stagnation"],
-                    "dead_count": stage_counts["dead"]
-                },
-                "period": {
-                    "days_history": days_history,
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat()
-                },
-                "params": {
-                    "min_spend": min_spend,
-                    "stagnation_threshold": stagnation_threshold
-                }
+        return {
+            "campaigns": campaign_stages,
+            "summary": {
+                "total_analyzed": len(campaign_stages),
+                "launch_count": stage_counts["launch"],
+                "growth_count": stage_counts["growth"],
+                "maturity_count": stage_counts["maturity"],
+                "decline_count": stage_counts["decline"],
+                "stagnation_count": stage_counts["stagnation"],
+                "dead_count": stage_counts["dead"]
+            },
+            "period": {
+                "days_history": days_history,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
+            },
+            "params": {
+                "min_spend": min_spend,
+                "stagnation_threshold": stagnation_threshold
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
@@ -0,0 +1,312 @@
+"""
+Пакетный движок прогнозирования для модулей predictive
+
+roi_forecast, revenue_projection, profitability_horizon, approval_rate_predictor
+и campaign_lifecycle_stage строят прогнозы по дневным рядам кампаний.
+Движок загружает ряды одним запросом в плоские массивы, упаковывает их в
+матрицы (кампании, дни) и считает для всех кампаний сразу:
+- регрессию МНК (stats_kernel.linear_regression, пропуски - NaN)
+- прогноз на горизонт и интервалы предсказания
+- число дней до безубыточности
+
+Ось X, как и раньше в модулях, - порядковый номер значения в ряду
+(ряд упакован по левому краю), день прогноза i (с 1) имеет x = n - 1 + i.
+
+Использование:
+    from .forecast_engine import load_daily_series, pack, fit, project
+
+    series = load_daily_series(date_from, positive="cost")
+    roi = pack(series, series["roi"])
+    regression = fit(roi)
+    predicted = project(regression, forecast_days)
+"""
+import logging
+from contextlib import contextmanager
+from datetime import date
+from statistics import NormalDist
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import Float, func, select, type_coerce
+
+from storage.database.base import get_session
+from storage.database.models import Campaign, CampaignStatsDaily
+from .. import stats_kernel
+
+logger = logging.getLogger(__name__)
+
+# Колонки, по которым можно отобрать дни со значением > 0
+POSITIVE_FILTERS = {
+    "cost": CampaignStatsDaily.cost,
+    "revenue": CampaignStatsDaily.revenue,
+    "leads": CampaignStatsDaily.leads
+}
+
+
+@contextmanager
+def get_db_session():
+    """
+    Локальная обертка над get_session() для использования в with.
+    Преобразует генератор в контекстный менеджер.
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        yield session
+    finally:
+        try:
+            next(session_gen)
+        except StopIteration:
+            pass
+
+
+def load_daily_series(date_from: date, positive: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Загружает дневные ряды всех кампаний с date_from одним запросом.
+
+    Деньги читаются как REAL и округляются до центов (как Numeric(10, 2)),
+    фильтр positive применяется в SQL к исходным значениям.
+
+    Args:
+        date_from: Начало окна
+        positive: Учитывать только дни, где эта колонка > 0 (cost, revenue, leads)
+
+    Returns:
+        Dict:
+            campaign_ids - internal_id кампаний (строки матриц, по возрастанию)
+            info - internal_id -> binom_id, name, group
+            index, position - строка кампании и номер дня в ряду для каждой дневной строки
+            lengths - длина ряда кампании
+            cost, revenue, clicks, leads, a_leads - плоские массивы дневных значений
+            roi - дневной ROI (0 при нулевом расходе)
+    """
+    query = select(
+        CampaignStatsDaily.campaign_id,
+        type_coerce(CampaignStatsDaily.cost, Float),
+        func.coalesce(type_coerce(CampaignStatsDaily.revenue, Float), 0.0),
+        func.coalesce(CampaignStatsDaily.clicks, 0),
+        func.coalesce(CampaignStatsDaily.leads, 0),
+        func.coalesce(CampaignStatsDaily.a_leads, 0),
+        Campaign.binom_id,
+        Campaign.current_name,
+        Campaign.group_name
+    ).join(
+        Campaign,
+        Campaign.internal_id == CampaignStatsDaily.campaign_id
+    ).filter(
+        CampaignStatsDaily.date >= date_from
+    ).order_by(
+        CampaignStatsDaily.campaign_id,
+        CampaignStatsDaily.date
+    )
+    if positive is not None:
+        query = query.filter(POSITIVE_FILTERS[positive] > 0)
+
+    with get_db_session() as session:
+        # Core-запрос без сборки ORM-строк
+        rows = session.connection().execute(query).all()
+
+    columns = list(zip(*rows)) if rows else [()] * 9
+    ids, index, lengths = np.unique(np.array(columns[0], dtype=np.int64), return_inverse=True, return_counts=True)
+    index = index.ravel()
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+
+    # Атрибуты кампании повторяются в каждой строке - берем из первой
+    info = {
+        campaign_id: {
+            "binom_id": columns[6][start],
+            "name": columns[7][start],
+            "group": columns[8][start] or "Без группы"
+        }
+        for campaign_id, start in zip(ids.tolist(), starts.tolist())
+    }
+
+    cost = stats_kernel.round_decimal(np.array(columns[1], dtype=np.float64), 2)
+    revenue = stats_kernel.round_decimal(np.array(columns[2], dtype=np.float64), 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roi = np.where(cost > 0, (revenue - cost) / cost * 100, 0.0)
+
+    logger.debug(f"Forecast engine: loaded {len(rows)} daily rows for {len(ids)} campaigns since {date_from}")
+
+    return {
+        "campaign_ids": ids.tolist(),
+        "info": info,
+        "index": index,
+        "position": np.arange(len(index)) - starts[index],
+        "lengths": lengths.astype(np.int64),
+        "cost": cost,
+        "revenue": revenue,
+        "clicks": np.array(columns[3], dtype=np.int64),
+        "leads": np.array(columns[4], dtype=np.int64),
+        "a_leads": np.array(columns[5], dtype=np.int64),
+        "roi": roi
+    }
+
+
+def pack(series: Dict[str, Any], values: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Упаковывает дневные значения в матрицу (кампании, дни) по левому краю.
+
+    Args:
+        series: Результат load_daily_series
+        values: Плоский массив дневных значений
+        mask: Оставить только эти дни (ряд кампании сжимается без пропусков)
+
+    Returns:
+        np.ndarray с NaN-дополнением справа
+    """
+    index = series["index"]
+    position = series["position"]
+    if mask is not None:
+        index = index[mask]
+        values = values[mask]
+        # Номер дня среди отобранных дней кампании
+        counts = np.bincount(index, minlength=len(series["campaign_ids"]))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        position = np.arange(len(index)) - starts[index]
+
+    width = int(position.max()) + 1 if len(position) else 0
+    matrix = np.full((len(series["campaign_ids"]), width), np.nan)
+    matrix[index, position] = values
+    return matrix
+
+
+def row_means(matrix: np.ndarray) -> np.ndarray:
+    """
+    Среднее ряда как np.mean() по списку значений (тот же порядок суммирования).
+
+    Элементы - np.float64: round() от них округляет как np.round,
+    а не как round() от Python float.
+
+    Returns:
+        np.ndarray длины n_rows; NaN для пустых рядов
+    """
+    lengths = stats_kernel.valid_counts(matrix)
+    result = np.full(matrix.shape[0], np.nan)
+    for length in np.unique(lengths[lengths > 0]):
+        rows = np.flatnonzero(lengths == length)
+        result[rows] = matrix[rows, :length].mean(axis=1)
+    return result
+
+
+def last_values(matrix: np.ndarray) -> np.ndarray:
+    """Последнее значение каждого ряда (NaN для пустых)"""
+    lengths = stats_kernel.valid_counts(matrix)
+    result = np.full(matrix.shape[0], np.nan)
+    rows = np.flatnonzero(lengths > 0)
+    result[rows] = matrix[rows, lengths[rows] - 1]
+    return result
+
+
+def fit(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Регрессия МНК всех рядов и σ остатков (для интервалов предсказания).
+
+    Returns:
+        Результат stats_kernel.linear_regression + residual_std
+    """
+    regression = stats_kernel.linear_regression(matrix)
+    regression["residual_std"] = stats_kernel.residual_std(regression)
+    return regression
+
+
+def project(
+    regression: Dict[str, np.ndarray],
+    horizon: int,
+    lower: Optional[float] = None,
+    upper: Optional[float] = None
+) -> np.ndarray:
+    """
+    Прогноз линии тренда на horizon дней вперед.
+
+    Args:
+        regression: Результат fit
+        horizon: Дней прогноза
+        lower, upper: Ограничения значения (например, revenue >= 0, approve rate <= 100)
+
+    Returns:
+        np.ndarray формы (n_rows, horizon)
+    """
+    x = regression["n"][:, None] + np.arange(horizon)[None, :]
+    predicted = regression["slope"][:, None] * x + regression["intercept"][:, None]
+    if lower is not None or upper is not None:
+        predicted = np.clip(predicted, lower, upper)
+    return predicted
+
+
+def prediction_interval(
+    regression: Dict[str, np.ndarray],
+    horizon: int,
+    confidence_level: float
+) -> np.ndarray:
+    """
+    Полуширина интервала предсказания для каждого дня прогноза.
+
+    s * z * sqrt(1 + 1/n + (x0 - x̄)² / Sxx), s - σ остатков регрессии,
+    z - квантиль нормального распределения (без scipy t-квантиль не считаем,
+    при 7+ днях истории разница невелика).
+
+    Args:
+        regression: Результат fit
+        horizon: Дней прогноза
+        confidence_level: Уровень доверия, %
+
+    Returns:
+        np.ndarray формы (n_rows, horizon); NaN где точек меньше 3
+    """
+    n = regression["n"].astype(np.float64)[:, None]
+    x0 = n + np.arange(horizon)[None, :]
+    x_mean = (n - 1) / 2
+    sxx = n * (n * n - 1) / 12
+    z = NormalDist().inv_cdf(0.5 + confidence_level / 200)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spread = np.sqrt(1 + 1 / n + (x0 - x_mean) ** 2 / sxx)
+    return z * regression["residual_std"][:, None] * spread
+
+
+def breakeven_days(current: np.ndarray, slope: np.ndarray) -> np.ndarray:
+    """
+    Дней до ROI = 0 при текущем ROI и линейном тренде: -current / slope.
+
+    Returns:
+        np.ndarray; NaN если тренд не растет или ROI уже не отрицательный
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        days = np.where(slope > 0, -current / np.where(slope > 0, slope, 1.0), np.nan)
+    return np.where(days > 0, days, np.nan)
+
+
+def forecast_points(
+    predicted: np.ndarray,
+    row: int,
+    key: str,
+    half_width: Optional[np.ndarray] = None,
+    lower: Optional[float] = None
+) -> list:
+    """
+    Точки прогноза кампании для ответа модуля.
+
+    Args:
+        predicted: Результат project
+        row: Строка кампании
+        key: Имя поля прогноза (predicted_roi, predicted_revenue, ...)
+        half_width: Результат prediction_interval (добавляет lower_bound / upper_bound)
+        lower: Нижнее ограничение границы интервала
+
+    Returns:
+        List[Dict]: day, key[, lower_bound, upper_bound]
+    """
+    points = []
+    for i, value in enumerate(predicted[row].tolist()):
+        point = {"day": i + 1, key: round(value, 2)}
+        if half_width is not None:
+            width = float(half_width[row, i])
+            bottom = value - width
+            if lower is not None:
+                bottom = max(lower, bottom)
+            point["lower_bound"] = round(bottom, 2)
+            point["upper_bound"] = round(value + width, 2)
+        points.append(point)
+    return points
@@ -3,31 +3,11 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
 import numpy as np
-from collections import defaultdict
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from . import forecast_engine
 
 
 class RevenueProjection(BaseModule):
@@ -51,7 +31,7 @@ class RevenueProjection(BaseModule):
             category="predictive",
             description="Прогнозирует revenue на следующие 7 дней на основе исторических данных",
             detailed_description="Модуль анализирует динамику revenue за последние 14-30 дней и строит прогноз используя линейную экстраполяцию с учетом тренда.",
-            version="1.0.0",
+            version="1.1.0",
             author="Binom Assistant",
             priority="medium",
             tags=["revenue", "forecast", "prediction", "income"]
@@ -110,89 +90,6 @@ class RevenueProjection(BaseModule):
             }
         }
 
-    def _simple_linear_regression(self, x_values: List[float], y_values: List[float]) -> tuple:
-        """
-        Простая линейная регрессия.
-
-        Returns:
-            (slope, intercept, r_squared)
-        """
-        n = len(x_values)
-        if n < 2:
-            return 0, 0, 0
-
-        x_mean = np.mean(x_values)
-        y_mean = np.mean(y_values)
-
-        numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
-        denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return 0, y_mean, 0
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        # R-squared
-        ss_tot = sum((y_values[i] - y_mean) ** 2 for i in range(n))
-        ss_res = sum((y_values[i] - (slope * x_values[i] + intercept)) ** 2 for i in range(n))
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-
-        return slope, intercept, r_squared
-
-    def _calculate_forecast(self, historical_revenue: List[float], forecast_days: int, confidence_level: int) -> Dict[str, Any]:
-        """
-        Рассчитывает прогноз revenue используя линейную регрессию.
-
-        Args:
-            historical_revenue: Список исторических значений revenue
-            forecast_days: Количество дней для прогноза
-            confidence_level: Уровень доверительного интервала (не используется)
-
-        Returns:
-            Dict с прогнозными значениями
-        """
-        # Минимум 7 дней для значимого прогноза
-        if len(historical_revenue) < 7:
-            return None
-
-        # Подготовка данных для регрессии
-        x_values = list(range(len(historical_revenue)))
-        y_values = historical_revenue
-
-        # Линейная регрессия
-        slope, intercept, r_squared = self._simple_linear_regression(x_values, y_values)
-
-        # Расчет стандартного отклонения для информации
-        std_dev = np.std(historical_revenue)
-
-        # Прогноз
-        forecast_values = []
-        total_projected_revenue = 0
-
-        for i in range(forecast_days):
-            day_offset = len(historical_revenue) + i
-            predicted_revenue = slope * day_offset + intercept
-
-            # Revenue не может быть отрицательным
-            predicted_revenue = max(0, predicted_revenue)
-
-            forecast_values.append({
-                "day": i + 1,
-                "predicted_revenue": round(predicted_revenue, 2)
-            })
-
-            total_projected_revenue += predicted_revenue
-
-        return {
-            "forecast": forecast_values,
-            "total_projected_revenue": round(total_projected_revenue, 2),
-            "trend_slope": round(slope, 4),
-            "r_squared": round(r_squared, 4),
-            "avg_historical_revenue": round(np.mean(historical_revenue), 2),
-            "std_dev": round(std_dev, 2)
-        }
-
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
         Прогнозирование revenue для активных кампаний.
@@ -211,153 +108,116 @@ class RevenueProjection(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=history_days - 1)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем все активные кампании с историей
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.revenue > 0
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "daily_stats": []
+        # Дневные ряды всех кампаний с доходом (строка матрицы = кампания)
+        series = forecast_engine.load_daily_series(date_from, positive="revenue")
+        revenue_matrix = forecast_engine.pack(series, series["revenue"])
+        lengths = series["lengths"]
+
+        # Регрессия, прогноз и интервалы предсказания сразу по всем кампаниям.
+        # Revenue не может быть отрицательным
+        regression = forecast_engine.fit(revenue_matrix)
+        predicted = forecast_engine.project(regression, forecast_days, lower=0)
+        half_width = forecast_engine.prediction_interval(regression, forecast_days, confidence_level)
+        projected_totals = stats_kernel.row_sums(predicted)
+        revenue_std = stats_kernel.nan_std(revenue_matrix)
+        avg_historical = forecast_engine.row_means(revenue_matrix)
+        current_revenue = forecast_engine.last_values(revenue_matrix)
+
+        total_revenues = stats_kernel.row_sums(revenue_matrix)
+        total_costs = stats_kernel.row_sums(forecast_engine.pack(series, series["cost"]))
+
+        # Обработка и прогнозирование
+        forecasts = []
+        total_campaigns_analyzed = 0
+        increasing_forecasts = 0
+        decreasing_forecasts = 0
+        stable_forecasts = 0
+
+        for row, campaign_id in enumerate(series["campaign_ids"]):
+            days_of_data = int(lengths[row])
+
+            # Фильтрация: минимальный revenue за весь период
+            total_revenue = float(total_revenues[row])
+            if total_revenue < min_revenue:
+                continue
+
+            # Минимум 7 дней для значимого прогноза
+            if days_of_data < 7:
+                continue
+
+            slope, _, r_squared = stats_kernel.regression_at(regression, row)
+            trend_slope = round(slope, 4)
+            total_projected_revenue = round(float(projected_totals[row]), 2)
+
+            # Агрегированная статистика
+            total_cost = float(total_costs[row])
+
+            # Средний прогнозируемый дневной revenue
+            predicted_daily_revenue = total_projected_revenue / forecast_days
+
+            # Классификация тренда ($/день)
+            if trend_slope > 1:
+                trend = "increasing"
+                trend_label = "Рост"
+                increasing_forecasts += 1
+            elif trend_slope < -1:
+                trend = "decreasing"
+                trend_label = "Падение"
+                decreasing_forecasts += 1
+            else:
+                trend = "stable"
+                trend_label = "Стабильный"
+                stable_forecasts += 1
+
+            info = series["info"][campaign_id]
+            forecasts.append({
+                "campaign_id": campaign_id,
+                "binom_id": info["binom_id"],
+                "name": info["name"],
+                "group": info["group"],
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "current_daily_revenue": round(float(current_revenue[row]), 2),
+                "predicted_daily_revenue": round(predicted_daily_revenue, 2),
+                "total_projected_revenue": total_projected_revenue,
+                "forecast": forecast_engine.forecast_points(
+                    predicted, row, "predicted_revenue", half_width, lower=0
+                ),
+                "trend": trend,
+                "trend_label": trend_label,
+                "trend_slope": trend_slope,
+                "r_squared": round(r_squared, 4),
+                "avg_historical_revenue": float(round(avg_historical[row], 2)),
+                "std_dev": round(float(revenue_std[row]), 2),
+                "days_of_data": days_of_data
             })
 
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-
-                revenue = float(row.revenue)
-
-                campaigns_data[campaign_id]["daily_stats"].append({
-                    "date": row.date,
-                    "cost": float(row.cost),
-                    "revenue": revenue,
-                    "clicks": row.clicks,
-                    "leads": row.leads
-                })
-
-            # Обработка и прогнозирование
-            forecasts = []
-            total_campaigns_analyzed = 0
-            increasing_forecasts = 0
-            decreasing_forecasts = 0
-            stable_forecasts = 0
-
-            for campaign_id, data in campaigns_data.items():
-                daily_stats = data["daily_stats"]
-
-                # Фильтрация: минимальный revenue за весь период
-                total_revenue = sum(d["revenue"] for d in daily_stats)
-                if total_revenue < min_revenue:
-                    continue
-
-                # Извлекаем revenue для прогноза
-                historical_revenue = [d["revenue"] for d in daily_stats]
-
-                # Рассчитываем прогноз
-                forecast_result = self._calculate_forecast(
-                    historical_revenue,
-                    forecast_days,
-                    confidence_level
-                )
-
-                if not forecast_result:
-                    continue
-
-                # Агрегированная статистика
-                total_cost = sum(d["cost"] for d in daily_stats)
-                avg_daily_revenue = total_revenue / len(daily_stats)
-                current_daily_revenue = historical_revenue[-1]
-
-                # Средний прогнозируемый дневной revenue
-                predicted_daily_revenue = forecast_result["total_projected_revenue"] / forecast_days
-
-                # Классификация тренда ($/день)
-                trend_slope = forecast_result["trend_slope"]
-                if trend_slope > 1:
-                    trend = "increasing"
-                    trend_label = "Рост"
-                    increasing_forecasts += 1
-                elif trend_slope < -1:
-                    trend = "decreasing"
-                    trend_label = "Падение"
-                    decreasing_forecasts += 1
-                else:
-                    trend = "stable"
-                    trend_label = "Стабильный"
-                    stable_forecasts += 1
-
-                forecasts.append({
-                    "campaign_id": campaign_id,
-                    "binom_id": data["binom_id"],
-                    "name": data["name"],
-                    "group": data["group"],
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "current_daily_revenue": round(current_daily_revenue, 2),
-                    "predicted_daily_revenue": round(predicted_daily_revenue, 2),
-                    "total_projected_revenue": forecast_result["total_projected_revenue"],
-                    "forecast": forecast_result["forecast"],
-                    "trend": trend,
-                    "trend_label": trend_label,
-                    "trend_slope": forecast_result["trend_slope"],
-                    "r_squared": forecast_result["r_squared"],
-                    "avg_historical_revenue": forecast_result["avg_historical_revenue"],
-                    "std_dev": forecast_result["std_dev"],
-                    "days_of_data": len(daily_stats)
-                })
-
-                total_campaigns_analyzed += 1
-
-            # Сортировка: по убыванию total_projected_revenue - сначала самые доходные
-            forecasts.sort(key=lambda x: x["total_projected_revenue"], reverse=True)
-
-            return {
-                "forecasts": forecasts,
-                "summary": {
-                    "total_analyzed": total_campaigns_analyzed,
-                    "increasing_count": increasing_forecasts,
-                    "decreasing_count": decreasing_forecasts,
-                    "stable_count": stable_forecasts,
-                    "avg_r_squared": round(np.mean([f["r_squared"] for f in forecasts]), 3) if forecasts else 0,
-                    "total_projected_revenue": round(sum(f["total_projected_revenue"] for f in forecasts), 2)
-                },
-                "period": {
-                    "history_days": history_days,
-                    "forecast_days": forecast_days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": (datetime.now().date() + timedelta(days=forecast_days)).isoformat()
-                },
-                "params": {
-                    "min_revenue": min_revenue,
-                    "confidence_level": confidence_level
-                }
+            total_campaigns_analyzed += 1
+
+        # Сортировка: по убыванию total_projected_revenue - сначала самые доходные
+        forecasts.sort(key=lambda x: x["total_projected_revenue"], reverse=True)
+
+        return {
+            "forecasts": forecasts,
+            "summary": {
+                "total_analyzed": total_campaigns_analyzed,
+                "increasing_count": increasing_forecasts,
+                "decreasing_count": decreasing_forecasts,
+                "stable_count": stable_forecasts,
+                "avg_r_squared": round(np.mean([f["r_squared"] for f in forecasts]), 3) if forecasts else 0,
+                "total_projected_revenue": round(sum(f["total_projected_revenue"] for f in forecasts), 2)
+            },
+            "period": {
+                "history_days": history_days,
+                "forecast_days": forecast_days,
+                "date_from": date_from.isoformat(),
+                "date_to": (datetime.now().date() + timedelta(days=forecast_days)).isoformat()
+            },
+            "params": {
+                "min_revenue": min_revenue,
+                "confidence_level": confidence_level
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
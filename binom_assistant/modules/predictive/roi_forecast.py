@@ -3,31 +3,11 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
 import numpy as np
-from collections import defaultdict
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from . import forecast_engine
 
 
 class ROIForecast(BaseModule):
@@ -51,7 +31,7 @@ class ROIForecast(BaseModule):
             category="predictive",
             description="Прогнозирует ROI на 3-7 дней вперед на основе исторических данных",
             detailed_description="Модуль анализирует динамику ROI за последние 30 дней и строит прогноз используя линейную экстраполяцию с учетом тренда и сезонности.",
-            version="1.0.0",
+            version="1.1.0",
             author="Binom Assistant",
             priority="medium",
             tags=["roi", "forecast", "prediction", "trends"]
@@ -156,81 +136,6 @@ class ROIForecast(BaseModule):
             ]
         }
 
-    def _simple_linear_regression(self, x_values: List[float], y_values: List[float]) -> tuple:
-        """
-        Простая линейная регрессия.
-
-        Returns:
-            (slope, intercept, r_squared)
-        """
-        n = len(x_values)
-        if n < 2:
-            return 0, 0, 0
-
-        x_mean = np.mean(x_values)
-        y_mean = np.mean(y_values)
-
-        numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
-        denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return 0, y_mean, 0
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        # R-squared
-        ss_tot = sum((y_values[i] - y_mean) ** 2 for i in range(n))
-        ss_res = sum((y_values[i] - (slope * x_values[i] + intercept)) ** 2 for i in range(n))
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-
-        return slope, intercept, r_squared
-
-    def _calculate_forecast(self, historical_roi: List[float], forecast_days: int, confidence_level: int) -> Dict[str, Any]:
-        """
-        Рассчитывает прогноз ROI используя линейную регрессию.
-
-        Args:
-            historical_roi: Список исторических значений ROI
-            forecast_days: Количество дней для прогноза
-            confidence_level: Уровень доверительного интервала (не используется)
-
-        Returns:
-            Dict с прогнозными значениями
-        """
-        # Минимум 7 дней для значимого прогноза
-        if len(historical_roi) < 7:
-            return None
-
-        # Подготовка данных для регрессии
-        x_values = list(range(len(historical_roi)))
-        y_values = historical_roi
-
-        # Линейная регрессия
-        slope, intercept, r_squared = self._simple_linear_regression(x_values, y_values)
-
-        # Расчет стандартного отклонения для информации
-        std_dev = np.std(historical_roi)
-
-        # Прогноз
-        forecast_values = []
-        for i in range(forecast_days):
-            day_offset = len(historical_roi) + i
-            predicted_roi = slope * day_offset + intercept
-
-            forecast_values.append({
-                "day": i + 1,
-                "predicted_roi": round(predicted_roi, 2)
-            })
-
-        return {
-            "forecast": forecast_values,
-            "trend_slope": round(slope, 4),
-            "r_squared": round(r_squared, 4),
-            "avg_historical_roi": round(np.mean(historical_roi), 2),
-            "std_dev": round(std_dev, 2)
-        }
-
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
         Прогнозирование ROI для активных кампаний.
@@ -254,170 +159,125 @@ class ROIForecast(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=history_days - 1)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем все активные кампании с историей
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost > 0
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "daily_stats": []
+        # Дневные ряды всех кампаний с расходом (строка матрицы = кампания)
+        series = forecast_engine.load_daily_series(date_from, positive="cost")
+        roi_matrix = forecast_engine.pack(series, series["roi"])
+        lengths = series["lengths"]
+
+        # Регрессия, прогноз и интервалы предсказания сразу по всем кампаниям
+        regression = forecast_engine.fit(roi_matrix)
+        predicted = forecast_engine.project(regression, forecast_days)
+        half_width = forecast_engine.prediction_interval(regression, forecast_days, confidence_level)
+        roi_std = stats_kernel.nan_std(roi_matrix)
+        avg_historical = forecast_engine.row_means(roi_matrix)
+        current_roi = forecast_engine.last_values(roi_matrix)
+
+        total_costs = stats_kernel.row_sums(forecast_engine.pack(series, series["cost"]))
+        total_revenues = stats_kernel.row_sums(forecast_engine.pack(series, series["revenue"]))
+
+        # Обработка и прогнозирование
+        forecasts = []
+        total_campaigns_analyzed = 0
+        improving_forecasts = 0
+        declining_forecasts = 0
+        stable_forecasts = 0
+
+        for row, campaign_id in enumerate(series["campaign_ids"]):
+            days_of_data = int(lengths[row])
+
+            # Фильтрация: минимум дней с данными (и минимум 7 дней для значимого прогноза)
+            if days_of_data < min_history_days or days_of_data < 7:
+                continue
+
+            # Фильтрация: средний расход
+            total_cost = float(total_costs[row])
+            avg_daily_spend = total_cost / days_of_data
+            if avg_daily_spend < min_daily_spend:
+                continue
+
+            slope, _, r_squared = stats_kernel.regression_at(regression, row)
+            trend_slope = round(slope, 4)
+
+            # Агрегированная статистика
+            total_revenue = float(total_revenues[row])
+            avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
+
+            # Классификация тренда
+            if trend_slope > 0.5:
+                trend = "improving"
+                trend_label = "Улучшение"
+                improving_forecasts += 1
+            elif trend_slope < -0.5:
+                trend = "declining"
+                trend_label = "Ухудшение"
+                declining_forecasts += 1
+            else:
+                trend = "stable"
+                trend_label = "Стабильный"
+                stable_forecasts += 1
+
+            forecast = forecast_engine.forecast_points(predicted, row, "predicted_roi", half_width)
+
+            # Определение критичности на основе настраиваемых порогов
+            last_forecast = forecast[-1]
+            if last_forecast["predicted_roi"] < severity_high_threshold:
+                severity = "high"
+            elif last_forecast["predicted_roi"] < severity_medium_threshold:
+                severity = "medium"
+            else:
+                severity = "low"
+
+            info = series["info"][campaign_id]
+            forecasts.append({
+                "campaign_id": campaign_id,
+                "binom_id": info["binom_id"],
+                "name": info["name"],
+                "group": info["group"],
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "avg_roi": round(avg_roi, 2),
+                "current_roi": round(float(current_roi[row]), 2),
+                "forecast": forecast,
+                "trend": trend,
+                "trend_label": trend_label,
+                "trend_slope": trend_slope,
+                "r_squared": round(r_squared, 4),
+                "avg_historical_roi": float(round(avg_historical[row], 2)),
+                "std_dev": round(float(roi_std[row]), 2),
+                "days_of_data": days_of_data,
+                "avg_daily_spend": round(avg_daily_spend, 2),
+                "severity": severity
             })
 
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
-
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-
-                campaigns_data[campaign_id]["daily_stats"].append({
-                    "date": row.date,
-                    "cost": cost,
-                    "revenue": revenue,
-                    "roi": roi,
-                    "clicks": row.clicks,
-                    "leads": row.leads
-                })
-
-            # Обработка и прогнозирование
-            forecasts = []
-            total_campaigns_analyzed = 0
-            improving_forecasts = 0
-            declining_forecasts = 0
-            stable_forecasts = 0
-
-            for campaign_id, data in campaigns_data.items():
-                daily_stats = data["daily_stats"]
-
-                # Фильтрация: минимум дней с данными
-                if len(daily_stats) < min_history_days:
-                    continue
-
-                # Фильтрация: средний расход
-                avg_daily_spend = sum(d["cost"] for d in daily_stats) / len(daily_stats)
-                if avg_daily_spend < min_daily_spend:
-                    continue
-
-                # Извлекаем ROI для прогноза
-                historical_roi = [d["roi"] for d in daily_stats]
-
-                # Рассчитываем прогноз
-                forecast_result = self._calculate_forecast(
-                    historical_roi,
-                    forecast_days,
-                    confidence_level
-                )
-
-                if not forecast_result:
-                    continue
-
-                # Агрегированная статистика
-                total_cost = sum(d["cost"] for d in daily_stats)
-                total_revenue = sum(d["revenue"] for d in daily_stats)
-                avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
-
-                # Классификация тренда
-                trend_slope = forecast_result["trend_slope"]
-                if trend_slope > 0.5:
-                    trend = "improving"
-                    trend_label = "Улучшение"
-                    improving_forecasts += 1
-                elif trend_slope < -0.5:
-                    trend = "declining"
-                    trend_label = "Ухудшение"
-                    declining_forecasts += 1
-                else:
-                    trend = "stable"
-                    trend_label = "Стабильный"
-                    stable_forecasts += 1
-
-                # Определение критичности на основе настраиваемых порогов
-                last_forecast = forecast_result["forecast"][-1]
-                if last_forecast["predicted_roi"] < severity_high_threshold:
-                    severity = "high"
-                elif last_forecast["predicted_roi"] < severity_medium_threshold:
-                    severity = "medium"
-                else:
-                    severity = "low"
-
-                forecasts.append({
-                    "campaign_id": campaign_id,
-                    "binom_id": data["binom_id"],
-                    "name": data["name"],
-                    "group": data["group"],
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "avg_roi": round(avg_roi, 2),
-                    "current_roi": round(historical_roi[-1], 2),
-                    "forecast": forecast_result["forecast"],
-                    "trend": trend,
-                    "trend_label": trend_label,
-                    "trend_slope": forecast_result["trend_slope"],
-                    "r_squared": forecast_result["r_squared"],
-                    "avg_historical_roi": forecast_result["avg_historical_roi"],
-                    "std_dev": forecast_result["std_dev"],
-                    "days_of_data": len(daily_stats),
-                    "avg_daily_spend": round(avg_daily_spend, 2),
-                    "severity": severity
-                })
-
-                total_campaigns_analyzed += 1
-
-            # Сортировка: сначала ухудшающиеся
-            forecasts.sort(key=lambda x: (
-                0 if x["trend"] == "declining" else 1 if x["trend"] == "stable" else 2,
-                x["trend_slope"]
-            ))
-
-            return {
-                "forecasts": forecasts,
-                "summary": {
-                    "total_analyzed": total_campaigns_analyzed,
-                    "improving_count": improving_forecasts,
-                    "declining_count": declining_forecasts,
-                    "stable_count": stable_forecasts,
-                    "avg_r_squared": round(np.mean([f["r_squared"] for f in forecasts]), 3) if forecasts else 0
-                },
-                "period": {
-                    "history_days": history_days,
-                    "forecast_days": forecast_days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": (datetime.now().date() + timedelta(days=forecast_days)).isoformat()
-                },
-                "params": {
-                    "min_history_days": min_history_days,
-                    "min_daily_spend": min_daily_spend,
-                    "confidence_level": confidence_level
-                }
+            total_campaigns_analyzed += 1
+
+        # Сортировка: сначала ухудшающиеся
+        forecasts.sort(key=lambda x: (
+            0 if x["trend"] == "declining" else 1 if x["trend"] == "stable" else 2,
+            x["trend_slope"]
+        ))
+
+        return {
+            "forecasts": forecasts,
+            "summary": {
+                "total_analyzed": total_campaigns_analyzed,
+                "improving_count": improving_forecasts,
+                "declining_count": declining_forecasts,
+                "stable_count": stable_forecasts,
+                "avg_r_squared": round(np.mean([f["r_squared"] for f in forecasts]), 3) if forecasts else 0
+            },
+            "period": {
+                "history_days": history_days,
+                "forecast_days": forecast_days,
+                "date_from": date_from.isoformat(),
+                "date_to": (datetime.now().date() + timedelta(days=forecast_days)).isoformat()
+            },
+            "params": {
+                "min_history_days": min_history_days,
+                "min_daily_spend": min_daily_spend,
+                "confidence_level": confidence_level
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
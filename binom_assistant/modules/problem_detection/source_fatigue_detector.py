@@ -2,13 +2,13 @@
 Модуль обнаружения выгорания источников трафика
 """
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from datetime import datetime
 from contextlib import contextmanager
 from collections import defaultdict
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
+from storage.database.period_comparison import adjacent_periods, compare_periods
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
 
 
@@ -168,89 +168,51 @@ class SourceFatigueDetector(BaseModule):
         severity_high_cpc_growth = config.params.get("severity_high_cpc_growth", 40)
 
         # Периоды анализа
-        # Текущий период: последние days дней (включая сегодня)
-        current_date_to = datetime.now().date()
-        current_date_from = current_date_to - timedelta(days=days - 1)
-
-        # Предыдущий период: предыдущие days дней
-        previous_date_to = current_date_from - timedelta(days=1)
-        previous_date_from = previous_date_to - timedelta(days=days - 1)
+        # Текущий период: последние days дней (включая сегодня),
+        # предыдущий период: предыдущие days дней
+        periods = adjacent_periods(datetime.now().date(), days)
+        (current_date_from, current_date_to), (previous_date_from, previous_date_to) = periods
 
         # Работа с БД
         with get_db_session() as session:
-            # Получаем данные для текущего периода
-            current_query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                func.sum(CampaignStatsDaily.cost).label('total_cost'),
-                func.sum(CampaignStatsDaily.clicks).label('total_clicks'),
-                func.sum(CampaignStatsDaily.leads).label('total_leads')
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= current_date_from,
-                CampaignStatsDaily.date <= current_date_to
-            ).group_by(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name
-            )
-
-            current_results = current_query.all()
-
-            # Получаем данные для предыдущего периода
-            previous_query = session.query(
-                Campaign.internal_id,
-                func.sum(CampaignStatsDaily.cost).label('total_cost'),
-                func.sum(CampaignStatsDaily.clicks).label('total_clicks'),
-                func.sum(CampaignStatsDaily.leads).label('total_leads')
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= previous_date_from,
-                CampaignStatsDaily.date <= previous_date_to
-            ).group_by(
-                Campaign.internal_id
+            # Оба периода одним запросом, атрибуты кампании - к агрегатам
+            comparison = compare_periods(
+                session,
+                periods,
+                sums={
+                    "cost": CampaignStatsDaily.cost,
+                    "clicks": CampaignStatsDaily.clicks,
+                    "leads": CampaignStatsDaily.leads
+                },
+                key=CampaignStatsDaily.campaign_id,
+                attributes=[Campaign.binom_id, Campaign.current_name, Campaign.group_name],
+                attributes_key=Campaign.internal_id
             )
 
-            previous_results = previous_query.all()
-
-            # Создаем словарь для предыдущего периода
-            previous_data = {}
-            for row in previous_results:
-                previous_data[row.internal_id] = {
-                    "cost": float(row.total_cost) if row.total_cost else 0,
-                    "clicks": row.total_clicks or 0,
-                    "leads": row.total_leads or 0
-                }
-
             # Обработка и поиск кампаний с выгоранием
             problem_campaigns = []
             total_campaigns_checked = 0
             critical_count = 0
             high_count = 0
 
-            for row in current_results:
-                campaign_id = row.internal_id
+            for row in comparison:
+                current, previous = row["current"], row["previous"]
+                campaign_id = row["key"]
+                binom_id, current_name, group_name = row["attributes"]
+
+                # Кампания должна иметь статистику в обоих периодах
+                if not current["rows"] or not previous["rows"]:
+                    continue
 
                 # Текущий период
-                current_cost = float(row.total_cost) if row.total_cost else 0
-                current_clicks = row.total_clicks or 0
-                current_leads = row.total_leads or 0
+                current_cost = float(current["cost"]) if current["cost"] else 0
+                current_clicks = current["clicks"] or 0
+                current_leads = current["leads"] or 0
 
                 # Предыдущий период
-                if campaign_id not in previous_data:
-                    continue
-
-                prev_data = previous_data[campaign_id]
-                previous_cost = prev_data["cost"]
-                previous_clicks = prev_data["clicks"]
-                previous_leads = prev_data["leads"]
+                previous_cost = float(previous["cost"]) if previous["cost"] else 0
+                previous_clicks = previous["clicks"] or 0
+                previous_leads = previous["leads"] or 0
 
                 # Фильтрация: минимум кликов в обоих периодах
                 if current_clicks < min_clicks or previous_clicks < min_clicks:
@@ -308,9 +270,9 @@ class SourceFatigueDetector(BaseModule):
 
                 problem_campaigns.append({
                     "campaign_id": campaign_id,
-                    "binom_id": row.binom_id,
-                    "name": row.current_name,
-                    "group": row.group_name or "Без группы",
+                    "binom_id": binom_id,
+                    "name": current_name,
+                    "group": group_name or "Без группы",
                     "current_cpc": round(current_cpc, 3),
                     "previous_cpc": round(previous_cpc, 3),
                     "cpc_growth_percent": round(cpc_growth_percent, 1),
@@ -5,6 +5,7 @@ import logging
 import threading
 from typing import Dict, List, Optional, Type
 from .base_module import BaseModule, ModuleMetadata
+from .manifest import ModuleManifestEntry, import_module_class
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +15,16 @@ class ModuleRegistry:
     Реестр всех доступных модулей аналитики.
 
     Хранит информацию о модулях и позволяет их находить по ID или категории.
+
+    Модули из манифеста регистрируются лениво (register_lazy): метаданные
+    берутся из манифеста, класс импортируется при первом обращении.
     """
 
     def __init__(self):
         self._modules: Dict[str, Type[BaseModule]] = {}
         self._metadata_cache: Dict[str, ModuleMetadata] = {}
+        self._lazy_entries: Dict[str, ModuleManifestEntry] = {}
+        self._import_lock = threading.Lock()
         logger.info("ModuleRegistry initialized")
 
     def register(self, module_class: Type[BaseModule]) -> None:
@@ -36,13 +42,69 @@ class ModuleRegistry:
         module_id = instance.metadata.id
         metadata = instance.metadata
 
-        if module_id in self._modules:
+        if module_id in self._metadata_cache:
             logger.warning(f"Module '{module_id}' already registered, overwriting")
 
         self._modules[module_id] = module_class
         self._metadata_cache[module_id] = metadata  # Кэшируем metadata
+        self._lazy_entries.pop(module_id, None)
         logger.info(f"Module '{module_id}' registered")
 
+    def register_lazy(self, entry: ModuleManifestEntry) -> None:
+        """
+        Регистрирует модуль по записи манифеста без импорта класса.
+
+        Args:
+            entry: Запись манифеста (путь импорта + метаданные)
+        """
+        module_id = entry.metadata.id
+
+        if module_id in self._metadata_cache:
+            logger.warning(f"Module '{module_id}' already registered, overwriting")
+            self._modules.pop(module_id, None)
+
+        self._lazy_entries[module_id] = entry
+        self._metadata_cache[module_id] = entry.metadata
+        logger.debug(f"Module '{module_id}' registered from manifest")
+
+    def _load_lazy(self, module_id: str) -> Optional[Type[BaseModule]]:
+        """
+        Импортирует класс модуля, зарегистрированного по манифесту.
+
+        Args:
+            module_id: ID модуля
+
+        Returns:
+            Type[BaseModule]: Класс модуля или None если импорт не удался
+        """
+        with self._import_lock:
+            # Другой поток мог уже загрузить модуль
+            if module_id in self._modules:
+                return self._modules[module_id]
+
+            entry = self._lazy_entries.get(module_id)
+            if entry is None:
+                return None
+
+            try:
+                module_class = import_module_class(entry.import_path)
+            except Exception as e:
+                logger.error(f"Failed to import module '{module_id}' ({entry.import_path}): {e}")
+                return None
+
+            metadata = module_class().metadata
+            if metadata != entry.metadata:
+                logger.warning(
+                    f"Module '{module_id}': manifest metadata is outdated, "
+                    f"run 'python -m modules.manifest --update'"
+                )
+                self._metadata_cache[module_id] = metadata
+
+            self._modules[module_id] = module_class
+            del self._lazy_entries[module_id]
+            logger.info(f"Module '{module_id}' loaded")
+            return module_class
+
     def unregister(self, module_id: str) -> None:
         """
         Удаляет модуль из реестра.
@@ -50,11 +112,11 @@ class ModuleRegistry:
         Args:
             module_id: ID модуля
         """
-        if module_id in self._modules:
-            del self._modules[module_id]
+        if module_id in self._metadata_cache:
+            self._modules.pop(module_id, None)
+            self._lazy_entries.pop(module_id, None)
             # Удаляем и из кэша metadata
-            if module_id in self._metadata_cache:
-                del self._metadata_cache[module_id]
+            del self._metadata_cache[module_id]
             logger.info(f"Module '{module_id}' unregistered")
         else:
             logger.warning(f"Module '{module_id}' not found in registry")
@@ -62,6 +124,7 @@ class ModuleRegistry:
     def get_module(self, module_id: str) -> Optional[Type[BaseModule]]:
         """
         Получает класс модуля по ID.
+        Модули из манифеста импортируются при первом обращении.
 
         Args:
             module_id: ID модуля
@@ -69,7 +132,52 @@ class ModuleRegistry:
         Returns:
             Type[BaseModule]: Класс модуля или None если не найден
         """
-        return self._modules.get(module_id)
+        module_class = self._modules.get(module_id)
+        if module_class is None and module_id in self._lazy_entries:
+            module_class = self._load_lazy(module_id)
+        return module_class
+
+    def get_default_schedule(self, module_id: str) -> Optional[str]:
+        """
+        Возвращает расписание модуля по умолчанию без импорта модуля.
+
+        Args:
+            module_id: ID модуля
+
+        Returns:
+            Optional[str]: Cron expression ('' - без расписания) или None если модуль не найден
+        """
+        entry = self._lazy_entries.get(module_id)
+        if entry is not None:
+            return entry.default_schedule
+
+        module_class = self._modules.get(module_id)
+        if module_class is None:
+            return None
+        return module_class().get_default_config().schedule or ""
+
+    def is_loaded(self, module_id: str) -> bool:
+        """
+        Проверяет, импортирован ли класс модуля.
+
+        Args:
+            module_id: ID модуля
+
+        Returns:
+            bool: True если класс уже загружен
+        """
+        return module_id in self._modules
+
+    def load_all(self) -> int:
+        """
+        Импортирует все модули из манифеста (прогрев, проверки).
+
+        Returns:
+            int: Количество загруженных модулей
+        """
+        for module_id in list(self._lazy_entries):
+            self.get_module(module_id)
+        return len(self._modules)
 
     def get_module_instance(self, module_id: str) -> Optional[BaseModule]:
         """
@@ -132,7 +240,7 @@ class ModuleRegistry:
         Returns:
             int: Количество модулей
         """
-        return len(self._modules)
+        return len(self._metadata_cache)
 
 
 # Глобальный экземпляр реестра
@@ -5,9 +5,11 @@ from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from contextlib import contextmanager
-from collections import defaultdict
-import statistics
+import itertools
 import math
+import operator
+
+import numpy as np
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
@@ -138,6 +140,95 @@ class SmartConsolidator(BaseModule):
 
         return dot_product / (magnitude1 * magnitude2)
 
+    def _similarity_clusters(self, vectors: np.ndarray, threshold: float) -> List[List[int]]:
+        """
+        Жадная кластеризация по косинусной схожести.
+
+        Кампании обходятся по порядку: первая свободная становится центром
+        кластера и забирает все свободные кампании со схожестью с центром
+        >= threshold (в порядке индексов).
+
+        Схожесть cos >= t для векторов единичной длины означает евклидово
+        расстояние <= sqrt(2 * (1 - t)), поэтому кандидаты ищутся в соседних
+        ячейках сетки с таким шагом, а не перебором всех пар. Для кандидатов
+        схожесть считается по той же формуле, что и _cosine_similarity.
+
+        Args:
+            vectors: Матрица признаков (n x k)
+            threshold: Порог схожести
+
+        Returns:
+            List[List[int]]: Индексы кампаний кластеров, первый - центр
+        """
+        n, dims = vectors.shape
+        norms = np.sqrt(sum(vectors[:, k] * vectors[:, k] for k in range(dims)))
+        used = np.zeros(n, dtype=bool)
+
+        def similarity(seed: int, candidates: np.ndarray) -> np.ndarray:
+            dot = sum(vectors[candidates, k] * vectors[seed, k] for k in range(dims))
+            magnitude = norms[candidates] * norms[seed]
+            return np.where(magnitude > 0, dot / magnitude, 0.0)
+
+        cells = None
+        if threshold > 0:
+            # Нулевые векторы не похожи ни на что и в сетку не попадают
+            nonzero = np.flatnonzero(norms > 0)
+            # Запас шага покрывает погрешность округления схожести у порога
+            step = math.sqrt(2 * (1 - min(threshold, 1.0))) + 1e-6
+            keys = np.floor(vectors[nonzero] / norms[nonzero, None] / step).astype(np.int64)
+            unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(unique_keys)))[:-1]
+            cells = {
+                tuple(key): members
+                for key, members in zip(
+                    unique_keys.tolist(), np.split(nonzero[np.argsort(inverse, kind='stable')], bounds)
+                )
+            }
+            cell_of = [None] * n
+            for index, key in zip(nonzero.tolist(), keys.tolist()):
+                cell_of[index] = key
+            offsets = list(itertools.product((-1, 0, 1), repeat=dims))
+
+        groups = []
+        empty = np.empty(0, dtype=np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for seed in range(n):
+                if used[seed]:
+                    continue
+                used[seed] = True
+
+                if cells is None:
+                    candidates = np.flatnonzero(~used)
+                elif cell_of[seed] is None:
+                    groups.append([seed])
+                    continue
+                else:
+                    base = cell_of[seed]
+                    parts = []
+                    for offset in offsets:
+                        key = tuple(map(operator.add, base, offset))
+                        members = cells.get(key)
+                        if members is None:
+                            continue
+                        # Выбрасываем уже распределенные кампании из ячейки
+                        members = members[~used[members]]
+                        if len(members):
+                            cells[key] = members
+                            parts.append(members)
+                        else:
+                            del cells[key]
+                    if not parts:
+                        groups.append([seed])
+                        continue
+                    candidates = np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+                members = candidates[similarity(seed, candidates) >= threshold] if len(candidates) else empty
+                used[members] = True
+                groups.append([seed] + members.tolist())
+
+        return groups
+
     def _normalize_value(self, value: float, min_val: float, max_val: float) -> float:
         """Нормализация значения в диапазон [0, 1]"""
         if max_val == min_val:
@@ -172,12 +263,10 @@ class SmartConsolidator(BaseModule):
                 Campaign.binom_id,
                 Campaign.current_name,
                 Campaign.group_name,
-                CampaignStatsDaily.date,
                 CampaignStatsDaily.clicks,
                 CampaignStatsDaily.cost,
                 CampaignStatsDaily.revenue,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads
+                CampaignStatsDaily.leads
             ).join(
                 CampaignStatsDaily,
                 Campaign.internal_id == CampaignStatsDaily.campaign_id
@@ -190,29 +279,28 @@ class SmartConsolidator(BaseModule):
 
             results = query.all()
 
-            # Группировка по кампаниям
-            campaigns_data = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "group": None,
-                "total_clicks": 0,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0,
-                "total_a_leads": 0
-            })
-
-            for row in results:
-                campaign_id = row.internal_id
-                campaigns_data[campaign_id]["binom_id"] = row.binom_id
-                campaigns_data[campaign_id]["name"] = row.current_name
-                campaigns_data[campaign_id]["group"] = row.group_name or "Без группы"
+            # Группировка по кампаниям (строки упорядочены по кампании)
+            campaigns_data = {}
+            data = None
+            current_id = None
+
+            for campaign_id, binom_id, name, group_name, clicks, cost, revenue, leads in results:
+                if campaign_id != current_id:
+                    current_id = campaign_id
+                    data = campaigns_data[campaign_id] = {
+                        "binom_id": binom_id,
+                        "name": name,
+                        "group": group_name or "Без группы",
+                        "total_clicks": 0,
+                        "total_cost": 0,
+                        "total_revenue": 0,
+                        "total_leads": 0
+                    }
 
-                campaigns_data[campaign_id]["total_clicks"] += row.clicks or 0
-                campaigns_data[campaign_id]["total_cost"] += float(row.cost) if row.cost else 0
-                campaigns_data[campaign_id]["total_revenue"] += float(row.revenue) if row.revenue else 0
-                campaigns_data[campaign_id]["total_leads"] += row.leads or 0
-                campaigns_data[campaign_id]["total_a_leads"] += row.a_leads or 0
+                data["total_clicks"] += clicks or 0
+                data["total_cost"] += float(cost) if cost else 0
+                data["total_revenue"] += float(revenue) if revenue else 0
+                data["total_leads"] += leads or 0
 
             # Фильтрация и подготовка малобюджетных кампаний
             small_campaigns = []
@@ -292,15 +380,18 @@ class SmartConsolidator(BaseModule):
 
                 campaign["feature_vector"] = [norm_roi, norm_cr, norm_cost]
 
-            # Простая кластеризация методом ближайшего соседа
+            # Кластеризация: каждая еще не распределенная кампания по порядку становится
+            # центром и забирает все свободные кампании со схожестью >= порога
             clusters = []
             small_clusters = []  # Для кластеров меньше минимального размера
-            used_campaigns = set()
 
-            for i, campaign in enumerate(small_campaigns):
-                if i in used_campaigns:
-                    continue
+            member_groups = self._similarity_clusters(
+                np.array([c.pop("feature_vector") for c in small_campaigns]),
+                similarity_threshold
+            )
 
+            for members in member_groups:
+                campaign = small_campaigns[members[0]]
                 cluster = {
                     "cluster_id": len(clusters) + len(small_clusters) + 1,
                     "campaigns": [campaign],
@@ -311,25 +402,14 @@ class SmartConsolidator(BaseModule):
                     "avg_roi": campaign["roi"],
                     "avg_cr": campaign["cr"]
                 }
-                used_campaigns.add(i)
 
-                # Поиск похожих кампаний
-                for j, other_campaign in enumerate(small_campaigns):
-                    if j in used_campaigns:
-                        continue
-
-                    similarity = self._cosine_similarity(
-                        campaign["feature_vector"],
-                        other_campaign["feature_vector"]
-                    )
-
-                    if similarity >= similarity_threshold:
-                        cluster["campaigns"].append(other_campaign)
-                        cluster["campaign_ids"].append(other_campaign["campaign_id"])
-                        cluster["total_cost"] += other_campaign["total_cost"]
-                        cluster["total_revenue"] += other_campaign["total_revenue"]
-                        cluster["total_clicks"] += other_campaign["total_clicks"]
-                        used_campaigns.add(j)
+                for j in members[1:]:
+                    other_campaign = small_campaigns[j]
+                    cluster["campaigns"].append(other_campaign)
+                    cluster["campaign_ids"].append(other_campaign["campaign_id"])
+                    cluster["total_cost"] += other_campaign["total_cost"]
+                    cluster["total_revenue"] += other_campaign["total_revenue"]
+                    cluster["total_clicks"] += other_campaign["total_clicks"]
 
                 # Пересчет средних метрик для всех кластеров
                 cluster["avg_roi"] = round(
@@ -342,11 +422,6 @@ class SmartConsolidator(BaseModule):
                 cluster["total_revenue"] = round(cluster["total_revenue"], 2)
                 cluster["campaign_count"] = len(cluster["campaigns"])
 
-                # Удаляем feature_vector из кампаний для чистоты вывода
-                for c in cluster["campaigns"]:
-                    if "feature_vector" in c:
-                        del c["feature_vector"]
-
                 # Добавляем в соответствующий список
                 if len(cluster["campaigns"]) >= min_campaigns_per_cluster:
                     clusters.append(cluster)
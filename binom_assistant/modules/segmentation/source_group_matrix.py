@@ -3,13 +3,14 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import Float, func, select, type_coerce
 from contextlib import contextmanager
-from collections import defaultdict
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .. import stats_kernel
 
 
 @contextmanager
@@ -52,7 +53,7 @@ class SourceGroupMatrix(BaseModule):
             category="segmentation",
             description="Построение матрицы эффективности источник-группа",
             detailed_description="Создает двумерную матрицу показывающую эффективность каждой пары источник-группа кампаний. Помогает определить лучшие и худшие комбинации для стратегического планирования.",
-            version="1.0.0",
+            version="1.0.1",
             author="Binom Assistant",
             priority="medium",
             tags=["segmentation", "matrix", "source", "group", "roi"]
@@ -120,188 +121,203 @@ class SourceGroupMatrix(BaseModule):
         # Период анализа
         date_from = datetime.now().date() - timedelta(days=days - 1)
 
-        # Работа с БД
+        # Разреженная матрица: одна строка на (источник, группа, кампания)
         with get_db_session() as session:
-            # Получаем все кампании с данными за период
-            query = session.query(
-                Campaign.internal_id,
-                Campaign.binom_id,
-                Campaign.current_name,
-                Campaign.group_name,
-                Campaign.ts_name,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.leads
-            ).join(
-                CampaignStatsDaily,
-                Campaign.internal_id == CampaignStatsDaily.campaign_id
-            ).filter(
-                CampaignStatsDaily.date >= date_from
-            ).order_by(
-                Campaign.internal_id,
-                CampaignStatsDaily.date
-            )
-
-            results = query.all()
-
-            # Группировка по источнику и офферу
-            matrix_data = defaultdict(lambda: {
-                "campaigns": set(),
-                "total_clicks": 0,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0,
-                "campaign_details": []
+            rows = self._fetch_sparse_matrix(session, date_from)
+
+        empty_result = {
+            "matrix_cells": [],
+            "sources": [],
+            "groups": [],
+            "summary": {
+                "total_cells": 0,
+                "total_campaigns": 0,
+                "profitable_cells": 0,
+                "unprofitable_cells": 0
+            },
+            "best_combinations": [],
+            "worst_combinations": [],
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
+            },
+            "params": {
+                "min_cell_spend": min_cell_spend,
+                "min_campaigns": min_campaigns
+            }
+        }
+
+        if not rows:
+            return empty_result
+
+        columns = list(zip(*rows))
+        sources = np.array([name or "Неизвестный источник" for name in columns[0]], dtype=object)
+        groups = np.array([name or "Без группы" for name in columns[1]], dtype=object)
+        campaign_ids = np.array(columns[2], dtype=np.int64)
+        clicks = np.array(columns[5], dtype=np.int64)
+        cost = np.array(columns[6], dtype=np.float64)
+        revenue = np.array(columns[7], dtype=np.float64)
+        leads = np.array(columns[8], dtype=np.int64)
+
+        # Ячейка = пара (источник, группа); ячейки нумеруются в порядке первой кампании
+        source_names, source_index = np.unique(sources, return_inverse=True)
+        group_names, group_index = np.unique(groups, return_inverse=True)
+        cell_key = source_index.ravel() * len(group_names) + group_index.ravel()
+        keys, first_row, cell_index = np.unique(cell_key, return_index=True, return_inverse=True)
+        cell_order = np.argsort(first_row, kind="stable")
+        rank = np.empty_like(cell_order)
+        rank[cell_order] = np.arange(len(cell_order))
+        cell_index = rank[cell_index.ravel()]
+        keys = keys[cell_order]
+        n_cells = len(keys)
+
+        def cell_totals(values: np.ndarray) -> np.ndarray:
+            return np.bincount(cell_index, weights=values, minlength=n_cells)
+
+        cell_campaigns = np.bincount(cell_index, minlength=n_cells)
+        cell_clicks = cell_totals(clicks)
+        cell_cost = cell_totals(cost)
+        cell_revenue = cell_totals(revenue)
+        cell_leads = cell_totals(leads)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cell_roi = np.where(cell_cost > 0, (cell_revenue - cell_cost) / cell_cost * 100, -100.0)
+            cell_cr = np.where(cell_clicks > 0, cell_leads / cell_clicks * 100, 0.0)
+            campaign_roi = np.where(cost > 0, (revenue - cost) / cost * 100, -100.0)
+        cell_profit = cell_revenue - cell_cost
+
+        # Фильтры
+        kept = np.flatnonzero((cell_cost >= min_cell_spend) & (cell_campaigns >= min_campaigns))
+        if len(kept) == 0:
+            return empty_result
+
+        # Детали кампаний ячеек: внутри ячейки по убыванию ROI
+        campaign_roi_rounded = stats_kernel.round_decimal(campaign_roi, 1)
+        detail_rows = np.flatnonzero(np.isin(cell_index, kept))
+        detail_rows = detail_rows[np.lexsort((
+            campaign_ids[detail_rows],
+            -campaign_roi_rounded[detail_rows],
+            cell_index[detail_rows]
+        ))]
+        details_by_cell: Dict[int, List[Dict[str, Any]]] = {int(cell): [] for cell in kept}
+        for row, cell, campaign_id, binom_id, name, camp_cost, camp_revenue, camp_roi in zip(
+            detail_rows.tolist(),
+            cell_index[detail_rows].tolist(),
+            campaign_ids[detail_rows].tolist(),
+            [columns[3][i] for i in detail_rows.tolist()],
+            [columns[4][i] for i in detail_rows.tolist()],
+            stats_kernel.round_decimal(cost[detail_rows], 2).tolist(),
+            stats_kernel.round_decimal(revenue[detail_rows], 2).tolist(),
+            campaign_roi_rounded[detail_rows].tolist()
+        ):
+            details_by_cell[cell].append({
+                "campaign_id": campaign_id,
+                "binom_id": binom_id,
+                "name": name,
+                "cost": camp_cost,
+                "revenue": camp_revenue,
+                "roi": camp_roi
             })
 
-            campaign_info = defaultdict(lambda: {
-                "binom_id": None,
-                "name": None,
-                "source": None,
-                "group": None,
-                "total_clicks": 0,
-                "total_cost": 0,
-                "total_revenue": 0,
-                "total_leads": 0
+        matrix_cells = []
+        for cell, campaigns_count, total_clicks, total_cost, total_revenue, total_leads, profit, roi, cr in zip(
+            kept.tolist(),
+            cell_campaigns[kept].tolist(),
+            cell_clicks[kept].astype(np.int64).tolist(),
+            stats_kernel.round_decimal(cell_cost[kept], 2).tolist(),
+            stats_kernel.round_decimal(cell_revenue[kept], 2).tolist(),
+            cell_leads[kept].astype(np.int64).tolist(),
+            stats_kernel.round_decimal(cell_profit[kept], 2).tolist(),
+            stats_kernel.round_decimal(cell_roi[kept], 1).tolist(),
+            stats_kernel.round_decimal(cell_cr[kept], 2).tolist()
+        ):
+            key = int(keys[cell])
+            matrix_cells.append({
+                "source": source_names[key // len(group_names)],
+                "group": group_names[key % len(group_names)],
+                "campaigns_count": campaigns_count,
+                "total_clicks": total_clicks,
+                "total_cost": total_cost,
+                "total_revenue": total_revenue,
+                "total_leads": total_leads,
+                "profit": profit,
+                "roi": roi,
+                "cr": cr,
+                "campaign_details": details_by_cell[cell]
             })
 
-            for row in results:
-                campaign_id = row.internal_id
-                source = row.ts_name or "Неизвестный источник"
-                group = row.group_name or "Без группы"
-
-                # Ключ матрицы
-                matrix_key = (source, group)
-
-                # Агрегация для матрицы
-                matrix_data[matrix_key]["campaigns"].add(campaign_id)
-                matrix_data[matrix_key]["total_clicks"] += row.clicks or 0
-                matrix_data[matrix_key]["total_cost"] += float(row.cost) if row.cost else 0
-                matrix_data[matrix_key]["total_revenue"] += float(row.revenue) if row.revenue else 0
-                matrix_data[matrix_key]["total_leads"] += row.leads or 0
-
-                # Информация о кампании
-                campaign_info[campaign_id]["binom_id"] = row.binom_id
-                campaign_info[campaign_id]["name"] = row.current_name
-                campaign_info[campaign_id]["source"] = source
-                campaign_info[campaign_id]["group"] = group
-                campaign_info[campaign_id]["total_clicks"] += row.clicks or 0
-                campaign_info[campaign_id]["total_cost"] += float(row.cost) if row.cost else 0
-                campaign_info[campaign_id]["total_revenue"] += float(row.revenue) if row.revenue else 0
-                campaign_info[campaign_id]["total_leads"] += row.leads or 0
-
-            # Подготовка ячеек матрицы
-            matrix_cells = []
-            all_sources = set()
-            all_groups = set()
-
-            for (source, group), data in matrix_data.items():
-                # Фильтры
-                if data["total_cost"] < min_cell_spend:
-                    continue
-                if len(data["campaigns"]) < min_campaigns:
-                    continue
-
-                all_sources.add(source)
-                all_groups.add(group)
-
-                # Расчет метрик
-                roi = ((data["total_revenue"] - data["total_cost"]) / data["total_cost"] * 100) if data["total_cost"] > 0 else -100
-                cr = (data["total_leads"] / data["total_clicks"] * 100) if data["total_clicks"] > 0 else 0
-                profit = data["total_revenue"] - data["total_cost"]
-
-                # Подготовка деталей кампаний
-                campaign_details = []
-                for camp_id in data["campaigns"]:
-                    camp = campaign_info[camp_id]
-                    camp_roi = ((camp["total_revenue"] - camp["total_cost"]) / camp["total_cost"] * 100) if camp["total_cost"] > 0 else -100
-
-                    campaign_details.append({
-                        "campaign_id": camp_id,
-                        "binom_id": camp["binom_id"],
-                        "name": camp["name"],
-                        "cost": round(camp["total_cost"], 2),
-                        "revenue": round(camp["total_revenue"], 2),
-                        "roi": round(camp_roi, 1)
-                    })
-
-                campaign_details.sort(key=lambda x: x["roi"], reverse=True)
-
-                cell = {
-                    "source": source,
-                    "group": group,
-                    "campaigns_count": len(data["campaigns"]),
-                    "total_clicks": data["total_clicks"],
-                    "total_cost": round(data["total_cost"], 2),
-                    "total_revenue": round(data["total_revenue"], 2),
-                    "total_leads": data["total_leads"],
-                    "profit": round(profit, 2),
-                    "roi": round(roi, 1),
-                    "cr": round(cr, 2),
-                    "campaign_details": campaign_details
-                }
+        # Сортировка ячеек по ROI (для выделения лучших/худших)
+        sorted_cells = sorted(matrix_cells, key=lambda x: x["roi"], reverse=True)
 
-                matrix_cells.append(cell)
-
-            if not matrix_cells:
-                return {
-                    "matrix_cells": [],
-                    "sources": [],
-                    "groups": [],
-                    "summary": {
-                        "total_cells": 0,
-                        "total_campaigns": 0,
-                        "profitable_cells": 0,
-                        "unprofitable_cells": 0
-                    },
-                    "best_combinations": [],
-                    "worst_combinations": [],
-                    "period": {
-                        "days": days,
-                        "date_from": date_from.isoformat(),
-                        "date_to": datetime.now().date().isoformat()
-                    },
-                    "params": {
-                        "min_cell_spend": min_cell_spend,
-                        "min_campaigns": min_campaigns
-                    }
-                }
+        # Топ-5 лучших и худших комбинаций
+        best_combinations = sorted_cells[:5]
+        worst_combinations = sorted_cells[-5:][::-1]  # Разворачиваем чтобы худшие были первыми
 
-            # Сортировка ячеек по ROI (для выделения лучших/худших)
-            sorted_cells = sorted(matrix_cells, key=lambda x: x["roi"], reverse=True)
-
-            # Топ-5 лучших и худших комбинаций
-            best_combinations = sorted_cells[:5]
-            worst_combinations = sorted_cells[-5:][::-1]  # Разворачиваем чтобы худшие были первыми
-
-            # Подсчет прибыльных/убыточных ячеек
-            profitable_cells = sum(1 for cell in matrix_cells if cell["profit"] > 0)
-            unprofitable_cells = sum(1 for cell in matrix_cells if cell["profit"] < 0)
-
-            return {
-                "matrix_cells": matrix_cells,
-                "sources": sorted(list(all_sources)),
-                "groups": sorted(list(all_groups)),
-                "summary": {
-                    "total_cells": len(matrix_cells),
-                    "total_campaigns": sum(len(data["campaigns"]) for data in matrix_data.values()),
-                    "profitable_cells": profitable_cells,
-                    "unprofitable_cells": unprofitable_cells
-                },
-                "best_combinations": best_combinations,
-                "worst_combinations": worst_combinations,
-                "period": {
-                    "days": days,
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat()
-                },
-                "params": {
-                    "min_cell_spend": min_cell_spend,
-                    "min_campaigns": min_campaigns
-                }
+        # Подсчет прибыльных/убыточных ячеек
+        kept_profit = cell_profit[kept]
+
+        return {
+            "matrix_cells": matrix_cells,
+            "sources": sorted({cell["source"] for cell in matrix_cells}),
+            "groups": sorted({cell["group"] for cell in matrix_cells}),
+            "summary": {
+                "total_cells": len(matrix_cells),
+                "total_campaigns": len(campaign_ids),
+                "profitable_cells": int((kept_profit > 0).sum()),
+                "unprofitable_cells": int((kept_profit < 0).sum())
+            },
+            "best_combinations": best_combinations,
+            "worst_combinations": worst_combinations,
+            "period": {
+                "days": days,
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat()
+            },
+            "params": {
+                "min_cell_spend": min_cell_spend,
+                "min_campaigns": min_campaigns
             }
+        }
+
+    def _fetch_sparse_matrix(self, session, date_from) -> List[tuple]:
+        """
+        Агрегирует статистику в SQL по (источник, группа, кампания).
+
+        Кампания принадлежит одной ячейке, поэтому строки результата - разреженное
+        представление матрицы: итоги ячеек получаются суммированием ее кампаний.
+        Деньги суммируются как REAL без округления Numeric до центов.
+
+        Args:
+            session: Сессия БД
+            date_from: Начало периода
+
+        Returns:
+            List[tuple]: ts_name, group_name, internal_id, binom_id, current_name,
+                clicks, cost, revenue, leads (по возрастанию internal_id)
+        """
+        return session.connection().execute(select(
+            Campaign.ts_name,
+            Campaign.group_name,
+            Campaign.internal_id,
+            Campaign.binom_id,
+            Campaign.current_name,
+            func.coalesce(func.sum(CampaignStatsDaily.clicks), 0),
+            func.coalesce(func.sum(type_coerce(CampaignStatsDaily.cost, Float)), 0.0),
+            func.coalesce(func.sum(type_coerce(CampaignStatsDaily.revenue, Float)), 0.0),
+            func.coalesce(func.sum(CampaignStatsDaily.leads), 0)
+        ).join(
+            CampaignStatsDaily,
+            Campaign.internal_id == CampaignStatsDaily.campaign_id
+        ).filter(
+            CampaignStatsDaily.date >= date_from
+        ).group_by(
+            Campaign.ts_name,
+            Campaign.group_name,
+            Campaign.internal_id
+        ).order_by(
+            Campaign.internal_id
+        )).all()
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
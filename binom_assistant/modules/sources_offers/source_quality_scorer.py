@@ -361,18 +361,6 @@ class SourceQualityScorer(BaseModule):
                 }
             }
 
-    def format_results(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Форматирование результатов для UI.
-
-        Args:
-            raw_data: Сырые данные из analyze()
-
-        Returns:
-            Dict[str, Any]: Отформатированные данные
-        """
-        return raw_data
-
     def prepare_chart_data(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Подготовка данных для Chart.js"""
         sources = raw_data.get("sources", [])
@@ -1,31 +1,11 @@
 """
 Модуль оценки консистентности прибыли
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .metrics_engine import get_stability_metrics
 
 
 class ConsistencyScorer(BaseModule):
@@ -156,9 +136,13 @@ class ConsistencyScorer(BaseModule):
             ]
         }
 
+    def get_lookback_days(self, config: ModuleConfig) -> int:
+        """Окно данных: последние days дней, включая сегодня"""
+        return config.params.get("days", 14) - 1
+
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
-        Анализ консистентности прибыли через SQLAlchemy.
+        Анализ консистентности прибыли.
 
         Args:
             config: Конфигурация модуля
@@ -166,11 +150,27 @@ class ConsistencyScorer(BaseModule):
         Returns:
             Dict[str, Any]: Данные о консистентности кампаний
         """
+        return self.merge_campaign_states(config, self.analyze_campaigns(config))
+
+    def analyze_campaigns(
+        self,
+        config: ModuleConfig,
+        campaign_ids: Optional[List[int]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Метрики консистентности по кампаниям (состояние по кампаниям).
+
+        Args:
+            config: Конфигурация модуля
+            campaign_ids: Пересчитать только эти кампании (None - все)
+
+        Returns:
+            Dict[int, Dict[str, Any]]: internal_id -> метрики кампании
+        """
         # Получение параметров
         days = config.params.get("days", 14)
         min_spend = config.params.get("min_spend", 1)
         min_days_with_data = config.params.get("min_days_with_data", 7)
-        profitability_threshold = config.params.get("profitability_threshold", 70)
 
         # Получение настраиваемых порогов severity
         severity_high_threshold = config.params.get("severity_high", 70)
@@ -178,218 +178,186 @@ class ConsistencyScorer(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=days - 1)  # Включаем текущий день
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем дневную статистику кампаний за период
-            query = session.query(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost >= min_spend
-            ).order_by(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date
-            )
-
-            stats_by_date = query.all()
-
-            # Группируем данные по кампаниям
-            campaigns_data = {}
-            for row in stats_by_date:
-                campaign_id = row.campaign_id
-                if campaign_id not in campaigns_data:
-                    campaigns_data[campaign_id] = []
-
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                profit = revenue - cost
-
-                campaigns_data[campaign_id].append({
-                    'date': row.date,
-                    'cost': cost,
-                    'revenue': revenue,
-                    'profit': profit,
-                    'is_profitable': profit > 0
-                })
+        # Метрики кампаний за окно (общий движок модулей стабильности)
+        metrics = get_stability_metrics(date_from, min_spend, campaign_ids)
+        campaigns_info = metrics['info']
 
-            # Загружаем информацию о кампаниях
-            campaign_ids = list(campaigns_data.keys())
-            campaigns_info = {}
-            if campaign_ids:
-                campaigns_query = session.query(Campaign).filter(
-                    Campaign.internal_id.in_(campaign_ids)
-                )
-                for campaign in campaigns_query.all():
-                    campaigns_info[campaign.internal_id] = {
-                        'binom_id': campaign.binom_id,
-                        'name': campaign.current_name,
-                        'group': campaign.group_name or "Без группы",
-                        'is_cpl_mode': campaign.is_cpl_mode
-                    }
+        # Анализируем консистентность для каждой кампании
+        states = {}
+
+        for row, campaign_id in enumerate(metrics['campaign_ids']):
+            days_with_data = int(metrics['days_with_data'][row])
+
+            # Пропускаем если недостаточно данных
+            if days_with_data < min_days_with_data:
+                continue
+
+            # Количество прибыльных и убыточных дней
+            profitable_days = int(metrics['profitable_days'][row])
+            unprofitable_days = days_with_data - profitable_days
 
-            # Анализируем консистентность для каждой кампании
-            high_consistency = []
-            medium_consistency = []
-            low_consistency = []
-
-            for campaign_id, daily_data in campaigns_data.items():
-                # Пропускаем если недостаточно данных
-                if len(daily_data) < min_days_with_data:
-                    continue
-
-                # Количество прибыльных и убыточных дней
-                profitable_days = sum(1 for d in daily_data if d['is_profitable'])
-                unprofitable_days = len(daily_data) - profitable_days
-
-                # Процент прибыльных дней
-                profitable_days_pct = round((profitable_days / len(daily_data) * 100), 2)
-
-                # Соотношение прибыльных к убыточным
-                if unprofitable_days > 0:
-                    profit_loss_ratio = round(profitable_days / unprofitable_days, 2)
-                else:
-                    profit_loss_ratio = round(float(profitable_days), 2)
-
-                # Расчет максимальной просадки (drawdown)
-                cumulative_profit = 0
-                peak_profit = 0
-                max_drawdown = 0
+            # Процент прибыльных дней
+            profitable_days_pct = round((profitable_days / days_with_data * 100), 2)
+
+            # Соотношение прибыльных к убыточным
+            if unprofitable_days > 0:
+                profit_loss_ratio = round(profitable_days / unprofitable_days, 2)
+            else:
+                profit_loss_ratio = round(float(profitable_days), 2)
+
+            # Максимальная просадка (drawdown) от пика накопленной прибыли
+            max_drawdown = float(metrics['max_drawdown'][row])
+            peak_profit = float(metrics['peak_profit'][row])
+
+            # Процент максимальной просадки (от пикового значения)
+            if peak_profit > 0:
+                max_drawdown_pct = round((max_drawdown / peak_profit * 100), 2)
+            else:
                 max_drawdown_pct = 0
 
-                for d in daily_data:
-                    cumulative_profit += d['profit']
-
-                    if cumulative_profit > peak_profit:
-                        peak_profit = cumulative_profit
-
-                    drawdown = peak_profit - cumulative_profit
-                    if drawdown > max_drawdown:
-                        max_drawdown = drawdown
-
-                # Процент максимальной просадки (от пикового значения)
-                if peak_profit > 0:
-                    max_drawdown_pct = round((max_drawdown / peak_profit * 100), 2)
-                else:
-                    max_drawdown_pct = 0
-
-                # Агрегированные показатели за весь период
-                total_cost = sum(d['cost'] for d in daily_data)
-                total_revenue = sum(d['revenue'] for d in daily_data)
-                total_profit = total_revenue - total_cost
-                avg_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
-
-                # Индекс консистентности (0-100)
-                # 50% - процент прибыльных дней (чем больше, тем лучше)
-                # 30% - соотношение прибыль/убыток (макс 10:1 = 100%)
-                # 20% - инверсия просадки (чем меньше просадка, тем лучше)
-
-                score_profitable_days = profitable_days_pct * 0.5  # 0-50 баллов
-                score_ratio = min(profit_loss_ratio / 10 * 30, 30)  # 0-30 баллов (макс при 10:1)
-                score_drawdown = max(0, (100 - max_drawdown_pct)) * 0.2  # 0-20 баллов
-
-                consistency_score = round(score_profitable_days + score_ratio + score_drawdown, 2)
-
-                # Классификация консистентности на основе настраиваемых порогов
-                # Высокая: индекс >= severity_high
-                # Средняя: индекс >= severity_medium (но < severity_high)
-                # Низкая: индекс < severity_medium
-                if consistency_score >= severity_high_threshold:
-                    consistency_class = "high"
-                    severity = "low"  # Хорошая новость
-                elif consistency_score >= severity_medium_threshold:
-                    consistency_class = "medium"
-                    severity = "medium"
-                else:
-                    consistency_class = "low"
-                    severity = "high"
-
-                # Формируем данные
-                full_campaign_info = campaigns_info.get(campaign_id, {
-                    'binom_id': None,
-                    'name': f"Campaign {campaign_id}",
-                    'group': "Без группы",
-                    'is_cpl_mode': False
-                })
+            # Агрегированные показатели за весь период
+            total_cost = float(metrics['total_cost'][row])
+            total_revenue = float(metrics['total_revenue'][row])
+            total_profit = total_revenue - total_cost
+            avg_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
+
+            # Индекс консистентности (0-100)
+            # 50% - процент прибыльных дней (чем больше, тем лучше)
+            # 30% - соотношение прибыль/убыток (макс 10:1 = 100%)
+            # 20% - инверсия просадки (чем меньше просадка, тем лучше)
+
+            score_profitable_days = profitable_days_pct * 0.5  # 0-50 баллов
+            score_ratio = min(profit_loss_ratio / 10 * 30, 30)  # 0-30 баллов (макс при 10:1)
+            score_drawdown = max(0, (100 - max_drawdown_pct)) * 0.2  # 0-20 баллов
+
+            consistency_score = round(score_profitable_days + score_ratio + score_drawdown, 2)
+
+            # Классификация консистентности на основе настраиваемых порогов
+            # Высокая: индекс >= severity_high
+            # Средняя: индекс >= severity_medium (но < severity_high)
+            # Низкая: индекс < severity_medium
+            if consistency_score >= severity_high_threshold:
+                consistency_class = "high"
+                severity = "low"  # Хорошая новость
+            elif consistency_score >= severity_medium_threshold:
+                consistency_class = "medium"
+                severity = "medium"
+            else:
+                consistency_class = "low"
+                severity = "high"
+
+            # Формируем данные
+            full_campaign_info = campaigns_info.get(campaign_id, {
+                'binom_id': None,
+                'name': f"Campaign {campaign_id}",
+                'group': "Без группы",
+                'is_cpl_mode': False
+            })
 
-                campaign_consistency = {
-                    "campaign_id": campaign_id,
-                    "binom_id": full_campaign_info['binom_id'],
-                    "name": full_campaign_info['name'],
-                    "group": full_campaign_info['group'],
-
-                    # Агрегированные метрики
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "total_profit": round(total_profit, 2),
-                    "avg_roi": avg_roi,
-
-                    # Метрики консистентности
-                    "consistency_score": consistency_score,
-                    "consistency_class": consistency_class,
-                    "profitable_days": profitable_days,
-                    "unprofitable_days": unprofitable_days,
-                    "profitable_days_pct": profitable_days_pct,
-                    "profit_loss_ratio": profit_loss_ratio,
-                    "max_drawdown": round(max_drawdown, 2),
-                    "max_drawdown_pct": max_drawdown_pct,
-
-                    # Дополнительные данные
-                    "days_with_data": len(daily_data),
-                    "severity": severity,
-                    "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
-                }
+            campaign_consistency = {
+                "campaign_id": campaign_id,
+                "binom_id": full_campaign_info['binom_id'],
+                "name": full_campaign_info['name'],
+                "group": full_campaign_info['group'],
+
+                # Агрегированные метрики
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "total_profit": round(total_profit, 2),
+                "avg_roi": avg_roi,
+
+                # Метрики консистентности
+                "consistency_score": consistency_score,
+                "consistency_class": consistency_class,
+                "profitable_days": profitable_days,
+                "unprofitable_days": unprofitable_days,
+                "profitable_days_pct": profitable_days_pct,
+                "profit_loss_ratio": profit_loss_ratio,
+                "max_drawdown": round(max_drawdown, 2),
+                "max_drawdown_pct": max_drawdown_pct,
+
+                # Дополнительные данные
+                "days_with_data": days_with_data,
+                "severity": severity,
+                "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
+            }
 
-                # Распределяем по категориям
-                if consistency_class == "high":
-                    high_consistency.append(campaign_consistency)
-                elif consistency_class == "medium":
-                    medium_consistency.append(campaign_consistency)
-                else:
-                    low_consistency.append(campaign_consistency)
-
-            # Сортировка (по убыванию индекса консистентности)
-            high_consistency.sort(key=lambda x: x['consistency_score'], reverse=True)
-            medium_consistency.sort(key=lambda x: x['consistency_score'], reverse=True)
-            low_consistency.sort(key=lambda x: x['consistency_score'])
-
-            # Объединяем для общей таблицы (сначала наиболее консистентные)
-            all_campaigns = high_consistency + medium_consistency + low_consistency
-
-            return {
-                "campaigns": all_campaigns,
-                "high_consistency": high_consistency,
-                "medium_consistency": medium_consistency,
-                "low_consistency": low_consistency,
-                "summary": {
-                    "total_analyzed": len(all_campaigns),
-                    "total_high": len(high_consistency),
-                    "total_medium": len(medium_consistency),
-                    "total_low": len(low_consistency),
-                    "avg_consistency_score": round(
-                        sum(c['consistency_score'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0,
-                    "best_consistency_score": round(high_consistency[0]['consistency_score'], 2) if high_consistency else 0,
-                    "worst_consistency_score": round(low_consistency[-1]['consistency_score'], 2) if low_consistency else 0,
-                    "avg_profitable_days_pct": round(
-                        sum(c['profitable_days_pct'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0
-                },
-                "period": {
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat(),
-                    "days": days
-                },
-                "thresholds": {
-                    "min_spend": min_spend,
-                    "min_days_with_data": min_days_with_data,
-                    "profitability_threshold": profitability_threshold,
-                    "severity_high": severity_high_threshold,
-                    "severity_medium": severity_medium_threshold
-                }
+            states[campaign_id] = campaign_consistency
+
+        return states
+
+    def merge_campaign_states(
+        self,
+        config: ModuleConfig,
+        states: Dict[int, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Собирает итоговый результат из метрик по кампаниям.
+
+        Args:
+            config: Конфигурация модуля
+            states: internal_id -> метрики кампании
+
+        Returns:
+            Dict[str, Any]: Данные о консистентности кампаний
+        """
+        days = config.params.get("days", 14)
+        date_from = datetime.now().date() - timedelta(days=days - 1)
+
+        # Распределяем по категориям
+        high_consistency = []
+        medium_consistency = []
+        low_consistency = []
+
+        for campaign_id in sorted(states):
+            campaign_consistency = states[campaign_id]
+            if campaign_consistency["consistency_class"] == "high":
+                high_consistency.append(campaign_consistency)
+            elif campaign_consistency["consistency_class"] == "medium":
+                medium_consistency.append(campaign_consistency)
+            else:
+                low_consistency.append(campaign_consistency)
+
+        # Сортировка (по убыванию индекса консистентности)
+        high_consistency.sort(key=lambda x: x['consistency_score'], reverse=True)
+        medium_consistency.sort(key=lambda x: x['consistency_score'], reverse=True)
+        low_consistency.sort(key=lambda x: x['consistency_score'])
+
+        # Объединяем для общей таблицы (сначала наиболее консистентные)
+        all_campaigns = high_consistency + medium_consistency + low_consistency
+
+        return {
+            "campaigns": all_campaigns,
+            "high_consistency": high_consistency,
+            "medium_consistency": medium_consistency,
+            "low_consistency": low_consistency,
+            "summary": {
+                "total_analyzed": len(all_campaigns),
+                "total_high": len(high_consistency),
+                "total_medium": len(medium_consistency),
+                "total_low": len(low_consistency),
+                "avg_consistency_score": round(
+                    sum(c['consistency_score'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0,
+                "best_consistency_score": round(high_consistency[0]['consistency_score'], 2) if high_consistency else 0,
+                "worst_consistency_score": round(low_consistency[-1]['consistency_score'], 2) if low_consistency else 0,
+                "avg_profitable_days_pct": round(
+                    sum(c['profitable_days_pct'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0
+            },
+            "period": {
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat(),
+                "days": days
+            },
+            "thresholds": {
+                "min_spend": config.params.get("min_spend", 1),
+                "min_days_with_data": config.params.get("min_days_with_data", 7),
+                "profitability_threshold": config.params.get("profitability_threshold", 70),
+                "severity_high": config.params.get("severity_high", 70),
+                "severity_medium": config.params.get("severity_medium", 40)
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
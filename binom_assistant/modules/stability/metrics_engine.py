@@ -0,0 +1,279 @@
+"""
+Общий движок метрик стабильности
+
+volatility_calculator, consistency_scorer, reliability_index и performance_stability
+читают одну и ту же дневную статистику и считают пересекающиеся метрики
+(σ и CV ROI, прибыльные дни, просадка, итоги по кампании). Движок загружает
+дневные строки одним запросом, считает полный набор метрик по всем кампаниям
+векторно и кэширует результат до изменения версии данных (журнал изменений
+сборщика) или смены дня. Модули применяют поверх свои баллы и пороги.
+
+Строки кэшируются для самого раннего запрошенного окна: окно, начинающееся
+позже, и другой min_spend вырезаются из кэша без обращения к БД.
+
+Кэшируются только векторы по кампаниям: матрицы (кампании, дни) существуют
+лишь во время расчета, поэтому память кэша метрик растет с числом кампаний,
+а не кампаний x дней.
+
+Результат общий для всех модулей - массивы нельзя изменять.
+
+Использование:
+    from .metrics_engine import get_stability_metrics
+
+    metrics = get_stability_metrics(date_from, min_spend)
+    for row, campaign_id in enumerate(metrics['campaign_ids']):
+        roi_std = metrics['roi_std_sample'][row]
+"""
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, String, func, select, type_coerce
+
+from storage.database.base import get_session
+from storage.database.models import Campaign, CampaignStatsDaily
+from .. import stats_kernel
+
+logger = logging.getLogger(__name__)
+
+# Сколько наборов метрик (окно, min_spend, кампании) хранить для одной версии данных:
+# по одному на модуль стабильности (~170 байт на кампанию в наборе)
+MAX_CACHED_METRICS = 4
+
+_lock = threading.Lock()
+_rows_cache: Dict[str, Any] = {}
+_metrics_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+
+@contextmanager
+def get_db_session():
+    """
+    Локальная обертка над get_session() для использования в with.
+    Преобразует генератор в контекстный менеджер.
+    """
+    session_gen = get_session()
+    session = next(session_gen)
+    try:
+        yield session
+    finally:
+        try:
+            next(session_gen)
+        except StopIteration:
+            pass
+
+
+def get_stability_metrics(
+    date_from: date,
+    min_spend: float,
+    campaign_ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Метрики стабильности кампаний за окно [date_from, сегодня].
+
+    Учитываются дни с расходом >= min_spend (как фильтр cost >= min_spend в запросе).
+
+    Args:
+        date_from: Начало окна
+        min_spend: Минимальный расход дня
+        campaign_ids: Только эти кампании (None - все)
+
+    Returns:
+        Dict (строка массивов = кампания, порядок по internal_id):
+            campaign_ids, info (internal_id -> binom_id, name, group, is_cpl_mode, created_at),
+            days_with_data, first_day (ordinal даты),
+            total_cost, total_revenue, total_clicks, total_leads, total_a_leads,
+            profitable_days, max_drawdown, peak_profit,
+            roi_mean, roi_std_sample, cr_std_sample, approve_std_sample,
+            по дневному ROI, округленному до сотых: roi_rounded_mean, roi_rounded_std
+            (генеральная), roi_outliers (дней дальше 2σ от среднего),
+            weekday_days, weekend_days, weekday_roi, weekend_roi (средний ROI будней/выходных)
+    """
+    from services.scheduler.change_log import get_data_version
+
+    version = (get_data_version(), date.today())
+    key = (date_from, float(min_spend), tuple(sorted(campaign_ids)) if campaign_ids is not None else None)
+
+    with _lock:
+        if _rows_cache.get('version') != version:
+            _rows_cache.clear()
+            _metrics_cache.clear()
+
+        metrics = _metrics_cache.get(key)
+        if metrics is not None:
+            _metrics_cache.move_to_end(key)
+            return metrics
+
+        if _rows_cache.get('date_from') is None or _rows_cache['date_from'] > date_from:
+            _rows_cache.update(_load_rows(date_from), version=version, date_from=date_from)
+
+        metrics = _compute_metrics(_rows_cache, date_from, min_spend, campaign_ids)
+        _metrics_cache[key] = metrics
+        while len(_metrics_cache) > MAX_CACHED_METRICS:
+            _metrics_cache.popitem(last=False)
+
+    return metrics
+
+
+def clear_cache() -> None:
+    """Сбрасывает кэш строк и метрик"""
+    with _lock:
+        _rows_cache.clear()
+        _metrics_cache.clear()
+
+
+def _load_rows(date_from: date) -> Dict[str, Any]:
+    """
+    Загружает дневную статистику всех кампаний с date_from и атрибуты кампаний.
+
+    Деньги читаются как REAL без Decimal: фильтр min_spend применяется к сырым
+    значениям (как в SQL), а расчеты - к округленным до центов (как Numeric(10, 2)).
+    """
+    with get_db_session() as session:
+        # Core-запрос без сборки ORM-строк: на сотнях тысяч строк это основная часть времени
+        rows = session.connection().execute(select(
+            CampaignStatsDaily.campaign_id,
+            type_coerce(CampaignStatsDaily.date, String),
+            type_coerce(CampaignStatsDaily.cost, Float),
+            func.coalesce(type_coerce(CampaignStatsDaily.revenue, Float), 0.0),
+            func.coalesce(CampaignStatsDaily.clicks, 0),
+            func.coalesce(CampaignStatsDaily.leads, 0),
+            func.coalesce(CampaignStatsDaily.a_leads, 0)
+        ).filter(
+            CampaignStatsDaily.date >= date_from
+        ).order_by(
+            CampaignStatsDaily.campaign_id,
+            CampaignStatsDaily.date
+        )).all()
+
+        info = {
+            campaign.internal_id: {
+                'binom_id': campaign.binom_id,
+                'name': campaign.current_name,
+                'group': campaign.group_name or "Без группы",
+                'is_cpl_mode': campaign.is_cpl_mode,
+                'created_at': campaign.created_at
+            }
+            for campaign in session.query(
+                Campaign.internal_id,
+                Campaign.binom_id,
+                Campaign.current_name,
+                Campaign.group_name,
+                Campaign.is_cpl_mode,
+                Campaign.created_at
+            ).all()
+        }
+
+    columns = list(zip(*rows)) if rows else [()] * 7
+    raw_cost = np.array(columns[2], dtype=np.float64)
+    revenue = np.array(columns[3], dtype=np.float64)
+
+    logger.debug(f"Stability engine: loaded {len(rows)} daily rows since {date_from}")
+
+    return {
+        'campaign_id': np.array(columns[0], dtype=np.int64),
+        'day': np.array(columns[1], dtype='datetime64[D]').astype(np.int64),
+        'raw_cost': raw_cost,
+        'cost': stats_kernel.round_decimal(raw_cost, 2),
+        'revenue': stats_kernel.round_decimal(revenue, 2),
+        'clicks': np.array(columns[4], dtype=np.int64),
+        'leads': np.array(columns[5], dtype=np.int64),
+        'a_leads': np.array(columns[6], dtype=np.int64),
+        'info': info
+    }
+
+
+def _compute_metrics(
+    rows: Dict[str, Any],
+    date_from: date,
+    min_spend: float,
+    campaign_ids: Optional[List[int]]
+) -> Dict[str, Any]:
+    """Считает полный набор метрик по строкам окна одним векторным проходом"""
+    epoch_day = (date_from - date(1970, 1, 1)).days
+    with np.errstate(invalid='ignore'):
+        selected = (rows['day'] >= epoch_day) & (rows['raw_cost'] >= min_spend)
+    if campaign_ids is not None:
+        selected &= np.isin(rows['campaign_id'], list(campaign_ids))
+    selected = np.flatnonzero(selected)
+
+    # Строки упорядочены по кампании и дате: позиция в группе = номер дня кампании
+    ids, index, counts = np.unique(rows['campaign_id'][selected], return_inverse=True, return_counts=True)
+    index = index.ravel()
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    position = np.arange(len(selected)) - starts[index]
+    shape = (len(ids), int(counts.max()) if len(ids) else 0)
+
+    def matrix(values: np.ndarray) -> np.ndarray:
+        result = np.full(shape, np.nan)
+        result[index, position] = values
+        return result
+
+    cost = rows['cost'][selected]
+    revenue = rows['revenue'][selected]
+    clicks = rows['clicks'][selected]
+    leads = rows['leads'][selected]
+    a_leads = rows['a_leads'][selected]
+    day = rows['day'][selected]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roi = np.where(cost > 0, (revenue - cost) / cost * 100, 0.0)
+        cr = np.where(clicks > 0, leads / clicks * 100, np.nan)
+        approve = np.where(leads > 0, a_leads / leads * 100, np.nan)
+
+    profit_matrix = matrix(revenue - cost)
+    roi_matrix = matrix(roi)
+    drawdowns = stats_kernel.max_drawdown(profit_matrix)
+
+    # Дневной ROI, округленный до сотых: среднее, σ и выбросы дальше 2σ (σ округлена до сотых)
+    roi_rounded = stats_kernel.round_decimal(roi_matrix, 2)
+    roi_rounded_mean = stats_kernel.nan_mean(roi_rounded)
+    roi_rounded_std = stats_kernel.nan_std(roi_rounded)
+    with np.errstate(invalid='ignore'):
+        outliers = (
+            np.abs(roi_rounded - roi_rounded_mean[:, None])
+            > 2 * stats_kernel.round_decimal(roi_rounded_std, 2)[:, None]
+        )
+
+    # Средний ROI будней и выходных; 1970-01-01 - четверг: (день + 3) % 7 - номер дня недели с понедельника
+    is_weekend = matrix(((day + 3) % 7 >= 5).astype(np.float64)) == 1
+    period_days = {}
+    period_roi = {}
+    for period, mask in (('weekday', ~is_weekend), ('weekend', is_weekend)):
+        period_days[period] = (mask & ~np.isnan(roi_rounded)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            period_roi[period] = stats_kernel.round_decimal(
+                stats_kernel.row_sums(np.where(mask, roi_rounded, np.nan)) / period_days[period], 2
+            )
+
+    def totals(values: np.ndarray) -> np.ndarray:
+        return np.bincount(index, weights=values, minlength=len(ids)).astype(np.int64)
+
+    return {
+        'campaign_ids': ids.tolist(),
+        'info': rows['info'],
+        'days_with_data': counts.astype(np.int64),
+        'first_day': day[starts[:len(ids)]] + date(1970, 1, 1).toordinal(),
+        'total_cost': stats_kernel.row_sums(matrix(cost)),
+        'total_revenue': stats_kernel.row_sums(matrix(revenue)),
+        'total_clicks': totals(clicks),
+        'total_leads': totals(leads),
+        'total_a_leads': totals(a_leads),
+        'profitable_days': (profit_matrix > 0).sum(axis=1),
+        'max_drawdown': drawdowns['max_drawdown'],
+        'peak_profit': drawdowns['peak'],
+        'roi_mean': stats_kernel.nan_mean(roi_matrix),
+        'roi_std_sample': stats_kernel.nan_std(roi_matrix, ddof=1),
+        'cr_std_sample': stats_kernel.nan_std(matrix(cr), ddof=1),
+        'approve_std_sample': stats_kernel.nan_std(matrix(approve), ddof=1),
+        'roi_rounded_mean': roi_rounded_mean,
+        'roi_rounded_std': roi_rounded_std,
+        'roi_outliers': outliers.sum(axis=1),
+        'weekday_days': period_days['weekday'],
+        'weekend_days': period_days['weekend'],
+        'weekday_roi': period_roi['weekday'],
+        'weekend_roi': period_roi['weekend']
+    }
@@ -3,30 +3,10 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-from collections import defaultdict
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from .metrics_engine import get_stability_metrics
 
 
 class PerformanceStability(BaseModule):
@@ -168,7 +148,7 @@ class PerformanceStability(BaseModule):
 
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
-        Анализ устойчивости результатов через SQLAlchemy.
+        Анализ устойчивости результатов.
 
         Args:
             config: Конфигурация модуля
@@ -189,256 +169,188 @@ class PerformanceStability(BaseModule):
 
         date_from = datetime.now().date() - timedelta(days=days - 1)  # Включаем текущий день
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем дневную статистику кампаний за период
-            query = session.query(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost >= min_spend
-            ).order_by(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date
-            )
-
-            stats_by_date = query.all()
-
-            # Группируем данные по кампаниям
-            campaigns_data = {}
-            for row in stats_by_date:
-                campaign_id = row.campaign_id
-                if campaign_id not in campaigns_data:
-                    campaigns_data[campaign_id] = []
-
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                clicks = int(row.clicks or 0)
-                profit = revenue - cost
-                roi = round(((revenue - cost) / cost * 100), 2) if cost > 0 else 0
-
-                # Определяем день недели (0 = понедельник, 6 = воскресенье)
-                weekday = row.date.weekday()
-                is_weekend = weekday >= 5  # Суббота (5) и Воскресенье (6)
-
-                campaigns_data[campaign_id].append({
-                    'date': row.date,
-                    'weekday': weekday,
-                    'is_weekend': is_weekend,
-                    'cost': cost,
-                    'revenue': revenue,
-                    'profit': profit,
-                    'roi': roi,
-                    'clicks': clicks
-                })
-
-            # Загружаем информацию о кампаниях
-            campaign_ids = list(campaigns_data.keys())
-            campaigns_info = {}
-            if campaign_ids:
-                campaigns_query = session.query(Campaign).filter(
-                    Campaign.internal_id.in_(campaign_ids)
+        # Метрики всех кампаний за окно (общий движок модулей стабильности)
+        metrics = get_stability_metrics(date_from, min_spend)
+        campaigns_info = metrics['info']
+
+        # Анализируем устойчивость для каждой кампании
+        high_stability = []
+        medium_stability = []
+        low_stability = []
+
+        # Среднее, σ и выбросы дневного ROI (округленного до сотых), ROI будней
+        # и выходных (суббота и воскресенье) посчитаны движком по всем кампаниям
+        roi_means = metrics['roi_rounded_mean']
+        roi_stds = metrics['roi_rounded_std']
+        outliers_counts = metrics['roi_outliers']
+
+        for row, campaign_id in enumerate(metrics['campaign_ids']):
+            days_with_data = int(metrics['days_with_data'][row])
+
+            # Пропускаем если недостаточно данных
+            if days_with_data < min_days_with_data:
+                continue
+
+            # Средний ROI будней и выходных (0, если таких дней не было)
+            weekday_days = int(metrics['weekday_days'][row])
+            weekend_days = int(metrics['weekend_days'][row])
+            weekday_avg_roi = float(metrics['weekday_roi'][row]) if weekday_days else 0
+            weekend_avg_roi = float(metrics['weekend_roi'][row]) if weekend_days else 0
+
+            # Разница между буднями и выходными (%)
+            weekday_weekend_roi_diff = 0
+            if weekday_avg_roi != 0 and weekend_avg_roi != 0:
+                weekday_weekend_roi_diff = round(
+                    abs(weekday_avg_roi - weekend_avg_roi) / abs(weekday_avg_roi) * 100, 2
                 )
-                for campaign in campaigns_query.all():
-                    campaigns_info[campaign.internal_id] = {
-                        'binom_id': campaign.binom_id,
-                        'name': campaign.current_name,
-                        'group': campaign.group_name or "Без группы",
-                        'is_cpl_mode': campaign.is_cpl_mode
-                    }
+            elif weekday_avg_roi != 0:
+                weekday_weekend_roi_diff = 100.0
+            elif weekend_avg_roi != 0:
+                weekday_weekend_roi_diff = 100.0
+
+            # Стандартное отклонение ROI (волатильность)
+            avg_roi = float(roi_means[row])
+            std_dev_roi = round(float(roi_stds[row]), 2)
+
+            # Коэффициент вариации (CV) - нормализованная волатильность
+            cv_roi = round(float(stats_kernel.coefficient_of_variation(std_dev_roi, avg_roi)), 2)
+
+            # Количество выбросов (значения выходящие за ±2σ)
+            outliers_count = int(outliers_counts[row])
+            outliers_pct = round((outliers_count / days_with_data * 100), 2)
+
+            # Индекс устойчивости (0-100)
+            # 40% - низкая разница будни/выходные (чем меньше, тем лучше)
+            # 30% - низкая волатильность (чем меньше CV, тем лучше)
+            # 30% - мало выбросов (чем меньше, тем лучше)
+
+            # Балл за разницу будни/выходные (макс 40)
+            score_weekday_weekend = max(0, 40 - (weekday_weekend_roi_diff / weekday_weekend_diff_threshold * 40))
+
+            # Балл за волатильность (макс 30)
+            # CV < 20% = отлично, CV > 100% = плохо
+            score_volatility = max(0, 30 - (cv_roi / 100 * 30))
+
+            # Балл за выбросы (макс 30)
+            # < 5% выбросов = отлично, > 20% = плохо
+            score_outliers = max(0, 30 - (outliers_pct / 20 * 30))
+
+            stability_score = round(score_weekday_weekend + score_volatility + score_outliers, 2)
+
+            # Классификация устойчивости на основе настраиваемых порогов
+            if stability_score >= severity_high_threshold:
+                stability_class = "high"
+                severity = "low"  # Хорошая новость
+            elif stability_score >= severity_medium_threshold:
+                stability_class = "medium"
+                severity = "medium"
+            else:
+                stability_class = "low"
+                severity = "high"
+
+            # Агрегированные показатели за весь период
+            total_cost = float(metrics['total_cost'][row])
+            total_revenue = float(metrics['total_revenue'][row])
+            total_profit = total_revenue - total_cost
+            overall_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
+
+            # Формируем данные
+            full_campaign_info = campaigns_info.get(campaign_id, {
+                'binom_id': None,
+                'name': f"Campaign {campaign_id}",
+                'group': "Без группы",
+                'is_cpl_mode': False
+            })
 
-            # Анализируем устойчивость для каждой кампании
-            high_stability = []
-            medium_stability = []
-            low_stability = []
-
-            for campaign_id, daily_data in campaigns_data.items():
-                # Пропускаем если недостаточно данных
-                if len(daily_data) < min_days_with_data:
-                    continue
-
-                # Разделяем на будни и выходные
-                weekday_data = [d for d in daily_data if not d['is_weekend']]
-                weekend_data = [d for d in daily_data if d['is_weekend']]
-
-                # Рассчитываем средние метрики для будней
-                weekday_avg_roi = 0
-                weekday_avg_cost = 0
-                weekday_avg_profit = 0
-                if weekday_data:
-                    weekday_avg_roi = round(sum(d['roi'] for d in weekday_data) / len(weekday_data), 2)
-                    weekday_avg_cost = round(sum(d['cost'] for d in weekday_data) / len(weekday_data), 2)
-                    weekday_avg_profit = round(sum(d['profit'] for d in weekday_data) / len(weekday_data), 2)
-
-                # Рассчитываем средние метрики для выходных
-                weekend_avg_roi = 0
-                weekend_avg_cost = 0
-                weekend_avg_profit = 0
-                if weekend_data:
-                    weekend_avg_roi = round(sum(d['roi'] for d in weekend_data) / len(weekend_data), 2)
-                    weekend_avg_cost = round(sum(d['cost'] for d in weekend_data) / len(weekend_data), 2)
-                    weekend_avg_profit = round(sum(d['profit'] for d in weekend_data) / len(weekend_data), 2)
-
-                # Разница между буднями и выходными (%)
-                weekday_weekend_roi_diff = 0
-                if weekday_avg_roi != 0 and weekend_avg_roi != 0:
-                    weekday_weekend_roi_diff = round(
-                        abs(weekday_avg_roi - weekend_avg_roi) / abs(weekday_avg_roi) * 100, 2
-                    )
-                elif weekday_avg_roi != 0:
-                    weekday_weekend_roi_diff = 100.0
-                elif weekend_avg_roi != 0:
-                    weekday_weekend_roi_diff = 100.0
-
-                # Стандартное отклонение ROI (волатильность)
-                roi_values = [d['roi'] for d in daily_data]
-                avg_roi = sum(roi_values) / len(roi_values)
-                variance = sum((x - avg_roi) ** 2 for x in roi_values) / len(roi_values)
-                std_dev_roi = round(variance ** 0.5, 2)
-
-                # Коэффициент вариации (CV) - нормализованная волатильность
-                cv_roi = round((std_dev_roi / abs(avg_roi)) * 100, 2) if avg_roi != 0 else 0
-
-                # Количество выбросов (значения выходящие за ±2σ)
-                outliers_count = sum(1 for roi in roi_values if abs(roi - avg_roi) > 2 * std_dev_roi)
-                outliers_pct = round((outliers_count / len(roi_values) * 100), 2)
-
-                # Индекс устойчивости (0-100)
-                # 40% - низкая разница будни/выходные (чем меньше, тем лучше)
-                # 30% - низкая волатильность (чем меньше CV, тем лучше)
-                # 30% - мало выбросов (чем меньше, тем лучше)
-
-                # Балл за разницу будни/выходные (макс 40)
-                score_weekday_weekend = max(0, 40 - (weekday_weekend_roi_diff / weekday_weekend_diff_threshold * 40))
-
-                # Балл за волатильность (макс 30)
-                # CV < 20% = отлично, CV > 100% = плохо
-                score_volatility = max(0, 30 - (cv_roi / 100 * 30))
-
-                # Балл за выбросы (макс 30)
-                # < 5% выбросов = отлично, > 20% = плохо
-                score_outliers = max(0, 30 - (outliers_pct / 20 * 30))
-
-                stability_score = round(score_weekday_weekend + score_volatility + score_outliers, 2)
-
-                # Классификация устойчивости на основе настраиваемых порогов
-                if stability_score >= severity_high_threshold:
-                    stability_class = "high"
-                    severity = "low"  # Хорошая новость
-                elif stability_score >= severity_medium_threshold:
-                    stability_class = "medium"
-                    severity = "medium"
-                else:
-                    stability_class = "low"
-                    severity = "high"
-
-                # Агрегированные показатели за весь период
-                total_cost = sum(d['cost'] for d in daily_data)
-                total_revenue = sum(d['revenue'] for d in daily_data)
-                total_profit = total_revenue - total_cost
-                overall_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
-
-                # Формируем данные
-                full_campaign_info = campaigns_info.get(campaign_id, {
-                    'binom_id': None,
-                    'name': f"Campaign {campaign_id}",
-                    'group': "Без группы",
-                    'is_cpl_mode': False
-                })
+            campaign_stability = {
+                "campaign_id": campaign_id,
+                "binom_id": full_campaign_info['binom_id'],
+                "name": full_campaign_info['name'],
+                "group": full_campaign_info['group'],
+
+                # Агрегированные метрики
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "total_profit": round(total_profit, 2),
+                "overall_roi": overall_roi,
+
+                # Метрики устойчивости
+                "stability_score": stability_score,
+                "stability_class": stability_class,
+
+                # Будни vs Выходные
+                "weekday_days": weekday_days,
+                "weekend_days": weekend_days,
+                "weekday_avg_roi": weekday_avg_roi,
+                "weekend_avg_roi": weekend_avg_roi,
+                "weekday_weekend_roi_diff": weekday_weekend_roi_diff,
+
+                # Волатильность
+                "std_dev_roi": std_dev_roi,
+                "cv_roi": cv_roi,
+
+                # Выбросы
+                "outliers_count": outliers_count,
+                "outliers_pct": outliers_pct,
+
+                # Дополнительные данные
+                "days_with_data": days_with_data,
+                "severity": severity,
+                "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
+            }
 
-                campaign_stability = {
-                    "campaign_id": campaign_id,
-                    "binom_id": full_campaign_info['binom_id'],
-                    "name": full_campaign_info['name'],
-                    "group": full_campaign_info['group'],
-
-                    # Агрегированные метрики
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "total_profit": round(total_profit, 2),
-                    "overall_roi": overall_roi,
-
-                    # Метрики устойчивости
-                    "stability_score": stability_score,
-                    "stability_class": stability_class,
-
-                    # Будни vs Выходные
-                    "weekday_days": len(weekday_data),
-                    "weekend_days": len(weekend_data),
-                    "weekday_avg_roi": weekday_avg_roi,
-                    "weekend_avg_roi": weekend_avg_roi,
-                    "weekday_weekend_roi_diff": weekday_weekend_roi_diff,
-
-                    # Волатильность
-                    "std_dev_roi": std_dev_roi,
-                    "cv_roi": cv_roi,
-
-                    # Выбросы
-                    "outliers_count": outliers_count,
-                    "outliers_pct": outliers_pct,
-
-                    # Дополнительные данные
-                    "days_with_data": len(daily_data),
-                    "severity": severity,
-                    "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
-                }
+            # Распределяем по категориям
+            if stability_class == "high":
+                high_stability.append(campaign_stability)
+            elif stability_class == "medium":
+                medium_stability.append(campaign_stability)
+            else:
+                low_stability.append(campaign_stability)
 
-                # Распределяем по категориям
-                if stability_class == "high":
-                    high_stability.append(campaign_stability)
-                elif stability_class == "medium":
-                    medium_stability.append(campaign_stability)
-                else:
-                    low_stability.append(campaign_stability)
-
-            # Сортировка (по убыванию индекса устойчивости)
-            high_stability.sort(key=lambda x: x['stability_score'], reverse=True)
-            medium_stability.sort(key=lambda x: x['stability_score'], reverse=True)
-            low_stability.sort(key=lambda x: x['stability_score'])
-
-            # Объединяем для общей таблицы
-            all_campaigns = high_stability + medium_stability + low_stability
-
-            return {
-                "campaigns": all_campaigns,
-                "high_stability": high_stability,
-                "medium_stability": medium_stability,
-                "low_stability": low_stability,
-                "summary": {
-                    "total_analyzed": len(all_campaigns),
-                    "total_high": len(high_stability),
-                    "total_medium": len(medium_stability),
-                    "total_low": len(low_stability),
-                    "avg_stability_score": round(
-                        sum(c['stability_score'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0,
-                    "best_stability_score": round(high_stability[0]['stability_score'], 2) if high_stability else 0,
-                    "worst_stability_score": round(low_stability[-1]['stability_score'], 2) if low_stability else 0,
-                    "avg_weekday_weekend_diff": round(
-                        sum(c['weekday_weekend_roi_diff'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0,
-                    "avg_cv_roi": round(
-                        sum(c['cv_roi'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0
-                },
-                "period": {
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat(),
-                    "days": days
-                },
-                "thresholds": {
-                    "min_spend": min_spend,
-                    "min_days_with_data": min_days_with_data,
-                    "weekday_weekend_diff_threshold": weekday_weekend_diff_threshold,
-                    "stability_score_threshold": stability_score_threshold,
-                    "severity_high": severity_high_threshold,
-                    "severity_medium": severity_medium_threshold
-                }
+        # Сортировка (по убыванию индекса устойчивости)
+        high_stability.sort(key=lambda x: x['stability_score'], reverse=True)
+        medium_stability.sort(key=lambda x: x['stability_score'], reverse=True)
+        low_stability.sort(key=lambda x: x['stability_score'])
+
+        # Объединяем для общей таблицы
+        all_campaigns = high_stability + medium_stability + low_stability
+
+        return {
+            "campaigns": all_campaigns,
+            "high_stability": high_stability,
+            "medium_stability": medium_stability,
+            "low_stability": low_stability,
+            "summary": {
+                "total_analyzed": len(all_campaigns),
+                "total_high": len(high_stability),
+                "total_medium": len(medium_stability),
+                "total_low": len(low_stability),
+                "avg_stability_score": round(
+                    sum(c['stability_score'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0,
+                "best_stability_score": round(high_stability[0]['stability_score'], 2) if high_stability else 0,
+                "worst_stability_score": round(low_stability[-1]['stability_score'], 2) if low_stability else 0,
+                "avg_weekday_weekend_diff": round(
+                    sum(c['weekday_weekend_roi_diff'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0,
+                "avg_cv_roi": round(
+                    sum(c['cv_roi'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0
+            },
+            "period": {
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat(),
+                "days": days
+            },
+            "thresholds": {
+                "min_spend": min_spend,
+                "min_days_with_data": min_days_with_data,
+                "weekday_weekend_diff_threshold": weekday_weekend_diff_threshold,
+                "stability_score_threshold": stability_score_threshold,
+                "severity_high": severity_high_threshold,
+                "severity_medium": severity_medium_threshold
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
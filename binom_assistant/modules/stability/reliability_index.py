@@ -3,30 +3,10 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-import statistics
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from .metrics_engine import get_stability_metrics
 
 
 class ReliabilityIndex(BaseModule):
@@ -171,7 +151,7 @@ class ReliabilityIndex(BaseModule):
 
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
-        Анализ надежности кампаний через SQLAlchemy.
+        Анализ надежности кампаний.
 
         Args:
             config: Конфигурация модуля
@@ -193,275 +173,199 @@ class ReliabilityIndex(BaseModule):
         # Исключаем сегодняшний день (апрувы приходят с задержкой)
         date_from = datetime.now().date() - timedelta(days=days)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем дневную статистику кампаний за период
-            query = session.query(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost >= min_spend
-            ).order_by(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date
+        # Метрики всех кампаний за окно (общий движок модулей стабильности)
+        metrics = get_stability_metrics(date_from, min_spend)
+        campaigns_info = metrics['info']
+
+        # Анализируем надежность для каждой кампании
+        high_reliability = []
+        medium_reliability = []
+        low_reliability = []
+
+        # CV ROI сразу по всем кампаниям (строка матрицы = кампания)
+        # Для околонулевого среднего ROI std нормализуется относительно порога 50%
+        roi_cvs = stats_kernel.coefficient_of_variation(
+            metrics['roi_std_sample'],
+            metrics['roi_mean'],
+            min_abs_mean=5,
+            fallback_scale=50
+        )
+
+        for row, campaign_id in enumerate(metrics['campaign_ids']):
+            days_with_data = int(metrics['days_with_data'][row])
+
+            # Пропускаем если недостаточно данных
+            if days_with_data < min_days_with_data:
+                continue
+
+            # === 1. Возраст кампании (вес 20%) ===
+            campaign_age_days = datetime.now().date().toordinal() - int(metrics['first_day'][row])
+            # Чем старше, тем лучше (макс балл при 60+ днях)
+            age_score = min(campaign_age_days / 60 * 100, 100)
+
+            # === 2. Стабильность ROI (вес 30%) ===
+            # ИСПРАВЛЕНО: Правильный расчет коэффициента вариации ROI
+            # CV = (std_dev / mean) * 100, но для ROI нужна особая обработка
+            if days_with_data > 1:
+                # Для ROI используем альтернативный подход при mean близком к 0 (|mean| <= 5)
+                cv_roi = float(roi_cvs[row])
+            else:
+                cv_roi = 100  # Недостаточно данных = максимальная неопределенность
+
+            # Чем меньше вариация, тем выше балл (CV < 20% = 100 баллов, > 100% = 0 баллов)
+            stability_score = max(0, 100 - cv_roi)
+
+            # === 3. Объем данных/лидов (вес 25%) ===
+            total_clicks = int(metrics['total_clicks'][row])
+            total_leads_all = int(metrics['total_leads'][row])
+            total_leads = int(metrics['total_a_leads'][row])
+
+            # Учитываем как клики, так и лиды
+            clicks_score = min(total_clicks / 1000 * 100, 100)  # Макс балл при 1000+ кликов
+            leads_score = min(total_leads / min_leads * 100, 100)  # Макс балл при min_leads+ лидов
+            volume_score = (clicks_score + leads_score) / 2
+
+            # === 4. Consistency score (вес 25%) ===
+            # Рассчитываем как в consistency_scorer
+            profitable_days = int(metrics['profitable_days'][row])
+            unprofitable_days = days_with_data - profitable_days
+            profitable_days_pct = profitable_days / days_with_data * 100
+
+            if unprofitable_days > 0:
+                profit_loss_ratio = profitable_days / unprofitable_days
+            else:
+                profit_loss_ratio = float(profitable_days)
+
+            # Максимальная просадка накопленной прибыли от пика
+            max_drawdown = float(metrics['max_drawdown'][row])
+            peak_profit = float(metrics['peak_profit'][row])
+
+            if peak_profit > 0:
+                max_drawdown_pct = (max_drawdown / peak_profit * 100)
+            else:
+                max_drawdown_pct = 0
+
+            # Индекс консистентности (0-100)
+            score_profitable_days = profitable_days_pct * 0.5
+            score_ratio = min(profit_loss_ratio / 10 * 30, 30)
+            score_drawdown = max(0, (100 - max_drawdown_pct)) * 0.2
+            consistency_score = score_profitable_days + score_ratio + score_drawdown
+
+            # === ФИНАЛЬНЫЙ ИНДЕКС НАДЕЖНОСТИ (0-100) ===
+            reliability_index = round(
+                age_score * 0.20 +
+                stability_score * 0.30 +
+                volume_score * 0.25 +
+                consistency_score * 0.25,
+                2
             )
 
-            stats_by_date = query.all()
-
-            # Группируем данные по кампаниям
-            campaigns_data = {}
-            for row in stats_by_date:
-                campaign_id = row.campaign_id
-                if campaign_id not in campaigns_data:
-                    campaigns_data[campaign_id] = {
-                        'first_date': row.date,
-                        'last_date': row.date,
-                        'daily_stats': []
-                    }
+            # Классификация надежности на основе настраиваемых порогов
+            if reliability_index >= severity_high_threshold:
+                reliability_class = "high"
+                severity = "low"  # Хорошая новость
+            elif reliability_index >= severity_medium_threshold:
+                reliability_class = "medium"
+                severity = "medium"
+            else:
+                reliability_class = "low"
+                severity = "high"
+
+            # Агрегированные показатели
+            total_cost = float(metrics['total_cost'][row])
+            total_revenue = float(metrics['total_revenue'][row])
+            total_profit = total_revenue - total_cost
+            avg_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
+
+            # Формируем данные
+            full_campaign_info = campaigns_info.get(campaign_id, {
+                'binom_id': None,
+                'name': f"Campaign {campaign_id}",
+                'group': "Без группы",
+                'is_cpl_mode': False
+            })
 
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                profit = revenue - cost
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-
-                campaigns_data[campaign_id]['daily_stats'].append({
-                    'date': row.date,
-                    'cost': cost,
-                    'revenue': revenue,
-                    'profit': profit,
-                    'roi': roi,
-                    'clicks': int(row.clicks) if row.clicks else 0,
-                    'leads': int(row.leads) if row.leads else 0,
-                    'a_leads': int(row.a_leads) if row.a_leads else 0,
-                    'is_profitable': profit > 0
-                })
-
-                # Обновляем даты
-                if row.date < campaigns_data[campaign_id]['first_date']:
-                    campaigns_data[campaign_id]['first_date'] = row.date
-                if row.date > campaigns_data[campaign_id]['last_date']:
-                    campaigns_data[campaign_id]['last_date'] = row.date
-
-            # Загружаем информацию о кампаниях
-            campaign_ids = list(campaigns_data.keys())
-            campaigns_info = {}
-            if campaign_ids:
-                campaigns_query = session.query(Campaign).filter(
-                    Campaign.internal_id.in_(campaign_ids)
-                )
-                for campaign in campaigns_query.all():
-                    campaigns_info[campaign.internal_id] = {
-                        'binom_id': campaign.binom_id,
-                        'name': campaign.current_name,
-                        'group': campaign.group_name or "Без группы",
-                        'is_cpl_mode': campaign.is_cpl_mode,
-                        'created_at': campaign.created_at
-                    }
+            campaign_reliability = {
+                "campaign_id": campaign_id,
+                "binom_id": full_campaign_info['binom_id'],
+                "name": full_campaign_info['name'],
+                "group": full_campaign_info['group'],
+
+                # Агрегированные метрики
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "total_profit": round(total_profit, 2),
+                "avg_roi": avg_roi,
+
+                # Индекс надежности и его компоненты
+                "reliability_index": reliability_index,
+                "reliability_class": reliability_class,
+                "age_score": round(age_score, 2),
+                "stability_score": round(stability_score, 2),
+                "volume_score": round(volume_score, 2),
+                "consistency_score": round(consistency_score, 2),
+
+                # Дополнительные данные
+                "campaign_age_days": campaign_age_days,
+                "cv_roi": round(cv_roi, 2),
+                "total_clicks": total_clicks,
+                "total_leads_all": total_leads_all,
+                "total_leads": total_leads,
+                "profitable_days_pct": round(profitable_days_pct, 2),
+                "days_with_data": days_with_data,
+                "severity": severity,
+                "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
+            }
 
-            # Анализируем надежность для каждой кампании
-            high_reliability = []
-            medium_reliability = []
-            low_reliability = []
-
-            for campaign_id, camp_data in campaigns_data.items():
-                daily_stats = camp_data['daily_stats']
-
-                # Пропускаем если недостаточно данных
-                if len(daily_stats) < min_days_with_data:
-                    continue
-
-                # === 1. Возраст кампании (вес 20%) ===
-                campaign_age_days = (datetime.now().date() - camp_data['first_date']).days
-                # Чем старше, тем лучше (макс балл при 60+ днях)
-                age_score = min(campaign_age_days / 60 * 100, 100)
-
-                # === 2. Стабильность ROI (вес 30%) ===
-                # ИСПРАВЛЕНО: Правильный расчет коэффициента вариации ROI
-                # CV = (std_dev / mean) * 100, но для ROI нужна особая обработка
-                roi_values = [d['roi'] for d in daily_stats]
-
-                if len(roi_values) > 1:
-                    mean_roi = statistics.mean(roi_values)
-                    std_roi = statistics.stdev(roi_values)
-
-                    # Для ROI используем альтернативный подход при mean близком к 0
-                    if abs(mean_roi) > 5:  # Если средний ROI значительно отличается от 0
-                        cv_roi = (std_roi / abs(mean_roi)) * 100
-                    else:
-                        # Для околонулевых средних используем нормализацию относительно порога (50%)
-                        cv_roi = (std_roi / 50) * 100
-                else:
-                    cv_roi = 100  # Недостаточно данных = максимальная неопределенность
-
-                # Чем меньше вариация, тем выше балл (CV < 20% = 100 баллов, > 100% = 0 баллов)
-                stability_score = max(0, 100 - cv_roi)
-
-                # === 3. Объем данных/лидов (вес 25%) ===
-                total_clicks = sum(d['clicks'] for d in daily_stats)
-                total_leads_all = sum(d['leads'] for d in daily_stats)
-                total_leads = sum(d['a_leads'] for d in daily_stats)
-
-                # Учитываем как клики, так и лиды
-                clicks_score = min(total_clicks / 1000 * 100, 100)  # Макс балл при 1000+ кликов
-                leads_score = min(total_leads / min_leads * 100, 100)  # Макс балл при min_leads+ лидов
-                volume_score = (clicks_score + leads_score) / 2
-
-                # === 4. Consistency score (вес 25%) ===
-                # Рассчитываем как в consistency_scorer
-                profitable_days = sum(1 for d in daily_stats if d['is_profitable'])
-                unprofitable_days = len(daily_stats) - profitable_days
-                profitable_days_pct = (profitable_days / len(daily_stats) * 100) if daily_stats else 0
-
-                if unprofitable_days > 0:
-                    profit_loss_ratio = profitable_days / unprofitable_days
-                else:
-                    profit_loss_ratio = float(profitable_days)
-
-                # Расчет максимальной просадки
-                cumulative_profit = 0
-                peak_profit = 0
-                max_drawdown = 0
-
-                for d in daily_stats:
-                    cumulative_profit += d['profit']
-                    if cumulative_profit > peak_profit:
-                        peak_profit = cumulative_profit
-                    drawdown = peak_profit - cumulative_profit
-                    if drawdown > max_drawdown:
-                        max_drawdown = drawdown
-
-                if peak_profit > 0:
-                    max_drawdown_pct = (max_drawdown / peak_profit * 100)
-                else:
-                    max_drawdown_pct = 0
-
-                # Индекс консистентности (0-100)
-                score_profitable_days = profitable_days_pct * 0.5
-                score_ratio = min(profit_loss_ratio / 10 * 30, 30)
-                score_drawdown = max(0, (100 - max_drawdown_pct)) * 0.2
-                consistency_score = score_profitable_days + score_ratio + score_drawdown
-
-                # === ФИНАЛЬНЫЙ ИНДЕКС НАДЕЖНОСТИ (0-100) ===
-                reliability_index = round(
-                    age_score * 0.20 +
-                    stability_score * 0.30 +
-                    volume_score * 0.25 +
-                    consistency_score * 0.25,
-                    2
-                )
-
-                # Классификация надежности на основе настраиваемых порогов
-                if reliability_index >= severity_high_threshold:
-                    reliability_class = "high"
-                    severity = "low"  # Хорошая новость
-                elif reliability_index >= severity_medium_threshold:
-                    reliability_class = "medium"
-                    severity = "medium"
-                else:
-                    reliability_class = "low"
-                    severity = "high"
-
-                # Агрегированные показатели
-                total_cost = sum(d['cost'] for d in daily_stats)
-                total_revenue = sum(d['revenue'] for d in daily_stats)
-                total_profit = total_revenue - total_cost
-                avg_roi = round(((total_revenue - total_cost) / total_cost * 100), 2) if total_cost > 0 else 0
-
-                # Формируем данные
-                full_campaign_info = campaigns_info.get(campaign_id, {
-                    'binom_id': None,
-                    'name': f"Campaign {campaign_id}",
-                    'group': "Без группы",
-                    'is_cpl_mode': False
-                })
-
-                campaign_reliability = {
-                    "campaign_id": campaign_id,
-                    "binom_id": full_campaign_info['binom_id'],
-                    "name": full_campaign_info['name'],
-                    "group": full_campaign_info['group'],
-
-                    # Агрегированные метрики
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "total_profit": round(total_profit, 2),
-                    "avg_roi": avg_roi,
-
-                    # Индекс надежности и его компоненты
-                    "reliability_index": reliability_index,
-                    "reliability_class": reliability_class,
-                    "age_score": round(age_score, 2),
-                    "stability_score": round(stability_score, 2),
-                    "volume_score": round(volume_score, 2),
-                    "consistency_score": round(consistency_score, 2),
-
-                    # Дополнительные данные
-                    "campaign_age_days": campaign_age_days,
-                    "cv_roi": round(cv_roi, 2),
-                    "total_clicks": total_clicks,
-                    "total_leads_all": total_leads_all,
-                    "total_leads": total_leads,
-                    "profitable_days_pct": round(profitable_days_pct, 2),
-                    "days_with_data": len(daily_stats),
-                    "severity": severity,
-                    "is_cpl_mode": full_campaign_info.get('is_cpl_mode', False)
-                }
+            # Распределяем по категориям
+            if reliability_class == "high":
+                high_reliability.append(campaign_reliability)
+            elif reliability_class == "medium":
+                medium_reliability.append(campaign_reliability)
+            else:
+                low_reliability.append(campaign_reliability)
 
-                # Распределяем по категориям
-                if reliability_class == "high":
-                    high_reliability.append(campaign_reliability)
-                elif reliability_class == "medium":
-                    medium_reliability.append(campaign_reliability)
-                else:
-                    low_reliability.append(campaign_reliability)
-
-            # Сортировка (по убыванию индекса надежности)
-            high_reliability.sort(key=lambda x: x['reliability_index'], reverse=True)
-            medium_reliability.sort(key=lambda x: x['reliability_index'], reverse=True)
-            low_reliability.sort(key=lambda x: x['reliability_index'])
-
-            # Объединяем для общей таблицы
-            all_campaigns = high_reliability + medium_reliability + low_reliability
-
-            return {
-                "campaigns": all_campaigns,
-                "high_reliability": high_reliability,
-                "medium_reliability": medium_reliability,
-                "low_reliability": low_reliability,
-                "summary": {
-                    "total_analyzed": len(all_campaigns),
-                    "total_high": len(high_reliability),
-                    "total_medium": len(medium_reliability),
-                    "total_low": len(low_reliability),
-                    "avg_reliability_index": round(
-                        sum(c['reliability_index'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0,
-                    "best_reliability_index": round(all_campaigns[0]['reliability_index'], 2) if all_campaigns else 0,
-                    "worst_reliability_index": round(all_campaigns[-1]['reliability_index'], 2) if all_campaigns else 0,
-                    "avg_campaign_age": round(
-                        sum(c['campaign_age_days'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0
-                },
-                "period": {
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat(),
-                    "days": days
-                },
-                "thresholds": {
-                    "min_spend": min_spend,
-                    "min_days_with_data": min_days_with_data,
-                    "reliability_threshold": reliability_threshold,
-                    "min_leads": min_leads,
-                    "severity_high": severity_high_threshold,
-                    "severity_medium": severity_medium_threshold
-                }
+        # Сортировка (по убыванию индекса надежности)
+        high_reliability.sort(key=lambda x: x['reliability_index'], reverse=True)
+        medium_reliability.sort(key=lambda x: x['reliability_index'], reverse=True)
+        low_reliability.sort(key=lambda x: x['reliability_index'])
+
+        # Объединяем для общей таблицы
+        all_campaigns = high_reliability + medium_reliability + low_reliability
+
+        return {
+            "campaigns": all_campaigns,
+            "high_reliability": high_reliability,
+            "medium_reliability": medium_reliability,
+            "low_reliability": low_reliability,
+            "summary": {
+                "total_analyzed": len(all_campaigns),
+                "total_high": len(high_reliability),
+                "total_medium": len(medium_reliability),
+                "total_low": len(low_reliability),
+                "avg_reliability_index": round(
+                    sum(c['reliability_index'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0,
+                "best_reliability_index": round(all_campaigns[0]['reliability_index'], 2) if all_campaigns else 0,
+                "worst_reliability_index": round(all_campaigns[-1]['reliability_index'], 2) if all_campaigns else 0,
+                "avg_campaign_age": round(
+                    sum(c['campaign_age_days'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0
+            },
+            "period": {
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat(),
+                "days": days
+            },
+            "thresholds": {
+                "min_spend": min_spend,
+                "min_days_with_data": min_days_with_data,
+                "reliability_threshold": reliability_threshold,
+                "min_leads": min_leads,
+                "severity_high": severity_high_threshold,
+                "severity_medium": severity_medium_threshold
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
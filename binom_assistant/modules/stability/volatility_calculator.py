@@ -3,30 +3,11 @@
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from contextlib import contextmanager
-import statistics
+import numpy as np
 
-from storage.database.base import get_session
-from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
-
-
-@contextmanager
-def get_db_session():
-    """
-    Локальная обертка над get_session() для использования в with.
-    Преобразует генератор в контекстный менеджер.
-    """
-    session_gen = get_session()
-    session = next(session_gen)
-    try:
-        yield session
-    finally:
-        try:
-            next(session_gen)
-        except StopIteration:
-            pass
+from .. import stats_kernel
+from .metrics_engine import get_stability_metrics
 
 
 class VolatilityCalculator(BaseModule):
@@ -160,7 +141,7 @@ class VolatilityCalculator(BaseModule):
 
     def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
         """
-        Анализ волатильности метрик через SQLAlchemy.
+        Анализ волатильности метрик.
 
         Args:
             config: Конфигурация модуля
@@ -181,251 +162,190 @@ class VolatilityCalculator(BaseModule):
         # Исключаем сегодняшний день (апрувы приходят с задержкой)
         date_from = datetime.now().date() - timedelta(days=days)
 
-        # Работа с БД
-        with get_db_session() as session:
-            # Получаем дневную статистику кампаний за период
-            query = session.query(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date,
-                CampaignStatsDaily.cost,
-                CampaignStatsDaily.revenue,
-                CampaignStatsDaily.clicks,
-                CampaignStatsDaily.leads,
-                CampaignStatsDaily.a_leads
-            ).filter(
-                CampaignStatsDaily.date >= date_from,
-                CampaignStatsDaily.cost >= min_spend
-            ).order_by(
-                CampaignStatsDaily.campaign_id,
-                CampaignStatsDaily.date
-            )
-
-            stats_by_date = query.all()
-
-            # Группируем данные по кампаниям
-            campaigns_data = {}
-            for row in stats_by_date:
-                campaign_id = row.campaign_id
-                if campaign_id not in campaigns_data:
-                    campaigns_data[campaign_id] = []
-
-                cost = float(row.cost)
-                revenue = float(row.revenue)
-                clicks = int(row.clicks)
-                leads = int(row.leads)
-                a_leads = int(row.a_leads)
-
-                # Вычисляем дневные метрики
-                roi = ((revenue - cost) / cost * 100) if cost > 0 else 0
-                cr = (leads / clicks * 100) if clicks > 0 else 0
-                approve_rate = (a_leads / leads * 100) if leads > 0 else 0
-
-                campaigns_data[campaign_id].append({
-                    'date': row.date,
-                    'cost': cost,
-                    'revenue': revenue,
-                    'roi': roi,
-                    'cr': cr,
-                    'approve_rate': approve_rate,
-                    'clicks': clicks,
-                    'leads': leads,
-                    'a_leads': a_leads
-                })
+        # Метрики всех кампаний за окно (общий движок модулей стабильности)
+        metrics = get_stability_metrics(date_from, min_spend)
+        campaigns_info = metrics['info']
+
+        # Анализируем волатильность для каждой кампании
+        low_volatility = []
+        medium_volatility = []
+        high_volatility = []
+        extreme_volatility = []
+
+        # Стандартные отклонения (σ) по всем кампаниям.
+        # Дни без кликов не участвуют в σ CR, дни без лидов - в σ approve rate.
+        # Меньше 2 значений - σ = 0
+        roi_stds = np.nan_to_num(metrics['roi_std_sample'])
+        cr_stds = np.nan_to_num(metrics['cr_std_sample'])
+        approve_stds = np.nan_to_num(metrics['approve_std_sample'])
+
+        for row, campaign_id in enumerate(metrics['campaign_ids']):
+            days_with_data = int(metrics['days_with_data'][row])
+
+            # Пропускаем если недостаточно данных
+            if days_with_data < min_days_with_data:
+                continue
+
+            # Агрегированные показатели за весь период
+            total_cost = float(metrics['total_cost'][row])
+            total_revenue = float(metrics['total_revenue'][row])
+            total_clicks = int(metrics['total_clicks'][row])
+            total_leads = int(metrics['total_leads'][row])
+            total_a_leads = int(metrics['total_a_leads'][row])
+
+            # Средние метрики за период
+            avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
+            avg_cr = (total_leads / total_clicks * 100) if total_clicks > 0 else 0
+            avg_approve_rate = (total_a_leads / total_leads * 100) if total_leads > 0 else 0
+
+            # Вычисляем стандартное отклонение (σ)
+            roi_std = round(float(roi_stds[row]), 2)
+            cr_std = round(float(cr_stds[row]), 2)
+            approve_std = round(float(approve_stds[row]), 2)
+
+            # Вычисляем коэффициент вариации (CV = σ/μ * 100)
+            # Ограничиваем CV максимум 500% для избежания экстремальных значений при малых средних
+            MAX_CV = 500
+
+            # ИСПРАВЛЕНО: Для ROI используем альтернативный метод при mean близком к нулю
+            # CV не подходит для метрик с mean близким к 0 (ROI может быть отрицательным)
+            # Вместо этого используем относительное стандартное отклонение от порога прибыльности (0%)
+            # Альтернативная метрика для околонулевых средних (|ROI| <= 5):
+            # нормализуем std_dev относительно порога значимости (50% ROI).
+            # Это показывает волатильность относительно ожидаемого диапазона прибыльности
+            roi_cv = round(float(stats_kernel.coefficient_of_variation(
+                roi_std, avg_roi, min_abs_mean=5, fallback_scale=50, cap=MAX_CV
+            )), 2)
+
+            # При среднем <= 0.1 CV = 0
+            cr_cv = round(float(stats_kernel.coefficient_of_variation(
+                cr_std, avg_cr, min_abs_mean=0.1, cap=MAX_CV
+            )), 2)
+            approve_cv = round(float(stats_kernel.coefficient_of_variation(
+                approve_std, avg_approve_rate, min_abs_mean=0.1, cap=MAX_CV
+            )), 2)
+
+            # Общий индекс волатильности (средний CV)
+            # Для CPL кампаний не учитываем approve rate
+            campaign_info = campaigns_info.get(campaign_id, {'is_cpl_mode': False})
+            is_cpl = campaign_info.get('is_cpl_mode', False)
+
+            if is_cpl:
+                overall_volatility = round((roi_cv + cr_cv) / 2, 2)
+            else:
+                overall_volatility = round((roi_cv + cr_cv + approve_cv) / 3, 2) if approve_cv > 0 else round((roi_cv + cr_cv) / 2, 2)
+
+            # Классификация волатильности на основе настраиваемых порогов
+            # Низкая: < severity_low (стабильная предсказуемая кампания)
+            # Средняя: severity_low - severity_medium (умеренные колебания)
+            # Высокая: severity_medium - severity_high (значительные колебания)
+            # Экстремальная: > severity_high (непредсказуемая кампания)
+            if overall_volatility < severity_low_threshold:
+                volatility_class = "low"
+                severity = "low"
+            elif overall_volatility < severity_medium_threshold:
+                volatility_class = "medium"
+                severity = "medium"
+            elif overall_volatility < severity_high_threshold:
+                volatility_class = "high"
+                severity = "high"
+            else:
+                volatility_class = "extreme"
+                severity = "critical"
+
+            # Формируем данные
+            full_campaign_info = campaigns_info.get(campaign_id, {
+                'binom_id': None,
+                'name': f"Campaign {campaign_id}",
+                'group': "Без группы",
+                'is_cpl_mode': False
+            })
 
-            # Загружаем информацию о кампаниях
-            campaign_ids = list(campaigns_data.keys())
-            campaigns_info = {}
-            if campaign_ids:
-                campaigns_query = session.query(Campaign).filter(
-                    Campaign.internal_id.in_(campaign_ids)
-                )
-                for campaign in campaigns_query.all():
-                    campaigns_info[campaign.internal_id] = {
-                        'binom_id': campaign.binom_id,
-                        'name': campaign.current_name,
-                        'group': campaign.group_name or "Без группы",
-                        'is_cpl_mode': campaign.is_cpl_mode
-                    }
+            campaign_volatility = {
+                "campaign_id": campaign_id,
+                "binom_id": full_campaign_info['binom_id'],
+                "name": full_campaign_info['name'],
+                "group": full_campaign_info['group'],
+
+                # Агрегированные метрики
+                "total_cost": round(total_cost, 2),
+                "total_revenue": round(total_revenue, 2),
+                "avg_roi": round(avg_roi, 2),
+                "avg_cr": round(avg_cr, 2),
+                "avg_approve_rate": round(avg_approve_rate, 2),
+
+                # Волатильность ROI
+                "roi_std": roi_std,
+                "roi_cv": roi_cv,
+
+                # Волатильность CR
+                "cr_std": cr_std,
+                "cr_cv": cr_cv,
+
+                # Волатильность Approve Rate
+                "approve_std": approve_std,
+                "approve_cv": approve_cv,
+
+                # Общий индекс
+                "overall_volatility": overall_volatility,
+                "volatility_class": volatility_class,
+                "severity": severity,
+
+                # Дополнительные данные
+                "days_with_data": days_with_data,
+                "is_cpl_mode": is_cpl
+            }
 
-            # Анализируем волатильность для каждой кампании
-            low_volatility = []
-            medium_volatility = []
-            high_volatility = []
-            extreme_volatility = []
-
-            for campaign_id, daily_data in campaigns_data.items():
-                # Пропускаем если недостаточно данных
-                if len(daily_data) < min_days_with_data:
-                    continue
-
-                # Извлекаем метрики по дням
-                roi_values = [d['roi'] for d in daily_data]
-                cr_values = [d['cr'] for d in daily_data if d['clicks'] > 0]
-                approve_rate_values = [d['approve_rate'] for d in daily_data if d['leads'] > 0]
-
-                # Агрегированные показатели за весь период
-                total_cost = sum(d['cost'] for d in daily_data)
-                total_revenue = sum(d['revenue'] for d in daily_data)
-                total_clicks = sum(d['clicks'] for d in daily_data)
-                total_leads = sum(d['leads'] for d in daily_data)
-                total_a_leads = sum(d['a_leads'] for d in daily_data)
-
-                # Средние метрики за период
-                avg_roi = ((total_revenue - total_cost) / total_cost * 100) if total_cost > 0 else 0
-                avg_cr = (total_leads / total_clicks * 100) if total_clicks > 0 else 0
-                avg_approve_rate = (total_a_leads / total_leads * 100) if total_leads > 0 else 0
-
-                # Вычисляем стандартное отклонение (σ)
-                roi_std = round(statistics.stdev(roi_values), 2) if len(roi_values) > 1 else 0
-                cr_std = round(statistics.stdev(cr_values), 2) if len(cr_values) > 1 else 0
-                approve_std = round(statistics.stdev(approve_rate_values), 2) if len(approve_rate_values) > 1 else 0
-
-                # Вычисляем коэффициент вариации (CV = σ/μ * 100)
-                # Ограничиваем CV максимум 500% для избежания экстремальных значений при малых средних
-                MAX_CV = 500
-
-                # ИСПРАВЛЕНО: Для ROI используем альтернативный метод при mean близком к нулю
-                # CV не подходит для метрик с mean близким к 0 (ROI может быть отрицательным)
-                # Вместо этого используем относительное стандартное отклонение от порога прибыльности (0%)
-                if abs(avg_roi) > 5:  # Если средний ROI значительно отличается от 0
-                    roi_cv = min(round((roi_std / abs(avg_roi) * 100), 2), MAX_CV)
-                else:
-                    # Альтернативная метрика для околонулевых средних:
-                    # Нормализуем std_dev относительно порога значимости (50% ROI)
-                    # Это показывает волатильность относительно ожидаемого диапазона прибыльности
-                    roi_cv = min(round((roi_std / 50 * 100), 2), MAX_CV)
-
-                if avg_cr > 0.1:
-                    cr_cv = min(round((cr_std / avg_cr * 100), 2), MAX_CV)
-                else:
-                    cr_cv = 0
-
-                if avg_approve_rate > 0.1:
-                    approve_cv = min(round((approve_std / avg_approve_rate * 100), 2), MAX_CV)
-                else:
-                    approve_cv = 0
-
-                # Общий индекс волатильности (средний CV)
-                # Для CPL кампаний не учитываем approve rate
-                campaign_info = campaigns_info.get(campaign_id, {'is_cpl_mode': False})
-                is_cpl = campaign_info.get('is_cpl_mode', False)
-
-                if is_cpl:
-                    overall_volatility = round((roi_cv + cr_cv) / 2, 2)
-                else:
-                    overall_volatility = round((roi_cv + cr_cv + approve_cv) / 3, 2) if approve_cv > 0 else round((roi_cv + cr_cv) / 2, 2)
-
-                # Классификация волатильности на основе настраиваемых порогов
-                # Низкая: < severity_low (стабильная предсказуемая кампания)
-                # Средняя: severity_low - severity_medium (умеренные колебания)
-                # Высокая: severity_medium - severity_high (значительные колебания)
-                # Экстремальная: > severity_high (непредсказуемая кампания)
-                if overall_volatility < severity_low_threshold:
-                    volatility_class = "low"
-                    severity = "low"
-                elif overall_volatility < severity_medium_threshold:
-                    volatility_class = "medium"
-                    severity = "medium"
-                elif overall_volatility < severity_high_threshold:
-                    volatility_class = "high"
-                    severity = "high"
-                else:
-                    volatility_class = "extreme"
-                    severity = "critical"
-
-                # Формируем данные
-                full_campaign_info = campaigns_info.get(campaign_id, {
-                    'binom_id': None,
-                    'name': f"Campaign {campaign_id}",
-                    'group': "Без группы",
-                    'is_cpl_mode': False
-                })
+            # Распределяем по категориям
+            if volatility_class == "low":
+                low_volatility.append(campaign_volatility)
+            elif volatility_class == "medium":
+                medium_volatility.append(campaign_volatility)
+            elif volatility_class == "high":
+                high_volatility.append(campaign_volatility)
+            else:  # extreme
+                extreme_volatility.append(campaign_volatility)
+
+        # Сортировка
+        low_volatility.sort(key=lambda x: x['overall_volatility'])
+        medium_volatility.sort(key=lambda x: x['overall_volatility'])
+        high_volatility.sort(key=lambda x: x['overall_volatility'])
+        extreme_volatility.sort(key=lambda x: x['overall_volatility'], reverse=True)
+
+        # Объединяем для общей таблицы (сначала наиболее стабильные)
+        all_campaigns = low_volatility + medium_volatility + high_volatility + extreme_volatility
 
-                campaign_volatility = {
-                    "campaign_id": campaign_id,
-                    "binom_id": full_campaign_info['binom_id'],
-                    "name": full_campaign_info['name'],
-                    "group": full_campaign_info['group'],
-
-                    # Агрегированные метрики
-                    "total_cost": round(total_cost, 2),
-                    "total_revenue": round(total_revenue, 2),
-                    "avg_roi": round(avg_roi, 2),
-                    "avg_cr": round(avg_cr, 2),
-                    "avg_approve_rate": round(avg_approve_rate, 2),
-
-                    # Волатильность ROI
-                    "roi_std": roi_std,
-                    "roi_cv": roi_cv,
-
-                    # Волатильность CR
-                    "cr_std": cr_std,
-                    "cr_cv": cr_cv,
-
-                    # Волатильность Approve Rate
-                    "approve_std": approve_std,
-                    "approve_cv": approve_cv,
-
-                    # Общий индекс
-                    "overall_volatility": overall_volatility,
-                    "volatility_class": volatility_class,
-                    "severity": severity,
-
-                    # Дополнительные данные
-                    "days_with_data": len(daily_data),
-                    "is_cpl_mode": is_cpl
-                }
-
-                # Распределяем по категориям
-                if volatility_class == "low":
-                    low_volatility.append(campaign_volatility)
-                elif volatility_class == "medium":
-                    medium_volatility.append(campaign_volatility)
-                elif volatility_class == "high":
-                    high_volatility.append(campaign_volatility)
-                else:  # extreme
-                    extreme_volatility.append(campaign_volatility)
-
-            # Сортировка
-            low_volatility.sort(key=lambda x: x['overall_volatility'])
-            medium_volatility.sort(key=lambda x: x['overall_volatility'])
-            high_volatility.sort(key=lambda x: x['overall_volatility'])
-            extreme_volatility.sort(key=lambda x: x['overall_volatility'], reverse=True)
-
-            # Объединяем для общей таблицы (сначала наиболее стабильные)
-            all_campaigns = low_volatility + medium_volatility + high_volatility + extreme_volatility
-
-            return {
-                "campaigns": all_campaigns,
-                "low_volatility": low_volatility,
-                "medium_volatility": medium_volatility,
-                "high_volatility": high_volatility,
-                "extreme_volatility": extreme_volatility,
-                "summary": {
-                    "total_analyzed": len(all_campaigns),
-                    "total_low": len(low_volatility),
-                    "total_medium": len(medium_volatility),
-                    "total_high": len(high_volatility),
-                    "total_extreme": len(extreme_volatility),
-                    "avg_volatility": round(
-                        sum(c['overall_volatility'] for c in all_campaigns) / len(all_campaigns), 2
-                    ) if all_campaigns else 0,
-                    "most_stable_volatility": round(low_volatility[0]['overall_volatility'], 2) if low_volatility else 0,
-                    "most_volatile_volatility": round(extreme_volatility[0]['overall_volatility'], 2) if extreme_volatility else (round(high_volatility[0]['overall_volatility'], 2) if high_volatility else 0)
-                },
-                "period": {
-                    "date_from": date_from.isoformat(),
-                    "date_to": datetime.now().date().isoformat(),
-                    "days": days
-                },
-                "thresholds": {
-                    "min_spend": min_spend,
-                    "min_days_with_data": min_days_with_data,
-                    "severity_low": severity_low_threshold,
-                    "severity_medium": severity_medium_threshold,
-                    "severity_high": severity_high_threshold
-                }
+        return {
+            "campaigns": all_campaigns,
+            "low_volatility": low_volatility,
+            "medium_volatility": medium_volatility,
+            "high_volatility": high_volatility,
+            "extreme_volatility": extreme_volatility,
+            "summary": {
+                "total_analyzed": len(all_campaigns),
+                "total_low": len(low_volatility),
+                "total_medium": len(medium_volatility),
+                "total_high": len(high_volatility),
+                "total_extreme": len(extreme_volatility),
+                "avg_volatility": round(
+                    sum(c['overall_volatility'] for c in all_campaigns) / len(all_campaigns), 2
+                ) if all_campaigns else 0,
+                "most_stable_volatility": round(low_volatility[0]['overall_volatility'], 2) if low_volatility else 0,
+                "most_volatile_volatility": round(extreme_volatility[0]['overall_volatility'], 2) if extreme_volatility else (round(high_volatility[0]['overall_volatility'], 2) if high_volatility else 0)
+            },
+            "period": {
+                "date_from": date_from.isoformat(),
+                "date_to": datetime.now().date().isoformat(),
+                "days": days
+            },
+            "thresholds": {
+                "min_spend": min_spend,
+                "min_days_with_data": min_days_with_data,
+                "severity_low": severity_low_threshold,
+                "severity_medium": severity_medium_threshold,
+                "severity_high": severity_high_threshold
             }
+        }
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
@@ -3,49 +3,8 @@
 """
 import logging
 from .registry import get_registry
-from .critical_alerts.bleeding_detector import BleedingCampaignDetector
-from .critical_alerts.zero_approval_alert import ZeroApprovalAlert
-from .critical_alerts.spend_spike_monitor import SpendSpikeMonitor
-from .critical_alerts.waste_campaign_finder import WasteCampaignFinder
-from .critical_alerts.traffic_quality_crash import TrafficQualityCrash
-from .critical_alerts.squeezed_offer import SqueezedOfferDetector
-from .trend_analysis.microtrend_scanner import MicrotrendScanner
-from .trend_analysis.momentum_tracker import MomentumTracker
-from .trend_analysis.recovery_detector import RecoveryDetector
-from .trend_analysis.acceleration_monitor import AccelerationMonitor
-from .trend_analysis.trend_reversal_finder import TrendReversalFinder
-from .stability.volatility_calculator import VolatilityCalculator
-from .stability.consistency_scorer import ConsistencyScorer
-from .stability.reliability_index import ReliabilityIndex
-from .stability.performance_stability import PerformanceStability
-from .predictive.roi_forecast import ROIForecast
-from .predictive.profitability_horizon import ProfitabilityHorizon
-from .predictive.approval_rate_predictor import ApprovalRatePredictor
-from .predictive.campaign_lifecycle_stage import CampaignLifecycleStage
-from .predictive.revenue_projection import RevenueProjection
-from .problem_detection.sleepy_campaign_finder import SleepyCampaignFinder
-from .problem_detection.cpl_margin_monitor import CPLMarginMonitor
-from .problem_detection.conversion_drop_alert import ConversionDropAlert
-from .problem_detection.approval_delay_impact import ApprovalDelayImpact
-from .problem_detection.zombie_campaign_detector import ZombieCampaignDetector
-from .problem_detection.source_fatigue_detector import SourceFatigueDetector
-from .opportunities.hidden_gems_finder import HiddenGemsFinder
-from .opportunities.sudden_winner_detector import SuddenWinnerDetector
-from .opportunities.scaling_candidates import ScalingCandidates
-from .opportunities.breakout_alert import BreakoutAlert
-from .segmentation.smart_consolidator import SmartConsolidator
-from .segmentation.performance_segmenter import PerformanceSegmenter
-from .segmentation.source_group_matrix import SourceGroupMatrix
-from .portfolio.portfolio_health_index import PortfolioHealthIndex
-from .portfolio.total_performance_tracker import TotalPerformanceTracker
-from .portfolio.risk_assessment import RiskAssessment
-from .portfolio.diversification_score import DiversificationScore
-from .portfolio.budget_optimizer import BudgetOptimizer
-from .sources_offers.network_performance_monitor import NetworkPerformanceMonitor
-from .sources_offers.source_quality_scorer import SourceQualityScorer
-from .sources_offers.offer_profitability_ranker import OfferProfitabilityRanker
-
-from .sources_offers.offer_lifecycle_tracker import OfferLifecycleTracker
+from .manifest import load_manifest
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,72 +12,14 @@ def register_all_modules():
     """
     Регистрирует все доступные модули в реестре.
 
-    Вызывается при старте приложения.
+    Вызывается при старте приложения. Модули регистрируются по манифесту
+    (modules/manifest.json) без импорта: класс модуля импортируется при
+    первом get_module_instance(), список модулей отдается из манифеста.
     """
     registry = get_registry()
 
-    # Регистрируем модули критических алертов
-    registry.register(BleedingCampaignDetector)
-    registry.register(ZeroApprovalAlert)
-    registry.register(SpendSpikeMonitor)
-    registry.register(WasteCampaignFinder)
-    registry.register(TrafficQualityCrash)
-    registry.register(SqueezedOfferDetector)
-
-    # Регистрируем модули анализа трендов
-    registry.register(MicrotrendScanner)
-    registry.register(MomentumTracker)
-    registry.register(RecoveryDetector)
-    registry.register(AccelerationMonitor)
-    registry.register(TrendReversalFinder)
-
-    # Регистрируем модули оценки стабильности
-    registry.register(VolatilityCalculator)
-    registry.register(ConsistencyScorer)
-    registry.register(ReliabilityIndex)
-    registry.register(PerformanceStability)
-
-    # Регистрируем модули предиктивной аналитики
-    registry.register(ROIForecast)
-    registry.register(ProfitabilityHorizon)
-    registry.register(ApprovalRatePredictor)
-    registry.register(CampaignLifecycleStage)
-    registry.register(RevenueProjection)
-
-    # Регистрируем модули обнаружения проблем
-    registry.register(SleepyCampaignFinder)
-    registry.register(CPLMarginMonitor)
-    registry.register(ConversionDropAlert)
-    registry.register(ApprovalDelayImpact)
-    registry.register(ZombieCampaignDetector)
-    registry.register(SourceFatigueDetector)
-
-    # Регистрируем модули поиска возможностей
-    registry.register(HiddenGemsFinder)
-    registry.register(SuddenWinnerDetector)
-    registry.register(ScalingCandidates)
-    registry.register(BreakoutAlert)
-
-    # Регистрируем модули группировки и сегментации
-    registry.register(SmartConsolidator)
-    registry.register(PerformanceSegmenter)
-    registry.register(SourceGroupMatrix)
-
-    # Регистрируем модули портфеля
-    registry.register(PortfolioHealthIndex)
-    registry.register(TotalPerformanceTracker)
-    registry.register(RiskAssessment)
-    registry.register(DiversificationScore)
-    registry.register(BudgetOptimizer)
-
-    # Регистрируем модули источников и офферов
-    registry.register(NetworkPerformanceMonitor)
-    registry.register(SourceQualityScorer)
-    registry.register(OfferProfitabilityRanker)
-    registry.register(OfferLifecycleTracker)
-
-    # TODO: Добавить регистрацию остальных модулей по мере их создания
-    # ...
+    for entry in load_manifest():
+        registry.register_lazy(entry)
 
     logger.info(f"Registered {registry.get_count()} modules")
 
@@ -136,6 +37,7 @@ def check_and_run_initial_collection():
     """
     try:
         from services.settings_manager import get_settings_manager
+        from services.scheduler.progress_bus import get_progress_bus
         from storage.database import session_scope, BackgroundTask
         from datetime import datetime
         import threading
@@ -171,19 +73,14 @@ def check_and_run_initial_collection():
                 task_id = None
 
             # Запускаем сбор данных в отдельном потоке
+            bus = get_progress_bus()
+
             def run_initial_collection():
                 try:
                     from services.scheduler.collector import DataCollector
 
                     # Обновляем статус задачи
-                    if task_id:
-                        with session_scope() as session:
-                            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                            if task:
-                                task.status = 'running'
-                                task.started_at = datetime.utcnow()
-                                task.progress_message = 'Запуск сборщика данных...'
-                                session.commit()
+                    bus.update(task_id, status='running', message='Запуск сборщика данных...')
 
                     # Создаем collector с отключением пауз для быстрого сбора
                     collector = DataCollector(skip_pauses=True)
@@ -193,16 +90,13 @@ def check_and_run_initial_collection():
                     result = collector.initial_collect(days=60)
 
                     # Обновляем статус на успех
-                    if task_id:
-                        with session_scope() as session:
-                            task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                            if task:
-                                task.status = 'completed'
-                                task.progress = 100
-                                task.progress_message = 'Первичный сбор данных завершен'
-                                task.completed_at = datetime.utcnow()
-                                task.result = result
-                                session.commit()
+                    bus.update(
+                        task_id,
+                        status='completed',
+                        progress=100,
+                        message='Первичный сбор данных завершен',
+                        result=result
+                    )
 
                     logger.info("=" * 60)
                     logger.info("INITIAL DATA COLLECTION COMPLETED SUCCESSFULLY")
@@ -251,18 +145,7 @@ def check_and_run_initial_collection():
                     logger.error(f"Initial collection failed: {e}", exc_info=True)
 
                     # Обновляем статус на ошибку
-                    if task_id:
-                        try:
-                            with session_scope() as session:
-                                task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                                if task:
-                                    task.status = 'failed'
-                                    task.progress_message = 'Ошибка при первичном сборе данных'
-                                    task.error = str(e)
-                                    task.completed_at = datetime.utcnow()
-                                    session.commit()
-                        except Exception as db_error:
-                            logger.error(f"Failed to update task status: {db_error}")
+                    bus.update(task_id, status='failed', message='Ошибка при первичном сборе данных', error=str(e))
 
             # Запускаем в фоновом потоке
             thread = threading.Thread(target=run_initial_collection, daemon=True)
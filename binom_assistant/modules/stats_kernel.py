@@ -0,0 +1,401 @@
+"""
+Векторизованное статистическое ядро для модулей аналитики
+
+Все функции работают с 2-D матрицей NumPy формы (кампании, дни):
+одна строка - одна кампания, пропущенные дни обозначаются NaN и
+исключаются из расчетов (маскирование). Ось X регрессии - индекс столбца.
+
+Два способа подготовить матрицу:
+- pack_series: ряды разной длины выравниваются по левому краю и
+  дополняются NaN справа. Индекс столбца совпадает с порядковым номером
+  значения в ряду - так считали модули (x = range(len(series))).
+- align_by_date: ряды раскладываются по календарным дням, пропуски
+  внутри ряда становятся NaN и учитываются как разрывы по оси X.
+
+Граничные случаи повторяют прежние реализации в модулях:
+- меньше 2 точек: slope = 0, intercept = 0, r_squared = 0
+- нулевая дисперсия X: slope = 0, intercept = mean(y), r_squared = 0
+- нулевая дисперсия Y: r_squared = 0
+"""
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def pack_series(series: Sequence[Sequence[float]], width: Optional[int] = None) -> np.ndarray:
+    """
+    Упаковывает ряды разной длины в матрицу с NaN-дополнением справа.
+
+    Args:
+        series: Список рядов (по одному на кампанию)
+        width: Ширина матрицы (по умолчанию - длина самого длинного ряда)
+
+    Returns:
+        np.ndarray формы (len(series), width), dtype float64
+    """
+    if width is None:
+        width = max((len(s) for s in series), default=0)
+
+    matrix = np.full((len(series), width), np.nan, dtype=np.float64)
+    for row, values in enumerate(series):
+        length = min(len(values), width)
+        if length:
+            matrix[row, :length] = values[:length]
+
+    return matrix
+
+
+def align_by_date(
+    series: Sequence[Sequence[Tuple[date, float]]],
+    date_from: date,
+    days: int
+) -> np.ndarray:
+    """
+    Раскладывает ряды по календарным дням начиная с date_from.
+
+    Дни без данных остаются NaN. Точки вне окна [date_from, date_from + days)
+    отбрасываются.
+
+    Args:
+        series: Список рядов из пар (дата, значение)
+        date_from: Первый день окна (столбец 0)
+        days: Количество дней в окне
+
+    Returns:
+        np.ndarray формы (len(series), days)
+    """
+    matrix = np.full((len(series), days), np.nan, dtype=np.float64)
+    for row, points in enumerate(series):
+        for day, value in points:
+            col = (day - date_from).days
+            if 0 <= col < days:
+                matrix[row, col] = value
+
+    return matrix
+
+
+def valid_counts(matrix: np.ndarray) -> np.ndarray:
+    """Количество непропущенных значений в каждой строке"""
+    return np.count_nonzero(~np.isnan(matrix), axis=1)
+
+
+def nan_mean(matrix: np.ndarray) -> np.ndarray:
+    """
+    Среднее по строке без учета NaN.
+
+    Returns:
+        np.ndarray длины n_rows; NaN для строк без данных
+    """
+    mask = ~np.isnan(matrix)
+    counts = mask.sum(axis=1)
+    sums = np.where(mask, matrix, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def nan_std(matrix: np.ndarray, ddof: int = 0) -> np.ndarray:
+    """
+    Стандартное отклонение по строке без учета NaN.
+
+    Args:
+        matrix: Матрица (кампании, дни)
+        ddof: 0 - генеральная совокупность (np.std), 1 - выборка (statistics.stdev)
+
+    Returns:
+        np.ndarray длины n_rows; NaN для строк, где точек не больше ddof
+    """
+    mask = ~np.isnan(matrix)
+    counts = mask.sum(axis=1)
+    means = nan_mean(matrix)
+    deviations = np.where(mask, matrix - means[:, None], 0.0)
+    ss = (deviations * deviations).sum(axis=1)
+    denominator = counts - ddof
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, np.sqrt(ss / np.maximum(denominator, 1)), np.nan)
+
+
+def coefficient_of_variation(
+    std: np.ndarray,
+    mean: np.ndarray,
+    min_abs_mean: float = 0.0,
+    fallback_scale: Optional[float] = None,
+    cap: Optional[float] = None
+) -> np.ndarray:
+    """
+    Коэффициент вариации в процентах: CV = std / |mean| * 100.
+
+    Для метрик со средним около нуля (ROI) CV теряет смысл, поэтому при
+    |mean| <= min_abs_mean std нормализуется на fallback_scale
+    (например, 50% ROI), а если он не задан - CV = 0.
+
+    Args:
+        std: Стандартные отклонения
+        mean: Средние значения
+        min_abs_mean: Порог |mean|, ниже которого используется fallback
+        fallback_scale: Знаменатель для околонулевых средних
+        cap: Верхняя граница CV
+
+    Returns:
+        np.ndarray с CV в процентах
+    """
+    std = np.asarray(std, dtype=np.float64)
+    abs_mean = np.abs(np.asarray(mean, dtype=np.float64))
+    fallback = std / fallback_scale * 100 if fallback_scale else np.zeros_like(std)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = np.where(abs_mean > min_abs_mean, std / abs_mean * 100, fallback)
+
+    if cap is not None:
+        cv = np.minimum(cv, cap)
+
+    return cv
+
+
+def linear_regression(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Линейная регрессия y = slope * x + intercept для всех строк сразу.
+
+    X - индекс столбца, NaN значения исключаются из расчета.
+
+    Args:
+        matrix: Матрица (кампании, дни)
+
+    Returns:
+        Dict массивов длины n_rows: slope, intercept, r_squared,
+        n (точек в регрессии), ss_res (сумма квадратов остатков)
+    """
+    mask = ~np.isnan(matrix)
+    n = mask.sum(axis=1)
+    x = np.arange(matrix.shape[1], dtype=np.float64)[None, :]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        safe_n = np.maximum(n, 1)
+        x_mean = np.where(mask, x, 0.0).sum(axis=1) / safe_n
+        y_mean = np.where(mask, matrix, 0.0).sum(axis=1) / safe_n
+
+        dx = np.where(mask, x - x_mean[:, None], 0.0)
+        dy = np.where(mask, matrix - y_mean[:, None], 0.0)
+
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+
+        has_slope = (n >= 2) & (sxx != 0)
+        slope = np.where(has_slope, sxy / np.where(sxx != 0, sxx, 1.0), 0.0)
+        intercept = np.where(n >= 2, y_mean - slope * x_mean, 0.0)
+
+        residuals = np.where(mask, matrix - (slope[:, None] * x + intercept[:, None]), 0.0)
+        ss_res = (residuals * residuals).sum(axis=1)
+
+        r_squared = np.where(
+            has_slope & (syy != 0),
+            1 - ss_res / np.where(syy != 0, syy, 1.0),
+            0.0
+        )
+
+    return {
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "n": n,
+        "ss_res": ss_res
+    }
+
+
+def regression_at(regression: Dict[str, np.ndarray], row: int) -> Tuple[float, float, float]:
+    """
+    Параметры регрессии одной строки в виде Python float.
+
+    Returns:
+        (slope, intercept, r_squared) - как прежний _simple_linear_regression
+    """
+    return (
+        float(regression["slope"][row]),
+        float(regression["intercept"][row]),
+        float(regression["r_squared"][row])
+    )
+
+
+def residual_std(regression: Dict[str, np.ndarray], ddof: int = 2) -> np.ndarray:
+    """
+    Стандартное отклонение остатков регрессии.
+
+    Args:
+        regression: Результат linear_regression
+        ddof: Число оцененных параметров (2 для slope + intercept)
+
+    Returns:
+        np.ndarray длины n_rows; NaN где точек не больше ddof
+    """
+    denominator = regression["n"] - ddof
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(
+            denominator > 0,
+            np.sqrt(regression["ss_res"] / np.maximum(denominator, 1)),
+            np.nan
+        )
+
+
+def rolling_mean(matrix: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """
+    Скользящее среднее по последним window столбцам с учетом NaN.
+
+    Для первых столбцов окно неполное (как в acceleration_monitor):
+    среднее считается по доступным значениям, если их не меньше min_periods.
+    Позиции, где исходное значение NaN, остаются NaN.
+
+    Args:
+        matrix: Матрица (кампании, дни)
+        window: Размер окна
+        min_periods: Минимум значений в окне
+
+    Returns:
+        np.ndarray той же формы
+    """
+    mask = ~np.isnan(matrix)
+    values = np.where(mask, matrix, 0.0)
+
+    zeros = np.zeros((matrix.shape[0], 1))
+    value_sums = np.concatenate([zeros, np.cumsum(values, axis=1)], axis=1)
+    count_sums = np.concatenate([zeros, np.cumsum(mask, axis=1)], axis=1)
+
+    end = np.arange(1, matrix.shape[1] + 1)
+    start = np.maximum(end - window, 0)
+
+    window_sums = value_sums[:, end] - value_sums[:, start]
+    window_counts = count_sums[:, end] - count_sums[:, start]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = window_sums / window_counts
+
+    return np.where(mask & (window_counts >= min_periods), result, np.nan)
+
+
+def derivative(matrix: np.ndarray, order: int = 1) -> np.ndarray:
+    """
+    Конечная разность между соседними днями.
+
+    Разность с пропущенным днем дает NaN. Каждый порядок сокращает
+    ширину матрицы на 1.
+
+    Args:
+        matrix: Матрица (кампании, дни)
+        order: Порядок производной (1 - скорость, 2 - ускорение)
+
+    Returns:
+        np.ndarray формы (n_rows, width - order)
+    """
+    return np.diff(matrix, n=order, axis=1)
+
+
+def row_values(matrix: np.ndarray, row: int) -> List[float]:
+    """Непропущенные значения строки в виде списка Python float"""
+    values = matrix[row]
+    return values[~np.isnan(values)].tolist()
+
+
+def max_drawdown(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Максимальная просадка накопленной суммы (например, прибыли).
+
+    Пик стартует с нуля: просадка считается от максимума накопленной суммы,
+    но не ниже 0 (как в consistency_scorer). NaN дни пропускаются.
+
+    Returns:
+        Dict массивов длины n_rows: max_drawdown, peak (итоговый пик)
+    """
+    cumulative = np.cumsum(np.where(np.isnan(matrix), 0.0, matrix), axis=1)
+    peaks = np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=1)
+    drawdowns = peaks - cumulative
+
+    if matrix.shape[1] == 0:
+        empty = np.zeros(matrix.shape[0])
+        return {"max_drawdown": empty, "peak": empty.copy()}
+
+    return {
+        "max_drawdown": np.maximum(drawdowns.max(axis=1), 0.0),
+        "peak": peaks[:, -1]
+    }
+
+
+def longest_run(mask: np.ndarray) -> np.ndarray:
+    """
+    Длина самой длинной серии True подряд в каждой строке.
+
+    Args:
+        mask: Булева матрица (кампании, дни)
+
+    Returns:
+        np.ndarray длины n_rows, dtype int64
+    """
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int64)
+
+    columns = np.arange(mask.shape[1])
+    # Индекс последнего False слева от каждой позиции (-1, если его нет)
+    last_break = np.maximum.accumulate(np.where(mask, -1, columns), axis=1)
+    runs = np.where(mask, columns - last_break, 0)
+    return runs.max(axis=1).astype(np.int64)
+
+
+def tail_mean(matrix: np.ndarray, count: int) -> np.ndarray:
+    """
+    Среднее последних count значений строки (матрица из pack_series).
+
+    Args:
+        matrix: Матрица с NaN-дополнением справа
+        count: Сколько последних значений усреднять
+
+    Returns:
+        np.ndarray длины n_rows; NaN, если в строке меньше count значений
+    """
+    lengths = valid_counts(matrix)
+    result = np.full(matrix.shape[0], np.nan)
+    rows = np.flatnonzero(lengths >= count)
+    if count <= 0 or rows.size == 0:
+        return result
+
+    columns = lengths[rows, None] - count + np.arange(count)
+    result[rows] = matrix[rows[:, None], columns].mean(axis=1)
+    return result
+
+
+def round_decimal(values: np.ndarray, digits: int = 2) -> np.ndarray:
+    """
+    Округление как встроенный round(x, digits) и Numeric(10, 2) при чтении из БД.
+
+    np.round (умножение и rint) расходится с десятичным округлением только
+    у значений на границе половины последнего знака - они досчитываются через round().
+
+    Returns:
+        np.ndarray того же размера, dtype float64
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** digits
+    with np.errstate(invalid='ignore'):
+        scaled = values * scale
+        result = np.rint(scaled) / scale
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        boundary = np.flatnonzero(distance <= np.maximum(np.abs(scaled), 1.0) * 1e-12)
+
+    if boundary.size:
+        flat = result.reshape(-1)
+        source = values.reshape(-1)
+        flat[boundary] = [round(float(v), digits) for v in source[boundary]]
+    return result
+
+
+def row_sums(matrix: np.ndarray) -> np.ndarray:
+    """
+    Сумма строки слева направо (как sum() по ряду), NaN пропускаются.
+
+    В отличие от matrix.sum(axis=1) порядок сложения последовательный,
+    поэтому результат совпадает с суммой в цикле до последнего бита.
+
+    Returns:
+        np.ndarray длины n_rows; 0 для пустых строк
+    """
+    if matrix.shape[1] == 0:
+        return np.zeros(matrix.shape[0])
+    return np.cumsum(np.where(np.isnan(matrix), 0.0, matrix), axis=1)[:, -1]
@@ -0,0 +1,88 @@
+"""
+Тест решателя распределения бюджета (budget_optimizer)
+
+Проверяет:
+- распределение укладывается в бюджет и границы кампаний
+- при активном ограничении бюджета маржинальный ROI кампаний внутри границ равен теневой цене
+- эластичность восстанавливается по дневным точкам степенной модели
+
+Использование:
+    python binom_assistant/modules/test_allocation_solver.py
+    pytest binom_assistant/modules/test_allocation_solver.py
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules.portfolio.allocation_solver import fit_elasticity, solve_allocation, DEFAULT_ELASTICITY
+
+
+def _portfolio(n: int = 2000, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    spend = rng.uniform(5, 500, n)
+    revenue = spend * rng.uniform(0.3, 2.0, n)
+    elasticity = rng.uniform(0.3, 0.9, n)
+    return spend, revenue, elasticity, spend * 0.7, spend * 1.3
+
+
+def test_allocation_respects_budget_and_bounds():
+    """Сумма не превышает бюджет, каждая кампания в своих границах"""
+    spend, revenue, elasticity, lower, upper = _portfolio()
+
+    for budget in (spend.sum() * 0.8, spend.sum(), spend.sum() * 1.5):
+        allocation = solve_allocation(spend, revenue, elasticity, lower, upper, budget)["allocation"]
+        assert allocation.sum() <= budget * (1 + 1e-9)
+        assert np.all(allocation >= lower - 1e-9) and np.all(allocation <= upper + 1e-9)
+
+
+def test_binding_budget_equalizes_marginal_roi():
+    """Внутренние кампании получают бюджет до равенства маржинального ROI теневой цене"""
+    spend, revenue, elasticity, lower, upper = _portfolio()
+    budget = spend.sum() * 0.8
+
+    solution = solve_allocation(spend, revenue, elasticity, lower, upper, budget)
+    allocation = solution["allocation"]
+    interior = (allocation > lower * (1 + 1e-6)) & (allocation < upper * (1 - 1e-6))
+
+    assert solution["budget_bound"]
+    assert abs(allocation.sum() - budget) / budget < 1e-6
+    assert interior.any()
+    assert np.allclose(solution["marginal_roi"][interior], solution["shadow_price"], atol=1e-3)
+
+
+def test_infeasible_budget_returns_lower_bounds():
+    """Если минимальные расходы не помещаются в бюджет, возвращаются нижние границы"""
+    spend, revenue, elasticity, lower, upper = _portfolio(n=50)
+
+    solution = solve_allocation(spend, revenue, elasticity, lower, upper, lower.sum() * 0.5)
+
+    assert solution["feasible"] is False
+    assert np.array_equal(solution["allocation"], lower)
+
+
+def test_fit_elasticity_recovers_power_law():
+    """Наклон log-log регрессии совпадает с показателем модели; мало точек - значение по умолчанию"""
+    rng = np.random.default_rng(3)
+    days = 14
+    cost = rng.uniform(10, 200, 2 * days)
+    revenue = np.concatenate([3.0 * cost[:days] ** 0.6, 2.0 * cost[days:] ** 0.85])
+    index = np.repeat([0, 1], days)
+
+    elasticity = fit_elasticity(index, cost, revenue, 3)
+
+    assert np.allclose(elasticity[:2], [0.6, 0.85])
+    assert elasticity[2] == DEFAULT_ELASTICITY
+
+
+if __name__ == "__main__":
+    test_allocation_respects_budget_and_bounds()
+    test_binding_budget_equalizes_marginal_roi()
+    test_infeasible_budget_returns_lower_bounds()
+    test_fit_elasticity_recovers_power_law()
+    print("OK")
@@ -0,0 +1,90 @@
+"""
+Тест пакетного движка прогнозирования (модули predictive)
+
+Проверяет:
+- прогноз совпадает с np.polyfit по каждой кампании (ряды разной длины)
+- интервал предсказания расширяется с горизонтом и содержит прогноз
+- дни до безубыточности считаются только при растущем тренде и отрицательном ROI
+- упаковка с маской сжимает ряд без пропусков
+
+Использование:
+    python binom_assistant/modules/test_forecast_engine.py
+    pytest binom_assistant/modules/test_forecast_engine.py
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules.predictive import forecast_engine
+
+
+def _series(lengths, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    lengths = np.array(lengths, dtype=np.int64)
+    index = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return {
+        "campaign_ids": list(range(len(lengths))),
+        "index": index,
+        "position": np.arange(len(index)) - starts[index],
+        "lengths": lengths,
+        "values": rng.normal(0, 20, len(index)) + np.arange(len(index)) % 7
+    }
+
+
+def test_project_matches_polyfit():
+    """Линия тренда по каждой кампании совпадает с np.polyfit"""
+    series = _series([14, 9, 30, 3])
+    matrix = forecast_engine.pack(series, series["values"])
+    predicted = forecast_engine.project(forecast_engine.fit(matrix), 5)
+
+    for row, length in enumerate(series["lengths"]):
+        values = series["values"][series["index"] == row]
+        slope, intercept = np.polyfit(np.arange(length), values, 1)
+        assert np.allclose(predicted[row], slope * np.arange(length, length + 5) + intercept)
+
+
+def test_prediction_interval_widens_with_horizon():
+    """Полуширина интервала растет с горизонтом; при двух точках интервала нет"""
+    series = _series([20, 2])
+    regression = forecast_engine.fit(forecast_engine.pack(series, series["values"]))
+
+    half_width = forecast_engine.prediction_interval(regression, 7, 95)
+    points = forecast_engine.forecast_points(forecast_engine.project(regression, 7), 0, "value", half_width)
+
+    assert np.all(np.diff(half_width[0]) > 0)
+    assert np.all(np.isnan(half_width[1]))
+    assert all(p["lower_bound"] <= p["value"] <= p["upper_bound"] for p in points)
+
+
+def test_breakeven_days():
+    """-ROI / наклон только для убыточных кампаний с растущим трендом"""
+    days = forecast_engine.breakeven_days(np.array([-30.0, -30.0, 10.0, -5.0]), np.array([3.0, -1.0, 2.0, 0.0]))
+
+    assert days[0] == 10.0
+    assert np.all(np.isnan(days[1:]))
+
+
+def test_pack_with_mask_compresses_series():
+    """Отобранные маской дни упаковываются подряд с начала строки"""
+    series = _series([4, 3])
+    values = np.arange(7, dtype=np.float64)
+    matrix = forecast_engine.pack(series, values, mask=values % 2 == 0)
+
+    assert matrix.shape == (2, 2)
+    assert np.array_equal(matrix[0], [0.0, 2.0])
+    assert np.array_equal(matrix[1], [4.0, 6.0])
+
+
+if __name__ == "__main__":
+    test_project_matches_polyfit()
+    test_prediction_interval_widens_with_horizon()
+    test_breakeven_days()
+    test_pack_with_mask_compresses_series()
+    print("OK")
@@ -0,0 +1,81 @@
+"""
+Тест манифеста модулей и ленивого реестра
+
+Проверяет:
+- manifest.json совпадает с метаданными классов модулей
+- регистрация по манифесту не импортирует классы
+- класс импортируется при первом get_module_instance()
+
+Использование:
+    python binom_assistant/modules/test_module_manifest.py
+    pytest binom_assistant/modules/test_module_manifest.py
+"""
+import sys
+from pathlib import Path
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules.manifest import load_manifest, check_manifest
+from modules.registry import ModuleRegistry
+
+
+def _lazy_registry():
+    registry = ModuleRegistry()
+    for entry in load_manifest():
+        registry.register_lazy(entry)
+    return registry
+
+
+def test_manifest_matches_classes():
+    """Метаданные и расписания в манифесте актуальны"""
+    problems = check_manifest()
+    assert problems == [], f"Run 'python -m modules.manifest --update': {problems}"
+
+
+def test_manifest_ids_unique():
+    """ID модулей в манифесте уникальны"""
+    ids = [entry.metadata.id for entry in load_manifest()]
+    assert len(ids) == len(set(ids))
+
+
+def test_lazy_registration_does_not_import():
+    """Список модулей и категории отдаются из манифеста"""
+    entries = load_manifest()
+    registry = _lazy_registry()
+
+    assert registry.get_count() == len(entries)
+    assert [m.id for m in registry.list_modules()] == [e.metadata.id for e in entries]
+    assert "critical_alerts" in registry.list_categories()
+    assert not any(registry.is_loaded(e.metadata.id) for e in entries)
+
+    entry = entries[0]
+    assert registry.get_default_schedule(entry.metadata.id) == entry.default_schedule
+    assert not registry.is_loaded(entry.metadata.id)
+
+
+def test_instance_loaded_on_first_access():
+    """Класс импортируется при первом обращении"""
+    registry = _lazy_registry()
+
+    module = registry.get_module_instance("consistency_scorer")
+    assert module is not None and module.metadata.id == "consistency_scorer"
+    assert registry.is_loaded("consistency_scorer")
+    assert registry.get_module_instance("unknown_module") is None
+
+
+def test_category_lazy_exports():
+    """Классы категории доступны через пакет"""
+    from modules.critical_alerts import BleedingCampaignDetector
+
+    assert BleedingCampaignDetector().metadata.id == "bleeding_detector"
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith("test_") and callable(obj)]
+    for test in tests:
+        test()
+        print(f"[OK] {test.__name__}")
+    print(f"\nВсе тесты пройдены: {len(tests)}")
@@ -0,0 +1,120 @@
+"""
+Тест слоя агрегатов портфеля (portfolio/rollup)
+
+Проверяет:
+- итоги кампаний и групп совпадают с суммированием в цикле до последнего бита
+- порог min_cost / min_leads и дни без расхода исключают кампании из портфеля
+- окно [date_from, date_to] и итоги всех строк окна
+- HHI долей
+
+Использование:
+    python binom_assistant/modules/test_portfolio_rollup.py
+    pytest binom_assistant/modules/test_portfolio_rollup.py
+"""
+import sys
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules.portfolio.rollup import _compute_rollup, hhi
+from modules import stats_kernel
+
+DATE_FROM = date(2024, 3, 1)
+
+
+def _rows(n_campaigns: int = 300, days: int = 10, seed: int = 11):
+    """Строки как после _load_rows: по кампании и дате"""
+    rng = np.random.default_rng(seed)
+    campaign_id = np.repeat(np.arange(1, n_campaigns + 1), days)
+    day = np.tile(np.arange(days), n_campaigns) + (DATE_FROM - date(1970, 1, 1)).days
+    raw_cost = np.where(rng.random(len(day)) < 0.2, 0.0, rng.uniform(0, 50, len(day)))
+    raw_revenue = raw_cost * rng.uniform(0.2, 2.5, len(day))
+    leads = rng.integers(0, 12, len(day))
+    groups = ["A", "B", "C", None]
+    info = {
+        campaign: {
+            "binom_id": campaign + 1000,
+            "name": f"c{campaign}",
+            "group": groups[campaign % 4] or "Без группы",
+            "source": "ts" if campaign % 3 else "Неизвестен"
+        }
+        for campaign in range(1, n_campaigns + 1)
+    }
+    return {
+        "campaign_id": campaign_id,
+        "known": np.ones(len(day), dtype=bool),
+        "day": day,
+        "raw_cost": raw_cost,
+        "raw_revenue": raw_revenue,
+        "cost": stats_kernel.round_decimal(raw_cost, 2),
+        "revenue": stats_kernel.round_decimal(raw_revenue, 2),
+        "clicks": leads * 10,
+        "leads": leads,
+        "a_leads": leads // 2,
+        "h_leads": leads // 3,
+        "info": info
+    }
+
+
+def test_totals_match_loop():
+    """Итоги кампаний, групп и портфеля как при накоплении в цикле"""
+    rows = _rows()
+    rollup = _compute_rollup(rows, DATE_FROM + timedelta(days=2), None, 30.0, 20)
+
+    totals = defaultdict(lambda: {"cost": 0, "revenue": 0, "leads": 0, "days": 0})
+    for i in range(len(rows["day"])):
+        if rows["day"][i] < (DATE_FROM + timedelta(days=2) - date(1970, 1, 1)).days:
+            continue
+        data = totals[int(rows["campaign_id"][i])]
+        data["cost"] += float(rows["cost"][i])
+        data["revenue"] += float(rows["revenue"][i])
+        data["leads"] += int(rows["leads"][i])
+        data["days"] += 1 if rows["cost"][i] > 0 else 0
+
+    groups = defaultdict(float)
+    portfolio_cost = 0
+    for campaign_id, data in totals.items():
+        if data["days"] == 0 or data["cost"] < 30.0 or data["leads"] < 20:
+            continue
+        portfolio_cost += data["cost"]
+        groups[rows["info"][campaign_id]["group"]] += data["cost"]
+
+    campaigns = rollup["campaigns"]
+    assert campaigns["cost"].tolist() == [totals[c]["cost"] for c in campaigns["campaign_ids"]]
+    assert rollup["portfolio"]["cost"] == portfolio_cost
+    assert rollup["groups"]["names"] == list(groups.keys())
+    assert rollup["groups"]["cost"].tolist() == list(groups.values())
+    assert rollup["groups"]["cost_share"].tolist() == [v / portfolio_cost for v in groups.values()]
+
+
+def test_window_and_thresholds():
+    """date_to ограничивает окно, пороги не влияют на итоги всех строк"""
+    rows = _rows(n_campaigns=20, days=6)
+    date_to = DATE_FROM + timedelta(days=2)
+    strict = _compute_rollup(rows, DATE_FROM, date_to, 1e9, 0)
+    loose = _compute_rollup(rows, DATE_FROM, date_to, 0.0, 0)
+
+    assert strict["portfolio"]["campaigns"] == 0
+    assert strict["totals"] == loose["totals"]
+    assert len(loose["days"]["dates"]) == 3
+    assert loose["totals"]["leads"] == int(rows["leads"][rows["day"] <= rows["day"][0] + 2].sum())
+
+
+def test_hhi():
+    """Одна группа - 1, равные доли - 1/n"""
+    assert hhi(np.array([1.0])) == 1.0
+    assert abs(hhi(np.full(4, 0.25)) - 0.25) < 1e-12
+
+
+if __name__ == "__main__":
+    test_totals_match_loop()
+    test_window_and_thresholds()
+    test_hhi()
+    print("OK")
@@ -0,0 +1,95 @@
+"""
+Тест отложенных фаз результата модуля
+
+Проверяет:
+- фоновый запуск (materialize=False) не строит графики и рекомендации
+- фазы, построенные по сохраненному data, совпадают с построенными сразу
+- модуль с собственным format_results() всегда строит фазы сразу
+
+Использование:
+    python binom_assistant/modules/test_result_phases.py
+    pytest binom_assistant/modules/test_result_phases.py
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules.base_module import BaseModule, ModuleMetadata, ModuleConfig, ModuleResult
+
+
+class _PhasedModule(BaseModule):
+    """Модуль с подсчетом вызовов фаз"""
+
+    def __init__(self):
+        self.phase_calls = 0
+        super().__init__()
+
+    def get_metadata(self) -> ModuleMetadata:
+        return ModuleMetadata(id="phased_test", name="Phased", category="test", description="test")
+
+    def get_default_config(self) -> ModuleConfig:
+        return ModuleConfig()
+
+    def analyze(self, config: ModuleConfig) -> Dict[str, Any]:
+        return {"campaigns": [{"id": 1, "roi": -60.0}, {"id": 2, "roi": 15.5}]}
+
+    def prepare_chart_data(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.phase_calls += 1
+        return [{"type": "bar", "data": [c["roi"] for c in raw_data["campaigns"]]}]
+
+    def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
+        return [f"Кампания {c['id']} убыточна" for c in raw_data["campaigns"] if c["roi"] < 0]
+
+
+class _FormattedModule(_PhasedModule):
+    """Модуль, у которого data отличается от вывода analyze()"""
+
+    def format_results(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"total": len(raw_data["campaigns"])}
+
+
+def test_background_run_defers_phases():
+    """Без materialize графики и рекомендации не строятся"""
+    module = _PhasedModule()
+    result = module.run(materialize=False)
+
+    assert result.status == "success"
+    assert result.materialized is False
+    assert result.charts == [] and result.recommendations == []
+    assert module.phase_calls == 0
+
+
+def test_materialized_from_stored_data_matches_eager():
+    """Фазы из сохраненного data совпадают с построенными при запуске"""
+    module = _PhasedModule()
+    eager = module.run()
+    deferred = module.run(materialize=False)
+
+    stored = ModuleResult(**deferred.model_dump(mode='json'))
+    phases = module.materialize_phases(stored.data)
+
+    assert eager.materialized is True
+    assert phases["charts"] == eager.charts
+    assert phases["recommendations"] == eager.recommendations
+
+
+def test_custom_format_results_is_always_materialized():
+    """Если data не совпадает с analyze(), фазы строятся сразу"""
+    module = _FormattedModule()
+    result = module.run(materialize=False)
+
+    assert module.supports_deferred_phases is False
+    assert result.materialized is True
+    assert result.charts and result.recommendations
+
+
+if __name__ == "__main__":
+    test_background_run_defers_phases()
+    test_materialized_from_stored_data_matches_eager()
+    test_custom_format_results_is_always_materialized()
+    print("OK")
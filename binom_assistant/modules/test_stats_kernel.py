@@ -0,0 +1,326 @@
+"""
+Тест векторизованного статистического ядра (stats_kernel)
+
+Проверяет численную эквивалентность с прежними поштучными реализациями
+из модулей:
+- _simple_linear_regression (predictive/*) и _calculate_linear_regression (trend_reversal_finder)
+- _moving_average / _calculate_derivative (acceleration_monitor)
+- np.std / statistics.stdev и CV (stability/*)
+- расчет просадки (consistency_scorer)
+- округление round() и суммы в цикле (stability/metrics_engine)
+
+Использование:
+    python binom_assistant/modules/test_stats_kernel.py
+    pytest binom_assistant/modules/test_stats_kernel.py
+"""
+import math
+import random
+import statistics
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from modules import stats_kernel
+
+
+TOLERANCE = 1e-9
+
+
+def _legacy_regression(y_values):
+    """Прежняя реализация _simple_linear_regression"""
+    x_values = list(range(len(y_values)))
+    n = len(x_values)
+    if n < 2:
+        return 0, 0, 0
+
+    x_mean = np.mean(x_values)
+    y_mean = np.mean(y_values)
+
+    numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
+    denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
+
+    if denominator == 0:
+        return 0, y_mean, 0
+
+    slope = numerator / denominator
+    intercept = y_mean - slope * x_mean
+
+    ss_tot = sum((y_values[i] - y_mean) ** 2 for i in range(n))
+    ss_res = sum((y_values[i] - (slope * x_values[i] + intercept)) ** 2 for i in range(n))
+    r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
+
+    return slope, intercept, r_squared
+
+
+def _legacy_moving_average(data, window):
+    """Прежняя реализация acceleration_monitor._moving_average"""
+    if len(data) < window:
+        return data
+
+    smoothed = []
+    for i in range(len(data)):
+        if i < window - 1:
+            avg = sum(data[:i + 1]) / (i + 1)
+        else:
+            avg = sum(data[i - window + 1:i + 1]) / window
+        smoothed.append(avg)
+
+    return smoothed
+
+
+def _legacy_derivative(data):
+    """Прежняя реализация acceleration_monitor._calculate_derivative"""
+    if len(data) < 2:
+        return []
+    return [data[i] - data[i - 1] for i in range(1, len(data))]
+
+
+def _legacy_drawdown(profits):
+    """Прежний расчет просадки из consistency_scorer"""
+    cumulative_profit = 0
+    peak_profit = 0
+    max_drawdown = 0
+    for profit in profits:
+        cumulative_profit += profit
+        if cumulative_profit > peak_profit:
+            peak_profit = cumulative_profit
+        drawdown = peak_profit - cumulative_profit
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+    return max_drawdown, peak_profit
+
+
+def _random_series(count=300, seed=7):
+    """Ряды разной длины, включая граничные случаи"""
+    rng = random.Random(seed)
+    series = [[], [42.0], [5.0, 5.0, 5.0], [1.0, 3.0]]
+    for _ in range(count):
+        length = rng.randint(0, 40)
+        base = rng.uniform(-100, 300)
+        trend = rng.uniform(-10, 10)
+        series.append([base + trend * i + rng.gauss(0, 30) for i in range(length)])
+    return series
+
+
+def _assert_close(actual, expected, tolerance=TOLERANCE):
+    scale = max(1.0, abs(expected))
+    assert abs(actual - expected) <= tolerance * scale, f"{actual} != {expected}"
+
+
+def test_linear_regression_matches_legacy():
+    """Батчевая регрессия совпадает с поштучной"""
+    series = _random_series()
+    regression = stats_kernel.linear_regression(stats_kernel.pack_series(series))
+
+    for row, values in enumerate(series):
+        expected = _legacy_regression(values)
+        actual = stats_kernel.regression_at(regression, row)
+        for a, e in zip(actual, expected):
+            _assert_close(a, float(e))
+
+
+def test_regression_edge_cases():
+    """Меньше 2 точек, константный ряд"""
+    regression = stats_kernel.linear_regression(stats_kernel.pack_series([[], [7.0], [3.0, 3.0, 3.0]]))
+
+    assert stats_kernel.regression_at(regression, 0) == (0.0, 0.0, 0.0)
+    assert stats_kernel.regression_at(regression, 1) == (0.0, 0.0, 0.0)
+    slope, intercept, r_squared = stats_kernel.regression_at(regression, 2)
+    assert slope == 0.0 and intercept == 3.0 and r_squared == 0.0
+
+
+def test_regression_calendar_gaps():
+    """Пропущенный день (NaN) исключается, но X остается календарным"""
+    matrix = np.array([[1.0, np.nan, 5.0, 7.0]])
+    regression = stats_kernel.linear_regression(matrix)
+    slope, intercept, r_squared = stats_kernel.regression_at(regression, 0)
+
+    assert regression["n"][0] == 3
+    _assert_close(slope, 2.0)
+    _assert_close(intercept, 1.0)
+    _assert_close(r_squared, 1.0)
+
+
+def test_align_by_date():
+    """Раскладка по календарным дням"""
+    start = date(2025, 1, 1)
+    matrix = stats_kernel.align_by_date(
+        [[(start, 1.0), (start + timedelta(days=2), 3.0), (start + timedelta(days=9), 9.0)]],
+        start,
+        4
+    )
+    assert matrix[0, 0] == 1.0 and matrix[0, 2] == 3.0
+    assert np.isnan(matrix[0, 1]) and np.isnan(matrix[0, 3])
+
+
+def test_std_and_cv_match_legacy():
+    """σ (генеральная и выборочная) и CV совпадают с прежними расчетами"""
+    series = _random_series()
+    matrix = stats_kernel.pack_series(series)
+    population = stats_kernel.nan_std(matrix)
+    sample = stats_kernel.nan_std(matrix, ddof=1)
+    means = stats_kernel.nan_mean(matrix)
+
+    for row, values in enumerate(series):
+        if values:
+            _assert_close(float(population[row]), float(np.std(values)))
+            _assert_close(float(means[row]), statistics.mean(values))
+        else:
+            assert np.isnan(population[row])
+
+        if len(values) > 1:
+            std = statistics.stdev(values)
+            mean = statistics.mean(values)
+            _assert_close(float(sample[row]), std)
+
+            expected_cv = (std / abs(mean)) * 100 if abs(mean) > 5 else (std / 50) * 100
+            actual_cv = stats_kernel.coefficient_of_variation(
+                sample[row], means[row], min_abs_mean=5, fallback_scale=50
+            )
+            _assert_close(float(actual_cv), expected_cv)
+        else:
+            assert np.isnan(sample[row])
+
+
+def test_cv_cap_and_zero_fallback():
+    """CV ограничивается сверху, без fallback_scale околонулевое среднее дает 0"""
+    cv = stats_kernel.coefficient_of_variation(
+        np.array([10.0, 10.0, 10.0]), np.array([0.05, 1.0, 0.0]), min_abs_mean=0.1, cap=500
+    )
+    assert cv.tolist() == [0.0, 500.0, 0.0]
+
+
+def test_std_nan_mask():
+    """NaN значения не участвуют в σ (дни без кликов/лидов)"""
+    values = [10.0, 20.0, 40.0]
+    matrix = np.array([[10.0, np.nan, 20.0, np.nan, 40.0]])
+    _assert_close(float(stats_kernel.nan_std(matrix, ddof=1)[0]), statistics.stdev(values))
+
+
+def test_moving_average_and_derivative_match_legacy():
+    """Сглаживание и производные совпадают с acceleration_monitor"""
+    series = [s for s in _random_series() if len(s) >= 3]
+    matrix = stats_kernel.pack_series(series)
+
+    for window in range(2, 6):
+        smoothed = stats_kernel.rolling_mean(matrix, window)
+        too_short = stats_kernel.valid_counts(matrix) < window
+        smoothed = np.where(too_short[:, None], matrix, smoothed)
+        velocity = stats_kernel.derivative(smoothed)
+        acceleration = stats_kernel.derivative(velocity)
+
+        for row, values in enumerate(series):
+            expected_smoothed = _legacy_moving_average(values, window)
+            expected_velocity = _legacy_derivative(expected_smoothed)
+            expected_acceleration = _legacy_derivative(expected_velocity)
+
+            for actual, expected in (
+                (stats_kernel.row_values(smoothed, row), expected_smoothed),
+                (stats_kernel.row_values(velocity, row), expected_velocity),
+                (stats_kernel.row_values(acceleration, row), expected_acceleration),
+            ):
+                assert len(actual) == len(expected)
+                for a, e in zip(actual, expected):
+                    _assert_close(a, e, 1e-7)
+
+
+def test_residual_std():
+    """σ остатков на точной прямой равна 0, на двух точках не определена"""
+    regression = stats_kernel.linear_regression(np.array([[1.0, 3.0, 5.0, 7.0], [1.0, 2.0, np.nan, np.nan]]))
+    residual = stats_kernel.residual_std(regression)
+    _assert_close(float(residual[0]), 0.0)
+    assert np.isnan(residual[1])
+
+
+def test_max_drawdown_matches_legacy():
+    """Просадка накопленной прибыли совпадает с consistency_scorer"""
+    series = _random_series(seed=11)
+    result = stats_kernel.max_drawdown(stats_kernel.pack_series(series))
+
+    for row, values in enumerate(series):
+        expected_drawdown, expected_peak = _legacy_drawdown(values)
+        _assert_close(float(result["max_drawdown"][row]), expected_drawdown, 1e-7)
+        _assert_close(float(result["peak"][row]), expected_peak, 1e-7)
+
+
+def test_angle_from_slope():
+    """Угол trend_reversal_finder считается из slope ядра"""
+    regression = stats_kernel.linear_regression(stats_kernel.pack_series([[0.0, 1.0, 2.0]]))
+    slope, _, _ = stats_kernel.regression_at(regression, 0)
+    _assert_close(math.degrees(math.atan(slope)), 45.0)
+
+
+def _legacy_longest_run(flags):
+    """Прежний подсчет серии (waste_campaign_finder._check_consecutive_negative_days)"""
+    current_streak = 0
+    max_streak = 0
+    for flag in flags:
+        if flag:
+            current_streak += 1
+            max_streak = max(max_streak, current_streak)
+        else:
+            current_streak = 0
+    return max_streak
+
+
+def test_longest_run_matches_legacy():
+    """Самая длинная серия True совпадает с поштучным подсчетом"""
+    rng = random.Random(7)
+    rows = [[rng.random() < 0.6 for _ in range(rng.randint(0, 20))] for _ in range(200)]
+    width = max(len(r) for r in rows)
+    mask = np.zeros((len(rows), width), dtype=bool)
+    for i, flags in enumerate(rows):
+        mask[i, :len(flags)] = flags
+
+    result = stats_kernel.longest_run(mask)
+    assert result.tolist() == [_legacy_longest_run(flags) for flags in rows]
+    assert stats_kernel.longest_run(np.zeros((3, 0), dtype=bool)).tolist() == [0, 0, 0]
+
+
+def test_tail_mean():
+    """Среднее последних значений ряда разной длины"""
+    matrix = stats_kernel.pack_series([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0], [7.0, 8.0, 9.0]])
+    result = stats_kernel.tail_mean(matrix, 3)
+
+    _assert_close(float(result[0]), 3.0)
+    assert math.isnan(result[1])
+    _assert_close(float(result[2]), 8.0)
+
+
+def test_round_decimal_matches_builtin_round():
+    """Векторное округление совпадает с round() бит в бит, включая границу половины"""
+    rng = random.Random(11)
+    values = [rng.uniform(-1000, 1000) for _ in range(20000)]
+    values += [rng.randint(-100000, 100000) / 1000 for _ in range(20000)]
+    values += [0.125, 2.675, 1.005, -0.125, -2.675, 0.0]
+
+    result = stats_kernel.round_decimal(np.array(values), 2)
+
+    assert result.tolist() == [round(v, 2) for v in values]
+    assert math.isnan(stats_kernel.round_decimal(np.array([np.nan]))[0])
+
+
+def test_row_sums_sequential_order():
+    """Сумма строки совпадает с sum() по ряду в исходном порядке"""
+    series = [[0.1] * 10 + [1e16, -1e16], [0.7, 0.2, 0.1], []]
+    matrix = stats_kernel.pack_series(series)
+
+    result = stats_kernel.row_sums(matrix)
+
+    assert result.tolist() == [sum(values) for values in series]
+    assert stats_kernel.row_sums(np.zeros((2, 0))).tolist() == [0.0, 0.0]
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith("test_") and callable(obj)]
+    for test in tests:
+        test()
+        print(f"[OK] {test.__name__}")
+    print(f"\nВсе тесты пройдены: {len(tests)}")
@@ -5,10 +5,12 @@ from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from contextlib import contextmanager
+import numpy as np
 
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .. import stats_kernel
 
 
 @contextmanager
@@ -271,7 +273,19 @@ class AccelerationMonitor(BaseModule):
             stable_campaigns = []  # Стабильные
             decelerating = []  # Замедляющиеся
 
-            for campaign_id, daily_data in campaigns_data.items():
+            # Сглаживание и производные сразу по всем кампаниям (строка матрицы = кампания)
+            roi_matrix = stats_kernel.pack_series([
+                [
+                    (d['revenue'] - d['cost']) / d['cost'] * 100 if d['cost'] > 0 else 0
+                    for d in daily_data
+                ]
+                for daily_data in campaigns_data.values()
+            ])
+            smoothed_matrix = self._moving_average(roi_matrix, smoothing_window)
+            velocity_matrix = self._calculate_derivative(smoothed_matrix)
+            acceleration_matrix = self._calculate_derivative(velocity_matrix)
+
+            for row, (campaign_id, daily_data) in enumerate(campaigns_data.items()):
                 # Фильтрация: минимум данных
                 if len(daily_data) < 3:
                     continue
@@ -289,23 +303,10 @@ class AccelerationMonitor(BaseModule):
                 if total_clicks < min_clicks:
                     continue
 
-                # Вычисляем дневной ROI для каждого дня
-                daily_roi = []
-                for day in daily_data:
-                    if day['cost'] > 0:
-                        roi = (day['revenue'] - day['cost']) / day['cost'] * 100
-                        daily_roi.append(roi)
-                    else:
-                        daily_roi.append(0)
-
-                # Применяем сглаживание (moving average)
-                smoothed_roi = self._moving_average(daily_roi, smoothing_window)
-
-                # Вычисляем первую производную (скорость изменения)
-                velocity = self._calculate_derivative(smoothed_roi)
-
-                # Вычисляем вторую производную (ускорение)
-                acceleration = self._calculate_derivative(velocity)
+                # Сглаженный ROI (moving average), скорость и ускорение из общих матриц
+                smoothed_roi = stats_kernel.row_values(smoothed_matrix, row)
+                velocity = stats_kernel.row_values(velocity_matrix, row)
+                acceleration = stats_kernel.row_values(acceleration_matrix, row)
 
                 # Если недостаточно данных для производных
                 if not acceleration:
@@ -420,51 +421,35 @@ class AccelerationMonitor(BaseModule):
                 }
             }
 
-    def _moving_average(self, data: List[float], window: int) -> List[float]:
+    def _moving_average(self, data: np.ndarray, window: int) -> np.ndarray:
         """
         Вычисляет скользящее среднее для сглаживания шума.
 
+        Для первых значений используется меньшее окно. Ряды короче окна
+        остаются без сглаживания.
+
         Args:
-            data: Исходные данные
+            data: Матрица рядов (кампании, дни), NaN - нет данных
             window: Размер окна
 
         Returns:
-            List[float]: Сглаженные данные
+            np.ndarray: Сглаженные данные той же формы
         """
-        if len(data) < window:
-            return data
-
-        smoothed = []
-        for i in range(len(data)):
-            if i < window - 1:
-                # Для первых значений используем меньшее окно
-                avg = sum(data[:i + 1]) / (i + 1)
-            else:
-                # Полное окно
-                avg = sum(data[i - window + 1:i + 1]) / window
-            smoothed.append(avg)
-
-        return smoothed
-
-    def _calculate_derivative(self, data: List[float]) -> List[float]:
+        smoothed = stats_kernel.rolling_mean(data, window)
+        too_short = stats_kernel.valid_counts(data) < window
+        return np.where(too_short[:, None], data, smoothed)
+
+    def _calculate_derivative(self, data: np.ndarray) -> np.ndarray:
         """
         Вычисляет производную (разность между соседними точками).
 
         Args:
-            data: Исходные данные
+            data: Матрица рядов (кампании, дни)
 
         Returns:
-            List[float]: Производная
+            np.ndarray: Производная (на один столбец короче)
         """
-        if len(data) < 2:
-            return []
-
-        derivative = []
-        for i in range(1, len(data)):
-            diff = data[i] - data[i - 1]
-            derivative.append(diff)
-
-        return derivative
+        return stats_kernel.derivative(data)
 
     def generate_recommendations(self, raw_data: Dict[str, Any]) -> List[str]:
         """
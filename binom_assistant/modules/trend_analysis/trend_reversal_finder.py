@@ -10,6 +10,7 @@ import math
 from storage.database.base import get_session
 from storage.database.models import Campaign, CampaignStatsDaily
 from ..base_module import BaseModule, ModuleMetadata, ModuleConfig
+from .. import stats_kernel
 
 
 @contextmanager
@@ -234,33 +235,8 @@ class TrendReversalFinder(BaseModule):
         Returns:
             Dict с параметрами: slope (наклон), intercept, r_squared
         """
-        n = len(data_points)
-        if n < 2:
-            return {"slope": 0, "intercept": 0, "r_squared": 0, "angle_degrees": 0}
-
-        # x = [0, 1, 2, ..., n-1]
-        x_values = list(range(n))
-        y_values = data_points
-
-        # Средние значения
-        x_mean = sum(x_values) / n
-        y_mean = sum(y_values) / n
-
-        # Вычисление наклона и пересечения
-        numerator = sum((x_values[i] - x_mean) * (y_values[i] - y_mean) for i in range(n))
-        denominator = sum((x_values[i] - x_mean) ** 2 for i in range(n))
-
-        if denominator == 0:
-            return {"slope": 0, "intercept": y_mean, "r_squared": 0, "angle_degrees": 0}
-
-        slope = numerator / denominator
-        intercept = y_mean - slope * x_mean
-
-        # R-squared
-        ss_res = sum((y_values[i] - (slope * x_values[i] + intercept)) ** 2 for i in range(n))
-        ss_tot = sum((y_values[i] - y_mean) ** 2 for i in range(n))
-
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
+        regression = stats_kernel.linear_regression(stats_kernel.pack_series([data_points]))
+        slope, intercept, r_squared = stats_kernel.regression_at(regression, 0)
 
         # Угол наклона в градусах
         angle_radians = math.atan(slope)
@@ -5,6 +5,7 @@ import httpx
 import json
 import logging
 from typing import List, Dict, Any, Optional
+from fastapi.concurrency import run_in_threadpool
 from config.config import get_config
 from .tools_generator import ToolsGenerator
 from .prompt_manager import get_prompt_manager
@@ -236,8 +237,8 @@ class AIAgentService:
                 try:
                     # Проверяем: это DB tool или модуль?
                     if self._is_db_tool(function_name):
-                        # Вызываем DB tool
-                        result = self._call_db_tool(function_name, function_args)
+                        # Вызываем DB tool (синхронные запросы - в пуле потоков, не в event loop)
+                        result = await run_in_threadpool(self._call_db_tool, function_name, function_args)
                     else:
                         # Извлекаем module_id из имени функции (формат: run_{module_id})
                         module_id = function_name.replace('run_', '')
@@ -20,6 +20,7 @@ from storage.database.models import (
     AffiliateNetwork, NetworkStatsDaily,
     Offer, OfferStatsDaily
 )
+from storage.database.campaign_search import campaign_search_filter
 
 logger = logging.getLogger(__name__)
 
@@ -104,7 +105,7 @@ def get_campaigns_list(
         is_active: Фильтр по активности (True/False/None=все)
         is_cpl_mode: Фильтр по типу оплаты (True=CPL, False=CPA, None=все)
         group_name: Фильтр по группе (точное совпадение)
-        search_name: Поиск по имени кампании (частичное совпадение, LIKE)
+        search_name: Поиск по имени кампании (частичное совпадение, полнотекстовый индекс)
 
     Returns:
         Dict с полями:
@@ -131,7 +132,11 @@ def get_campaigns_list(
             query = query.filter(Campaign.group_name == group_name)
 
         if search_name:
-            query = query.filter(Campaign.current_name.like(f'%{search_name}%'))
+            # Полнотекстовый индекс; для запросов короче 3 символов - LIKE
+            search_filter = campaign_search_filter(session, search_name)
+            if search_filter is None:
+                search_filter = Campaign.current_name.like(f'%{search_name}%')
+            query = query.filter(search_filter)
 
         # Сортировка: сначала активные, потом по дате последнего обновления
         query = query.order_by(
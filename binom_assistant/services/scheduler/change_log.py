@@ -0,0 +1,149 @@
+"""
+Журнал изменений данных кампаний (dirty set)
+
+Сборщик записывает сюда каждую созданную или изменившуюся строку
+campaign_stats_daily (и изменение атрибутов кампании). ID записи монотонно
+растет и служит версией данных: потребители (инкрементальный пересчет модулей)
+запоминают последнюю учтенную версию и запрашивают только изменения после нее.
+
+Использование:
+    from services.scheduler.change_log import record_campaign_changes, get_changes_since
+
+    record_campaign_changes(session, [(campaign_id, stat_date), ...])
+    changed_ids, version = get_changes_since(last_version, date_from=window_start)
+"""
+import logging
+from datetime import date, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+from utils import get_now
+from storage.database import session_scope, CampaignDataChange
+
+logger = logging.getLogger(__name__)
+
+
+def record_campaign_changes(session, changes: Iterable[Tuple[int, date]]) -> int:
+    """
+    Добавляет изменения в журнал в рамках текущей сессии сборщика.
+
+    Запись фиксируется тем же commit, что и сами данные, поэтому потребители
+    никогда не увидят версию раньше данных.
+
+    Args:
+        session: Сессия SQLAlchemy сборщика
+        changes: Пары (internal_id кампании, дата статистики)
+
+    Returns:
+        Количество записанных изменений (дубликаты схлопываются)
+    """
+    unique_changes = set(changes)
+    if not unique_changes:
+        return 0
+
+    now = get_now()
+    session.bulk_insert_mappings(CampaignDataChange, [
+        {'campaign_id': campaign_id, 'date': stat_date, 'changed_at': now}
+        for campaign_id, stat_date in sorted(unique_changes)
+    ])
+
+    logger.debug(f"Recorded {len(unique_changes)} campaign data changes")
+    return len(unique_changes)
+
+
+def get_data_version(session=None) -> int:
+    """
+    Текущая версия данных (ID последнего изменения, 0 если журнал пуст).
+
+    Args:
+        session: Сессия SQLAlchemy (опционально)
+    """
+    if session is not None:
+        return session.query(func.max(CampaignDataChange.id)).scalar() or 0
+
+    with session_scope() as own_session:
+        return own_session.query(func.max(CampaignDataChange.id)).scalar() or 0
+
+
+def get_changes_since(
+    version: int,
+    date_from: Optional[date] = None
+) -> Tuple[Optional[Set[int]], int]:
+    """
+    Возвращает кампании, данные которых изменились после версии version.
+
+    Args:
+        version: Последняя учтенная версия данных
+        date_from: Учитывать только изменения дней >= date_from (окно модуля)
+
+    Returns:
+        (set internal_id или None, текущая версия).
+        None означает, что журнал после version уже очищен и
+        точный dirty set восстановить нельзя - нужен полный пересчет.
+    """
+    with session_scope() as session:
+        current_version = get_data_version(session)
+        if current_version <= version:
+            return set(), current_version
+
+        oldest = session.query(func.min(CampaignDataChange.id)).scalar()
+        if oldest is not None and oldest > version + 1:
+            logger.info(f"Change log pruned after version {version} (oldest: {oldest}), full recompute required")
+            return None, current_version
+
+        query = session.query(CampaignDataChange.campaign_id).filter(
+            CampaignDataChange.id > version,
+            CampaignDataChange.id <= current_version
+        )
+        if date_from is not None:
+            query = query.filter(CampaignDataChange.date >= date_from)
+
+        changed = {row.campaign_id for row in query.distinct()}
+
+    return changed, current_version
+
+
+def get_changed_dates(version: int) -> Set[date]:
+    """
+    Дни статистики, изменившиеся после версии version.
+
+    Используется для выбора недель, которые нужно переагрегировать.
+
+    Args:
+        version: Последняя учтенная версия данных
+
+    Returns:
+        Множество дат (пустое, если изменений не было)
+    """
+    with session_scope() as session:
+        rows = session.query(CampaignDataChange.date).filter(
+            CampaignDataChange.id > version
+        ).distinct().all()
+
+    return {row.date for row in rows}
+
+
+def cleanup_change_log(days_to_keep: int = 14) -> int:
+    """
+    Удаляет старые записи журнала.
+
+    Потребители с версией старше оставшихся записей получат None
+    из get_changes_since и выполнят полный пересчет.
+
+    Args:
+        days_to_keep: Сколько дней хранить журнал
+
+    Returns:
+        Количество удаленных записей
+    """
+    cutoff = get_now() - timedelta(days=days_to_keep)
+
+    with session_scope() as session:
+        deleted = session.query(CampaignDataChange).filter(
+            CampaignDataChange.changed_at < cutoff
+        ).delete(synchronize_session=False)
+        session.commit()
+
+    logger.info(f"Deleted {deleted} campaign data changes older than {cutoff}")
+    return deleted
@@ -52,9 +52,10 @@ from storage.database import (
     Offer,
     OfferStatsDaily,
     AffiliateNetwork,
-    NetworkStatsDaily,
-    BackgroundTask
+    NetworkStatsDaily
 )
+from .change_log import record_campaign_changes
+from .progress_bus import get_progress_bus
 
 
 logger = logging.getLogger(__name__)
@@ -111,28 +112,14 @@ class DataCollector:
 
     def _update_task_progress(self, task_id: Optional[int], progress: int, message: str):
         """
-        Обновляет прогресс задачи в БД
+        Публикует прогресс задачи в шину прогресса (в БД - периодически)
 
         Args:
             task_id: ID задачи (None если задача не отслеживается)
             progress: прогресс 0-100
             message: текущее действие
         """
-        if task_id is None:
-            return
-
-        try:
-            with session_scope() as session:
-                task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                if task:
-                    task.progress = progress
-                    task.progress_message = message
-                    if progress > 0 and task.status == 'pending':
-                        task.status = 'running'
-                        task.started_at = get_now()
-                    session.commit()
-        except Exception as e:
-            logger.error(f"Failed to update task progress: {e}")
+        get_progress_bus().update(task_id, progress=progress, message=message)
 
     def _generate_date_range(self, days: int) -> List[date]:
         """
@@ -330,7 +317,7 @@ class DataCollector:
             logger.info(f"Will track {len(campaign_ids)} campaigns (creating zeros for days without traffic)")
 
             daily_stats_summary = {
-                'campaigns': {'created': 0, 'updated': 0, 'skipped': 0, 'zero_records': 0},
+                'campaigns': {'created': 0, 'updated': 0, 'skipped': 0, 'zero_records': 0, 'changed': 0},
                 'traffic_sources': {'created': 0, 'updated': 0, 'skipped': 0},
                 'offers': {'created': 0, 'updated': 0, 'skipped': 0},
                 'networks': {'created': 0, 'updated': 0, 'skipped': 0}
@@ -367,6 +354,12 @@ class DataCollector:
                 for k, v in net_stats.items():
                     daily_stats_summary['networks'][k] += v
 
+                self._update_task_progress(
+                    task_id,
+                    65 + 30 * day_num // len(dates),
+                    f"Блок 5: день {day_num}/{len(dates)} ({target_date})"
+                )
+
             # Добавляем статистику дневных данных в общую
             stats['daily_stats'] = daily_stats_summary
 
@@ -422,23 +415,13 @@ class DataCollector:
             self._update_task_progress(task_id, 100, "Сбор данных завершен успешно")
 
             # Сохраняем результат в задачу
-            if task_id:
-                try:
-                    with session_scope() as session:
-                        task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                        if task:
-                            task.status = 'completed'
-                            task.completed_at = get_now()
-                            task.result = {
-                                'campaigns': stats['campaigns_processed'],
-                                'traffic_sources': stats['ts_processed'],
-                                'offers': stats['offers_processed'],
-                                'networks': stats['networks_processed'],
-                                'errors': stats['errors']
-                            }
-                            session.commit()
-                except Exception as ex:
-                    logger.error(f"Failed to save task result: {ex}")
+            get_progress_bus().update(task_id, status='completed', result={
+                'campaigns': stats['campaigns_processed'],
+                'traffic_sources': stats['ts_processed'],
+                'offers': stats['offers_processed'],
+                'networks': stats['networks_processed'],
+                'errors': stats['errors']
+            })
 
             return stats
 
@@ -449,17 +432,7 @@ class DataCollector:
             stats['errors'] += 1
 
             # Отмечаем задачу как failed
-            if task_id:
-                try:
-                    with session_scope() as session:
-                        task = session.query(BackgroundTask).filter_by(id=task_id).first()
-                        if task:
-                            task.status = 'failed'
-                            task.completed_at = get_now()
-                            task.error = str(e)
-                            session.commit()
-                except Exception as ex:
-                    logger.error(f"Failed to save task error: {ex}")
+            get_progress_bus().update(task_id, status='failed', error=str(e))
 
             return stats
 
@@ -522,7 +495,7 @@ class DataCollector:
                     clicks = campaign_data.get('clicks', 0)
 
                     if clicks == 0:
-                        logger.debug(f"Skipping campaign {campaign_data['id']} - no traffic (clicks=0)")
+                        logger.debug("Skipping campaign %s - no traffic (clicks=0)", campaign_data['id'])
                         continue
 
                     # Сохраняем/обновляем кампанию
@@ -804,7 +777,7 @@ class DataCollector:
 
             if not campaign:
                 # Новая кампания
-                logger.info(f"New campaign: {binom_id} - {current_name}")
+                logger.info("New campaign: %s - %s", binom_id, current_name)
 
                 campaign = Campaign(
                     binom_id=binom_id,
@@ -831,7 +804,7 @@ class DataCollector:
 
                 # ВАЖНО: Проверяем изменение имени
                 if campaign.current_name != current_name:
-                    logger.info(f"Name changed for {binom_id}: '{campaign.current_name}' -> '{current_name}'")
+                    logger.info("Name changed for %s: '%s' -> '%s'", binom_id, campaign.current_name, current_name)
 
                     # Сохраняем изменение имени
                     name_change = NameChange(
@@ -848,15 +821,21 @@ class DataCollector:
                     result['name_changed'] = True
 
                 # Обновляем остальные поля
+                group_changed = (campaign.group_name or '') != campaign_data.get('group_name', '')
                 campaign.group_name = campaign_data.get('group_name', '')
                 campaign.ts_name = campaign_data.get('ts_name', '')
                 campaign.domain_name = campaign_data.get('domain_name', '')
 
             # Определяем тип (CPL/CPA)
             is_cpl = self.cpl_detector.detect(campaign_data)
+            cpl_changed = not result['is_new'] and bool(campaign.is_cpl_mode) != is_cpl
             campaign.is_cpl_mode = is_cpl
             result['is_cpl'] = is_cpl
 
+            # Имя/группа/тип попадают в результаты модулей - помечаем кампанию как измененную
+            if not result['is_new'] and (result['name_changed'] or group_changed or cpl_changed):
+                record_campaign_changes(session, [(campaign.internal_id, now.date())])
+
             session.commit()
 
         return result
@@ -887,7 +866,7 @@ class DataCollector:
 
             if not ts:
                 # Новый источник
-                logger.info(f"New traffic source: {ts_id} - {current_name}")
+                logger.info("New traffic source: %s - %s", ts_id, current_name)
 
                 ts = TrafficSource(
                     id=ts_id,
@@ -906,7 +885,7 @@ class DataCollector:
 
                 # ВАЖНО: Проверяем изменение имени
                 if ts.name != current_name:
-                    logger.info(f"TS name changed for {ts_id}: '{ts.name}' -> '{current_name}'")
+                    logger.info("TS name changed for %s: '%s' -> '%s'", ts_id, ts.name, current_name)
                     ts.name = current_name
                     result['name_changed'] = True
 
@@ -943,7 +922,7 @@ class DataCollector:
 
             if not offer:
                 # Новый оффер
-                logger.info(f"New offer: {offer_id} - {current_name}")
+                logger.info("New offer: %s - %s", offer_id, current_name)
 
                 offer = Offer(
                     id=offer_id,
@@ -967,7 +946,7 @@ class DataCollector:
 
                 # ВАЖНО: Проверяем изменение имени
                 if offer.name != current_name:
-                    logger.info(f"Offer name changed for {offer_id}: '{offer.name}' -> '{current_name}'")
+                    logger.info("Offer name changed for %s: '%s' -> '%s'", offer_id, offer.name, current_name)
                     offer.name = current_name
                     result['name_changed'] = True
 
@@ -1007,7 +986,7 @@ class DataCollector:
 
             if not network:
                 # Новая сеть
-                logger.info(f"New affiliate network: {network_id} - {current_name}")
+                logger.info("New affiliate network: %s - %s", network_id, current_name)
 
                 network = AffiliateNetwork(
                     id=network_id,
@@ -1026,7 +1005,7 @@ class DataCollector:
 
                 # ВАЖНО: Проверяем изменение имени
                 if network.name != current_name:
-                    logger.info(f"Network name changed for {network_id}: '{network.name}' -> '{current_name}'")
+                    logger.info("Network name changed for %s: '%s' -> '%s'", network_id, network.name, current_name)
                     network.name = current_name
                     result['name_changed'] = True
 
@@ -1077,6 +1056,39 @@ class DataCollector:
         logger.info(f"Found {len(campaign_ids)} campaigns with traffic in period")
         return campaign_ids
 
+    @staticmethod
+    def _daily_stat_changed(
+        existing: CampaignStatsDaily,
+        clicks: int,
+        leads: int,
+        cost: float,
+        revenue: float,
+        a_leads: int,
+        h_leads: int,
+        r_leads: int
+    ) -> bool:
+        """
+        Проверяет, изменились ли базовые метрики строки дневной статистики.
+
+        Производные метрики (roi, cr, epc...) считаются из базовых, поэтому
+        сравниваются только клики, лиды, деньги и статусы лидов.
+
+        Returns:
+            True если хотя бы одна метрика отличается
+        """
+        def _num(value) -> float:
+            return round(float(value or 0), 4)
+
+        return (
+            _num(existing.clicks) != _num(clicks)
+            or _num(existing.leads) != _num(leads)
+            or _num(existing.cost) != _num(cost)
+            or _num(existing.revenue) != _num(revenue)
+            or _num(existing.a_leads) != _num(a_leads)
+            or _num(existing.h_leads) != _num(h_leads)
+            or _num(existing.r_leads) != _num(r_leads)
+        )
+
     def _collect_campaign_daily_stats(self, target_date: date, campaign_ids: Optional[List[int]] = None) -> Dict[str, int]:
         """
         Собирает дневную статистику по кампаниям за конкретный день
@@ -1113,6 +1125,8 @@ class DataCollector:
 
         with session_scope() as session:
             snapshot_time = get_now()
+            # Изменившиеся строки (campaign_id, date) для журнала изменений
+            changes = []
 
             # Словарь для быстрого поиска данных по binom_id
             campaigns_data_map = {}
@@ -1131,7 +1145,7 @@ class DataCollector:
 
                     if not campaign:
                         # Кампания не существует в базе - пропускаем
-                        logger.debug(f"Campaign {binom_id} not found in DB, skipping")
+                        logger.debug("Campaign %s not found in DB, skipping", binom_id)
                         stats['skipped'] += 1
                         continue
 
@@ -1180,6 +1194,8 @@ class DataCollector:
 
                     if existing_stat:
                         # Обновляем существующую
+                        if self._daily_stat_changed(existing_stat, clicks, leads, cost, revenue, a_leads, h_leads, r_leads):
+                            changes.append((campaign.internal_id, target_date))
                         existing_stat.clicks = clicks
                         existing_stat.leads = leads
                         existing_stat.cost = cost
@@ -1218,6 +1234,7 @@ class DataCollector:
                             snapshot_time=snapshot_time
                         )
                         session.add(new_stat)
+                        changes.append((campaign.internal_id, target_date))
                         stats['created'] += 1
 
             else:
@@ -1238,7 +1255,7 @@ class DataCollector:
                     campaign = session.query(Campaign).filter_by(binom_id=binom_id).first()
 
                     if not campaign:
-                        logger.debug(f"Campaign {binom_id} not found in DB, skipping daily stats")
+                        logger.debug("Campaign %s not found in DB, skipping daily stats", binom_id)
                         stats['skipped'] += 1
                         continue
 
@@ -1250,6 +1267,17 @@ class DataCollector:
 
                     if existing_stat:
                         # Обновляем существующую
+                        if self._daily_stat_changed(
+                            existing_stat,
+                            clicks,
+                            camp_data.get('leads', 0),
+                            camp_data.get('cost', 0),
+                            camp_data.get('revenue', 0),
+                            camp_data.get('a_leads', 0),
+                            camp_data.get('h_leads', 0),
+                            camp_data.get('r_leads', 0)
+                        ):
+                            changes.append((campaign.internal_id, target_date))
                         existing_stat.clicks = clicks
                         existing_stat.leads = camp_data.get('leads', 0)
                         existing_stat.cost = camp_data.get('cost', 0)
@@ -1288,11 +1316,15 @@ class DataCollector:
                             snapshot_time=snapshot_time
                         )
                         session.add(new_stat)
+                        changes.append((campaign.internal_id, target_date))
                         stats['created'] += 1
 
+            # Публикуем dirty set в том же коммите, что и сами данные
+            stats['changed'] = record_campaign_changes(session, changes)
+
             session.commit()
 
-        logger.info(f"Campaign daily stats for {target_date}: created={stats['created']}, updated={stats['updated']}, skipped={stats['skipped']}, zero_records={stats['zero_records']}")
+        logger.info(f"Campaign daily stats for {target_date}: changed={stats['changed']}, created={stats['created']}, updated={stats['updated']}, skipped={stats['skipped']}, zero_records={stats['zero_records']}")
         return stats
 
     def _collect_ts_daily_stats(self, target_date: date) -> Dict[str, int]:
@@ -1335,7 +1367,7 @@ class DataCollector:
                 # Проверяем существование TS в базе
                 ts = session.query(TrafficSource).filter_by(id=ts_id).first()
                 if not ts:
-                    logger.debug(f"TrafficSource {ts_id} not found in DB, skipping daily stats")
+                    logger.debug("TrafficSource %s not found in DB, skipping daily stats", ts_id)
                     stats['skipped'] += 1
                     continue
 
@@ -1428,7 +1460,7 @@ class DataCollector:
                 # Проверяем существование оффера
                 offer = session.query(Offer).filter_by(id=offer_id).first()
                 if not offer:
-                    logger.debug(f"Offer {offer_id} not found in DB, skipping daily stats")
+                    logger.debug("Offer %s not found in DB, skipping daily stats", offer_id)
                     stats['skipped'] += 1
                     continue
 
@@ -1519,7 +1551,7 @@ class DataCollector:
                 # Проверяем существование сети
                 network = session.query(AffiliateNetwork).filter_by(id=net_id).first()
                 if not network:
-                    logger.debug(f"Network {net_id} not found in DB, skipping daily stats")
+                    logger.debug("Network %s not found in DB, skipping daily stats", net_id)
                     stats['skipped'] += 1
                     continue
 
@@ -1635,7 +1667,7 @@ class DataCollector:
         logger.info("=" * 80)
 
         daily_stats_summary = {
-            'campaigns': {'created': 0, 'updated': 0, 'skipped': 0, 'zero_records': 0},
+            'campaigns': {'created': 0, 'updated': 0, 'skipped': 0, 'zero_records': 0, 'changed': 0},
             'traffic_sources': {'created': 0, 'updated': 0, 'skipped': 0},
             'offers': {'created': 0, 'updated': 0, 'skipped': 0},
             'networks': {'created': 0, 'updated': 0, 'skipped': 0}
@@ -0,0 +1,477 @@
+"""
+Оркестрация обработки данных после сбора
+
+Вместо независимых cron-задач модулей (которые срабатывают без учета того,
+закончился ли сбор) завершение сбора запускает цепочку:
+
+1. stat_periods   - пересчет периодной статистики (7/14/30 дней)
+2. weekly_rollup  - недельная агрегация затронутых недель
+3. модули волнами по приоритету:
+   critical_alerts -> critical -> high -> medium -> low
+   с ограничением параллельности (MODULES_WAVE_CONCURRENCY)
+
+Расписание модуля (cron) определяет, КОГДА модуль "созрел" для запуска:
+модуль попадает в волну, если его cron сработал после последнего запуска.
+Модуль пропускается, если его входные данные не изменились с прошлого
+запуска (версия данных из журнала изменений, день, параметры).
+
+Режим задается MODULES_ORCHESTRATION:
+- event (по умолчанию) - модули запускаются только оркестратором
+- cron - прежнее поведение, модули по своим cron-задачам
+
+Использование:
+    from services.scheduler.orchestrator import get_orchestrator
+    get_orchestrator().notify_collection_completed(source='scheduler')
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from config import get_config
+from utils import get_now
+from storage.database import session_scope
+
+logger = logging.getLogger(__name__)
+
+# Порядок волн: сначала критические алерты, затем по приоритету модуля
+PRIORITY_TIERS = ["critical_alerts", "critical", "high", "medium", "low"]
+
+# Сколько отчетов о волнах хранить в памяти
+REPORTS_HISTORY_SIZE = 20
+
+
+def is_event_mode() -> bool:
+    """Модули запускаются оркестратором после сбора, а не по своим cron-задачам"""
+    return str(get_config().get("modules.orchestration", "event")).lower() == "event"
+
+
+def _module_tier(category: str, priority: str) -> str:
+    """Волна модуля: critical_alerts отдельно, остальные по приоритету"""
+    if category == "critical_alerts":
+        return "critical_alerts"
+    return priority if priority in PRIORITY_TIERS else "medium"
+
+
+def _is_due(schedule: str, last_run: Optional[datetime], now: datetime) -> bool:
+    """
+    Проверяет, сработал ли cron модуля после последнего запуска.
+
+    Args:
+        schedule: Cron expression модуля
+        last_run: Время последнего запуска (None - модуль еще не запускался)
+        now: Текущее время (aware)
+
+    Returns:
+        True если модуль нужно запустить
+    """
+    from apscheduler.triggers.cron import CronTrigger
+
+    if last_run is None:
+        return True
+
+    if last_run.tzinfo is None:
+        # started_at в module_runs хранится в локальном времени сервера
+        last_run = last_run.astimezone()
+
+    trigger = CronTrigger.from_crontab(schedule, timezone=now.tzinfo)
+    next_fire = trigger.get_next_fire_time(None, last_run + timedelta(seconds=1))
+    return next_fire is not None and next_fire <= now
+
+
+class PostCollectionOrchestrator:
+    """
+    Запускает обработку данных после завершения сбора.
+
+    Повторные уведомления во время работы не запускают параллельный конвейер:
+    после текущего прогона выполняется еще один (с последними данными).
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        """
+        Args:
+            concurrency: Максимум модулей, выполняемых одновременно в волне
+                (по умолчанию из MODULES_WAVE_CONCURRENCY)
+        """
+        if concurrency is None:
+            concurrency = get_config().get("modules.wave_concurrency", 3)
+        self.concurrency = max(int(concurrency), 1)
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending_source: Optional[str] = None
+        self._reports = deque(maxlen=REPORTS_HISTORY_SIZE)
+
+        # Состояние последнего прогона (в памяти: после рестарта первый прогон полный)
+        self._last_data_version: Optional[int] = None
+        self._last_day: Optional[date] = None
+        self._fingerprints: Dict[str, str] = {}
+
+        self._runner = None
+
+    @property
+    def is_running(self) -> bool:
+        """Конвейер выполняется"""
+        return self._running
+
+    def notify_collection_completed(self, source: str = "collector") -> bool:
+        """
+        Сообщает о завершении сбора данных и запускает конвейер в фоне.
+
+        Args:
+            source: Кто завершил сбор (scheduler, manual, rebuild)
+
+        Returns:
+            True если конвейер запущен, False если он уже выполняется
+            (в этом случае будет выполнен повторный прогон)
+        """
+        with self._lock:
+            if self._running:
+                self._pending_source = source
+                logger.info(f"Post-collection pipeline already running, rerun queued ({source})")
+                return False
+            self._running = True
+
+        thread = threading.Thread(
+            target=self._run_loop,
+            args=(source,),
+            name="post-collection-pipeline",
+            daemon=True
+        )
+        thread.start()
+        return True
+
+    def get_reports(self, limit: int = REPORTS_HISTORY_SIZE) -> List[Dict[str, Any]]:
+        """
+        Отчеты о последних прогонах (новые первыми).
+
+        Args:
+            limit: Максимум отчетов
+        """
+        return list(reversed(self._reports))[:limit]
+
+    def _run_loop(self, source: str) -> None:
+        """Выполняет конвейер, пока есть отложенные уведомления"""
+        while True:
+            try:
+                self.run_pipeline(source)
+            except Exception as e:
+                logger.error(f"Post-collection pipeline failed: {e}", exc_info=True)
+
+            with self._lock:
+                if self._pending_source is None:
+                    self._running = False
+                    return
+                source, self._pending_source = self._pending_source, None
+
+    def run_pipeline(self, source: str = "manual") -> Dict[str, Any]:
+        """
+        Синхронно выполняет конвейер: периоды -> недели -> волны модулей.
+
+        Args:
+            source: Источник запуска (для отчета)
+
+        Returns:
+            Отчет с таймлайном этапов и модулей
+        """
+        from .change_log import get_data_version
+
+        pipeline_started = time.perf_counter()
+        started_at = get_now()
+        today = date.today()
+        data_version = get_data_version()
+        data_changed = data_version != self._last_data_version or today != self._last_day
+
+        logger.info("=" * 60)
+        logger.info(f"POST-COLLECTION PIPELINE ({source}), data version {data_version}")
+        logger.info("=" * 60)
+
+        report = {
+            "source": source,
+            "started_at": started_at.isoformat(),
+            "data_version": data_version,
+            "data_changed": data_changed,
+            "concurrency": self.concurrency,
+            "stages": [],
+            "tiers": [],
+            "modules": [],
+        }
+
+        # 1. Периоды и недельная агрегация зависят только от дневных данных кампаний
+        report["stages"].append(self._run_stage(
+            "stat_periods", pipeline_started, data_changed, self._recalculate_periods
+        ))
+        report["stages"].append(self._run_stage(
+            "weekly_rollup", pipeline_started, data_changed, self._weekly_rollup
+        ))
+
+        # 2. Волны модулей
+        self._run_module_waves(report, pipeline_started, data_version)
+
+        self._last_data_version = data_version
+        self._last_day = today
+
+        report["finished_at"] = get_now().isoformat()
+        report["duration_ms"] = round((time.perf_counter() - pipeline_started) * 1000, 1)
+        report["summary"] = {
+            status: sum(1 for m in report["modules"] if m["status"] == status)
+            for status in ("success", "error", "unchanged", "not_due")
+        }
+
+        self._reports.append(report)
+        self._log_report(report)
+        return report
+
+    def _run_stage(self, name: str, pipeline_started: float, needed: bool, action) -> Dict[str, Any]:
+        """Выполняет этап конвейера и возвращает запись таймлайна"""
+        entry = {
+            "stage": name,
+            "offset_ms": round((time.perf_counter() - pipeline_started) * 1000, 1),
+            "status": "unchanged",
+            "duration_ms": 0.0,
+        }
+        if not needed:
+            return entry
+
+        started = time.perf_counter()
+        try:
+            entry["details"] = action()
+            entry["status"] = "success"
+        except Exception as e:
+            logger.error(f"Pipeline stage '{name}' failed: {e}", exc_info=True)
+            entry["status"] = "error"
+            entry["error"] = str(e)
+        entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return entry
+
+    def _recalculate_periods(self) -> Dict[str, Any]:
+        """Этап 1: пересчет stat_periods"""
+        from .aggregate_periods import recalculate_stat_periods
+
+        result = recalculate_stat_periods()
+        return {
+            "campaigns_processed": result["campaigns_processed"],
+            "records_created": result["records_created"],
+            "records_updated": result["records_updated"],
+        }
+
+    def _weekly_rollup(self) -> Dict[str, Any]:
+        """
+        Этап 2: недельная агрегация недель, в которых изменились данные.
+
+        При первом прогоне после старта (версия неизвестна) - только текущая неделя.
+        """
+        from core.data_processor import aggregate_weekly_stats, get_week_start
+        from .change_log import get_changed_dates
+
+        weeks = {get_week_start(date.today())}
+        if self._last_data_version is not None:
+            weeks |= {get_week_start(day) for day in get_changed_dates(self._last_data_version)}
+
+        aggregated = 0
+        for week_start in sorted(weeks):
+            aggregated += aggregate_weekly_stats(week_start=week_start)
+
+        return {
+            "weeks": [week.isoformat() for week in sorted(weeks)],
+            "records": aggregated,
+        }
+
+    def _select_modules(self) -> List[Dict[str, Any]]:
+        """
+        Модули с автозапуском (enabled + schedule) и их последний запуск.
+
+        Returns:
+            Список: module_id, schedule, params, tier, last_run
+        """
+        from modules.registry import get_registry
+        from storage.database.models import ModuleConfig as ModuleConfigDB, ModuleRun as ModuleRunDB
+
+        metadata_by_id = {metadata.id: metadata for metadata in get_registry().list_modules()}
+        selected = []
+
+        with session_scope() as session:
+            configs = session.query(ModuleConfigDB).filter(
+                ModuleConfigDB.enabled == True,
+                ModuleConfigDB.schedule.isnot(None)
+            ).all()
+
+            last_runs = dict(session.query(
+                ModuleRunDB.module_id,
+                func.max(ModuleRunDB.started_at)
+            ).group_by(ModuleRunDB.module_id).all())
+
+            for config in configs:
+                if not (config.schedule and config.schedule.strip()):
+                    continue
+
+                metadata = metadata_by_id.get(config.module_id)
+                if metadata is None:
+                    logger.warning(f"Module '{config.module_id}' has schedule but is not registered, skipping")
+                    continue
+
+                selected.append({
+                    "module_id": config.module_id,
+                    "schedule": config.schedule.strip(),
+                    "params": config.params or {},
+                    "tier": _module_tier(metadata.category, metadata.priority),
+                    "category": metadata.category,
+                    "last_run": last_runs.get(config.module_id),
+                })
+
+        selected.sort(key=lambda m: (PRIORITY_TIERS.index(m["tier"]), m["module_id"]))
+        return selected
+
+    def _input_fingerprint(self, module: Dict[str, Any], data_version: int, sources_snapshot: Optional[str]) -> str:
+        """
+        Отпечаток входных данных модуля.
+
+        Включает версию данных кампаний, текущий день (окна модулей считаются от
+        сегодня) и параметры. Модули источников/офферов дополнительно зависят
+        от времени последнего снимка статистики источников, офферов и партнерок.
+        """
+        parts = [
+            str(data_version),
+            date.today().isoformat(),
+            json.dumps(module["params"], sort_keys=True, default=str),
+        ]
+        if module["category"] == "sources_offers":
+            parts.append(sources_snapshot or "")
+        return "|".join(parts)
+
+    def _sources_snapshot(self) -> str:
+        """Время последних снимков статистики источников, офферов и партнерок"""
+        from storage.database.models import TrafficSourceStatsDaily, OfferStatsDaily, NetworkStatsDaily
+
+        with session_scope() as session:
+            snapshots = [
+                session.query(func.max(model.snapshot_time)).scalar()
+                for model in (TrafficSourceStatsDaily, OfferStatsDaily, NetworkStatsDaily)
+            ]
+        return ",".join(str(snapshot) for snapshot in snapshots)
+
+    def _run_module_waves(self, report: Dict[str, Any], pipeline_started: float, data_version: int) -> None:
+        """Этап 3: волны модулей по приоритету с ограничением параллельности"""
+        try:
+            modules = self._select_modules()
+        except Exception as e:
+            logger.error(f"Failed to select modules for the wave: {e}", exc_info=True)
+            report["stages"].append({"stage": "module_waves", "status": "error", "error": str(e)})
+            return
+
+        now = get_now()
+        sources_snapshot = self._sources_snapshot() if any(
+            m["category"] == "sources_offers" for m in modules
+        ) else None
+
+        waves: Dict[str, List[Tuple[Dict[str, Any], str]]] = {}
+        for module in modules:
+            entry = {"module_id": module["module_id"], "tier": module["tier"]}
+
+            if not _is_due(module["schedule"], module["last_run"], now):
+                entry["status"] = "not_due"
+                report["modules"].append(entry)
+                continue
+
+            fingerprint = self._input_fingerprint(module, data_version, sources_snapshot)
+            if self._fingerprints.get(module["module_id"]) == fingerprint:
+                entry["status"] = "unchanged"
+                report["modules"].append(entry)
+                continue
+
+            waves.setdefault(module["tier"], []).append((module, fingerprint))
+
+        for tier in PRIORITY_TIERS:
+            wave = waves.get(tier)
+            if not wave:
+                continue
+
+            wave_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"wave-{tier}") as executor:
+                results = list(executor.map(
+                    lambda item: self._run_module(item[0], item[1], tier, pipeline_started),
+                    wave
+                ))
+
+            report["modules"].extend(results)
+            report["tiers"].append({
+                "tier": tier,
+                "modules": len(wave),
+                "offset_ms": round((wave_started - pipeline_started) * 1000, 1),
+                "duration_ms": round((time.perf_counter() - wave_started) * 1000, 1),
+            })
+
+    def _run_module(self, module: Dict[str, Any], fingerprint: str, tier: str, pipeline_started: float) -> Dict[str, Any]:
+        """Запускает модуль в волне и возвращает запись таймлайна"""
+        module_id = module["module_id"]
+        started = time.perf_counter()
+        entry = {
+            "module_id": module_id,
+            "tier": tier,
+            "offset_ms": round((started - pipeline_started) * 1000, 1),
+        }
+
+        try:
+            result = self._get_runner().run_module(
+                module_id=module_id, config=None, use_cache=False, materialize=False
+            )
+            entry["status"] = "success" if result.status == "success" else "error"
+            if result.status == "success":
+                self._fingerprints[module_id] = fingerprint
+            else:
+                entry["error"] = result.error
+        except Exception as e:
+            logger.error(f"Module '{module_id}' failed in wave '{tier}': {e}", exc_info=True)
+            entry["status"] = "error"
+            entry["error"] = str(e)
+
+        entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return entry
+
+    def _get_runner(self):
+        """ModuleRunner создается при первом запуске модуля"""
+        if self._runner is None:
+            from modules.module_runner import ModuleRunner
+            self._runner = ModuleRunner()
+        return self._runner
+
+    def _log_report(self, report: Dict[str, Any]) -> None:
+        """Логирует таймлайн прогона"""
+        logger.info(f"Pipeline timeline ({report['duration_ms']:.0f} ms total):")
+        for stage in report["stages"]:
+            logger.info(
+                f"  [{stage.get('offset_ms', 0):>8.0f} ms] {stage['stage']:<16} "
+                f"{stage['status']:<10} {stage.get('duration_ms', 0):.0f} ms"
+            )
+        for tier in report["tiers"]:
+            logger.info(
+                f"  [{tier['offset_ms']:>8.0f} ms] wave {tier['tier']:<11} "
+                f"{tier['modules']} modules, {tier['duration_ms']:.0f} ms"
+            )
+        logger.info(f"  Modules: {report['summary']}")
+
+
+# Глобальный экземпляр оркестратора
+_orchestrator_instance: Optional[PostCollectionOrchestrator] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> PostCollectionOrchestrator:
+    """
+    Получает глобальный экземпляр оркестратора.
+
+    Returns:
+        PostCollectionOrchestrator
+    """
+    global _orchestrator_instance
+    if _orchestrator_instance is None:
+        with _orchestrator_lock:
+            if _orchestrator_instance is None:
+                _orchestrator_instance = PostCollectionOrchestrator()
+    return _orchestrator_instance
@@ -0,0 +1,331 @@
+"""
+Шина прогресса фоновых задач (in-memory)
+
+Сборщик и фоновые задачи публикуют прогресс сюда, а не в background_tasks
+напрямую. Шина:
+- хранит состояние задач в памяти - /tasks/{id} и /refresh/status читают его без БД
+- раздает события подписчикам SSE (/system/tasks/stream)
+- пишет состояние в БД не чаще раза в PROGRESS_FLUSH_INTERVAL секунд на задачу;
+  смена статуса (running, completed, failed) пишется сразу
+
+Записи одной задачи идут по очереди (блокировка задачи), у каждого снимка
+состояния есть версия - номер события. Снимок, который старше уже записанного,
+не пишется: запоздавший "running" не затирает "completed".
+
+После перезапуска процесса состояние восстанавливается из БД при первом
+обновлении задачи.
+
+Использование:
+    from services.scheduler.progress_bus import get_progress_bus
+
+    bus = get_progress_bus()
+    bus.update(task_id, progress=30, message="Блок 2 завершен")
+    bus.update(task_id, status="completed", result={...})
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from utils import get_now
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = frozenset({'completed', 'failed'})
+
+# Поля состояния, которые пишутся в background_tasks
+_PERSISTED_FIELDS = (
+    'status', 'progress', 'progress_message', 'result', 'error', 'started_at', 'completed_at'
+)
+_TIMESTAMP_FIELDS = ('created_at', 'started_at', 'completed_at')
+
+
+def _serialize(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Состояние задачи в формате BackgroundTask.to_dict()"""
+    data = {key: value for key, value in state.items() if not key.startswith('_')}
+    for key in _TIMESTAMP_FIELDS:
+        if data.get(key) is not None:
+            data[key] = data[key].isoformat()
+    return data
+
+
+class ProgressBus:
+    """
+    Состояние и события прогресса фоновых задач.
+
+    Публикация потокобезопасна (сборщик работает в потоках),
+    подписчики - asyncio-очереди event loop веб-сервера.
+    """
+
+    def __init__(self, flush_interval: float = 30.0, keep_tasks: int = 50):
+        """
+        Args:
+            flush_interval: Минимальный интервал записи прогресса задачи в БД, секунд
+            keep_tasks: Сколько задач держать в памяти (старые вытесняются)
+        """
+        self.flush_interval = flush_interval
+        self.keep_tasks = keep_tasks
+        self._lock = threading.Lock()
+        self._tasks: OrderedDict = OrderedDict()
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._sequence = 0
+
+    def update(
+        self,
+        task_id: Optional[int],
+        progress: Optional[int] = None,
+        message: Optional[str] = None,
+        status: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Обновляет состояние задачи и рассылает событие подписчикам.
+
+        Задача в статусе pending с progress > 0 переходит в running.
+
+        Args:
+            task_id: ID задачи (None - задача не отслеживается)
+            progress: Прогресс 0-100
+            message: Текущее действие
+            status: Новый статус (pending, running, completed, failed)
+            result: Результат выполнения
+            error: Текст ошибки
+        """
+        if task_id is None:
+            return
+
+        with self._lock:
+            state = self._tasks.get(task_id)
+        if state is None:
+            state = self._load(task_id)
+            if state is None:
+                logger.warning(f"Progress for unknown task #{task_id} ignored")
+                return
+
+        with self._lock:
+            state = self._tasks.setdefault(task_id, state)
+            self._tasks.move_to_end(task_id)
+            previous_status = state['status']
+
+            if progress is not None:
+                state['progress'] = progress
+                if progress > 0 and state['status'] == 'pending' and status is None:
+                    status = 'running'
+            if message is not None:
+                state['progress_message'] = message
+            if result is not None:
+                state['result'] = result
+            if error is not None:
+                state['error'] = error
+            if status is not None:
+                state['status'] = status
+                if status == 'running' and state['started_at'] is None:
+                    state['started_at'] = get_now()
+                if status in FINISHED_STATUSES and state['completed_at'] is None:
+                    state['completed_at'] = get_now()
+
+            now = time.monotonic()
+            due = (
+                state['status'] != previous_status
+                or state['status'] in FINISHED_STATUSES
+                or now - state['_flushed_at'] >= self.flush_interval
+            )
+            state['_dirty'] = True
+            if due:
+                state['_flushed_at'] = now
+
+            self._sequence += 1
+            state['_version'] = self._sequence
+            event = {'sequence': self._sequence, 'task': _serialize(state)}
+            snapshot = dict(state) if due else None
+            self._trim()
+
+        if snapshot is not None:
+            self._flush(task_id, snapshot)
+        self._publish(event)
+
+    def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Состояние задачи из памяти.
+
+        Returns:
+            Dict в формате BackgroundTask.to_dict() или None, если задачи нет в шине
+        """
+        with self._lock:
+            state = self._tasks.get(task_id)
+            return _serialize(state) if state is not None else None
+
+    def get_tasks(self, since_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Задачи в памяти: активные и завершенные не раньше since_seconds назад.
+
+        Args:
+            since_seconds: Окно для завершенных задач (None - все)
+        """
+        now = get_now()
+        with self._lock:
+            states = list(self._tasks.values())
+        tasks = []
+        for state in states:
+            completed_at = state['completed_at']
+            if (
+                state['status'] in FINISHED_STATUSES
+                and since_seconds is not None
+                and completed_at is not None
+                and (now - _aware(completed_at, now)).total_seconds() > since_seconds
+            ):
+                continue
+            tasks.append(_serialize(state))
+        return tasks
+
+    def flush(self) -> int:
+        """
+        Пишет в БД все задачи с непримененными изменениями.
+
+        Returns:
+            Количество записанных задач
+        """
+        with self._lock:
+            pending = [(task_id, dict(state)) for task_id, state in self._tasks.items() if state['_dirty']]
+        for task_id, snapshot in pending:
+            self._flush(task_id, snapshot)
+        return len(pending)
+
+    def subscribe(self, max_events: int = 100) -> asyncio.Queue:
+        """
+        Подписка на события (вызывать из event loop).
+
+        Returns:
+            Очередь событий {'sequence', 'task'}; при переполнении старые события отбрасываются
+        """
+        queue = asyncio.Queue(maxsize=max_events)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Отменяет подписку"""
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        """Передает событие подписчикам в их event loop"""
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                # Event loop закрыт - подписчик больше не читает
+                self.unsubscribe(queue)
+
+    def _trim(self) -> None:
+        """Вытесняет самые старые завершенные задачи сверх keep_tasks (под self._lock)"""
+        while len(self._tasks) > self.keep_tasks:
+            for task_id, state in self._tasks.items():
+                if state['status'] in FINISHED_STATUSES and not state['_dirty']:
+                    del self._tasks[task_id]
+                    break
+            else:
+                return
+
+    def _load(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Состояние задачи из background_tasks"""
+        from storage.database import session_scope, BackgroundTask
+
+        try:
+            with session_scope() as session:
+                task = session.query(BackgroundTask).filter_by(id=task_id).first()
+                if task is None:
+                    return None
+                return {
+                    'id': task.id,
+                    'task_type': task.task_type,
+                    'status': task.status,
+                    'progress': task.progress or 0,
+                    'progress_message': task.progress_message,
+                    'result': task.result,
+                    'error': task.error,
+                    'created_at': task.created_at,
+                    'started_at': task.started_at,
+                    'completed_at': task.completed_at,
+                    '_flushed_at': 0.0,
+                    '_dirty': False,
+                    # Версия состояния (номер события) и последняя записанная в БД
+                    '_version': 0,
+                    '_written_version': 0,
+                    '_flush_lock': threading.Lock()
+                }
+        except Exception as e:
+            logger.error(f"Failed to load task #{task_id}: {e}")
+            return None
+
+    def _flush(self, task_id: int, snapshot: Dict[str, Any]) -> None:
+        """
+        Пишет снимок состояния задачи в background_tasks.
+
+        Записи задачи выполняются по очереди; снимок не новее записанного
+        пропускается. Задача перестает быть dirty, только если записана
+        последняя версия состояния.
+        """
+        with snapshot['_flush_lock']:
+            with self._lock:
+                state = self._tasks.get(task_id)
+                # Задача вытеснена (все записано) или записан более новый снимок
+                if state is None or snapshot['_version'] <= state['_written_version']:
+                    return
+            try:
+                self._write(task_id, snapshot)
+            except Exception as e:
+                logger.error(f"Failed to flush task #{task_id} progress: {e}")
+                return
+            with self._lock:
+                state['_written_version'] = snapshot['_version']
+                # Новое обновление могло прийти во время записи - оно остается dirty
+                if state['_version'] == snapshot['_version']:
+                    state['_dirty'] = False
+
+    def _write(self, task_id: int, snapshot: Dict[str, Any]) -> None:
+        """Записывает поля состояния в background_tasks"""
+        from storage.database import session_scope, BackgroundTask
+
+        with session_scope() as session:
+            task = session.query(BackgroundTask).filter_by(id=task_id).first()
+            if task:
+                for field in _PERSISTED_FIELDS:
+                    setattr(task, field, snapshot[field])
+                session.commit()
+
+
+def _aware(value, now):
+    """Приводит naive datetime из БД к timezone now (для сравнения)"""
+    if value.tzinfo is None and now.tzinfo is not None:
+        return value.replace(tzinfo=now.tzinfo)
+    return value
+
+
+def _deliver(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    """Кладет событие в очередь подписчика (в его event loop), вытесняя самое старое"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_progress_bus: Optional[ProgressBus] = None
+_progress_bus_lock = threading.Lock()
+
+
+def get_progress_bus() -> ProgressBus:
+    """Получает глобальную шину прогресса (singleton)"""
+    global _progress_bus
+    if _progress_bus is None:
+        with _progress_bus_lock:
+            if _progress_bus is None:
+                from config import get_config
+                _progress_bus = ProgressBus(
+                    flush_interval=float(get_config().get("progress.flush_interval", 30))
+                )
+    return _progress_bus
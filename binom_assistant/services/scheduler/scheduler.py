@@ -15,7 +15,9 @@ from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
 from .collector import DataCollector
 from .cleanup import cleanup_old_data
+from .change_log import cleanup_change_log
 from .aggregate_periods import recalculate_stat_periods
+from .orchestrator import get_orchestrator, is_event_mode
 from core.data_processor import aggregate_weekly_stats
 from config import get_config
 from utils import get_now
@@ -108,15 +110,19 @@ class TaskScheduler:
         logger.info("Job added: find_problems every 6 hours")
 
         # 4. Пересчет stat_periods каждый час
-        self.scheduler.add_job(
-            func=self._recalculate_periods_job,
-            trigger=CronTrigger(minute=0),  # каждый час в начале
-            id='recalculate_periods',
-            name='Recalculate Stat Periods',
-            replace_existing=True,
-            max_instances=1
-        )
-        logger.info("Job added: recalculate_periods every hour")
+        # В event режиме периоды пересчитываются оркестратором сразу после сбора
+        if is_event_mode():
+            logger.info("Job skipped: recalculate_periods (runs after each collection, event mode)")
+        else:
+            self.scheduler.add_job(
+                func=self._recalculate_periods_job,
+                trigger=CronTrigger(minute=0),  # каждый час в начале
+                id='recalculate_periods',
+                name='Recalculate Stat Periods',
+                replace_existing=True,
+                max_instances=1
+            )
+            logger.info("Job added: recalculate_periods every hour")
 
         # 5. Очистка старых данных раз в неделю по воскресеньям в 5:00 UTC
         self.scheduler.add_job(
@@ -193,6 +199,10 @@ class TaskScheduler:
             if stats['errors'] > 0:
                 logger.warning(f"Daily collection had {stats['errors']} errors")
 
+            # Периоды, недельная агрегация и модули - после завершения сбора
+            if is_event_mode():
+                get_orchestrator().notify_collection_completed(source='scheduler')
+
         except Exception as e:
             logger.error(f"Daily collection job failed: {e}")
             raise
@@ -276,6 +286,10 @@ class TaskScheduler:
             if result['errors']:
                 logger.warning(f"Cleanup had {len(result['errors'])} errors")
 
+            # Журнал изменений нужен только для инкрементального пересчета модулей
+            deleted_changes = cleanup_change_log()
+            logger.info(f"  - Change log: {deleted_changes:,}")
+
         except Exception as e:
             logger.error(f"Cleanup job failed: {e}")
             raise
@@ -0,0 +1,264 @@
+"""
+Тест журнала изменений и инкрементального пересчета модулей
+(collector -> change_log -> modules.incremental)
+
+Проверяет:
+- daily_collect проходит блок 5 и записывает измененные строки в журнал
+- повторный сбор тех же данных журнал не меняет
+- инкрементальный пересчет bleeding_detector совпадает с полным
+  (кампания стала убыточной, перестала быть убыточной, изменились суммы)
+- build_plan переходит на полный пересчет: нет состояния, окно сдвинулось,
+  журнал очищен после версии, изменилось слишком много кампаний
+
+Сборщик работает с заглушкой Binom API, БД - временный SQLite файл.
+
+Использование:
+    python binom_assistant/services/scheduler/test_change_log.py
+    pytest binom_assistant/services/scheduler/test_change_log.py
+"""
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from core.api_client import CPLDetector
+from storage.database import base as db_base
+from storage.database import session_scope, Campaign, CampaignDataChange, ModuleState
+from storage.database.base import Base
+from services.scheduler import progress_bus
+from services.scheduler.change_log import get_changes_since, get_data_version
+from services.scheduler.collector import DataCollector
+from modules import incremental
+from modules.base_module import IncrementalPlan
+from modules.critical_alerts.bleeding_detector import BleedingCampaignDetector
+
+DAYS = 7
+
+# Убыточные (cost, revenue) и прибыльные кампании
+LOSS = (10.0, 2.0)
+PROFIT = (10.0, 30.0)
+
+
+@contextmanager
+def _database():
+    """Глобальный движок и фабрика сессий на временном SQLite файле"""
+    saved = (db_base._engine, db_base._session_factory, progress_bus._progress_bus)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/test.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        db_base._engine = engine
+        db_base._session_factory = scoped_session(sessionmaker(bind=engine, autoflush=False))
+        progress_bus._progress_bus = progress_bus.ProgressBus()
+        try:
+            yield
+        finally:
+            db_base._session_factory.remove()
+            engine.dispose()
+            db_base._engine, db_base._session_factory, progress_bus._progress_bus = saved
+
+
+def _row(binom_id: int, cost: float, revenue: float) -> Dict:
+    """Строка кампании в формате Binom API"""
+    return {
+        'id': binom_id, 'name': f"Campaign {binom_id}", 'group_name': "Nutra", 'ts_name': "FB",
+        'domain_name': "", 'clicks': 100, 'leads': 2, 'cost': cost, 'revenue': revenue,
+        'a_leads': 1, 'h_leads': 1, 'r_leads': 0
+    }
+
+
+class _StubClient:
+    """Заглушка BinomClient: данные по дням {дата ISO: {binom_id: (cost, revenue)}}"""
+
+    def __init__(self, daily: Dict[str, Dict[int, Tuple[float, float]]]):
+        self.daily = daily
+
+    def get_campaigns(self, date=None, date_start=None, date_end=None, status=None, val_page=None):
+        if date_start is not None and date_start == date_end:
+            return [_row(b, cost, revenue) for b, (cost, revenue) in self.daily.get(date_start, {}).items()]
+        totals = {}
+        for rows in self.daily.values():
+            for binom_id, (cost, revenue) in rows.items():
+                total = totals.setdefault(binom_id, [0.0, 0.0])
+                total[0] += cost
+                total[1] += revenue
+        return [_row(b, cost, revenue) for b, (cost, revenue) in sorted(totals.items())]
+
+    def get_campaigns_custom_period(self, date_start, date_end, status=None, val_page=None):
+        return self.get_campaigns(date="12", status=status, val_page=val_page)
+
+    def get_traffic_sources(self, **kwargs):
+        return []
+
+    def get_offers(self, **kwargs):
+        return []
+
+    def get_affiliate_networks(self, **kwargs):
+        return []
+
+
+def _collector(daily) -> DataCollector:
+    """Сборщик без пауз с заглушкой API (без BinomClient и настроек из .env)"""
+    collector = DataCollector.__new__(DataCollector)
+    collector.client = _StubClient(daily)
+    collector.cpl_detector = CPLDetector()
+    collector.settings = None
+    collector.skip_pauses = True
+    collector.pause_between_blocks = 0
+    return collector
+
+
+def _daily(values: Dict[int, Tuple[float, float]]) -> Dict[str, Dict[int, Tuple[float, float]]]:
+    """Одинаковые значения кампаний за все дни сбора"""
+    dates = _collector({})._generate_date_range(DAYS)
+    return {day.isoformat(): dict(values) for day in dates}
+
+
+def _collect(daily) -> Dict[str, int]:
+    """daily_collect, итоги блока 5 по кампаниям"""
+    stats = _collector(daily).daily_collect()
+    assert stats['errors'] == 0, stats
+    return stats['daily_stats']['campaigns']
+
+
+def _internal_ids() -> Dict[int, int]:
+    """binom_id -> internal_id"""
+    with session_scope() as session:
+        return {c.binom_id: c.internal_id for c in session.query(Campaign)}
+
+
+def _run(module, config, plan):
+    """Запуск модуля по плану (как ModuleRunner._run_incremental без проверки)"""
+    result = module.run(config, plan)
+    assert result.status == "success", result.error
+    return result
+
+
+def _full(module, config, plan):
+    """Полный пересчет на той же версии данных"""
+    return _run(module, config, IncrementalPlan(window_start=plan.window_start, data_version=plan.data_version))
+
+
+def test_daily_collect_records_changes():
+    """Блок 5 завершается, в журнал попадают только измененные строки"""
+    with _database():
+        values = {b: LOSS for b in range(1, 7)}
+        values.update({7: PROFIT, 8: PROFIT})
+        daily = _daily(values)
+
+        summary = _collect(daily)
+        assert summary['created'] == 8 * DAYS and summary['changed'] == 8 * DAYS
+
+        version = get_data_version()
+        summary = _collect(daily)
+        assert summary['changed'] == 0 and summary['updated'] == 8 * DAYS
+        assert get_changes_since(version) == (set(), version)
+
+        today = max(daily)
+        daily[today][3] = (25.0, 2.0)
+        assert _collect(daily)['changed'] == 1
+        changed, new_version = get_changes_since(version)
+        assert changed == {_internal_ids()[3]} and new_version == version + 1
+
+
+def test_incremental_matches_full_recompute():
+    """Инкрементальный результат bleeding_detector совпадает с полным пересчетом"""
+    with _database():
+        values = {b: LOSS for b in range(1, 7)}
+        values.update({7: PROFIT, 8: PROFIT})
+        daily = _daily(values)
+        _collect(daily)
+
+        module = BleedingCampaignDetector()
+        config = module.config
+
+        plan = incremental.build_plan(module, config)
+        assert plan.is_full
+        first = _run(module, config, plan)
+        assert first.data['summary']['total_found'] == 6
+        incremental.save_state(module, config, plan)
+
+        # Суммы кампании 2 растут, 1 становится прибыльной, 7 - убыточной
+        today = max(daily)
+        daily[today][2] = (40.0, 1.0)
+        daily[today][1] = (10.0, 200.0)
+        daily[today][7] = (10.0, 0.0)
+        for day in daily.values():
+            day[7] = LOSS
+        _collect(daily)
+
+        plan = incremental.build_plan(module, config)
+        ids = _internal_ids()
+        assert plan.dirty_campaign_ids == sorted(ids[b] for b in (1, 2, 7))
+        assert set(plan.previous_states) == {ids[b] for b in range(1, 7)}
+
+        result = _run(module, config, plan)
+        assert incremental.compare_results(result.data, _full(module, config, plan).data) == []
+        found = {c['binom_id'] for c in result.data['campaigns']}
+        assert found == {2, 3, 4, 5, 6, 7}
+        incremental.save_state(module, config, plan)
+
+        # Без новых данных - пустой dirty set, результат тот же
+        plan = incremental.build_plan(module, config)
+        assert plan.dirty_campaign_ids == []
+        assert incremental.compare_results(_run(module, config, plan).data, result.data) == []
+
+
+def test_plan_falls_back_to_full_recompute():
+    """Полный пересчет: окно сдвинулось, журнал очищен, много изменений"""
+    with _database():
+        values = {b: LOSS for b in range(1, 7)}
+        daily = _daily(values)
+        _collect(daily)
+
+        module = BleedingCampaignDetector()
+        config = module.config
+        plan = incremental.build_plan(module, config)
+        _run(module, config, plan)
+        incremental.save_state(module, config, plan)
+        today = max(daily)
+
+        # Окно сдвинулось (состояние сохранено вчера)
+        with session_scope() as session:
+            state = session.query(ModuleState).one()
+            state.window_start = plan.window_start - timedelta(days=1)
+        assert incremental.build_plan(module, config).is_full
+
+        # Журнал после сохраненной версии очищен
+        incremental.save_state(module, config, plan)
+        daily[today][1] = (12.0, 2.0)
+        daily[today][2] = (12.0, 2.0)
+        _collect(daily)
+        with session_scope() as session:
+            session.query(CampaignDataChange).filter(
+                CampaignDataChange.id <= plan.data_version + 1
+            ).delete(synchronize_session=False)
+        assert get_changes_since(plan.data_version)[0] is None
+        assert incremental.build_plan(module, config).is_full
+
+        # Изменилось больше половины кампаний из состояния
+        plan = incremental.build_plan(module, config)
+        _run(module, config, plan)
+        incremental.save_state(module, config, plan)
+        for binom_id in (1, 2, 3, 4):
+            daily[today][binom_id] = (15.0, 2.0)
+        _collect(daily)
+        plan = incremental.build_plan(module, config)
+        assert plan.is_full
+        assert incremental.compare_results(_run(module, config, plan).data, _full(module, config, plan).data) == []
+
+
+if __name__ == "__main__":
+    test_daily_collect_records_changes()
+    test_incremental_matches_full_recompute()
+    test_plan_falls_back_to_full_recompute()
+    print("OK")
@@ -0,0 +1,226 @@
+"""
+Тест шины прогресса фоновых задач (progress_bus)
+
+Проверяет:
+- прогресс пишется в БД не чаще flush_interval, flush() дописывает остальное
+- смена статуса пишется сразу
+- _trim вытесняет только завершенные записанные задачи
+- подписчики получают события, переполненная очередь теряет самые старые
+- записи одной задачи не идут вперемешку: запоздавший снимок "running"
+  не затирает "completed", задача с незаписанной версией остается dirty
+
+Вместо background_tasks - словарь в памяти (переопределены _load и _write).
+
+Использование:
+    python binom_assistant/services/scheduler/test_progress_bus.py
+    pytest binom_assistant/services/scheduler/test_progress_bus.py
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from services.scheduler.progress_bus import ProgressBus
+
+
+class _MemoryBus(ProgressBus):
+    """Шина с таблицей background_tasks в памяти"""
+
+    def __init__(self, task_ids=(1,), **kwargs):
+        super().__init__(**kwargs)
+        self.rows: Dict[int, Dict[str, Any]] = {
+            task_id: {'status': 'pending', 'progress': 0} for task_id in task_ids
+        }
+        self.writes: List[tuple] = []
+        self.fail = set()
+        # Запись задачи ждет события (имитация медленной БД)
+        self.gates: Dict[int, threading.Event] = {}
+        self.writing = threading.Event()
+
+    def _load(self, task_id):
+        row = self.rows.get(task_id)
+        if row is None:
+            return None
+        return {
+            'id': task_id, 'task_type': "test", 'status': row['status'], 'progress': row['progress'],
+            'progress_message': None, 'result': None, 'error': None,
+            'created_at': None, 'started_at': None, 'completed_at': None,
+            '_flushed_at': 0.0, '_dirty': False,
+            '_version': 0, '_written_version': 0, '_flush_lock': threading.Lock()
+        }
+
+    def _write(self, task_id, snapshot):
+        gate = self.gates.pop(task_id, None)
+        if gate is not None:
+            self.writing.set()
+            assert gate.wait(5)
+        if task_id in self.fail:
+            raise RuntimeError("database is locked")
+        self.writes.append((task_id, snapshot['status'], snapshot['progress']))
+        self.rows[task_id] = {'status': snapshot['status'], 'progress': snapshot['progress']}
+
+
+def test_throttled_progress():
+    """Прогресс - не чаще flush_interval, смена статуса - сразу"""
+    bus = _MemoryBus(flush_interval=30)
+
+    bus.update(1, progress=10, message="Блок 1")
+    assert bus.writes == [(1, 'running', 10)]
+    assert bus.get(1)['started_at'] is not None
+
+    for progress in (20, 30, 40):
+        bus.update(1, progress=progress)
+    assert len(bus.writes) == 1
+    assert bus.get(1)['progress'] == 40 and bus.get(1)['progress_message'] == "Блок 1"
+
+    # Прошел интервал
+    bus._tasks[1]['_flushed_at'] -= 30
+    bus.update(1, progress=50)
+    assert bus.writes[-1] == (1, 'running', 50)
+    bus.update(1, progress=60)
+    assert len(bus.writes) == 2
+
+    # Остановка: flush() дописывает последний прогресс один раз
+    assert bus.flush() == 1
+    assert bus.writes[-1] == (1, 'running', 60)
+    assert bus.flush() == 0
+
+    bus.update(1, status="completed", result={'ok': True})
+    assert bus.writes[-1] == (1, 'completed', 60)
+    assert bus.get(1)['completed_at'] is not None and bus.flush() == 0
+
+    # Неизвестная задача и task_id None игнорируются
+    bus.update(2, progress=10)
+    bus.update(None, progress=10)
+    assert bus.get(2) is None and len(bus.writes) == 4
+
+
+def test_failed_write_stays_dirty():
+    """Ошибка записи не снимает dirty, flush() повторяет запись"""
+    bus = _MemoryBus()
+    bus.fail.add(1)
+    bus.update(1, status="failed", error="boom")
+    assert bus.writes == [] and bus._tasks[1]['_dirty']
+
+    bus.fail.clear()
+    assert bus.flush() == 1
+    assert bus.rows[1]['status'] == 'failed' and not bus._tasks[1]['_dirty']
+
+
+def test_trim():
+    """Вытесняются самые старые завершенные и записанные задачи"""
+    bus = _MemoryBus(task_ids=range(1, 7), keep_tasks=3)
+    bus.update(1, status="completed")
+    bus.fail.add(2)
+    bus.update(2, status="completed")
+    bus.update(3, progress=10)
+    bus.update(4, status="completed")
+    assert list(bus._tasks) == [2, 3, 4]
+
+    bus.update(5, progress=10)
+    assert list(bus._tasks) == [2, 3, 5]
+
+    # Все оставшиеся - активные или dirty: в памяти больше keep_tasks
+    bus.update(6, progress=10)
+    assert list(bus._tasks) == [2, 3, 5, 6]
+
+    # Запись задачи 2 удалась - ее можно вытеснить
+    bus.fail.clear()
+    bus.flush()
+    bus.update(6, progress=20)
+    assert list(bus._tasks) == [3, 5, 6]
+
+
+def test_subscribers():
+    """События доходят до подписчиков из других потоков"""
+    bus = _MemoryBus()
+
+    async def scenario():
+        queue = bus.subscribe()
+        small = bus.subscribe(max_events=2)
+        worker = threading.Thread(target=lambda: [bus.update(1, progress=p) for p in (10, 20, 30)])
+        worker.start()
+        worker.join()
+
+        events = [await asyncio.wait_for(queue.get(), 5) for _ in range(3)]
+        assert [e['task']['progress'] for e in events] == [10, 20, 30]
+        assert [e['sequence'] for e in events] == sorted(e['sequence'] for e in events)
+        assert all(not key.startswith('_') for key in events[0]['task'])
+
+        # Переполненная очередь хранит последние события
+        await asyncio.sleep(0)
+        assert small.qsize() == 2
+        assert [small.get_nowait()['task']['progress'] for _ in range(2)] == [20, 30]
+
+        bus.unsubscribe(queue)
+        bus.update(1, progress=40)
+        await asyncio.sleep(0)
+        assert queue.empty() and small.qsize() == 1
+        bus.unsubscribe(small)
+
+    asyncio.run(scenario())
+
+    # Event loop подписчика закрыт - подписка снимается при публикации
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(_subscribe(bus))
+    loop.close()
+    bus.update(1, progress=50)
+    assert bus._subscribers == {}
+
+
+async def _subscribe(bus):
+    return bus.subscribe()
+
+
+def test_stale_snapshot_not_written():
+    """Снимок "running", записанный после "completed", пропускается"""
+    bus = _MemoryBus()
+    bus.update(1, progress=10)
+    stale = dict(bus._tasks[1])
+    bus.update(1, progress=90)
+    bus.update(1, status="completed")
+    assert bus.rows[1]['status'] == 'completed'
+
+    bus._flush(1, stale)
+    assert bus.rows[1] == {'status': 'completed', 'progress': 90}
+    assert bus.writes[-1] == (1, 'completed', 90)
+    assert not bus._tasks[1]['_dirty'] and bus.flush() == 0
+
+
+def test_concurrent_flushes_in_order():
+    """Запись "completed" ждет медленную запись "running" и идет после нее"""
+    bus = _MemoryBus()
+    gate = bus.gates[1] = threading.Event()
+
+    running = threading.Thread(target=bus.update, args=(1,), kwargs={'progress': 10})
+    running.start()
+    assert bus.writing.wait(5)
+
+    completed = threading.Thread(target=bus.update, args=(1,), kwargs={'status': "completed"})
+    completed.start()
+    completed.join(0.2)
+    # Запись "completed" ждет, пока закончится запись "running"
+    assert completed.is_alive() and bus.writes == []
+
+    gate.set()
+    running.join(5)
+    completed.join(5)
+    assert bus.writes == [(1, 'running', 10), (1, 'completed', 10)]
+    assert bus.rows[1]['status'] == 'completed'
+    assert not bus._tasks[1]['_dirty'] and bus.flush() == 0
+
+
+if __name__ == "__main__":
+    test_throttled_progress()
+    test_failed_write_stays_dirty()
+    test_trim()
+    test_subscribers()
+    test_stale_snapshot_not_written()
+    test_concurrent_flushes_in_order()
+    print("OK")
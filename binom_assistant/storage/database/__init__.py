@@ -27,6 +27,8 @@ from .models import (
     ModuleConfig,
     ModuleRun,
     ModuleCache,
+    ModuleState,
+    CampaignDataChange,
     BackgroundTask,
     AppSettings
 )
@@ -67,6 +69,8 @@ __all__ = [
     'ModuleConfig',
     'ModuleRun',
     'ModuleCache',
+    'ModuleState',
+    'CampaignDataChange',
     'BackgroundTask',
     'AppSettings',
     # Migrations
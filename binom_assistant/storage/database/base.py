@@ -59,14 +59,17 @@ def get_session_factory():
     global _session_factory
 
     if _session_factory is None:
+        from .write_tracker import install_write_tracking
+
         engine = get_engine()
-        _session_factory = scoped_session(
-            sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=engine
-            )
+        factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=engine
         )
+        # Поколение данных статистики для кэшей ответов API
+        install_write_tracking(engine, factory)
+        _session_factory = scoped_session(factory)
 
         logger.info("Session factory created")
 
@@ -155,6 +158,19 @@ def create_tables():
 
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+
+    # create_all не добавляет новые индексы в уже существующие таблицы.
+    # Составные индексы моделей (Index('idx_...') в __table_args__) создаем
+    # отдельно; индексы колонок (index=True, ix_*) в БД после миграций
+    # уже есть под именами из миграций
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name and index.name.startswith('idx_'):
+                index.create(bind=engine, checkfirst=True)
+
+    # Полнотекстовый индекс кампаний (виртуальная таблица FTS5 + триггеры)
+    from .campaign_search import ensure_search_index
+    ensure_search_index(engine)
     logger.info("All tables created")
 
 
@@ -168,5 +184,10 @@ def drop_tables():
         logger.warning("Models not yet created")
 
     engine = get_engine()
+
+    # Полнотекстовый индекс кампаний drop_all не удаляет
+    from .campaign_search import drop_search_index
+    drop_search_index(engine)
+
     Base.metadata.drop_all(bind=engine)
     logger.warning("All tables dropped")
@@ -0,0 +1,220 @@
+"""
+Полнотекстовый поиск кампаний (SQLite FTS5, токенизатор trigram)
+
+Поиск по подстроке через LIKE '%x%' читает всю таблицу campaigns.
+Индекс campaign_search хранит триграммы названия, группы и источника
+кампании: подстрока от 3 символов ищется по индексу без учета регистра
+(в том числе для кириллицы, в отличие от LIKE в SQLite).
+
+Индекс - external content таблица над campaigns (названия не дублируются),
+синхронизируется триггерами: новые кампании, переименования и смена
+группы/источника при слиянии метаданных сборщиком, удаление при сбросе
+данных. Обновления last_seen и статистики индекс не трогают. drop_tables()
+удаляет индекс вместе с campaigns, create_tables() создает и заполняет заново.
+
+Если FTS5 с trigram недоступен (не SQLite, старая версия SQLite) или
+запрос короче 3 символов, вызывающий код использует LIKE.
+
+Использование:
+    from storage.database.campaign_search import campaign_search_filter
+
+    condition = campaign_search_filter(session, "nutra")
+    if condition is None:
+        condition = Campaign.current_name.ilike("%nutra%")
+"""
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, func, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from .models import Campaign
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'campaign_search'
+
+# Триграммы: более короткие подстроки индекс не находит
+MIN_QUERY_LENGTH = 3
+
+# Колонки индекса и веса bm25 (совпадение в названии важнее группы и источника)
+SEARCH_COLUMNS = ('current_name', 'group_name', 'ts_name')
+SEARCH_WEIGHTS = (10.0, 3.0, 1.0)
+
+_CREATE_STATEMENTS = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        current_name, group_name, ts_name,
+        content='campaigns', content_rowid='internal_id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON campaigns BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, current_name, group_name, ts_name)
+        VALUES (new.internal_id, new.current_name, new.group_name, new.ts_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON campaigns BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, current_name, group_name, ts_name)
+        VALUES ('delete', old.internal_id, old.current_name, old.group_name, old.ts_name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF current_name, group_name, ts_name ON campaigns
+    WHEN old.current_name IS NOT new.current_name
+        OR old.group_name IS NOT new.group_name
+        OR old.ts_name IS NOT new.ts_name
+    BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, current_name, group_name, ts_name)
+        VALUES ('delete', old.internal_id, old.current_name, old.group_name, old.ts_name);
+        INSERT INTO {SEARCH_TABLE}(rowid, current_name, group_name, ts_name)
+        VALUES (new.internal_id, new.current_name, new.group_name, new.ts_name);
+    END""",
+)
+
+_search = table(SEARCH_TABLE, column('rowid'), column(SEARCH_TABLE))
+
+# Доступность индекса по URL движка (проверяется один раз)
+_available: Dict[str, bool] = {}
+
+
+def ensure_search_index(engine) -> bool:
+    """
+    Создает индекс и триггеры (если их нет) и заполняет индекс при создании.
+
+    Args:
+        engine: Движок SQLAlchemy
+
+    Returns:
+        True, если индекс доступен
+    """
+    if engine.dialect.name != 'sqlite':
+        _available[str(engine.url)] = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': SEARCH_TABLE}
+            ).first() is not None
+            for statement in _CREATE_STATEMENTS:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+                logger.info("Campaign search index created")
+        _available[str(engine.url)] = True
+    except OperationalError as e:
+        logger.warning(f"Campaign search index unavailable (FTS5 trigram): {e}")
+        _available[str(engine.url)] = False
+    return _available[str(engine.url)]
+
+
+def drop_search_index(engine) -> None:
+    """
+    Удаляет индекс и триггеры (вместе с таблицей campaigns).
+
+    drop_all не знает о виртуальной таблице: без этого индекс со старыми
+    строками переживает пересоздание campaigns, и ensure_search_index
+    его не перестраивает.
+
+    Args:
+        engine: Движок SQLAlchemy
+    """
+    _available.pop(str(engine.url), None)
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as conn:
+        for suffix in ('ai', 'ad', 'au'):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+def is_search_available(session) -> bool:
+    """Есть ли индекс в БД сессии"""
+    engine = session.get_bind()
+    key = str(engine.url)
+    if key not in _available:
+        if engine.dialect.name != 'sqlite':
+            _available[key] = False
+        else:
+            _available[key] = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': SEARCH_TABLE}
+            ).first() is not None
+    return _available[key]
+
+
+def build_match_query(query: str, columns: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    Выражение MATCH для поиска подстроки.
+
+    Args:
+        query: Строка поиска (как для LIKE '%query%')
+        columns: Колонки индекса (None - все)
+
+    Returns:
+        Выражение FTS5 или None, если запрос короче MIN_QUERY_LENGTH
+    """
+    query = (query or '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return None
+    phrase = '"' + query.replace('"', '""') + '"'
+    if columns:
+        return '{' + ' '.join(columns) + '}: ' + phrase
+    return phrase
+
+
+def campaign_search_filter(session, query: str, columns: Sequence[str] = ('current_name',)):
+    """
+    Условие для query(Campaign): кампании, найденные индексом.
+
+    Args:
+        session: Сессия БД
+        query: Строка поиска
+        columns: Колонки индекса (по умолчанию только название, как прежний LIKE)
+
+    Returns:
+        SQL-условие или None - индекс недоступен или запрос короткий (нужен LIKE)
+    """
+    match = build_match_query(query, columns)
+    if match is None or not is_search_available(session):
+        return None
+    return Campaign.internal_id.in_(
+        select(_search.c.rowid).where(_search.c[SEARCH_TABLE].op('MATCH')(match))
+    )
+
+
+def search_campaigns(
+    session,
+    query: str,
+    limit: int = 20,
+    columns: Optional[Sequence[str]] = None
+) -> Optional[List[Tuple[Campaign, float]]]:
+    """
+    Кампании по релевантности (bm25: название, затем группа и источник).
+
+    Args:
+        session: Сессия БД
+        query: Строка поиска
+        limit: Максимум результатов
+        columns: Колонки индекса (None - все)
+
+    Returns:
+        [(кампания, score)] - чем больше score, тем релевантнее;
+        None - индекс недоступен или запрос короткий
+    """
+    match = build_match_query(query, columns)
+    if match is None or not is_search_available(session):
+        return None
+
+    rank = func.bm25(_search.c[SEARCH_TABLE], *SEARCH_WEIGHTS).label('rank')
+    ranked = (
+        select(_search.c.rowid, rank)
+        .where(_search.c[SEARCH_TABLE].op('MATCH')(match))
+        .order_by(rank)
+        .limit(limit)
+        .subquery()
+    )
+    rows = (
+        session.query(Campaign, ranked.c.rank)
+        .join(ranked, Campaign.internal_id == ranked.c.rowid)
+        .order_by(ranked.c.rank)
+        .all()
+    )
+    # bm25 отрицательный: меньше - релевантнее
+    return [(campaign, round(-rank, 6)) for campaign, rank in rows]
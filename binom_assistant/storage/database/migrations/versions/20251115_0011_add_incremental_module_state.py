@@ -0,0 +1,58 @@
+"""
+Миграция 0011: Инкрементальный пересчет модулей
+
+Создает:
+- campaign_data_changes: журнал изменений дневной статистики кампаний (dirty set от сборщика)
+- module_states: промежуточное состояние модулей по кампаниям
+
+Дата: 2025-11-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# Ревизии
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Создание таблиц для инкрементального пересчета"""
+    op.create_table(
+        'campaign_data_changes',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.internal_id']),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_campaign_data_changes_campaign_id', 'campaign_data_changes', ['campaign_id'])
+    op.create_index('ix_campaign_data_changes_changed_at', 'campaign_data_changes', ['changed_at'])
+
+    op.create_table(
+        'module_states',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('module_id', sa.String(length=100), nullable=False),
+        sa.Column('cache_key', sa.String(length=200), nullable=False),
+        sa.Column('window_start', sa.Date(), nullable=False),
+        sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('states', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('module_id', 'cache_key', name='unique_module_state')
+    )
+    op.create_index('ix_module_states_module_id', 'module_states', ['module_id'])
+
+
+def downgrade():
+    """Удаление таблиц инкрементального пересчета"""
+    op.drop_index('ix_module_states_module_id', table_name='module_states')
+    op.drop_table('module_states')
+
+    op.drop_index('ix_campaign_data_changes_changed_at', table_name='campaign_data_changes')
+    op.drop_index('ix_campaign_data_changes_campaign_id', table_name='campaign_data_changes')
+    op.drop_table('campaign_data_changes')
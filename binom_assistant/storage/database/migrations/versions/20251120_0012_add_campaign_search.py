@@ -0,0 +1,63 @@
+"""
+Миграция 0012: Полнотекстовый поиск кампаний
+
+Создает:
+- campaign_search: FTS5 индекс (trigram) по названию, группе и источнику кампании
+  (external content над campaigns)
+- триггеры синхронизации индекса при вставке, изменении имен и удалении кампаний
+
+Требует SQLite 3.34+ (токенизатор trigram).
+
+Дата: 2025-11-20
+"""
+from alembic import op
+
+
+# Ревизии
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Создание индекса, триггеров и заполнение индекса"""
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS campaign_search USING fts5(
+            current_name, group_name, ts_name,
+            content='campaigns', content_rowid='internal_id', tokenize='trigram'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS campaign_search_ai AFTER INSERT ON campaigns BEGIN
+            INSERT INTO campaign_search(rowid, current_name, group_name, ts_name)
+            VALUES (new.internal_id, new.current_name, new.group_name, new.ts_name);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS campaign_search_ad AFTER DELETE ON campaigns BEGIN
+            INSERT INTO campaign_search(campaign_search, rowid, current_name, group_name, ts_name)
+            VALUES ('delete', old.internal_id, old.current_name, old.group_name, old.ts_name);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS campaign_search_au AFTER UPDATE OF current_name, group_name, ts_name ON campaigns
+        WHEN old.current_name IS NOT new.current_name
+            OR old.group_name IS NOT new.group_name
+            OR old.ts_name IS NOT new.ts_name
+        BEGIN
+            INSERT INTO campaign_search(campaign_search, rowid, current_name, group_name, ts_name)
+            VALUES ('delete', old.internal_id, old.current_name, old.group_name, old.ts_name);
+            INSERT INTO campaign_search(rowid, current_name, group_name, ts_name)
+            VALUES (new.internal_id, new.current_name, new.group_name, new.ts_name);
+        END
+    """)
+    op.execute("INSERT INTO campaign_search(campaign_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    """Удаление триггеров и индекса"""
+    op.execute("DROP TRIGGER IF EXISTS campaign_search_au")
+    op.execute("DROP TRIGGER IF EXISTS campaign_search_ad")
+    op.execute("DROP TRIGGER IF EXISTS campaign_search_ai")
+    op.execute("DROP TABLE IF EXISTS campaign_search")
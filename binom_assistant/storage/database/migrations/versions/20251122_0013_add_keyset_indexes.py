@@ -0,0 +1,32 @@
+"""
+Миграция 0013: Индексы keyset-пагинации
+
+Создает составные индексы по ключам сортировки списков API:
+- idx_module_runs_module_started: история запусков модуля (module_id, started_at, id)
+- idx_module_runs_status_completed: алерты из успешных запусков (status, completed_at, id)
+- idx_chat_sessions_updated: список чатов (updated_at, id)
+
+Дата: 2025-11-22
+"""
+from alembic import op
+
+
+# Ревизии
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Создание индексов"""
+    op.create_index('idx_module_runs_module_started', 'module_runs', ['module_id', 'started_at', 'id'])
+    op.create_index('idx_module_runs_status_completed', 'module_runs', ['status', 'completed_at', 'id'])
+    op.create_index('idx_chat_sessions_updated', 'chat_sessions', ['updated_at', 'id'])
+
+
+def downgrade():
+    """Удаление индексов"""
+    op.drop_index('idx_chat_sessions_updated', 'chat_sessions')
+    op.drop_index('idx_module_runs_status_completed', 'module_runs')
+    op.drop_index('idx_module_runs_module_started', 'module_runs')
@@ -5,7 +5,7 @@ import json
 from datetime import datetime
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime,
-    Date, Numeric, Text, ForeignKey, JSON, UniqueConstraint
+    Date, Numeric, Text, ForeignKey, JSON, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship, validates
 from .base import Base
@@ -696,6 +696,12 @@ class ModuleRun(Base):
     # Связи
     config = relationship("ModuleConfig", back_populates="runs")
 
+    __table_args__ = (
+        # Ключи keyset-пагинации: история модуля и алерты (успешные запуски по времени)
+        Index('idx_module_runs_module_started', 'module_id', 'started_at', 'id'),
+        Index('idx_module_runs_status_completed', 'status', 'completed_at', 'id'),
+    )
+
     def __repr__(self):
         return f"<ModuleRun {self.module_id} at {self.started_at}>"
 
@@ -722,6 +728,49 @@ class ModuleCache(Base):
         return f"<ModuleCache {self.module_id}:{self.cache_key}>"
 
 
+class ModuleState(Base):
+    """
+    Промежуточное состояние модуля по кампаниям для инкрементального пересчета.
+    Одна запись на модуль + набор параметров (cache_key).
+    """
+    __tablename__ = 'module_states'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    module_id = Column(String(100), nullable=False, index=True)
+    cache_key = Column(String(200), nullable=False)
+    window_start = Column(Date, nullable=False)  # начало окна данных на момент расчета
+    data_version = Column(Integer, nullable=False, default=0)  # последний учтенный CampaignDataChange.id
+    states = Column(JSON, nullable=False)  # campaign_id -> состояние модуля по кампании
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('module_id', 'cache_key', name='unique_module_state'),
+    )
+
+    def __repr__(self):
+        return f"<ModuleState {self.module_id}:{self.cache_key} v{self.data_version}>"
+
+
+class CampaignDataChange(Base):
+    """
+    Журнал изменений дневной статистики кампаний (dirty set).
+    Пишется сборщиком при создании/изменении строки campaign_stats_daily.
+    id монотонно растет и служит версией данных.
+    """
+    __tablename__ = 'campaign_data_changes'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    campaign_id = Column(Integer, ForeignKey('campaigns.internal_id'), nullable=False, index=True)
+    date = Column(Date, nullable=False)  # день статистики, который изменился
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # AUTOINCREMENT: id не переиспользуется после очистки журнала (версия только растет)
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    def __repr__(self):
+        return f"<CampaignDataChange #{self.id} campaign={self.campaign_id} date={self.date}>"
+
+
 class BackgroundTask(Base):
     """
     Модель для отслеживания фоновых задач.
@@ -844,17 +893,30 @@ class ChatSession(Base):
     # Связи
     messages = relationship("ChatMessage", back_populates="chat", cascade="all, delete-orphan", order_by="ChatMessage.created_at")
 
+    __table_args__ = (
+        # Ключ keyset-пагинации списка чатов
+        Index('idx_chat_sessions_updated', 'updated_at', 'id'),
+    )
+
     def __repr__(self):
         return f"<ChatSession {self.id}: {self.title}>"
 
-    def to_dict(self):
-        """Преобразует модель в словарь"""
+    def to_dict(self, message_count=None):
+        """
+        Преобразует модель в словарь.
+
+        Args:
+            message_count: Количество сообщений, если уже посчитано
+                (иначе загружаются все сообщения чата)
+        """
+        if message_count is None:
+            message_count = len(self.messages) if self.messages else 0
         return {
             'id': self.id,
             'title': self.title,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'message_count': len(self.messages) if self.messages else 0,
+            'message_count': message_count,
         }
 
 
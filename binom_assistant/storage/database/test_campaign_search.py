@@ -0,0 +1,124 @@
+"""
+Тест полнотекстового поиска кампаний (campaign_search)
+
+Проверяет:
+- индекс заполняется при создании и следует за вставкой, переименованием,
+  сменой группы и удалением кампаний
+- поиск подстроки без учета регистра, в том числе кириллицы
+- короткий запрос - None (вызывающий код использует LIKE)
+- совпадение в названии выше совпадения в источнике
+- drop_tables() + create_tables() не оставляют в индексе старые кампании
+
+Использование:
+    python binom_assistant/storage/database/test_campaign_search.py
+    pytest binom_assistant/storage/database/test_campaign_search.py
+"""
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from storage.database import base as db_base
+from storage.database.base import Base, create_tables, drop_tables
+from storage.database.models import Campaign
+from storage.database.campaign_search import campaign_search_filter, ensure_search_index, search_campaigns
+
+NOW = datetime(2024, 5, 20)
+
+
+def _session(campaigns):
+    """Сессия in-memory SQLite с кампаниями (binom_id, name, group, ts) и индексом"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Campaign(binom_id=binom_id, current_name=name, group_name=group, ts_name=ts, first_seen=NOW, last_seen=NOW)
+        for binom_id, name, group, ts in campaigns
+    ])
+    session.commit()
+    assert ensure_search_index(engine)
+    return session
+
+
+def _names(session, query, columns=('current_name',)):
+    condition = campaign_search_filter(session, query, columns)
+    return sorted(c.current_name for c in session.query(Campaign).filter(condition))
+
+
+def test_index_follows_campaign_changes():
+    """Индекс заполнен при создании и синхронизируется триггерами"""
+    session = _session([(1, "Nutra Keto RU", "Nutra", "Facebook"), (2, "Крипта Бот", "Finance", "TikTok")])
+    assert _names(session, "keto") == ["Nutra Keto RU"]
+    assert _names(session, "КРИПТ") == ["Крипта Бот"]
+
+    session.add(Campaign(binom_id=3, current_name="Keto Max", group_name="Nutra", ts_name="Google",
+                         first_seen=NOW, last_seen=NOW))
+    session.commit()
+    assert _names(session, "keto") == ["Keto Max", "Nutra Keto RU"]
+
+    campaign = session.query(Campaign).filter_by(binom_id=2).one()
+    campaign.current_name = "Gambling X"
+    campaign.group_name = "Casino"
+    session.commit()
+    assert _names(session, "крипт") == []
+    assert _names(session, "gambl") == ["Gambling X"]
+    assert _names(session, "casino", columns=('group_name',)) == ["Gambling X"]
+
+    session.query(Campaign).filter_by(binom_id=1).delete()
+    session.commit()
+    assert _names(session, "keto") == ["Keto Max"]
+    session.close()
+
+
+def test_short_query_and_ranking():
+    """Короткий запрос не ищется индексом, название ранжируется выше источника"""
+    session = _session([(1, "Push RU", "Nutra", "Facebook"), (2, "Keto", "Nutra", "PushHouse")])
+    assert campaign_search_filter(session, "pu") is None
+    assert search_campaigns(session, "pu") is None
+
+    ranked = search_campaigns(session, "push")
+    assert [c.current_name for c, _ in ranked] == ["Push RU", "Keto"]
+    assert ranked[0][1] >= ranked[1][1]
+    session.close()
+
+
+def test_recreated_tables_rebuild_index():
+    """После drop_tables() и create_tables() индекс не содержит удаленных кампаний"""
+    saved = db_base._engine
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/test.db")
+        db_base._engine = engine
+        try:
+            create_tables()
+            session = sessionmaker(bind=engine)()
+            session.add(Campaign(binom_id=1, current_name="Old Crypto Offer", first_seen=NOW, last_seen=NOW))
+            session.commit()
+            assert _names(session, "crypto") == ["Old Crypto Offer"]
+            session.close()
+
+            drop_tables()
+            create_tables()
+            session = sessionmaker(bind=engine)()
+            session.add(Campaign(binom_id=2, current_name="Fresh Nutra", first_seen=NOW, last_seen=NOW))
+            session.commit()
+            assert _names(session, "crypto") == []
+            assert _names(session, "nutra") == ["Fresh Nutra"]
+            session.close()
+        finally:
+            engine.dispose()
+            db_base._engine = saved
+
+
+if __name__ == "__main__":
+    test_index_follows_campaign_changes()
+    test_short_query_and_ranking()
+    test_recreated_tables_rebuild_index()
+    print("OK")
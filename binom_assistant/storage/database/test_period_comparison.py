@@ -0,0 +1,126 @@
+"""
+Тест сравнения смежных периодов (period_comparison)
+
+Проверяет:
+- adjacent_periods строит смежные окна от последнего к более ранним
+- compare_periods совпадает с отдельными запросами по каждому периоду
+- кампания без строк в периоде получает rows = 0 и None в метриках
+- атрибуты присоединяются к ключу, без группировки - одна строка итогов
+
+Использование:
+    python binom_assistant/storage/database/test_period_comparison.py
+    pytest binom_assistant/storage/database/test_period_comparison.py
+"""
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from storage.database.base import Base
+from storage.database.models import Campaign, CampaignStatsDaily
+from storage.database.period_comparison import adjacent_periods, compare_periods
+
+TODAY = date(2024, 5, 20)
+
+
+def _session():
+    """Сессия in-memory SQLite: 3 кампании, 10 дней, у третьей только последние 3 дня"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    now = datetime(2024, 5, 20)
+    for binom_id in (1, 2, 3):
+        session.add(Campaign(
+            binom_id=binom_id, current_name=f"c{binom_id}", group_name="g" if binom_id != 2 else None,
+            first_seen=now, last_seen=now
+        ))
+    session.flush()
+    for campaign in session.query(Campaign).all():
+        for day in range(3 if campaign.binom_id == 3 else 10):
+            session.add(CampaignStatsDaily(
+                campaign_id=campaign.internal_id, date=TODAY - timedelta(days=day),
+                clicks=100 + day * campaign.binom_id, leads=day % 4,
+                cost=Decimal("1.13") * (day + campaign.binom_id), revenue=Decimal("0.57") * day,
+                approve=Decimal(day * 5), snapshot_time=now
+            ))
+    session.commit()
+    return session
+
+
+def test_adjacent_periods():
+    """Окна по days дней без разрывов"""
+    periods = adjacent_periods(TODAY, 3, count=3)
+
+    assert periods[0] == (TODAY - timedelta(days=2), TODAY)
+    assert periods[1] == (TODAY - timedelta(days=5), TODAY - timedelta(days=3))
+    assert periods[2][1] == periods[1][0] - timedelta(days=1)
+
+
+def test_matches_separate_queries():
+    """Суммы по кампаниям как у отдельного запроса на каждый период"""
+    session = _session()
+    periods = adjacent_periods(TODAY, 4)
+    rows = compare_periods(
+        session, periods,
+        sums={"cost": CampaignStatsDaily.cost, "clicks": CampaignStatsDaily.clicks},
+        key=CampaignStatsDaily.campaign_id,
+        attributes=[Campaign.current_name, Campaign.group_name],
+        attributes_key=Campaign.internal_id
+    )
+
+    for i, (date_from, date_to) in enumerate(periods):
+        expected = dict(
+            (row[0], (row[1], row[2])) for row in session.query(
+                CampaignStatsDaily.campaign_id,
+                func.sum(CampaignStatsDaily.cost),
+                func.sum(CampaignStatsDaily.clicks)
+            ).filter(
+                CampaignStatsDaily.date >= date_from,
+                CampaignStatsDaily.date <= date_to
+            ).group_by(CampaignStatsDaily.campaign_id)
+        )
+        actual = {
+            row["key"]: (row["periods"][i]["cost"], row["periods"][i]["clicks"])
+            for row in rows if row["periods"][i]["rows"]
+        }
+        assert actual == expected
+
+    assert [row["key"] for row in rows] == sorted(row["key"] for row in rows)
+    assert rows[1]["attributes"] == ("c2", None)
+    assert rows[0]["delta"]["clicks"] == rows[0]["current"]["clicks"] - rows[0]["previous"]["clicks"]
+    assert isinstance(rows[0]["current"]["cost"], Decimal)
+
+
+def test_missing_period_and_totals():
+    """Нет строк в периоде - rows = 0 и None; без key - одна строка итогов"""
+    session = _session()
+    periods = adjacent_periods(TODAY, 3)
+    rows = compare_periods(session, periods, sums={"leads": CampaignStatsDaily.leads}, key=CampaignStatsDaily.campaign_id)
+
+    assert rows[2]["previous"] == {"rows": 0, "leads": None}
+    assert rows[2]["delta"]["leads"] == float(rows[2]["current"]["leads"])
+
+    totals = compare_periods(
+        session, periods,
+        sums={"leads": CampaignStatsDaily.leads},
+        averages={"approve": CampaignStatsDaily.approve}
+    )
+    assert len(totals) == 1 and totals[0]["key"] is None
+    assert totals[0]["current"]["rows"] == 9
+    assert totals[0]["previous"]["rows"] == 6
+    assert float(totals[0]["previous"]["approve"]) == 20.0
+
+
+if __name__ == "__main__":
+    test_adjacent_periods()
+    test_matches_separate_queries()
+    test_missing_period_and_totals()
+    print("OK")
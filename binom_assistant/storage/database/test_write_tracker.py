@@ -0,0 +1,105 @@
+"""
+Тест поколения данных статистики (write_tracker)
+
+Проверяет:
+- commit с записью в таблицу статистики увеличивает поколение
+- чтение, откат и запись в неотслеживаемую таблицу поколение не меняют
+- bulk-операции без ORM-событий тоже учитываются
+- у статистики и модулей отдельные поколения
+
+Использование:
+    python binom_assistant/storage/database/test_write_tracker.py
+    pytest binom_assistant/storage/database/test_write_tracker.py
+"""
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from storage.database.base import Base
+from storage.database.models import Campaign, CampaignStatsDaily, ModuleRun
+from storage.database.write_tracker import MODULES_SCOPE, STATS_SCOPE, get_generation, install_write_tracking
+
+
+def _factory():
+    """Фабрика сессий in-memory SQLite с отслеживанием записей"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    install_write_tracking(engine, factory)
+    return factory
+
+
+def test_commit_bumps_generation():
+    """Запись + commit - новое поколение, чтение и откат - без изменений"""
+    factory = _factory()
+    session = factory()
+    now = datetime(2024, 5, 20)
+
+    before = get_generation()
+    session.add(Campaign(binom_id=1, current_name="c1", first_seen=now, last_seen=now))
+    session.commit()
+    assert get_generation() == before + 1
+
+    before = get_generation()
+    session.query(Campaign).count()
+    session.commit()
+    assert get_generation() == before
+
+    session.add(Campaign(binom_id=2, current_name="c2", first_seen=now, last_seen=now))
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert get_generation() == before
+    session.close()
+
+
+def test_bulk_and_untracked_tables():
+    """Bulk UPDATE учитывается, запись в чужую таблицу - нет"""
+    factory = _factory()
+    session = factory()
+    now = datetime(2024, 5, 20)
+    session.add(Campaign(binom_id=1, current_name="c1", first_seen=now, last_seen=now))
+    session.flush()
+    session.add(CampaignStatsDaily(campaign_id=1, date=date(2024, 5, 20), clicks=1, snapshot_time=now))
+    session.commit()
+
+    before = get_generation()
+    session.query(CampaignStatsDaily).update({CampaignStatsDaily.clicks: 2}, synchronize_session=False)
+    session.commit()
+    assert get_generation() == before + 1
+
+    before = get_generation()
+    session.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY)"))
+    session.execute(text("INSERT INTO notes (id) VALUES (1)"))
+    session.commit()
+    assert get_generation() == before
+    session.close()
+
+
+def test_scopes():
+    """Запуск модуля меняет поколение модулей, но не статистики"""
+    factory = _factory()
+    session = factory()
+
+    stats_before = get_generation(STATS_SCOPE)
+    modules_before = get_generation(MODULES_SCOPE)
+    session.add(ModuleRun(module_id="m", started_at=datetime(2024, 5, 20), status="success"))
+    session.commit()
+    assert get_generation(STATS_SCOPE) == stats_before
+    assert get_generation(MODULES_SCOPE) == modules_before + 1
+    session.close()
+
+
+if __name__ == "__main__":
+    test_commit_bumps_generation()
+    test_bulk_and_untracked_tables()
+    test_scopes()
+    print("OK")
@@ -0,0 +1,138 @@
+"""
+Поколения данных (in-process счетчики фиксаций по областям)
+
+Каждый commit сессии, которая писала в отслеживаемые таблицы, увеличивает
+поколение их области:
+- stats - кампании, дневная статистика, агрегаты периодов и недель,
+  источники, офферы, партнерки
+- modules - конфигурации, запуски и состояния модулей, алерты
+
+Кэши ответов API и ETag добавляют поколение в ключ и устаревают сразу после
+фиксации новых данных сборщиком, recalculate_stat_periods, пересборкой
+или запуском модуля.
+
+Запись определяется по SQL-оператору (INSERT / UPDATE / DELETE / REPLACE),
+поэтому учитываются и bulk-операции без ORM-событий. Поколение растет
+только после успешного commit: читатель не закэширует старые данные
+под новым поколением. Откат сбрасывает отметки без изменения поколения.
+
+Использование:
+    from storage.database.write_tracker import get_generation
+
+    key = (route, params, get_generation())
+    etag_source = (path, get_generation("stats"), get_generation("modules"))
+"""
+import logging
+import re
+import threading
+from typing import Dict, Set
+
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+# Области данных
+STATS_SCOPE = 'stats'
+MODULES_SCOPE = 'modules'
+
+# Отслеживаемые таблицы -> область
+TRACKED_TABLES = {
+    'campaigns': STATS_SCOPE,
+    'name_changes': STATS_SCOPE,
+    'campaign_stats_daily': STATS_SCOPE,
+    'stats_period': STATS_SCOPE,
+    'stats_weekly': STATS_SCOPE,
+    'traffic_sources': STATS_SCOPE,
+    'traffic_source_stats_daily': STATS_SCOPE,
+    'affiliate_networks': STATS_SCOPE,
+    'network_stats_daily': STATS_SCOPE,
+    'offers': STATS_SCOPE,
+    'offer_stats_daily': STATS_SCOPE,
+    'campaign_data_changes': STATS_SCOPE,
+    'module_configs': MODULES_SCOPE,
+    'module_runs': MODULES_SCOPE,
+    'module_states': MODULES_SCOPE,
+    'alerts': MODULES_SCOPE,
+}
+
+_WRITE_STATEMENT = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+
+# Ключи в connection.info / session.info
+_WRITTEN_KEY = 'tracked_written_scopes'
+_CONNECTIONS_KEY = 'tracked_connections'
+
+_generations: Dict[str, int] = {STATS_SCOPE: 0, MODULES_SCOPE: 0}
+_lock = threading.Lock()
+
+
+def get_generation(scope: str = STATS_SCOPE) -> int:
+    """Текущее поколение данных области (по умолчанию статистики)"""
+    return _generations[scope]
+
+
+def bump_generation(reason: str = "manual", scope: str = STATS_SCOPE) -> int:
+    """
+    Увеличивает поколение (для записей в обход сессий, например restore бэкапа).
+
+    Args:
+        reason: Причина (для лога)
+        scope: Область данных
+
+    Returns:
+        Новое поколение
+    """
+    with _lock:
+        _generations[scope] += 1
+        generation = _generations[scope]
+    logger.debug(f"Data generation {scope} -> {generation} ({reason})")
+    return generation
+
+
+def _on_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Отмечает соединение, если оператор пишет в отслеживаемую таблицу"""
+    match = _WRITE_STATEMENT.match(statement)
+    if match:
+        scope = TRACKED_TABLES.get(match.group(1).lower())
+        if scope:
+            conn.info.setdefault(_WRITTEN_KEY, set()).add(scope)
+
+
+def _on_begin(session, transaction, connection):
+    """Запоминает соединения транзакции сессии (info живет вместе с DBAPI соединением)"""
+    session.info.setdefault(_CONNECTIONS_KEY, []).append(connection.info)
+
+
+def _collect_writes(session) -> Set[str]:
+    """Снимает отметки записи с соединений транзакции"""
+    written = set()
+    for info in session.info.pop(_CONNECTIONS_KEY, []):
+        written |= info.pop(_WRITTEN_KEY, set())
+    return written
+
+
+def _on_commit(session):
+    for scope in sorted(_collect_writes(session)):
+        bump_generation("commit", scope)
+
+
+def _on_rollback(session):
+    _collect_writes(session)
+
+
+def install_write_tracking(engine, session_factory) -> None:
+    """
+    Подписывает движок и фабрику сессий на отслеживание записей.
+
+    Args:
+        engine: Движок SQLAlchemy
+        session_factory: sessionmaker, из которого создаются сессии приложения
+    """
+    event.listen(engine, "after_cursor_execute", _on_cursor_execute)
+    event.listen(session_factory, "after_begin", _on_begin)
+    event.listen(session_factory, "after_commit", _on_commit)
+    event.listen(session_factory, "after_rollback", _on_rollback)
+    logger.debug("Stats write tracking installed")
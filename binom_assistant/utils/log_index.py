@@ -0,0 +1,135 @@
+"""
+Индекс предупреждений и ошибок лог-файла
+
+Рядом с лог-файлом (app.log) хранится app.log.idx - смещения и время
+записей уровня WARNING и выше. /log-errors и уведомления читают по индексу
+только нужные строки, а не весь файл.
+
+Формат индекса (текст, только дописывается):
+    # start <смещение>                   - индекс полон для записей с этого смещения
+    <смещение>\\t<время>\\t<уровень>      - по строке на запись
+
+Индекс ведет ErrorIndexFileHandler (вместо RotatingFileHandler): при ротации
+индекс начинается заново. Записи до start (лог без индекса, внешняя очистка)
+читатель находит обратным чтением файла (utils.log_reader).
+
+Использование:
+    handler = ErrorIndexFileHandler(log_file, maxBytes=..., backupCount=5, encoding='utf-8')
+"""
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Union
+
+INDEX_SUFFIX = '.idx'
+
+# Минимальный уровень записей в индексе (/log-errors показывает и WARNING)
+INDEX_LEVEL = logging.WARNING
+
+# Формат времени в индексе - как asctime в логах (utils.logging_setup)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class IndexEntry(NamedTuple):
+    """Запись индекса"""
+    offset: int
+    timestamp: str
+    level: str
+
+
+class ErrorIndex(NamedTuple):
+    """Индекс лог-файла: с какого смещения он полон и записи по порядку"""
+    start: int
+    entries: List[IndexEntry]
+
+
+def index_path(log_path: Union[str, Path]) -> Path:
+    """Путь к индексу лог-файла"""
+    return Path(str(log_path) + INDEX_SUFFIX)
+
+
+def reset_error_index(log_path: Union[str, Path], start: Optional[int] = None) -> None:
+    """
+    Начинает индекс заново.
+
+    Args:
+        log_path: Лог-файл
+        start: С какого смещения индекс полон (None - текущий размер лога)
+    """
+    if start is None:
+        start = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+    with open(index_path(log_path), 'w', encoding='utf-8') as f:
+        f.write(f"# start {start}\n")
+
+
+def load_error_index(log_path: Union[str, Path]) -> Optional[ErrorIndex]:
+    """
+    Читает индекс лог-файла.
+
+    Returns:
+        ErrorIndex или None, если индекса нет или он поврежден
+    """
+    try:
+        with open(index_path(log_path), 'r', encoding='utf-8') as f:
+            header = f.readline()
+            if not header.startswith('# start '):
+                return None
+            start = int(header[len('# start '):])
+            entries = []
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                # Недописанная последняя строка (сбой во время записи) пропускается
+                if len(parts) != 3 or not parts[0].isdigit():
+                    continue
+                entries.append(IndexEntry(int(parts[0]), parts[1], parts[2]))
+        return ErrorIndex(start, entries)
+    except (OSError, ValueError):
+        return None
+
+
+class ErrorIndexFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler, который ведет индекс записей WARNING и выше.
+
+    Смещение записи - размер файла перед записью (файл пишет один процесс,
+    под блокировкой handler'а). Индекс открывается на каждую запись:
+    ошибки редки, а очистка логов может удалить файл индекса.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        # Лог без индекса: записи до текущего конца индексом не покрыты
+        if not index_path(self.baseFilename).exists():
+            reset_error_index(self.baseFilename)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            offset = None
+            if record.levelno >= INDEX_LEVEL:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.flush()
+                offset = os.fstat(self.stream.fileno()).st_size
+            logging.FileHandler.emit(self, record)
+            if offset is not None:
+                self._index(offset, record)
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        # Новый файл пуст - индекс полон с начала
+        reset_error_index(self.baseFilename, start=0)
+
+    def _index(self, offset: int, record: logging.LogRecord) -> None:
+        """Дописывает запись в индекс"""
+        path = index_path(self.baseFilename)
+        if not path.exists():
+            reset_error_index(self.baseFilename, start=offset)
+        timestamp = time.strftime(TIMESTAMP_FORMAT, time.localtime(record.created))
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(f"{offset}\t{timestamp}\t{record.levelname}\n")
@@ -0,0 +1,213 @@
+"""
+Чтение лог-файлов без загрузки целиком
+
+- read_lines_reverse: строки файла с конца, блоками (память не зависит от размера лога)
+- tail_lines: последние N строк, подходящих под условие
+- find_log_lines: записи WARNING/ERROR/CRITICAL за период - по индексу
+  (utils.log_index), непокрытая индексом часть файла читается с конца
+  до начала периода
+- iter_log_bytes: содержимое файлов блоками для скачивания
+
+Формат строк: 2025-11-05 15:04:06 - component.name - LEVEL - message
+
+Использование:
+    from utils.log_reader import LOG_DIR, find_log_lines, tail_lines
+
+    errors = find_log_lines(LOG_DIR / "app.log", limit=50, since=cutoff)
+"""
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from .log_index import load_error_index
+
+# Каталог логов (utils.logging_setup пишет сюда app.log)
+LOG_DIR = Path(__file__).parent.parent / "logs"
+
+# Лог-файлы, которые показывает и отдает веб-интерфейс
+LOG_FILES = ("app.log", "collector.log", "stat_periods.log")
+
+# Уровни, записи которых есть в индексе
+INDEXED_LEVELS = ("WARNING", "ERROR", "CRITICAL")
+
+BLOCK_SIZE = 64 * 1024
+
+# Длина строки, читаемой по смещению из индекса
+MAX_LINE_BYTES = 64 * 1024
+
+TIMESTAMP_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def get_log_files() -> List[Path]:
+    """Существующие лог-файлы веб-интерфейса"""
+    return [LOG_DIR / name for name in LOG_FILES if (LOG_DIR / name).exists()]
+
+
+def detect_level(line: str) -> str:
+    """Уровень записи по строке лога (строки без уровня - INFO)"""
+    if " - ERROR - " in line or ":ERROR:" in line:
+        return "ERROR"
+    if " - WARNING - " in line or ":WARNING:" in line:
+        return "WARNING"
+    if " - DEBUG - " in line or ":DEBUG:" in line:
+        return "DEBUG"
+    if " - CRITICAL - " in line or ":CRITICAL:" in line:
+        return "CRITICAL"
+    return "INFO"
+
+
+def parse_log_line(line: str) -> Dict[str, Optional[str]]:
+    """
+    Разбирает строку лога.
+
+    Returns:
+        Dict: timestamp (None, если строка без времени), component, level, message
+    """
+    match = TIMESTAMP_PATTERN.match(line)
+    parts = line.split(" - ", 3)
+    return {
+        "timestamp": match.group(1) if match else None,
+        "component": parts[1] if len(parts) > 1 else "unknown",
+        "level": parts[2].strip() if len(parts) > 2 else detect_level(line),
+        "message": parts[3] if len(parts) > 3 else line
+    }
+
+
+def read_lines_reverse(path: Path, end: Optional[int] = None, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Строки файла от последней к первой.
+
+    Args:
+        path: Файл
+        end: Читать байты до этого смещения (None - весь файл)
+        block_size: Размер блока чтения
+
+    Yields:
+        Строки без перевода строки (пустые строки пропускаются)
+    """
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        tail = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b'\n')
+            # Первая строка блока может продолжаться в предыдущем блоке
+            tail = lines[0]
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line.decode('utf-8', errors='replace').rstrip('\r')
+        if tail.strip():
+            yield tail.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def tail_lines(path: Path, limit: int, predicate: Optional[Callable[[str], bool]] = None) -> List[str]:
+    """
+    Последние строки файла, подходящие под условие.
+
+    Args:
+        path: Файл
+        limit: Максимум строк
+        predicate: Условие (None - все строки)
+
+    Returns:
+        Строки от новых к старым
+    """
+    lines = []
+    for line in read_lines_reverse(path):
+        if predicate is None or predicate(line):
+            lines.append(line)
+            if len(lines) >= limit:
+                break
+    return lines
+
+
+def _read_line_at(f, offset: int) -> str:
+    """Строка файла, начинающаяся со смещения"""
+    f.seek(offset)
+    return f.readline(MAX_LINE_BYTES).decode('utf-8', errors='replace').rstrip('\r\n')
+
+
+def find_log_lines(
+    path: Path,
+    limit: int,
+    since: Optional[datetime] = None,
+    levels: Sequence[str] = INDEXED_LEVELS
+) -> List[str]:
+    """
+    Последние записи уровней levels (из INDEXED_LEVELS) не старше since.
+
+    Записи после начала индекса читаются по смещениям из индекса,
+    остальная часть файла - с конца до первой записи старше since.
+    Если индекс не соответствует файлу (файл очищен или заменен),
+    весь файл читается с конца.
+
+    Args:
+        path: Лог-файл
+        limit: Максимум записей
+        since: Начало периода (None - без ограничения)
+        levels: Уровни записей
+
+    Returns:
+        Строки записей от новых к старым
+    """
+    since_str = since.strftime(TIMESTAMP_FORMAT) if since else None
+    lines: List[str] = []
+    scan_end = None
+
+    index = load_error_index(path)
+    size = path.stat().st_size
+    if index is not None and index.start <= size:
+        valid = True
+        with open(path, 'rb') as f:
+            for entry in reversed(index.entries):
+                if since_str and entry.timestamp < since_str:
+                    return lines
+                if entry.level not in levels:
+                    continue
+                line = _read_line_at(f, entry.offset) if entry.offset < size else ''
+                if not line.startswith(entry.timestamp):
+                    valid = False
+                    break
+                lines.append(line)
+                if len(lines) >= limit:
+                    return lines
+        if valid:
+            scan_end = index.start
+        else:
+            lines = []
+
+    # Часть файла без индекса
+    for line in read_lines_reverse(path, end=scan_end):
+        match = TIMESTAMP_PATTERN.match(line)
+        if not match:
+            continue
+        if since_str and match.group(1) < since_str:
+            break
+        if detect_level(line) in levels:
+            lines.append(line)
+            if len(lines) >= limit:
+                break
+    return lines
+
+
+def iter_log_bytes(paths: Sequence[Path], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Содержимое файлов подряд, блоками.
+
+    Размер каждого файла фиксируется при открытии: строки, дописанные
+    во время скачивания, не отдаются.
+    """
+    for path in paths:
+        with open(path, 'rb') as f:
+            remaining = os.fstat(f.fileno()).st_size
+            while remaining > 0:
+                chunk = f.read(min(block_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
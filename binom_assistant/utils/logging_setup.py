@@ -1,16 +1,39 @@
 """
 Централизованная настройка логирования для всех скриптов и модулей
+
+Логгеры пишут записи в очередь (QueueHandler), в файл и консоль их выводит
+отдельный поток (QueueListener). Потоки запросов и фоновых задач не ждут
+записи на диск и в stdout.
 """
+import atexit
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from .log_index import ErrorIndexFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Ротация app.log по размеру
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
+LOG_BACKUP_COUNT = 5
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
 
 
 def setup_logging(level=logging.INFO, log_file=None, console=True):
     """
     Настраивает логирование приложения в файл и/или консоль.
 
+    Повторный вызов заменяет предыдущую настройку (поток записи
+    останавливается, записи из очереди дописываются).
+
     Args:
         level: Уровень логирования (по умолчанию INFO)
         log_file: Путь к файлу логов (если None, используется logs/app.log)
@@ -19,6 +42,8 @@ def setup_logging(level=logging.INFO, log_file=None, console=True):
     Returns:
         Logger объект для использования в скрипте
     """
+    global _listener
+
     # Определяем корневую папку проекта
     root_dir = Path(__file__).parent.parent
     log_dir = root_dir / "logs"
@@ -30,34 +55,68 @@ def setup_logging(level=logging.INFO, log_file=None, console=True):
     else:
         log_file = Path(log_file)
 
-    # Настраиваем формат логов
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    date_format = '%Y-%m-%d %H:%M:%S'
-
-    # Создаем корневой logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(level)
-
-    # Удаляем существующие handlers чтобы избежать дублирования
-    root_logger.handlers.clear()
+    formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
 
-    # File handler с ротацией (макс 10MB, 5 бэкапов)
-    file_handler = RotatingFileHandler(
+    # File handler с ротацией по размеру и индексом ошибок (log_index)
+    file_handler = ErrorIndexFileHandler(
         log_file,
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
         encoding='utf-8'
     )
     file_handler.setLevel(level)
-    file_handler.setFormatter(logging.Formatter(log_format, date_format))
-    root_logger.addHandler(file_handler)
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
 
     # Console handler (опционально)
     if console:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(level)
-        console_handler.setFormatter(logging.Formatter(log_format, date_format))
-        root_logger.addHandler(console_handler)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    with _listener_lock:
+        _stop_listener()
+
+        # Создаем корневой logger
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+
+        # Удаляем существующие handlers чтобы избежать дублирования
+        root_logger.handlers.clear()
+
+        # Очередь без ограничения размера: запись в нее не блокирует поток
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(QueueHandler(log_queue))
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
 
     # Возвращаем logger для использования
     return logging.getLogger(__name__)
+
+
+def _stop_listener() -> None:
+    """Останавливает поток записи логов и закрывает его handlers"""
+    global _listener
+
+    if _listener is None:
+        return
+    # stop() дожидается записи всех записей из очереди
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def stop_logging() -> None:
+    """
+    Дописывает записи из очереди и останавливает поток записи.
+
+    Вызывается автоматически при выходе из процесса.
+    """
+    with _listener_lock:
+        _stop_listener()
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,116 @@
+"""
+Тест чтения логов с конца и индекса ошибок (log_reader, log_index)
+
+Проверяет:
+- обратное чтение на границах блоков совпадает с прямым
+- ошибки за период находятся по индексу, записи до индекса - чтением с конца
+- после ротации и внешней очистки файла результат остается верным
+
+Использование:
+    python binom_assistant/utils/test_log_reader.py
+    pytest binom_assistant/utils/test_log_reader.py
+"""
+import logging
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from utils.log_index import ErrorIndexFileHandler, load_error_index, reset_error_index
+from utils.log_reader import find_log_lines, read_lines_reverse, tail_lines
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _logger(path: Path, max_bytes: int = 0):
+    """Логгер, пишущий в path через ErrorIndexFileHandler"""
+    handler = ErrorIndexFileHandler(path, maxBytes=max_bytes, backupCount=2, encoding='utf-8')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+    logger = logging.getLogger(f"test_log_reader.{path.name}.{max_bytes}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler
+
+
+def test_read_lines_reverse():
+    """Строки с конца при маленьком блоке (строки режутся блоками, кириллица)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.log"
+        lines = [f"строка {i} " + "x" * (i % 7) for i in range(200)]
+        path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+        assert list(read_lines_reverse(path, block_size=5)) == lines[::-1]
+        assert tail_lines(path, 3, lambda line: "x" not in line) == ["строка 196 ", "строка 189 ", "строка 182 "]
+
+
+def test_errors_by_index():
+    """Ошибки за период: по индексу и в части файла до индекса"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.log"
+        old = (datetime.now() - timedelta(days=2)).strftime(DATE_FORMAT)
+        recent = datetime.now().strftime(DATE_FORMAT)
+        # Записи до появления индекса: старая и свежая ошибки
+        path.write_text(
+            f"{old} - m - ERROR - old error\n"
+            f"{recent} - m - ERROR - before index\n"
+            f"{recent} - m - INFO - info\n",
+            encoding='utf-8'
+        )
+
+        logger, handler = _logger(path)
+        logger.info("ok")
+        logger.error("first")
+        logger.warning("warn")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("second")
+        handler.close()
+
+        index = load_error_index(path)
+        assert len(index.entries) == 3 and index.start > 0
+
+        since = datetime.now() - timedelta(hours=1)
+        messages = [line.split(" - ")[3] for line in find_log_lines(path, 10, since=since, levels=("ERROR",))]
+        assert messages == ["second", "first", "before index"]
+        assert len(find_log_lines(path, 10, levels=("ERROR",))) == 4
+        assert len(find_log_lines(path, 2, levels=("ERROR", "WARNING"))) == 2
+
+        # Файл очищен в обход индекса - индекс не совпадает, файл читается с конца
+        path.write_text(f"{recent} - m - ERROR - after clear\n", encoding='utf-8')
+        assert [line.split(" - ")[3] for line in find_log_lines(path, 10)] == ["after clear"]
+
+        # Очистка со сбросом индекса (как DELETE /logs)
+        path.write_text("# cleared\n", encoding='utf-8')
+        reset_error_index(path)
+        assert find_log_lines(path, 10) == []
+
+
+def test_rotation():
+    """После ротации индекс начинается заново и указывает на новый файл"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.log"
+        logger, handler = _logger(path, max_bytes=300)
+        for i in range(30):
+            logger.error(f"error {i}")
+        handler.close()
+
+        assert Path(str(path) + ".1").exists()
+        assert load_error_index(path).start == 0
+        found = find_log_lines(path, 100)
+        assert found and found[0].endswith("error 29")
+        assert len(found) == len(path.read_text(encoding='utf-8').splitlines())
+
+
+if __name__ == "__main__":
+    test_read_lines_reverse()
+    test_errors_by_index()
+    test_rotation()
+    print("OK")
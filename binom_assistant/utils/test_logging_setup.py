@@ -0,0 +1,78 @@
+"""
+Тест логирования через очередь (logging_setup)
+
+Проверяет:
+- записи и трейсбеки попадают в файл через поток записи
+- индекс ошибок (log_index) ведется и при записи через очередь
+- повторная настройка и stop_logging дописывают очередь
+
+Использование:
+    python binom_assistant/utils/test_logging_setup.py
+    pytest binom_assistant/utils/test_logging_setup.py
+"""
+import logging
+import sys
+import tempfile
+import threading
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "binom_assistant"))
+
+from utils.log_index import load_error_index
+from utils.log_reader import find_log_lines
+from utils.logging_setup import setup_logging, stop_logging
+
+
+def test_queue_pipeline():
+    """Записи из нескольких потоков, трейсбек и индекс ошибок"""
+    root_logger = logging.getLogger()
+    saved_handlers, saved_level = list(root_logger.handlers), root_logger.level
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            first = Path(tmp) / "first.log"
+            setup_logging(log_file=first, console=False)
+            assert [type(h) for h in root_logger.handlers] == [QueueHandler]
+
+            logger = logging.getLogger("test_logging_setup")
+            logger.debug("hidden %s", "debug")
+            workers = [
+                threading.Thread(target=lambda n=n: [logger.info("worker %s line %s", n, i) for i in range(100)])
+                for n in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("failed %s", 42)
+
+            # Повторная настройка дописывает очередь в прежний файл
+            second = Path(tmp) / "second.log"
+            setup_logging(log_file=second, console=False)
+            logger.warning("after reconfigure")
+            stop_logging()
+
+            text = first.read_text(encoding='utf-8')
+            assert text.count(" - INFO - worker ") == 400
+            assert "hidden" not in text
+            assert " - ERROR - failed 42\nTraceback" in text and "ValueError: boom" in text
+
+            entries = load_error_index(first).entries
+            assert [entry.level for entry in entries] == ["ERROR"]
+            assert find_log_lines(first, 10)[0].endswith("failed 42")
+            assert second.read_text(encoding='utf-8').rstrip().endswith("after reconfigure")
+    finally:
+        stop_logging()
+        root_logger.handlers[:] = saved_handlers
+        root_logger.setLevel(saved_level)
+
+
+if __name__ == "__main__":
+    test_queue_pipeline()
+    print("OK")